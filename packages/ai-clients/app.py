@@ -10,10 +10,15 @@ This version uses a modular architecture with separate services for:
 Based on the CLAUDE.md roadmap for better maintainability and testing.
 """
 
+import asyncio
 import json
+import math
+import os
 import time
+from contextlib import asynccontextmanager
 from typing import List
 from fastapi import FastAPI, HTTPException, Response, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Import modular components
 from models import (
@@ -21,16 +26,20 @@ from models import (
     ChapterRequest, ChapterResponse, BookGenerationRequest, BookGenerationResponse,
     BookContext, BookChaptersRequest, BookChaptersResponse
 )
-from services import ask_llm, ChapterGenerator, _PDF_AVAILABLE
-try:
-    from services import PDFGenerator, CoverGenerator
-except ImportError:
-    PDFGenerator = None
-    CoverGenerator = None
+from services import (
+    ChapterGenerator, LLMError,
+    get_llm_pool_stats, get_llm_cache_stats, get_single_flight_stats,
+    get_llm_latency_stats, get_resilience_stats, get_rate_limit_stats, get_llm_usage_stats,
+    get_usage_ledger, usage_scope, get_model_routing_stats, route_overrides, get_provider_stats,
+    get_batch_stats, get_replay_stats, get_hedging_stats, Warmup, default_warmup_steps,
+    TOCGenerator, TOCParseError, get_chapter_scheduler_stats, tenant_scope, regenerate_responses,
+    get_book_job_store, get_book_job_stats, BookJobConflict, BookJobBusy, UnknownBookJob,
+    DraftEngine,
+)
 from demo import demo_router
 
 # Import mock data
-from mock_data.responses import get_mock_response
+from mock_data.responses import get_mock_response, load_mock_pdf
 
 
 # Performance tracking decorator
@@ -46,17 +55,63 @@ def track_performance(func):
     return wrapper
 
 
+# Background warm-up started with the app; GET /ready reports when it has finished
+warmup = Warmup({**default_warmup_steps(), "mock_pdf": load_mock_pdf})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup.start()
+    yield
+    await warmup.stop()
+    # Background book jobs are checkpointed, so they are cancelled and resumed after the restart
+    await chapter_generator.cancel_background()
+
+
 # FastAPI app
 app = FastAPI(
     title="AI-Powered Book Generator",
     description="Convert book ideas → TOC, draft, PDF, and cover via REST. Modular chapter-by-chapter architecture.",
+    lifespan=lifespan,
 )
 
 # Include demo routes
 app.include_router(demo_router)
 
-# Initialize chapter generator
+
+# Request header naming the tenant whose generation work a request is (scheduler fair share)
+TENANT_HEADER = os.getenv("TENANT_HEADER", "x-tenant-id").lower().encode()
+# Client addresses (e.g. the authenticating gateway) whose tenant header is believed; others are the default tenant
+TRUSTED_PROXIES = frozenset(ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip())
+
+
+def request_tenant(scope) -> str:
+    """The tenant named by a trusted proxy's header; empty (the default tenant) for any other client."""
+    client = scope.get("client")
+    if not client or client[0] not in TRUSTED_PROXIES:
+        return ""
+    return dict(scope["headers"]).get(TENANT_HEADER, b"").decode("latin-1").strip()
+
+
+class UsageTagMiddleware:
+    """Tag every LLM call made while serving a request with the request path, and its work with the tenant."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with usage_scope(endpoint=scope["path"]), tenant_scope(request_tenant(scope)):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(UsageTagMiddleware)
+
+# Initialize chapter, TOC and draft generators
 chapter_generator = ChapterGenerator(max_workers=5)
+toc_generator = TOCGenerator()
+draft_engine = DraftEngine()
 
 
 @app.get("/test")
@@ -71,13 +126,20 @@ def test_endpoint():
         "available_endpoints": [
             "/toc", 
             "/draft", 
+            "/draft-stream",
             "/generate-chapter", 
+            "/generate-chapter-stream",
             "/generate-book", 
+            "/book-jobs/{job_id}",
+            "/book-jobs/{job_id}/resume",
             "/generate-book-chapters",
             "/pdf", 
             "/cover", 
             "/demo", 
-            "/demo/presets"
+            "/demo/presets",
+            "/llm-stats",
+            "/llm-usage",
+            "/ready"
         ],
         "mock_endpoints": [
             "/mock/test",
@@ -96,52 +158,97 @@ def test_endpoint():
     }
 
 
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: 503 until the startup warm-up has finished, then 200 with each step's outcome."""
+    status = warmup.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
+@app.get("/llm-stats")
+def llm_stats():
+    """Report LLM client pool, response cache and request coalescing counters."""
+    return {
+        "pool": get_llm_pool_stats(),
+        "cache": get_llm_cache_stats(),
+        "single_flight": get_single_flight_stats(),
+        "latency": get_llm_latency_stats(),
+        "resilience": get_resilience_stats(),
+        "rate_limits": get_rate_limit_stats(),
+        "usage": get_llm_usage_stats(),
+        "routing": get_model_routing_stats(),
+        "providers": get_provider_stats(),
+        "batch": get_batch_stats(),
+        "replay": get_replay_stats(),
+        "hedging": get_hedging_stats(),
+        "toc": toc_generator.stats(),
+        "synopsis": chapter_generator.synopsis_generator.stats(),
+        "fanout": chapter_generator.stitcher.stats(),
+        "chapter_scheduler": get_chapter_scheduler_stats(),
+        "book_jobs": get_book_job_stats(),
+        "draft": draft_engine.stats(),
+    }
+
+
+@app.get("/llm-usage")
+def llm_usage(endpoint: str = None, book: str = None, chapter: int = None):
+    """Summarize the token usage ledger by model, optionally filtered by endpoint, book or chapter."""
+    filters = {"endpoint": endpoint, "book": book, "chapter": chapter}
+    return get_usage_ledger().summary(**{tag: value for tag, value in filters.items() if value is not None})
+
+
+def llm_http_error(error: LLMError) -> HTTPException:
+    """Map a typed LLM failure to 503 (transient, with Retry-After) or 502 (permanent)."""
+    headers = None
+    if error.retry_after:
+        headers = {"Retry-After": str(math.ceil(error.retry_after))}
+    return HTTPException(
+        503 if error.transient else 502,
+        detail=f"LLM call failed ({error.error_type}): {error}",
+        headers=headers,
+    )
+
+
 @app.post("/toc", response_model=List[Section])
 def generate_toc(req: TOCRequest):
     """Generate a JSON table of contents from title/author/idea."""
-    prompt = (
-        f"Act as an expert editor with the book idea: '{req.book_idea}'. "
-        "Generate a detailed table of contents using the following JSON schema: "
-        "[{\"section_name\": string, \"section_ideas\": [string, ...]}]. "
-        "Create at least 10 sections, and include at least 10 section ideas per section. "
-        "ONLY RETURN RAW JSON — do NOT include any Markdown formatting (no ``` or ```json), explanations, or extra text. "
-        "The response must be directly parsable as JSON."
-    )
-    raw = ask_llm(prompt, default="[]")
     try:
-        toc = json.loads(raw)
-        if not isinstance(toc, list):
-            raise ValueError
-        return toc
-    except ValueError:
+        with route_overrides(req.model_routes), regenerate_responses(req.regenerate):
+            return toc_generator.generate(req.book_idea)
+    except LLMError as e:
+        raise llm_http_error(e)
+    except TOCParseError:
         raise HTTPException(502, detail="LLM returned invalid JSON for TOC")
 
 
 @app.post("/draft")
-def generate_draft(req: DraftRequest):
+async def generate_draft(req: DraftRequest):
     """Take a TOC + metadata, return a single Markdown string draft."""
-    md = []
-    count = 0
-
-    for sec in req.toc:
-        md.append(f"## {sec.section_name}\n")
-        for idea in sec.section_ideas:
-            count += 1
-            prompt = (
-                f"Act as an expert writer of the book '{req.title}' about '{req.book_idea}'. "
-                f"Expand on '{idea}' in chapter '{sec.section_name}'. Write a couple of pages. "
-                "Reply only with the contents of the section. Do not add chapter numbers or chapter titles."
-            )
-            content = ask_llm(prompt, default=f"*Error generating {idea}*")
-            md.append(content + "\n\n")
+    return await draft_engine.draft(req)
 
-    return {"markdown": "".join(md)}
+
+@app.post("/draft-stream")
+async def generate_draft_stream(req: DraftRequest):
+    """Stream draft progress as Server-Sent Events, ending with the Markdown draft."""
+    async def events():
+        async for event in draft_engine.events(req):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+    )
 
 
 @app.post("/pdf")
 def generate_book_pdf(req: PDFRequest):
     """Convert Markdown + TOC + metadata → formatted PDF bytes."""
-    if not _PDF_AVAILABLE or PDFGenerator is None:
+    # WeasyPrint and pandoc are loaded by the first PDF request, not at startup
+    from services import PDFGenerator
+    if PDFGenerator is None:
         raise HTTPException(503, detail="PDF generation not available. WeasyPrint dependencies not installed.")
     
     try:
@@ -160,67 +267,130 @@ def generate_book_pdf(req: PDFRequest):
 @app.post("/cover")
 def generate_cover(req: CoverRequest):
     """Generate a full 6x9 cover PDF (front/back/spine) via AI + assemble."""
-    if not _PDF_AVAILABLE or CoverGenerator is None:
+    from services import CoverGenerator
+    if CoverGenerator is None:
         raise HTTPException(503, detail="Cover generation not available. WeasyPrint dependencies not installed.")
     
     try:
-        pdf_bytes = CoverGenerator.generate_cover_pdf(
-            title=req.title,
-            author=req.author,
-            book_idea=req.book_idea,
-            num_pages=req.num_pages,
-            include_spine_title=req.include_spine_title
-        )
+        with route_overrides(req.model_routes), regenerate_responses(req.regenerate):
+            pdf_bytes = CoverGenerator.generate_cover_pdf(
+                title=req.title,
+                author=req.author,
+                book_idea=req.book_idea,
+                num_pages=req.num_pages,
+                include_spine_title=req.include_spine_title
+            )
         return Response(content=pdf_bytes, media_type="application/pdf")
     except Exception as e:
         raise HTTPException(500, detail=f"Cover generation failed: {str(e)}")
 
 
 @app.post("/generate-chapter", response_model=ChapterResponse)
-def generate_chapter(req: ChapterRequest):
+async def generate_chapter(req: ChapterRequest):
     """Generate a single chapter based on outline and context."""
     try:
-        return chapter_generator.generate_single_chapter(req)
+        return await chapter_generator.async_generate_single_chapter(req)
     except Exception as e:
         raise HTTPException(500, detail=f"Chapter generation failed: {str(e)}")
 
 
+@app.post("/generate-chapter-stream")
+async def generate_chapter_stream(req: ChapterRequest):
+    """Stream a single chapter as Server-Sent Events; a failed stream ends with an ``error`` event."""
+    async def events():
+        try:
+            async for event in chapter_generator.async_stream_single_chapter(req):
+                if event["event"] == "complete":
+                    event = {"event": "complete", "chapter": event["chapter"].model_dump()}
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            # The status line has already been sent, so the failure is reported in-band
+            event = {"event": "error", "chapter_number": req.chapter_outline.chapter_number,
+                     "error": f"Chapter generation failed: {str(e)}", "error_type": "permanent"}
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+    )
+
+
+def book_job_accepted(job_id: str) -> JSONResponse:
+    """202 for a book job left running in the background; progress is polled from /book-jobs/{job_id}."""
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": "running",
+        "status_url": f"/book-jobs/{job_id}",
+    })
+
+
 @app.post("/generate-book", response_model=BookGenerationResponse)
-def generate_book(req: BookGenerationRequest):
-    """Generate an entire book chapter by chapter with optional parallel processing."""
+async def generate_book(req: BookGenerationRequest):
+    """Generate an entire book chapter by chapter with optional parallel processing.
+
+    Batch generation can take hours, so it returns 202 with the job ID at once
+    and the batch is submitted and polled in the background.
+    """
     try:
-        return chapter_generator.generate_book(req)
+        if req.batch_generation:
+            return book_job_accepted(await chapter_generator.async_start_book(req))
+        return await chapter_generator.async_generate_book(req)
+    except (BookJobConflict, BookJobBusy) as e:
+        raise HTTPException(409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(500, detail=f"Book generation failed: {str(e)}")
+
+
+@app.get("/book-jobs/{job_id}")
+def book_job_status(job_id: str):
+    """Report which chapters of a book job are saved and which are still missing."""
+    # A sync route, so FastAPI runs it (and its SQLite reads) in the threadpool
+    status = get_book_job_store().status(job_id)
+    if status is None:
+        raise HTTPException(404, detail=f"Unknown book job {job_id}")
+    return {**status, "running": chapter_generator.running_in_background(job_id)}
+
+
+@app.post("/book-jobs/{job_id}/resume", response_model=BookGenerationResponse)
+async def resume_book_job(job_id: str):
+    """Finish a book job, regenerating only the chapters that are missing or failed.
+
+    An unfinished batch job is resumed in the background (202); a finished one
+    returns the assembled book. A job that is still running returns 409.
+    """
+    store = get_book_job_store()
+    # The job store is SQLite, read off the event loop
+    request = await asyncio.to_thread(store.request, job_id)
+    try:
+        if request is not None and request.batch_generation and \
+                not (await asyncio.to_thread(store.status, job_id))["complete"]:
+            return book_job_accepted(await chapter_generator.async_start_book(request))
+        return await chapter_generator.async_resume_book(job_id)
+    except UnknownBookJob:
+        raise HTTPException(404, detail=f"Unknown book job {job_id}")
+    except BookJobBusy as e:
+        raise HTTPException(409, detail=str(e))
     except Exception as e:
         raise HTTPException(500, detail=f"Book generation failed: {str(e)}")
 
 
 @app.post("/generate-book-chapters", response_model=BookChaptersResponse)
-def generate_book_chapters(req: BookChaptersRequest):
+async def generate_book_chapters(req: BookChaptersRequest):
     """Generate TOC + selected chapters in one stateless call."""
     start_time = time.time()
     
     try:
         # Step 1: Generate TOC internally using the existing /toc logic
-        toc_prompt = (
-            f"Act as an expert editor with the book idea: '{req.book_idea}'. "
-            "Generate a detailed table of contents using the following JSON schema: "
-            "[{\"section_name\": string, \"section_ideas\": [string, ...]}]. "
-            "Create at least 10 sections, and include at least 10 section ideas per section. "
-            "ONLY RETURN RAW JSON — do NOT include any Markdown formatting (no ``` or ```json), explanations, or extra text. "
-            "The response must be directly parsable as JSON."
-        )
-        toc_raw = ask_llm(toc_prompt, default="[]")
-        toc_data = json.loads(toc_raw)
-        
-        if not isinstance(toc_data, list):
-            raise ValueError("Invalid TOC format")
+        with usage_scope() as toc_usage, route_overrides(req.model_routes), regenerate_responses(req.regenerate):
+            toc_data = await toc_generator.async_generate(req.book_idea)
             
         # Convert to Section objects for chapter generation
         toc_sections = [Section(**section) for section in toc_data]
         
         # Step 2: Generate only the requested chapters
         chapters = []
-        total_cost = 0.0
+        total_cost = toc_usage.cost
         
         book_context = BookContext(
             title=req.title,
@@ -228,27 +398,25 @@ def generate_book_chapters(req: BookChaptersRequest):
             book_idea=req.book_idea
         )
         
+        # The whole outline goes in the prompt prefix shared by every chapter
+        outlines = chapter_generator.toc_to_chapter_outlines(toc_sections)
+        
         for chapter_num in req.chapters_to_generate:
             if chapter_num <= len(toc_sections):
-                section = toc_sections[chapter_num - 1]
-                
-                # Create chapter outline from section
-                from models.chapter_models import ChapterOutline
-                chapter_outline = ChapterOutline(
-                    chapter_number=chapter_num,
-                    section_name=section.section_name,
-                    section_ideas=section.section_ideas
-                )
+                chapter_outline = outlines[chapter_num - 1]
                 
                 # Generate chapter request
                 chapter_request = ChapterRequest(
                     chapter_outline=chapter_outline,
                     book_context=book_context,
-                    custom_instructions=f"This is chapter {chapter_num} of {len(toc_sections)} in the book. Generate with full context awareness."
+                    book_outline=outlines,
+                    custom_instructions=f"This is chapter {chapter_num} of {len(toc_sections)} in the book. Generate with full context awareness.",
+                    model_routes=req.model_routes,
+                    regenerate=req.regenerate
                 )
                 
                 # Generate the chapter
-                chapter_response = chapter_generator.generate_single_chapter(chapter_request)
+                chapter_response = await chapter_generator.async_generate_single_chapter(chapter_request)
                 chapters.append(chapter_response)
                 
                 if chapter_response.cost_estimate:
@@ -273,7 +441,9 @@ def generate_book_chapters(req: BookChaptersRequest):
             }
         )
         
-    except json.JSONDecodeError:
+    except LLMError as e:
+        raise llm_http_error(e)
+    except TOCParseError:
         raise HTTPException(502, detail="LLM returned invalid JSON for TOC")
     except Exception as e:
         raise HTTPException(500, detail=f"Book chapters generation failed: {str(e)}")
@@ -363,8 +533,7 @@ def mock_generate_book_pdf(req: PDFRequest):
     """Mock version of /pdf endpoint."""
     try:
         # Return the existing mock PDF file
-        with open("mock_data/Eyes_on_Health_cover.pdf", "rb") as f:
-            pdf_bytes = f.read()
+        pdf_bytes = load_mock_pdf()
         headers = {'Content-Disposition': 'inline; filename="mock_book.pdf"'}
         return Response(content=pdf_bytes, headers=headers, media_type="application/pdf")
     except FileNotFoundError:
@@ -376,8 +545,7 @@ def mock_generate_cover(req: CoverRequest):
     """Mock version of /cover endpoint."""
     try:
         # Return the existing mock cover PDF file
-        with open("mock_data/Eyes_on_Health_cover.pdf", "rb") as f:
-            pdf_bytes = f.read()
+        pdf_bytes = load_mock_pdf()
         filename = f"{req.title.replace(' ', '_')}_cover_mock.pdf"
         headers = {'Content-Disposition': f'inline; filename="{filename}"'}
         return Response(content=pdf_bytes, headers=headers, media_type="application/pdf")
@@ -0,0 +1,245 @@
+"""
+Local OpenAI-compatible stand-in for the HAL9/OpenAI proxy, for load testing.
+
+Serves ``POST /v1/chat/completions`` (plain and streaming) and
+``POST /v1/images/generations`` with synthetic output, lognormal
+time-to-first-token, a per-token generation rate, injected 429/5xx errors
+and a concurrency cap. Point the app at it with one setting:
+
+    uvicorn fake_llm_server:app --port 9000
+    LLM_BASE_URL=http://localhost:9000/v1/ uvicorn app:app --port 8000
+
+All behaviour is configured with ``FAKE_LLM_*`` environment variables (see
+``FakeLLMConfig``); ``GET /stats`` reports what the server has done.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from PIL import Image
+
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from at or an have not "
+    "book chapter health story data idea people system change every model light signal world "
+    "science future question answer reason detail example practice moment pattern evidence"
+).split()
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class FakeLLMConfig:
+    """Behaviour of the fake provider; every field has a ``FAKE_LLM_<NAME>`` variable."""
+    # Output length in tokens (one word per token), capped by the request's max_tokens
+    output_tokens: int = 800
+    # Lognormal time to first token: median seconds and sigma of the underlying normal
+    ttfb_median: float = 0.5
+    ttfb_sigma: float = 0.5
+    # Generation rate after the first token (0 for instant)
+    tokens_per_second: float = 60.0
+    # Probability of answering with an injected 429 / 5xx
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    retry_after: float = 1.0
+    # Requests served at once; extra requests get a 429 (0 for no cap)
+    max_concurrency: int = 0
+    # Latency of an image generation
+    image_latency: float = 2.0
+    image_size: int = 64
+    # Seed for latency and error draws (None for nondeterministic)
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            output_tokens=int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", str(cls.output_tokens))),
+            ttfb_median=_env_float("FAKE_LLM_TTFB_MEDIAN", cls.ttfb_median),
+            ttfb_sigma=_env_float("FAKE_LLM_TTFB_SIGMA", cls.ttfb_sigma),
+            tokens_per_second=_env_float("FAKE_LLM_TOKENS_PER_SECOND", cls.tokens_per_second),
+            rate_limit_rate=_env_float("FAKE_LLM_RATE_LIMIT_RATE", cls.rate_limit_rate),
+            server_error_rate=_env_float("FAKE_LLM_SERVER_ERROR_RATE", cls.server_error_rate),
+            retry_after=_env_float("FAKE_LLM_RETRY_AFTER", cls.retry_after),
+            max_concurrency=int(os.getenv("FAKE_LLM_MAX_CONCURRENCY", str(cls.max_concurrency))),
+            image_latency=_env_float("FAKE_LLM_IMAGE_LATENCY", cls.image_latency),
+            image_size=int(os.getenv("FAKE_LLM_IMAGE_SIZE", str(cls.image_size))),
+            seed=int(seed) if seed else None,
+        )
+
+
+def synthetic_text(prompt: str, tokens: int) -> List[str]:
+    """Deterministic filler for ``prompt``: ``tokens`` words, each with its trailing space."""
+    rng = random.Random(hashlib.sha256(prompt.encode()).hexdigest())
+    return [rng.choice(WORDS) + " " for _ in range(tokens)]
+
+
+class FakeProvider:
+    """Latency, error and concurrency model shared by the endpoints."""
+
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.in_flight = 0
+        self.metrics = {"requests": 0, "completed": 0, "streamed": 0, "images": 0,
+                        "rate_limited": 0, "server_errors": 0, "concurrency_rejected": 0,
+                        "peak_in_flight": 0}
+
+    def ttfb(self) -> float:
+        if self.config.ttfb_median <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.config.ttfb_median), self.config.ttfb_sigma)
+
+    def token_delay(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1.0 / rate if rate > 0 else 0.0
+
+    def admit(self) -> Optional[JSONResponse]:
+        """
+        Count the request and return an injected error response, if any.
+
+        An admitted request is counted as in flight until ``leave``.
+        """
+        self.metrics["requests"] += 1
+        cap = self.config.max_concurrency
+        if cap and self.in_flight >= cap:
+            self.metrics["concurrency_rejected"] += 1
+            return _error(429, "Too many concurrent requests", self.config.retry_after)
+        draw = self.rng.random()
+        if draw < self.config.rate_limit_rate:
+            self.metrics["rate_limited"] += 1
+            return _error(429, "Rate limit reached (injected)", self.config.retry_after)
+        if draw < self.config.rate_limit_rate + self.config.server_error_rate:
+            self.metrics["server_errors"] += 1
+            return _error(self.rng.choice((500, 502, 503)), "Upstream error (injected)")
+        self.in_flight += 1
+        self.metrics["peak_in_flight"] = max(self.metrics["peak_in_flight"], self.in_flight)
+        return None
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"config": asdict(self.config), "in_flight": self.in_flight, **self.metrics}
+
+
+def _error(status: int, message: str, retry_after: Optional[float] = None) -> JSONResponse:
+    headers = {"retry-after": f"{retry_after:g}"} if retry_after is not None else None
+    return JSONResponse(status_code=status, headers=headers,
+                        content={"error": {"message": message, "type": "fake_llm_error", "code": status}})
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0}}
+
+
+def _chunk(model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+               "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    """
+    Build the fake provider app.
+
+    Args:
+        config: Behaviour (defaults to ``FakeLLMConfig.from_env()``)
+
+    Returns:
+        The FastAPI app
+    """
+    provider = FakeProvider(config or FakeLLMConfig.from_env())
+    fake = FastAPI(title="Fake LLM provider")
+    fake.state.provider = provider
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        rejected = provider.admit()
+        if rejected is not None:
+            return rejected
+        model = body.get("model", "gpt-4o")
+        prompt = "".join(str(message.get("content", "")) for message in body.get("messages", []))
+        tokens = min(provider.config.output_tokens, body.get("max_tokens") or body.get("max_completion_tokens")
+                     or provider.config.output_tokens)
+        words = synthetic_text(prompt, tokens)
+        usage = _usage(len(prompt) // 4, len(words))
+        ttfb, delay = provider.ttfb(), provider.token_delay()
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(ttfb + delay * max(len(words) - 1, 0))
+            finally:
+                provider.leave()
+            provider.metrics["completed"] += 1
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(words).strip()}}],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                await asyncio.sleep(ttfb)
+                yield _chunk(model, {"role": "assistant", "content": ""})
+                for index, word in enumerate(words):
+                    if index and delay:
+                        await asyncio.sleep(delay)
+                    yield _chunk(model, {"content": word})
+                yield _chunk(model, {}, "stop")
+                if include_usage:
+                    payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                               "created": int(time.time()), "model": model, "choices": [], "usage": usage}
+                    yield f"data: {json.dumps(payload)}\n\n"
+                yield "data: [DONE]\n\n"
+                provider.metrics["streamed"] += 1
+            finally:
+                provider.leave()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @fake.post("/v1/images/generations")
+    async def images_generations(request: Request):
+        body = await request.json()
+        rejected = provider.admit()
+        if rejected is not None:
+            return rejected
+        try:
+            await asyncio.sleep(provider.config.image_latency)
+        finally:
+            provider.leave()
+        size = provider.config.image_size
+        color = tuple(hashlib.sha256(body.get("prompt", "").encode()).digest()[:3])
+        buffer = BytesIO()
+        Image.new("RGB", (size, size), color).save(buffer, format="PNG")
+        provider.metrics["images"] += 1
+        return {"created": int(time.time()),
+                "data": [{"b64_json": base64.b64encode(buffer.getvalue()).decode()} for _ in range(body.get("n") or 1)]}
+
+    @fake.get("/stats")
+    def stats():
+        """Report the configuration and request, error and concurrency counters."""
+        return provider.stats()
+
+    return fake
+
+
+app = create_app()
@@ -2,8 +2,20 @@
 Mock response data for API endpoints to avoid expensive AI calls during testing.
 """
 
+import os
+from functools import lru_cache
 from typing import Dict, Any, List, Union
 
+# Sample PDF returned by the mock PDF and cover endpoints
+MOCK_PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Eyes_on_Health_cover.pdf")
+
+
+@lru_cache(maxsize=1)
+def load_mock_pdf() -> bytes:
+    """Bytes of the sample PDF, read from disk once (raises FileNotFoundError if it is missing)."""
+    with open(MOCK_PDF_PATH, "rb") as f:
+        return f.read()
+
 
 def get_mock_toc_response(book_idea: str = "") -> List[Dict[str, Any]]:
     """Mock TOC response - structured JSON matching Section model."""
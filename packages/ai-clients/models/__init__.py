@@ -2,7 +2,7 @@
 Pydantic models for the AI Book Generator API.
 """
 
-from .request_models import TOCRequest, DraftRequest, PDFRequest, CoverRequest
+from .request_models import TOCRequest, DraftRequest, PDFRequest, CoverRequest, ModelRoute, ModelStage
 from .section_model import Section
 from .chapter_models import (
     ChapterOutline, 
@@ -21,6 +21,8 @@ __all__ = [
     "DraftRequest", 
     "PDFRequest", 
     "CoverRequest",
+    "ModelRoute",
+    "ModelStage",
     "ChapterOutline",
     "BookContext", 
     "ChapterRequest", 
@@ -5,6 +5,7 @@ Models for chapter-by-chapter generation.
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from .section_model import Section
+from .request_models import ModelRoutes
 
 
 class ChapterOutline(BaseModel):
@@ -37,6 +38,29 @@ class ChapterRequest(BaseModel):
         default=None,
         description="Additional instructions for this specific chapter"
     )
+    book_outline: Optional[List[ChapterOutline]] = Field(
+        default=None,
+        description="Every chapter of the book; sent in the prompt prefix shared by all chapters"
+    )
+    book_synopses: Optional[List[str]] = Field(
+        default=None,
+        description="Short synopsis of every chapter, in outline order; shared context for hybrid generation"
+    )
+    subsection_fanout: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=10,
+        description="Ideas per subsection: generate the chapter's subsections concurrently and stitch them "
+                    "(unset writes the chapter in one call; streaming always does)"
+    )
+    model_routes: ModelRoutes = Field(
+        default=None,
+        description="Per-stage model/parameter overrides for this request (e.g. {'chapter': {'model': 'gpt-4o'}})"
+    )
+    regenerate: bool = Field(
+        default=False,
+        description="Ignore cached LLM responses and generate fresh text, which replaces the cached copy"
+    )
 
 
 class ChapterResponse(BaseModel):
@@ -47,6 +71,18 @@ class ChapterResponse(BaseModel):
     word_count: int = Field(..., description="Approximate word count")
     generation_time: Optional[float] = Field(default=None, description="Time taken to generate in seconds")
     cost_estimate: Optional[float] = Field(default=None, description="Estimated cost in USD")
+    prompt_tokens: Optional[int] = Field(default=None, description="Prompt tokens reported by the provider")
+    completion_tokens: Optional[int] = Field(default=None, description="Completion tokens reported by the provider")
+    cached_tokens: Optional[int] = Field(default=None, description="Prompt tokens served from the provider's prompt cache")
+    time_to_first_token: Optional[float] = Field(
+        default=None,
+        description="Seconds until the first streamed token arrived (streaming generation only)"
+    )
+    error: Optional[str] = Field(default=None, description="Failure message if the chapter could not be generated")
+    error_type: Optional[str] = Field(
+        default=None,
+        description="'transient' (worth retrying later) or 'permanent' when generation failed"
+    )
 
 
 class BookGenerationRequest(BaseModel):
@@ -57,12 +93,53 @@ class BookGenerationRequest(BaseModel):
         default=False, 
         description="Whether to generate chapters in parallel (faster but no cross-chapter context)"
     )
+    batch_generation: bool = Field(
+        default=False,
+        description="Submit all chapters as one discounted Batch API job and wait for it (slow, no cross-chapter context)"
+    )
+    synopsis_generation: bool = Field(
+        default=False,
+        description="Draft per-chapter synopses in one cheap call, then generate all chapters in parallel "
+                    "with the synopses as shared cross-chapter context"
+    )
+    graph_generation: bool = Field(
+        default=False,
+        description="Schedule chapters as a dependency graph: each waits only for the context_lookback chapters "
+                    "before its wave of max_concurrent_chapters concurrent chapters, never on chapters of its own wave"
+    )
+    context_lookback: int = Field(
+        default=2,
+        ge=0,
+        le=10,
+        description="Earlier chapters each chapter depends on and receives as context in graph generation. "
+                    "Counted back from the start of the chapter's wave: chapters in the same wave of "
+                    "max_concurrent_chapters never see each other (see generation_summary.chapter_dependencies)"
+    )
+    subsection_fanout: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=10,
+        description="Ideas per subsection: write each chapter as concurrent subsections stitched together "
+                    "(not used by batch generation)"
+    )
+    job_id: Optional[str] = Field(
+        default=None,
+        description="Resume this book job, regenerating only chapters that are missing or failed (new job if unset)"
+    )
     max_concurrent_chapters: int = Field(
         default=3,
         ge=1,
         le=10,
         description="Maximum number of chapters to generate concurrently"
     )
+    model_routes: ModelRoutes = Field(
+        default=None,
+        description="Per-stage model/parameter overrides for this request (e.g. {'chapter': {'model': 'gpt-4o'}})"
+    )
+    regenerate: bool = Field(
+        default=False,
+        description="Ignore cached LLM responses and generate fresh text, which replaces the cached copy"
+    )
 
 
 class BookGenerationResponse(BaseModel):
@@ -83,6 +160,14 @@ class BookChaptersRequest(BaseModel):
     author: str = Field(description="Book author")
     book_idea: str = Field(description="Book concept/description")
     chapters_to_generate: List[int] = Field(default=[1], description="List of chapter numbers to generate (1-indexed)")
+    model_routes: ModelRoutes = Field(
+        default=None,
+        description="Per-stage model/parameter overrides for this request (e.g. {'chapter': {'model': 'gpt-4o'}})"
+    )
+    regenerate: bool = Field(
+        default=False,
+        description="Ignore cached LLM responses and generate fresh text, which replaces the cached copy"
+    )
 
 
 class BookChaptersResponse(BaseModel):
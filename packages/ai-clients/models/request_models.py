@@ -2,15 +2,88 @@
 Request models for API endpoints.
 """
 
-from typing import List
-from pydantic import BaseModel, Field
+import os
+from typing import Any, Callable, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator
 from .section_model import Section
 
 
+# LLM call sites that can be routed to different models
+ModelStage = Literal[
+    "toc", "toc_repair", "synopsis", "chapter", "chapter_stitch", "cover_blurb", "cover_illustration_prompt",
+    "section_draft"
+]
+
+
+# What a request may choose in ``model_routes``; anything else is configured server-side (LLM_ROUTES)
+OVERRIDABLE_PARAMS = frozenset({
+    "temperature", "top_p", "max_tokens", "max_completion_tokens", "presence_penalty", "frequency_penalty",
+    "seed", "stop"
+})
+# The default provider is the OpenAI-compatible proxy, so only OpenAI models are allowed by default
+ALLOWED_MODELS = frozenset(filter(None, (name.strip() for name in os.getenv(
+    "LLM_ALLOWED_MODELS", "gpt-4o,gpt-4o-mini,gpt-4.1,gpt-4.1-mini"
+).split(","))))
+
+# Whether the active LLM providers can serve a model; installed by the LLM layer (``services.ai_client``)
+_model_served: Callable[[str], bool] = lambda model: True
+
+
+def set_model_served_check(check: Callable[[str], bool]) -> None:
+    """Install the check that an overridden model can be served by the configured providers."""
+    global _model_served
+    _model_served = check
+
+
+def check_override_model(model: str) -> str:
+    """
+    Validate a model a request asks for.
+
+    Raises:
+        ValueError: The model is outside ``LLM_ALLOWED_MODELS`` or no configured provider serves it
+    """
+    if model not in ALLOWED_MODELS:
+        raise ValueError(f"model must be one of {sorted(ALLOWED_MODELS)}")
+    if not _model_served(model):
+        raise ValueError(f"model {model!r} cannot be served by the configured LLM providers")
+    return model
+
+
+class ModelRoute(BaseModel):
+    """Model and sampling parameters for one stage; unset fields keep the configured route."""
+    model: Optional[str] = Field(
+        default=None,
+        description="Model name, e.g. 'gpt-4o-mini'; must be one of LLM_ALLOWED_MODELS and served by LLM_PROVIDERS"
+    )
+    params: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Sampling parameters: temperature, top_p, max_tokens, max_completion_tokens, "
+                    "presence_penalty, frequency_penalty, seed or stop"
+    )
+
+    @field_validator("model")
+    @classmethod
+    def _allowed_model(cls, model: Optional[str]) -> Optional[str]:
+        return check_override_model(model) if model is not None else None
+
+    @field_validator("params")
+    @classmethod
+    def _overridable_params(cls, params: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(params) - OVERRIDABLE_PARAMS
+        if unknown:
+            raise ValueError(f"params may not set {sorted(unknown)}; allowed: {sorted(OVERRIDABLE_PARAMS)}")
+        return params
+
+
+ModelRoutes = Optional[Dict[ModelStage, ModelRoute]]
+
+
 class TOCRequest(BaseModel):
     title: str
     author: str
     book_idea: str
+    model_routes: ModelRoutes = None
+    regenerate: bool = Field(default=False, description="Ignore cached LLM responses and generate fresh text")
 
 
 class DraftRequest(BaseModel):
@@ -18,6 +91,8 @@ class DraftRequest(BaseModel):
     author: str
     book_idea: str
     toc: List[Section]
+    model_routes: ModelRoutes = None
+    regenerate: bool = Field(default=False, description="Ignore cached LLM responses and generate fresh text")
 
 
 class PDFRequest(BaseModel):
@@ -32,4 +107,6 @@ class CoverRequest(BaseModel):
     author: str
     book_idea: str
     num_pages: int = Field(..., gt=0)
-    include_spine_title: bool = False
\ No newline at end of file
+    include_spine_title: bool = False
+    model_routes: ModelRoutes = None
+    regenerate: bool = Field(default=False, description="Ignore cached LLM responses and generate fresh text")
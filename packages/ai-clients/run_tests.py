@@ -25,6 +25,30 @@ def run_tests():
                 sys.executable, '-m', 'pytest', 
                 'tests/test_simple_app.py',
                 'tests/test_models.py',
+                'tests/test_llm_pool.py',
+                'tests/test_chapter_generator.py',
+                'tests/test_llm_cache.py',
+                'tests/test_single_flight.py',
+                'tests/test_streaming.py',
+                'tests/test_resilience.py',
+                'tests/test_rate_limiter.py',
+                'tests/test_usage_ledger.py',
+                'tests/test_model_routing.py',
+                'tests/test_llm_providers.py',
+                'tests/test_llm_batch.py',
+                'tests/test_chapter_prompts.py',
+                'tests/test_http_replay.py',
+                'tests/test_fake_llm_server.py',
+                'tests/test_hedging.py',
+                'tests/test_startup.py',
+                'tests/test_warmup.py',
+                'tests/test_toc_generator.py',
+                'tests/test_chapter_scheduler.py',
+                'tests/test_synopsis_generator.py',
+                'tests/test_chapter_graph.py',
+                'tests/test_book_jobs.py',
+                'tests/test_draft_engine.py',
+                'tests/test_chapter_fanout.py',
                 '-v', 
                 '--tb=short',
                 '--color=yes'
@@ -1,25 +1,178 @@
 """
 Business logic services for the AI Book Generator.
+
+Importing this package is cheap: the OpenAI, Replicate and Anthropic SDKs are
+imported when their clients are first built, and the WeasyPrint-based
+``PDFGenerator``/``CoverGenerator`` (with pypandoc, bs4 and PIL) are
+imported the first time one of them, or ``_PDF_AVAILABLE``, is looked up.
 """
 
-from .ai_client import get_openai_client, get_replicate_client, ask_llm
+from .ai_client import (
+    get_openai_client, get_async_openai_client, get_replicate_client,
+    ask_llm, async_ask_llm, call_llm, async_call_llm, stream_llm, async_stream_llm,
+    get_client_manager, set_client_manager, get_llm_pool_stats,
+    get_llm_cache, set_llm_cache, get_llm_cache_stats, get_single_flight_stats,
+    get_llm_latency_stats, get_resilience, set_resilience, get_resilience_stats,
+    get_rate_limiter, set_rate_limiter, get_rate_limit_stats,
+    get_usage_ledger, set_usage_ledger, get_llm_usage_stats,
+    get_model_router, set_model_router, get_model_routing_stats,
+    get_provider_pool, set_provider_pool, make_provider_pool, get_provider_stats,
+    batch_call_llm, async_batch_call_llm, get_batch_runner, set_batch_runner, get_batch_stats,
+    get_http_client, get_replay_stats, get_hedger, set_hedger, get_hedging_stats
+)
+from .llm_errors import (
+    LLMError, LLMTransientError, LLMRateLimitError, LLMTimeoutError,
+    LLMDeadlineExceededError, LLMCircuitOpenError, LLMPermanentError
+)
+from .resilience import LLMResilience, RetryPolicy, CircuitBreaker
+from .rate_limiter import RateLimiter, ModelLimits
+from .usage_ledger import UsageLedger, ModelPrice, usage_scope
+from .model_routing import ModelRouter, StageRoute, route_overrides
+from .llm_providers import LLMProvider, OpenAIProvider, AnthropicProvider, ProviderPool
+from .llm_batch import BatchProvider, OpenAIBatchProvider, BatchRunner, BatchResult
+from .http_replay import Cassette, ReplayTransport
+from .hedging import Hedger, hedge_budget
+from .llm_cache import LLMCache, regenerate_responses
+from .llm_pool import LLMClientManager
 from .chapter_generator import ChapterGenerator
+from .book_jobs import (
+    BookJobStore, BookJobConflict, BookJobBusy, UnknownBookJob,
+    get_book_job_store, set_book_job_store, get_book_job_stats
+)
+from .chapter_fanout import SubsectionStitcher, split_subsections
+from .chapter_graph import lookback_dependencies, critical_path
+from .chapter_scheduler import (
+    ChapterScheduler, get_chapter_scheduler, set_chapter_scheduler, get_chapter_scheduler_stats, tenant_scope
+)
+from .warmup import Warmup, WarmupSkipped, default_warmup_steps
+from .toc_generator import TOCGenerator, TOCParseError, parse_toc
+from .synopsis_generator import SynopsisGenerator, SynopsisParseError
+from .draft_engine import DraftEngine, DraftProgress
+
+_PDF_SERVICES = ("PDFGenerator", "CoverGenerator", "_PDF_AVAILABLE")
+
+
+def __getattr__(name):
+    """Import the WeasyPrint-dependent services on first access."""
+    if name not in _PDF_SERVICES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        from .pdf_generator import PDFGenerator
+        from .cover_generator import CoverGenerator
+        available = True
+    except (ImportError, OSError):
+        # WeasyPrint raises OSError when its system libraries are missing
+        PDFGenerator = None
+        CoverGenerator = None
+        available = False
+    globals().update(PDFGenerator=PDFGenerator, CoverGenerator=CoverGenerator, _PDF_AVAILABLE=available)
+    return globals()[name]
 
-# Import WeasyPrint-dependent services only when needed
-try:
-    from .pdf_generator import PDFGenerator
-    from .cover_generator import CoverGenerator
-    _PDF_AVAILABLE = True
-except ImportError:
-    PDFGenerator = None
-    CoverGenerator = None
-    _PDF_AVAILABLE = False
 
 __all__ = [
     "get_openai_client",
+    "get_async_openai_client",
     "get_replicate_client", 
     "ask_llm",
+    "async_ask_llm",
+    "call_llm",
+    "async_call_llm",
+    "stream_llm",
+    "async_stream_llm",
+    "get_client_manager",
+    "set_client_manager",
+    "get_llm_pool_stats",
+    "LLMClientManager",
+    "get_llm_cache",
+    "set_llm_cache",
+    "get_llm_cache_stats",
+    "LLMCache",
+    "regenerate_responses",
+    "get_single_flight_stats",
+    "get_llm_latency_stats",
+    "get_resilience",
+    "set_resilience",
+    "get_resilience_stats",
+    "LLMResilience",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "get_rate_limiter",
+    "set_rate_limiter",
+    "get_rate_limit_stats",
+    "RateLimiter",
+    "ModelLimits",
+    "get_usage_ledger",
+    "set_usage_ledger",
+    "get_llm_usage_stats",
+    "UsageLedger",
+    "ModelPrice",
+    "usage_scope",
+    "get_model_router",
+    "set_model_router",
+    "get_model_routing_stats",
+    "ModelRouter",
+    "StageRoute",
+    "route_overrides",
+    "get_provider_pool",
+    "set_provider_pool",
+    "make_provider_pool",
+    "get_provider_stats",
+    "LLMProvider",
+    "OpenAIProvider",
+    "AnthropicProvider",
+    "ProviderPool",
+    "batch_call_llm",
+    "async_batch_call_llm",
+    "get_batch_runner",
+    "set_batch_runner",
+    "get_batch_stats",
+    "BatchProvider",
+    "OpenAIBatchProvider",
+    "BatchRunner",
+    "BatchResult",
+    "get_http_client",
+    "get_replay_stats",
+    "get_hedger",
+    "set_hedger",
+    "get_hedging_stats",
+    "Cassette",
+    "ReplayTransport",
+    "Hedger",
+    "hedge_budget",
+    "LLMError",
+    "LLMTransientError",
+    "LLMRateLimitError",
+    "LLMTimeoutError",
+    "LLMDeadlineExceededError",
+    "LLMCircuitOpenError",
+    "LLMPermanentError",
     "ChapterGenerator",
+    "BookJobStore",
+    "BookJobConflict",
+    "BookJobBusy",
+    "UnknownBookJob",
+    "get_book_job_store",
+    "set_book_job_store",
+    "get_book_job_stats",
+    "SubsectionStitcher",
+    "split_subsections",
+    "lookback_dependencies",
+    "critical_path",
+    "ChapterScheduler",
+    "get_chapter_scheduler",
+    "set_chapter_scheduler",
+    "get_chapter_scheduler_stats",
+    "tenant_scope",
+    "Warmup",
+    "WarmupSkipped",
+    "default_warmup_steps",
+    "TOCGenerator",
+    "TOCParseError",
+    "parse_toc",
+    "SynopsisGenerator",
+    "SynopsisParseError",
+    "DraftEngine",
+    "DraftProgress",
     "PDFGenerator",
     "CoverGenerator",
     "_PDF_AVAILABLE"
@@ -2,50 +2,788 @@
 AI client configuration and utilities for OpenAI and Replicate APIs.
 """
 
+import asyncio
 import os
-from openai import OpenAI
-from replicate.client import Client as ReplicateClient
+import threading
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import httpx
 
-# Initialize AI clients (using HAL9 proxy tokens)
+from models.request_models import set_model_served_check
+
+from .llm_batch import BATCH_PRICE_FACTOR, BatchJob, BatchResult, BatchRunner, OpenAIBatchProvider
+from .llm_cache import LLMCache, make_cache_key, regenerating
+from .llm_errors import classify_error
+from .llm_metrics import LatencyRecorder
+from .hedging import Hedger, pending_send
+from .http_replay import ReplayTransport, make_replay_transport
+from .llm_pool import (
+    DEFAULT_KEEPALIVE_EXPIRY,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_KEEPALIVE,
+    DEFAULT_TIMEOUT,
+    LLMClientManager,
+)
+from .llm_providers import Completion, LLMProvider, OpenAIProvider, ProviderPool, build_provider_pool
+from .model_routing import ModelRouter
+from .rate_limiter import RateLimiter, estimate_tokens
+from .resilience import LLMResilience
+from .single_flight import SingleFlight
+from .usage_ledger import UsageLedger, current_usage_scope
+
+# The OpenAI and Replicate SDKs are imported when their clients are first built
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+    from replicate.client import Client as ReplicateClient
+
+# AI clients use HAL9 proxy tokens; a missing token is reported on first use
 OAI_TOKEN = os.getenv("HAL9_TOKEN")
-if not OAI_TOKEN:
-    raise RuntimeError("HAL9_TOKEN must be set")
 
+# LLM_BASE_URL points every OpenAI call elsewhere, e.g. fake_llm_server.py for load tests
+OPENAI_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.hal9.com/proxy/server=https://api.openai.com/v1/")
+REPLICATE_BASE_URL = "https://api.hal9.com/proxy/server=https://api.replicate.com"
+
+# Record/replay transport under every upstream client (LLM_REPLAY_MODE, off by default)
+_replay_transport: Optional[ReplayTransport] = make_replay_transport(limits=httpx.Limits(
+    max_connections=DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+    keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+))
+
+# Process-wide pooled client shared by every request and worker thread (built on first use)
+_client_manager: Optional[LLMClientManager] = None
+_client_lock = threading.Lock()
+_llm_cache = LLMCache()
+_single_flight = SingleFlight()
+_latency = LatencyRecorder()
+_resilience = LLMResilience()
+_rate_limiter = RateLimiter()
+_usage_ledger = UsageLedger()
+_model_router = ModelRouter()
+_hedger = Hedger()
+_provider_pool: Optional[ProviderPool] = None
+_provider_lock = threading.Lock()
+_batch_runner: Optional[BatchRunner] = None
+_replicate_client: Optional["ReplicateClient"] = None
+_replicate_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+
+
+def _hal9_token() -> str:
+    """The HAL9 proxy token, checked when the first upstream client is built."""
+    if not OAI_TOKEN:
+        raise RuntimeError("HAL9_TOKEN must be set")
+    return OAI_TOKEN
+
+
+def get_client_manager() -> LLMClientManager:
+    """Get the process-wide LLM client manager, creating it on first use."""
+    global _client_manager
+    manager = _client_manager
+    if manager is not None:
+        return manager
+    with _client_lock:
+        if _client_manager is None:
+            _client_manager = LLMClientManager(
+                base_url=OPENAI_BASE_URL, api_key=_hal9_token(), transport=_replay_transport
+            )
+        return _client_manager
+
+
+def set_client_manager(manager: Optional[LLMClientManager]) -> Optional[LLMClientManager]:
+    """
+    Replace the process-wide LLM client manager.
+
+    Args:
+        manager: New manager (e.g. with a test transport); None rebuilds the default on next use
+
+    Returns:
+        The previously installed manager
+    """
+    global _client_manager
+    with _client_lock:
+        previous, _client_manager = _client_manager, manager
+    return previous
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the process-wide LLM response cache."""
+    return _llm_cache
+
+
+def set_llm_cache(cache: LLMCache) -> LLMCache:
+    """
+    Replace the process-wide LLM response cache.
+
+    Args:
+        cache: New cache (e.g. memory-only for tests)
+
+    Returns:
+        The previously installed cache
+    """
+    global _llm_cache
+    previous, _llm_cache = _llm_cache, cache
+    return previous
+
+
+def get_resilience() -> LLMResilience:
+    """Get the process-wide retry/circuit-breaker policy."""
+    return _resilience
+
+
+def set_resilience(resilience: LLMResilience) -> LLMResilience:
+    """
+    Replace the process-wide retry/circuit-breaker policy.
+
+    Args:
+        resilience: New policy (e.g. without backoff delays for tests)
+
+    Returns:
+        The previously installed policy
+    """
+    global _resilience
+    previous, _resilience = _resilience, resilience
+    return previous
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide RPM/TPM limiter."""
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: RateLimiter) -> RateLimiter:
+    """
+    Replace the process-wide RPM/TPM limiter.
+
+    Args:
+        limiter: New limiter
+
+    Returns:
+        The previously installed limiter
+    """
+    global _rate_limiter
+    previous, _rate_limiter = _rate_limiter, limiter
+    return previous
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Get the process-wide token usage ledger."""
+    return _usage_ledger
+
+
+def set_usage_ledger(ledger: UsageLedger) -> UsageLedger:
+    """
+    Replace the process-wide token usage ledger.
+
+    Args:
+        ledger: New ledger
+
+    Returns:
+        The previously installed ledger
+    """
+    global _usage_ledger
+    previous, _usage_ledger = _usage_ledger, ledger
+    return previous
+
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide stage-to-model router."""
+    return _model_router
+
+
+def set_model_router(router: ModelRouter) -> ModelRouter:
+    """
+    Replace the process-wide stage-to-model router.
+
+    Args:
+        router: New router
+
+    Returns:
+        The previously installed router
+    """
+    global _model_router
+    previous, _model_router = _model_router, router
+    return previous
 
-def get_openai_client() -> OpenAI:
-    """Get configured OpenAI client."""
-    return OpenAI(
-        base_url="https://api.hal9.com/proxy/server=https://api.openai.com/v1/",
-        api_key=OAI_TOKEN,
-    )
 
+def get_hedger() -> Hedger:
+    """Get the process-wide request hedging policy."""
+    return _hedger
 
-def get_replicate_client() -> ReplicateClient:
-    """Get configured Replicate client.""" 
-    return ReplicateClient(
-        base_url="https://api.hal9.com/proxy/server=https://api.replicate.com",
-        api_token=OAI_TOKEN,
-    )
 
+def set_hedger(hedger: Hedger) -> Hedger:
+    """
+    Replace the process-wide request hedging policy.
+
+    Args:
+        hedger: New policy
 
-def ask_llm(prompt: str, default: str = "") -> str:
+    Returns:
+        The previously installed policy
+    """
+    global _hedger
+    previous, _hedger = _hedger, hedger
+    return previous
+
+
+def _before_send(model: str, params: Dict[str, Any]) -> None:
+    # Limiter waits do not count towards the hedge threshold
+    with pending_send():
+        _rate_limiter.acquire(model, _estimated_tokens(params))
+
+
+async def _async_before_send(model: str, params: Dict[str, Any]) -> None:
+    with pending_send():
+        await _rate_limiter.async_acquire(model, _estimated_tokens(params))
+
+
+def make_provider_pool(providers: Optional[List[Tuple[LLMProvider, float]]] = None,
+                       **kwargs: Any) -> ProviderPool:
+    """
+    Build a provider pool whose sends acquire the shared rate limiter.
+
+    Args:
+        providers: ``(provider, weight)`` pairs (defaults to ``LLM_PROVIDERS``)
+        **kwargs: Passed to ``ProviderPool``
+
+    Returns:
+        The pool
+    """
+    kwargs.update(before_send=_before_send, async_before_send=_async_before_send)
+    if providers is None:
+        return build_provider_pool(OpenAIProvider(get_openai_client, get_async_openai_client), **kwargs)
+    return ProviderPool(providers, **kwargs)
+
+
+def get_provider_pool() -> ProviderPool:
+    """Get the LLM provider pool, building it from ``LLM_PROVIDERS`` on first use."""
+    global _provider_pool
+    with _provider_lock:
+        if _provider_pool is None:
+            _provider_pool = make_provider_pool()
+        return _provider_pool
+
+
+def set_provider_pool(pool: Optional[ProviderPool]) -> Optional[ProviderPool]:
+    """
+    Replace the LLM provider pool (None rebuilds it from the environment).
+
+    Args:
+        pool: New pool (see ``make_provider_pool``)
+
+    Returns:
+        The previously installed pool
+    """
+    global _provider_pool
+    with _provider_lock:
+        previous, _provider_pool = _provider_pool, pool
+    return previous
+
+
+# Request model overrides must name a model some configured provider serves
+set_model_served_check(lambda model: get_provider_pool().serves(model))
+
+
+def get_batch_runner() -> BatchRunner:
+    """Get the batch job runner, using the OpenAI Batch API on first use."""
+    global _batch_runner
+    with _provider_lock:
+        if _batch_runner is None:
+            _batch_runner = BatchRunner(
+                OpenAIBatchProvider(get_openai_client),
+                retry=lambda fn: _resilience.call(fn),
+            )
+        return _batch_runner
+
+
+def set_batch_runner(runner: Optional[BatchRunner]) -> Optional[BatchRunner]:
+    """
+    Replace the batch job runner (None rebuilds the default on next use).
+
+    Args:
+        runner: New runner (e.g. against a stand-in batch server)
+
+    Returns:
+        The previously installed runner
+    """
+    global _batch_runner
+    with _provider_lock:
+        previous, _batch_runner = _batch_runner, runner
+    return previous
+
+
+def get_openai_client() -> "OpenAI":
+    """Get the shared, connection-pooled OpenAI client."""
+    return get_client_manager().get_openai_client()
+
+
+def get_async_openai_client() -> "AsyncOpenAI":
+    """Get the pooled AsyncOpenAI client for the running event loop."""
+    return get_client_manager().get_async_openai_client()
+
+
+def get_replicate_client() -> "ReplicateClient":
+    """Get the shared Replicate client."""
+    global _replicate_client
+    with _replicate_lock:
+        if _replicate_client is None:
+            from replicate.client import Client as ReplicateClient
+
+            _replicate_client = ReplicateClient(
+                base_url=REPLICATE_BASE_URL,
+                api_token=_hal9_token(),
+                **({"transport": _replay_transport} if _replay_transport else {}),
+            )
+        return _replicate_client
+
+
+def get_http_client() -> httpx.Client:
+    """Get the shared client for plain downloads (e.g. generated images)."""
+    global _http_client
+    with _replicate_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                transport=_replay_transport,
+                timeout=DEFAULT_TIMEOUT,
+                follow_redirects=True,
+            )
+        return _http_client
+
+
+def get_replay_stats() -> Dict[str, Any]:
+    """Get record/replay counters (``{"mode": "off"}`` when disabled)."""
+    return _replay_transport.stats() if _replay_transport else {"mode": "off"}
+
+
+def get_llm_pool_stats() -> Dict[str, Any]:
+    """Get connection pool usage and reuse counters for the LLM client."""
+    return get_client_manager().stats()
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters for the LLM response cache."""
+    return _llm_cache.stats()
+
+
+def _chat_params(prompt: str, stage: Optional[str],
+                 response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the chat completion parameters (routed by stage) that also define the cache key."""
+    route = _model_router.resolve(stage)
+    params = {
+        "model": route.model,
+        "messages": [{"role": "user", "content": prompt}],
+        **route.params,
+    }
+    if response_format is not None:
+        params["response_format"] = response_format
+    return params
+
+
+def _cache_lookup(params: Dict[str, Any], use_cache: bool) -> Tuple[str, Optional[str]]:
+    """Return the cache key for a request and any cached response."""
+    key = make_cache_key(params)
+    if not use_cache or regenerating():
+        _llm_cache.record_bypass()
+        return key, None
+    return key, _llm_cache.get(key)
+
+
+async def _async_cache_lookup(params: Dict[str, Any], use_cache: bool) -> Tuple[str, Optional[str]]:
+    """Async version of ``_cache_lookup``; SQLite is read off the event loop."""
+    key = make_cache_key(params)
+    if not use_cache or regenerating():
+        _llm_cache.record_bypass()
+        return key, None
+    return key, await _llm_cache.async_get(key)
+
+
+def get_single_flight_stats() -> Dict[str, int]:
+    """Get counts of upstream calls vs. callers coalesced onto them."""
+    return _single_flight.stats()
+
+
+def get_llm_latency_stats() -> Dict[str, Dict[str, float]]:
+    """Get latency percentiles (total call time, streaming TTFB) for LLM calls."""
+    return _latency.stats()
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """Get retry counters and circuit breaker state."""
+    return _resilience.stats()
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    """Get per-model throttling counts and limiter wait times."""
+    return _rate_limiter.stats()
+
+
+def get_model_routing_stats() -> Dict[str, Any]:
+    """Get the configured stage routes and calls per stage and model."""
+    return _model_router.stats()
+
+
+def get_provider_stats() -> Dict[str, Any]:
+    """Get per-provider load, health and latency plus failover counts."""
+    return get_provider_pool().stats()
+
+
+def get_batch_stats() -> Dict[str, int]:
+    """Get batch jobs submitted/completed/failed and request counts."""
+    return get_batch_runner().stats()
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """Get hedges fired, hedge win rate and current hedging thresholds."""
+    return _hedger.stats()
+
+
+def get_llm_usage_stats() -> Dict[str, Any]:
+    """Get token usage and cost totals per model."""
+    return _usage_ledger.stats()
+
+
+def _estimated_tokens(params: Dict[str, Any]) -> int:
+    """Estimate the tokens a request will consume for TPM accounting."""
+    prompt = "".join(m["content"] for m in params["messages"])
+    max_tokens = params.get("max_completion_tokens") or params.get("max_tokens")
+    return estimate_tokens(prompt, int(max_tokens)) if max_tokens else estimate_tokens(prompt)
+
+
+def _send(params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+    """One upstream completion through the provider pool, with its usage recorded."""
+    completion = get_provider_pool().complete(params, timeout)
+    _usage_ledger.record(completion.model, completion.usage)
+    return completion
+
+
+async def _async_send(params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+    """Async counterpart of ``_send``."""
+    completion = await get_provider_pool().async_complete(params, timeout)
+    await _usage_ledger.async_record(completion.model, completion.usage)
+    return completion
+
+
+def _fetch(params: Dict[str, Any], key: str, use_cache: bool, deadline: Optional[float],
+           stage: Optional[str] = None) -> str:
+    """Perform the upstream call with retries and hedging and populate the cache (single-flight leader)."""
+    def attempt(timeout: Optional[float]) -> str:
+        start = time.perf_counter()
+        completion = _hedger.call(params, timeout, _send, stage)
+        _latency.record("total", time.perf_counter() - start)
+        return completion.content
+
+    content = _resilience.call(attempt, deadline)
+    if content and use_cache:
+        _llm_cache.set(key, content)
+    return content
+
+
+async def _async_fetch(params: Dict[str, Any], key: str, use_cache: bool, deadline: Optional[float],
+                       stage: Optional[str] = None) -> str:
+    """Async counterpart of ``_fetch``."""
+    async def attempt(timeout: Optional[float]) -> str:
+        start = time.perf_counter()
+        completion = await _hedger.async_call(params, timeout, _async_send, stage)
+        _latency.record("total", time.perf_counter() - start)
+        return completion.content
+
+    content = await _resilience.async_call(attempt, deadline)
+    if content and use_cache:
+        await _llm_cache.async_set(key, content)
+    return content
+
+
+def call_llm(prompt: str, use_cache: bool = True, deadline: Optional[float] = None,
+             stage: Optional[str] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Send a prompt to the LLM, raising a typed error on failure.
+    
+    Transient failures are retried with backoff (honouring Retry-After)
+    under a circuit breaker. Identical prompts already in flight (from any
+    thread or event loop) are coalesced onto that call.
+    
+    Args:
+        prompt: The prompt to send
+        use_cache: Serve/store the response via the LLM cache (False bypasses it)
+        deadline: Seconds allowed across all attempts (default from environment)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        response_format: Structured-output format, e.g. a JSON schema (ignored by
+            providers without one)
+        
+    Returns:
+        LLM response text
+        
+    Raises:
+        LLMTransientError: Rate limit, timeout, 5xx or open circuit after retries
+        LLMPermanentError: Request rejected or response unusable
+    """
+    params = _chat_params(prompt, stage, response_format)
+    key, cached = _cache_lookup(params, use_cache)
+    if cached is not None:
+        return cached
+    return _single_flight.do(key, lambda: _fetch(params, key, use_cache, deadline, stage))
+
+
+async def async_call_llm(prompt: str, use_cache: bool = True, deadline: Optional[float] = None,
+                         stage: Optional[str] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Async version of ``call_llm``.
+    
+    Args:
+        prompt: The prompt to send
+        use_cache: Serve/store the response via the LLM cache (False bypasses it)
+        deadline: Seconds allowed across all attempts (default from environment)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        response_format: Structured-output format (ignored by providers without one)
+        
+    Returns:
+        LLM response text
+        
+    Raises:
+        LLMError: Typed transient or permanent failure
+    """
+    params = _chat_params(prompt, stage, response_format)
+    key, cached = await _async_cache_lookup(params, use_cache)
+    if cached is not None:
+        return cached
+    return await _single_flight.async_do(key, lambda: _async_fetch(params, key, use_cache, deadline, stage))
+
+
+def ask_llm(prompt: str, default: str = "", use_cache: bool = True, deadline: Optional[float] = None,
+            stage: Optional[str] = None) -> str:
     """
     Send a prompt to the LLM and return the response.
     
     Args:
         prompt: The prompt to send
         default: Default response if request fails
+        use_cache: Serve/store the response via the LLM cache (False bypasses it)
+        deadline: Seconds allowed across all attempts (default from environment)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
         
     Returns:
         LLM response text or default value
     """
     try:
-        client = get_openai_client()
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
-        )
-        return resp.choices[0].message.content
+        return call_llm(prompt, use_cache=use_cache, deadline=deadline, stage=stage)
     except Exception:
-        return default
\ No newline at end of file
+        return default
+
+
+async def async_ask_llm(prompt: str, default: str = "", use_cache: bool = True,
+                        deadline: Optional[float] = None, stage: Optional[str] = None) -> str:
+    """
+    Send a prompt to the LLM without blocking the event loop.
+    
+    Args:
+        prompt: The prompt to send
+        default: Default response if request fails
+        use_cache: Serve/store the response via the LLM cache (False bypasses it)
+        deadline: Seconds allowed across all attempts (default from environment)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        
+    Returns:
+        LLM response text or default value
+    """
+    try:
+        return await async_call_llm(prompt, use_cache=use_cache, deadline=deadline, stage=stage)
+    except Exception:
+        return default
+
+
+def _batch_prepare(prompts: List[str], stage: Optional[str],
+                   use_cache: bool) -> Tuple[List[Dict[str, Any]], List[str], List[Optional[BatchResult]]]:
+    """Build params and cache keys for a batch and pre-fill results served from the cache."""
+    params = [_chat_params(prompt, stage) for prompt in prompts]
+    keys, results = [], []
+    for index, request in enumerate(params):
+        key, cached = _cache_lookup(request, use_cache)
+        keys.append(key)
+        results.append(BatchResult(f"request-{index}", content=cached) if cached is not None else None)
+    return params, keys, results
+
+
+def _batch_finish(batch: List[BatchResult], params: List[Dict[str, Any]], keys: List[str],
+                  results: List[Optional[BatchResult]], scopes: Optional[List[Any]],
+                  use_cache: bool) -> List[BatchResult]:
+    """Record usage at batch prices, cache successes and slot batch results into place."""
+    for result in batch:
+        index = int(result.custom_id.rsplit("-", 1)[1])
+        if result.error is None:
+            scope = scopes[index] if scopes else current_usage_scope()
+            result.model = result.model or params[index]["model"]
+            _usage_ledger.record(result.model, result.usage, scope, price_factor=BATCH_PRICE_FACTOR)
+            if result.content and use_cache:
+                _llm_cache.set(keys[index], result.content)
+        results[index] = result
+    return results
+
+
+def batch_call_llm(prompts: List[str], use_cache: bool = True, stage: Optional[str] = None,
+                   scopes: Optional[List[Any]] = None, batch_id: Optional[str] = None,
+                   on_job: Optional[Callable[[BatchJob], None]] = None) -> List[BatchResult]:
+    """
+    Send many independent prompts as one discounted Batch API job.
+
+    Cached prompts are answered locally; the rest are submitted together and
+    polled until the job finishes, which can take minutes to hours. Batch
+    calls bypass the rate limiter and provider failover (the provider queues
+    them), but their usage is recorded like any other call.
+
+    Args:
+        prompts: Prompts to send
+        use_cache: Serve/store responses via the LLM cache (False bypasses it)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        scopes: Usage scope per prompt (see ``current_usage_scope``); defaults to the current one
+        batch_id: Batch the same prompts were already submitted as, to wait for instead of resubmitting
+        on_job: Called with the batch job once submitted and after every poll
+
+    Returns:
+        One ``BatchResult`` per prompt, in order, each with content or a typed error
+
+    Raises:
+        LLMError: The job could not be submitted, failed as a whole or timed out
+    """
+    params, keys, results = _batch_prepare(prompts, stage, use_cache)
+    pending = [(f"request-{i}", params[i]) for i, result in enumerate(results) if result is None]
+    batch = get_batch_runner().run(pending, batch_id, on_job) if pending else []
+    return _batch_finish(batch, params, keys, results, scopes, use_cache)
+
+
+async def async_batch_call_llm(prompts: List[str], use_cache: bool = True, stage: Optional[str] = None,
+                               scopes: Optional[List[Any]] = None, batch_id: Optional[str] = None,
+                               on_job: Optional[Callable[[BatchJob], None]] = None) -> List[BatchResult]:
+    """
+    Async version of ``batch_call_llm``; the event loop stays free while the job is polled.
+
+    Args:
+        prompts: Prompts to send
+        use_cache: Serve/store responses via the LLM cache (False bypasses it)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        scopes: Usage scope per prompt; defaults to the current one
+        batch_id: Batch the same prompts were already submitted as
+        on_job: Called (in a worker thread) with the batch job once submitted and after every poll
+
+    Returns:
+        One ``BatchResult`` per prompt, in order
+
+    Raises:
+        LLMError: The job could not be submitted, failed as a whole or timed out
+    """
+    # Cache lookups and ledger writes touch SQLite, so they run off the event loop
+    params, keys, results = await asyncio.to_thread(_batch_prepare, prompts, stage, use_cache)
+    pending = [(f"request-{i}", params[i]) for i, result in enumerate(results) if result is None]
+    batch = await get_batch_runner().async_run(pending, batch_id, on_job) if pending else []
+    return await asyncio.to_thread(_batch_finish, batch, params, keys, results, scopes, use_cache)
+
+
+class _StreamTimer:
+    """Records time-to-first-token and total latency for one streamed call."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+    def token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            _latency.record("stream_ttfb", self.first_token_at - self.start)
+
+    def done(self) -> None:
+        _latency.record("stream_total", time.perf_counter() - self.start)
+
+
+def stream_llm(prompt: str, default: Optional[str] = None, use_cache: bool = True,
+               stage: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream the LLM response as content deltas.
+    
+    A cached response is yielded as a single delta; a freshly streamed
+    response is cached once it completes. Opening the stream is retried
+    like ``call_llm``; a failure after the first delta is raised, since
+    the caller has already consumed a partial response.
+    
+    Args:
+        prompt: The prompt to send
+        default: Yielded instead of raising if the request fails before any
+            content arrives (None raises)
+        use_cache: Serve/store the response via the LLM cache (False bypasses it)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        
+    Yields:
+        Content deltas in arrival order
+        
+    Raises:
+        LLMError: If the stream fails and no ``default`` applies
+    """
+    params = _chat_params(prompt, stage)
+    key, cached = _cache_lookup(params, use_cache)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    timer = _StreamTimer()
+    # Captured now: later iterations may run in a different context (threadpool)
+    scope = current_usage_scope()
+    try:
+        model, stream = _resilience.call(lambda timeout: get_provider_pool().open_stream(params, timeout))
+        for text, usage in stream:
+            if usage is not None:
+                _usage_ledger.record(model, usage, scope)
+            if text:
+                timer.token()
+                parts.append(text)
+                yield text
+    except Exception as e:
+        if parts or default is None:
+            raise classify_error(e) from e
+        yield default
+        return
+    timer.done()
+    if parts and use_cache:
+        _llm_cache.set(key, "".join(parts))
+
+
+async def async_stream_llm(prompt: str, default: Optional[str] = None, use_cache: bool = True,
+                           stage: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Async version of ``stream_llm``.
+    
+    Args:
+        prompt: The prompt to send
+        default: Yielded instead of raising if the request fails before any
+            content arrives (None raises)
+        use_cache: Serve/store the response via the LLM cache (False bypasses it)
+        stage: Call site name used to route the model (None for ``LLM_MODEL``)
+        
+    Yields:
+        Content deltas in arrival order
+    """
+    params = _chat_params(prompt, stage)
+    key, cached = await _async_cache_lookup(params, use_cache)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    timer = _StreamTimer()
+    # Captured now: later iterations may run in a different context (threadpool)
+    scope = current_usage_scope()
+    try:
+        model, stream = await _resilience.async_call(
+            lambda timeout: get_provider_pool().async_open_stream(params, timeout)
+        )
+        async for text, usage in stream:
+            if usage is not None:
+                await _usage_ledger.async_record(model, usage, scope)
+            if text:
+                timer.token()
+                parts.append(text)
+                yield text
+    except Exception as e:
+        if parts or default is None:
+            raise classify_error(e) from e
+        yield default
+        return
+    timer.done()
+    if parts and use_cache:
+        await _llm_cache.async_set(key, "".join(parts))
@@ -0,0 +1,455 @@
+"""
+Checkpointed, resumable book generation jobs.
+
+Every ``/generate-book`` run is a job. Each chapter is saved to a SQLite
+store as soon as it is generated, keyed by the job ID, together with the
+original request. If a chapter fails or the worker restarts, resuming the job
+regenerates only the chapters that are missing or failed. The finished ones
+are not paid for again. Chapters take part through ``job_scope``: inside it,
+``ChapterGenerator`` serves saved chapters instead of calling the LLM and
+saves each new chapter it generates.
+
+A running job holds a lease on its row, so a second run of the same job
+(a concurrent resume, or the same ID sent twice) is refused with
+``BookJobBusy`` instead of generating and saving the same chapters twice.
+The lease is renewed whenever a chapter is saved or a batch is polled, and
+expires on its own if the worker dies. A batch book also records its
+provider batch ID, so a resume waits for that batch instead of paying for
+the book again. Jobs untouched for the retention period are purged.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from models.chapter_models import BookGenerationRequest, ChapterResponse
+from .llm_batch import TERMINAL_STATUSES, BatchJob
+
+DEFAULT_JOBS_PATH = os.getenv("BOOK_JOBS_PATH", ".cache/book_jobs.sqlite3")
+# Extra rounds for failed chapters in parallel generation before they become error placeholders
+DEFAULT_REPAIR_PASSES = int(os.getenv("BOOK_REPAIR_PASSES", "1"))
+# How long a run holds its job without saving a chapter before another run may take it over
+DEFAULT_LEASE_SECONDS = float(os.getenv("BOOK_JOB_LEASE_SECONDS", "900"))
+# Jobs not updated for this long are deleted with their chapters (0 keeps them forever)
+DEFAULT_RETENTION_SECONDS = float(os.getenv("BOOK_JOB_RETENTION_SECONDS", str(30 * 24 * 3600)))
+# Expired jobs are purged at most this often, when a job is opened
+PURGE_INTERVAL_SECONDS = 3600.0
+
+
+class UnknownBookJob(KeyError):
+    """No job with this ID is stored."""
+
+
+class BookJobConflict(ValueError):
+    """A job ID was reused for a book with a different table of contents."""
+
+
+class BookJobBusy(RuntimeError):
+    """Another run holds the job's lease."""
+
+
+class BookJobStore:
+    """SQLite store of book requests and their finished chapters."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = DEFAULT_JOBS_PATH,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            db_path: SQLite file for jobs (None/"" keeps them in memory, lost on restart)
+            lease_seconds: How long a run holds its job without saving a chapter
+            retention_seconds: Age (since the last update) at which jobs are purged (0 keeps them)
+        """
+        self.db_path = db_path or None
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._purged_at = 0.0
+        self._metrics = {
+            "jobs_created": 0,
+            "jobs_resumed": 0,
+            "jobs_busy": 0,
+            "jobs_purged": 0,
+            "chapters_saved": 0,
+            "chapters_reused": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (caller holds the lock)."""
+        if self._db is None:
+            if self.db_path is not None:
+                directory = os.path.dirname(self.db_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path or ":memory:", check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS book_jobs ("
+                " job_id TEXT PRIMARY KEY, request TEXT NOT NULL, chapter_count INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+                " lease_owner TEXT, lease_expires REAL, batch_id TEXT)"
+            )
+            # Stores created before leases and batch IDs existed get the columns added
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(book_jobs)")}
+            for column, kind in (("lease_owner", "TEXT"), ("lease_expires", "REAL"), ("batch_id", "TEXT")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE book_jobs ADD COLUMN {column} {kind}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS book_job_chapters ("
+                " job_id TEXT NOT NULL, chapter_number INTEGER NOT NULL, chapter TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, chapter_number))"
+            )
+            self._db.commit()
+        return self._db
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    def open(self, request: BookGenerationRequest) -> str:
+        """
+        Start the job named by ``request.job_id``, or a new one.
+
+        An existing job keeps its saved chapters and is marked resumed; a
+        new job stores the request so it can be resumed by ID alone.
+
+        Returns:
+            The job ID
+
+        Raises:
+            BookJobConflict: The existing job was started with a different table of contents
+        """
+        job_id = request.job_id or uuid.uuid4().hex
+        now = time.time()
+        stored = request.model_copy(update={"job_id": job_id}).model_dump_json()
+        with self._lock:
+            db = self._connect()
+            if now - self._purged_at >= PURGE_INTERVAL_SECONDS:
+                self._purge(db, now)
+            row = db.execute("SELECT request FROM book_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row:
+                if BookGenerationRequest.model_validate_json(row[0]).toc != request.toc:
+                    raise BookJobConflict(f"Book job {job_id} was started with a different table of contents")
+                db.execute("UPDATE book_jobs SET updated_at = ? WHERE job_id = ?", (now, job_id))
+                self._metrics["jobs_resumed"] += 1
+            else:
+                db.execute("INSERT INTO book_jobs VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL)",
+                           (job_id, stored, len(request.toc), now, now))
+                self._metrics["jobs_created"] += 1
+            db.commit()
+        return job_id
+
+    def claim(self, job_id: str, lease_seconds: Optional[float] = None) -> str:
+        """
+        Take the lease on a job for one run of it.
+
+        Args:
+            job_id: An opened job
+            lease_seconds: Lease length (defaults to the store's)
+
+        Returns:
+            The lease token, passed back to ``release``
+
+        Raises:
+            BookJobBusy: Another run holds an unexpired lease on the job
+        """
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            claimed = db.execute(
+                "UPDATE book_jobs SET lease_owner = ?, lease_expires = ?"
+                " WHERE job_id = ? AND (lease_owner IS NULL OR lease_expires <= ?)",
+                (token, now + (lease_seconds or self.lease_seconds), job_id, now),
+            ).rowcount
+            db.commit()
+            if not claimed:
+                self._metrics["jobs_busy"] += 1
+                raise BookJobBusy(f"Book job {job_id} is already running")
+        return token
+
+    def renew(self, job_id: str, token: str) -> bool:
+        """Extend a lease taken by ``claim``; False if it has expired and been taken over."""
+        with self._lock:
+            db = self._connect()
+            renewed = db.execute("UPDATE book_jobs SET lease_expires = ? WHERE job_id = ? AND lease_owner = ?",
+                                 (time.time() + self.lease_seconds, job_id, token)).rowcount
+            db.commit()
+        return bool(renewed)
+
+    def set_batch(self, job_id: str, batch_id: Optional[str]) -> None:
+        """Record the provider batch generating a job's chapters (None once it has been collected)."""
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE book_jobs SET batch_id = ?, updated_at = ? WHERE job_id = ?",
+                       (batch_id, time.time(), job_id))
+            db.commit()
+
+    def batch(self, job_id: str) -> Optional[str]:
+        """The provider batch a job is waiting for, if any."""
+        with self._lock:
+            row = self._connect().execute("SELECT batch_id FROM book_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def release(self, job_id: str, token: str) -> None:
+        """Give up a lease taken by ``claim`` (a no-op if it has since been taken over)."""
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE book_jobs SET lease_owner = NULL, lease_expires = NULL"
+                       " WHERE job_id = ? AND lease_owner = ?", (job_id, token))
+            db.commit()
+
+    def _purge(self, db: sqlite3.Connection, now: float) -> int:
+        """Delete jobs past retention that no run holds (caller holds the lock)."""
+        self._purged_at = now
+        if self.retention_seconds <= 0:
+            return 0
+        expired = [row[0] for row in db.execute(
+            "SELECT job_id FROM book_jobs WHERE updated_at < ? AND (lease_owner IS NULL OR lease_expires <= ?)",
+            (now - self.retention_seconds, now),
+        )]
+        for job_id in expired:
+            db.execute("DELETE FROM book_job_chapters WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM book_jobs WHERE job_id = ?", (job_id,))
+        db.commit()
+        self._metrics["jobs_purged"] += len(expired)
+        return len(expired)
+
+    def purge(self) -> int:
+        """Delete jobs not updated within the retention period; returns how many were deleted."""
+        with self._lock:
+            return self._purge(self._connect(), time.time())
+
+    def request(self, job_id: str) -> Optional[BookGenerationRequest]:
+        """The request a job was started with, or None for an unknown job."""
+        with self._lock:
+            row = self._connect().execute("SELECT request FROM book_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return BookGenerationRequest.model_validate_json(row[0]) if row else None
+
+    def save_chapter(self, job_id: str, chapter: ChapterResponse) -> None:
+        """Checkpoint a generated chapter (replacing any earlier copy); renews a held lease."""
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO book_job_chapters VALUES (?, ?, ?)",
+                       (job_id, chapter.chapter_number, chapter.model_dump_json()))
+            db.execute(
+                "UPDATE book_jobs SET updated_at = ?,"
+                " lease_expires = CASE WHEN lease_owner IS NULL THEN NULL ELSE MAX(lease_expires, ?) END"
+                " WHERE job_id = ?",
+                (now, now + self.lease_seconds, job_id),
+            )
+            db.commit()
+            self._metrics["chapters_saved"] += 1
+
+    def chapters(self, job_id: str) -> Dict[int, ChapterResponse]:
+        """Saved chapters of a job by chapter number."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT chapter FROM book_job_chapters WHERE job_id = ? ORDER BY chapter_number", (job_id,)
+            ).fetchall()
+        chapters = [ChapterResponse.model_validate_json(row[0]) for row in rows]
+        return {chapter.chapter_number: chapter for chapter in chapters}
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a job (None if unknown): saved chapters and the ones still missing."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT chapter_count, created_at, updated_at, lease_owner, lease_expires, batch_id"
+                " FROM book_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        chapter_count, created_at, updated_at, lease_owner, lease_expires, batch_id = row
+        saved = self.chapters(job_id)
+        return {
+            "job_id": job_id,
+            "chapters": chapter_count,
+            "completed_chapters": sorted(saved),
+            "missing_chapters": [n for n in range(1, chapter_count + 1) if n not in saved],
+            "complete": len(saved) == chapter_count,
+            "leased": lease_owner is not None and lease_expires > time.time(),
+            "batch_id": batch_id,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Report jobs created and resumed, and chapters saved and reused."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            "persistent": self.db_path is not None,
+            "lease_seconds": self.lease_seconds,
+            "retention_seconds": self.retention_seconds,
+            **metrics,
+        }
+
+
+class JobCheckpoint:
+    """The job a book generation belongs to, with the chapters already saved for it."""
+
+    def __init__(self, store: BookJobStore, job_id: str, lease: Optional[str] = None):
+        self.store = store
+        self.job_id = job_id
+        self.lease = lease
+        self.detached = False
+        self.saved = store.chapters(job_id)
+        # Provider batch submitted by this or an earlier run and not yet collected
+        self.batch_id = store.batch(job_id)
+        self.batch_finished = False
+        self.reused: List[int] = []
+        # What the reused chapters cost the runs that generated them
+        self.reused_cost = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, chapter_number: int) -> Optional[ChapterResponse]:
+        """
+        The saved chapter to reuse instead of generating it again, if any.
+
+        It is returned at zero cost, since this run did not pay for it; its
+        original cost is added to ``reused_cost`` instead.
+        """
+        chapter = self.saved.get(chapter_number)
+        if chapter is None:
+            return None
+        with self._lock:
+            self.reused.append(chapter_number)
+            self.reused_cost += chapter.cost_estimate or 0.0
+        self.store._count("chapters_reused")
+        return chapter.model_copy(update={"cost_estimate": 0.0})
+
+    def reused_chapters(self) -> List[ChapterResponse]:
+        """The chapters reused so far, at zero cost like ``lookup`` returns them."""
+        return [self.saved[number].model_copy(update={"cost_estimate": 0.0}) for number in self.reused]
+
+    def save(self, chapter: ChapterResponse) -> None:
+        """Checkpoint a chapter; failed chapters are not saved, so a resume retries them."""
+        if not chapter.error:
+            self.store.save_chapter(self.job_id, chapter)
+
+    async def async_save(self, chapter: ChapterResponse) -> None:
+        """Async version of ``save``; SQLite is written off the event loop."""
+        if not chapter.error:
+            await asyncio.to_thread(self.store.save_chapter, self.job_id, chapter)
+
+    def track_batch(self, job: BatchJob) -> None:
+        """
+        Follow the job's provider batch: record its ID and renew the lease on every poll.
+
+        Raises:
+            BookJobBusy: The lease expired and another run took the job over
+        """
+        if job.id != self.batch_id:
+            self.store.set_batch(self.job_id, job.id)
+            self.batch_id = job.id
+        self.batch_finished = job.status in TERMINAL_STATUSES
+        if self.lease is not None and not self.store.renew(self.job_id, self.lease):
+            raise BookJobBusy(f"Book job {self.job_id} was taken over by another run")
+
+    def finish_batch(self) -> None:
+        """Forget a batch that reached a final status once its chapters are saved, so a resume submits anew."""
+        if self.batch_id is not None and self.batch_finished:
+            self.store.set_batch(self.job_id, None)
+            self.batch_id = None
+
+    def detach(self) -> None:
+        """Keep the lease past ``job_scope``; the caller must ``release`` it when the run ends."""
+        self.detached = True
+
+    def release(self) -> None:
+        """Give up the job's lease so it can be resumed."""
+        if self.lease is not None:
+            self.store.release(self.job_id, self.lease)
+            self.lease = None
+
+    async def async_release(self) -> None:
+        """Async version of ``release``."""
+        await asyncio.to_thread(self.release)
+
+
+_current_checkpoint: ContextVar[Optional[JobCheckpoint]] = ContextVar("book_job_checkpoint", default=None)
+
+
+@contextmanager
+def job_scope(store: BookJobStore, request: BookGenerationRequest) -> Iterator[JobCheckpoint]:
+    """
+    Run a book generation as a checkpointed job.
+
+    The job's lease is held until the scope exits, or until the checkpoint
+    is released if it was detached to keep running in the background.
+
+    Args:
+        store: Job store
+        request: Book request; its ``job_id`` resumes that job, None starts a new one
+
+    Yields:
+        The job's checkpoint (its ID, saved chapters and the ones reused)
+
+    Raises:
+        BookJobConflict: ``job_id`` names a job with a different table of contents
+        BookJobBusy: Another run of the job is in progress
+    """
+    checkpoint = _start_job(store, request)
+    token = _current_checkpoint.set(checkpoint)
+    try:
+        yield checkpoint
+    finally:
+        _current_checkpoint.reset(token)
+        if not checkpoint.detached:
+            checkpoint.release()
+
+
+@asynccontextmanager
+async def async_job_scope(store: BookJobStore, request: BookGenerationRequest) -> AsyncIterator[JobCheckpoint]:
+    """Async version of ``job_scope``; the job is opened, claimed and released off the event loop."""
+    checkpoint = await asyncio.to_thread(_start_job, store, request)
+    token = _current_checkpoint.set(checkpoint)
+    try:
+        yield checkpoint
+    finally:
+        _current_checkpoint.reset(token)
+        if not checkpoint.detached:
+            await checkpoint.async_release()
+
+
+def _start_job(store: BookJobStore, request: BookGenerationRequest) -> JobCheckpoint:
+    """Open the request's job, take its lease and load its saved chapters."""
+    job_id = store.open(request)
+    return JobCheckpoint(store, job_id, store.claim(job_id))
+
+
+def current_checkpoint() -> Optional[JobCheckpoint]:
+    """The checkpoint of the book job running in this context, if any."""
+    return _current_checkpoint.get()
+
+
+_store = BookJobStore()
+
+
+def get_book_job_store() -> BookJobStore:
+    """Return the process-wide book job store."""
+    return _store
+
+
+def set_book_job_store(store: BookJobStore) -> BookJobStore:
+    """Replace the process-wide book job store; returns the previous one."""
+    global _store
+    previous, _store = _store, store
+    return previous
+
+
+def get_book_job_stats() -> Dict[str, Any]:
+    """Return the book job store's counters."""
+    return _store.stats()
@@ -0,0 +1,168 @@
+"""
+Intra-chapter fan-out: subsections written concurrently, then stitched.
+
+A chapter is one long completion, so its latency grows with its length. With
+fan-out, a chapter's ideas are split into subsections of a few ideas each.
+Every subsection is generated concurrently from the same chapter prompt (book
+prefix, chapter topics and context), plus a note on which part to write, so
+each part knows what the others cover. One short call (stage
+``chapter_stitch``, routable to a small model) then writes a transition for
+each boundary between parts; the parts themselves are not rewritten, so this
+pass costs a few sentences of output rather than a second chapter. A long
+chapter then takes about as long as its longest part.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from models.chapter_models import ChapterRequest
+from .ai_client import async_call_llm, call_llm
+from .chapter_prompts import PART_SEPARATOR, ChapterPrompt, book_prefix, chapter_suffix
+from .llm_errors import LLMError
+from .toc_generator import parse_json_reply
+
+DEFAULT_STITCH_TRANSITIONS = os.getenv("CHAPTER_STITCH_TRANSITIONS", "1").lower() in ("1", "true", "yes")
+# Characters of each part shown either side of a boundary to the stitch call
+BOUNDARY_EXCERPT = 600
+
+
+def split_subsections(ideas: List[str], ideas_per_subsection: int) -> List[List[str]]:
+    """Consecutive groups of ``ideas_per_subsection`` ideas (the last may be shorter)."""
+    size = max(1, ideas_per_subsection)
+    return [ideas[start:start + size] for start in range(0, len(ideas), size)] or [[]]
+
+
+def subsection_prompt(request: ChapterRequest, ideas: List[str], part: int, parts: int) -> ChapterPrompt:
+    """
+    The prompt for one subsection of a fanned-out chapter.
+
+    It is the chapter's own prompt, so every part sees the same book and
+    chapter context (and shares its cached prefix), followed by the part to
+    write.
+
+    Args:
+        request: Chapter generation request
+        ideas: Ideas this part covers
+        part: 1-based part number
+        parts: Number of parts in the chapter
+    """
+    ideas_text = "\\n".join(f"- {idea}" for idea in ideas)
+    instructions = [
+        f"This chapter is written in {parts} parts at the same time. Write only part {part} of {parts}, "
+        f"about 1/{parts} of the target length, covering:\\n{ideas_text}",
+        "Open the chapter with a short introduction." if part == 1
+        else "Do not introduce the chapter; an earlier part does.",
+        "End the chapter with a short conclusion." if part == parts
+        else "Do not conclude the chapter; a later part does.",
+    ]
+    return ChapterPrompt(
+        book_prefix(request.book_context, request.book_outline, request.book_synopses),
+        PART_SEPARATOR.join([chapter_suffix(request), *instructions]),
+    )
+
+
+def stitch_prompt(request: ChapterRequest, parts: List[str]) -> str:
+    """The prompt asking for one transition per boundary between ``parts``."""
+    boundaries = "\n\n".join(
+        f"Boundary {number}:\nEnd of part {number}:\n...{before[-BOUNDARY_EXCERPT:]}\n"
+        f"Start of part {number + 1}:\n{after[:BOUNDARY_EXCERPT]}..."
+        for number, (before, after) in enumerate(zip(parts, parts[1:]), 1)
+    )
+    return (
+        f"The parts of chapter '{request.chapter_outline.section_name}' of the book "
+        f"'{request.book_context.title}' were written separately. For each boundary below, write one or two "
+        "sentences to insert between the parts so the chapter reads as one text. Do not repeat either side.\n\n"
+        f"{boundaries}\n\n"
+        f"Return only JSON of the form {{\"transitions\": [string, ...]}} with exactly {len(parts) - 1} "
+        "entries, in boundary order."
+    )
+
+
+def _transitions(value: Any, count: int) -> List[str]:
+    """Validate a decoded reply: ``count`` strings (a transition may be empty)."""
+    if isinstance(value, dict):
+        value = value.get("transitions")
+    if not isinstance(value, list) or len(value) != count or not all(isinstance(t, str) for t in value):
+        raise ValueError(f"expected {count} transitions")
+    return [text.strip() for text in value]
+
+
+class SubsectionStitcher:
+    """Joins the subsections of a fanned-out chapter, with model-written transitions at the boundaries."""
+
+    def __init__(self, transitions: bool = DEFAULT_STITCH_TRANSITIONS):
+        """
+        Initialize the stitcher.
+
+        Args:
+            transitions: Ask the model for transitions; when off, parts are joined as written
+        """
+        self.transitions = transitions
+        self._lock = threading.Lock()
+        self._metrics = {"chapters": 0, "subsections": 0, "stitched": 0, "stitch_failures": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _needs_call(self, parts: List[str]) -> bool:
+        self._count("chapters")
+        self._count("subsections", len(parts))
+        return self.transitions and len(parts) > 1
+
+    def _join(self, parts: List[str], raw: Optional[str] = None) -> str:
+        """Parts in order, with the transitions parsed from ``raw`` between them when usable."""
+        parts = [part.strip() for part in parts]
+        if raw is None:
+            return "\n\n".join(parts)
+        try:
+            transitions = parse_json_reply(raw, lambda value: _transitions(value, len(parts) - 1))[0]
+        except ValueError:
+            self._count("stitch_failures")
+            return "\n\n".join(parts)
+        self._count("stitched")
+        joined = [parts[0]]
+        for transition, part in zip(transitions, parts[1:]):
+            joined.extend([transition, part] if transition else [part])
+        return "\n\n".join(joined)
+
+    def stitch(self, request: ChapterRequest, parts: List[str]) -> str:
+        """
+        Join a chapter's parts in order.
+
+        A failed or unusable stitch call does not fail the chapter; the
+        parts are then joined without transitions.
+
+        Args:
+            request: Chapter generation request
+            parts: Generated subsections, in order
+
+        Returns:
+            Chapter content
+        """
+        if not self._needs_call(parts):
+            return self._join(parts)
+        try:
+            raw = call_llm(stitch_prompt(request, parts), stage="chapter_stitch")
+        except LLMError:
+            self._count("stitch_failures")
+            return self._join(parts)
+        return self._join(parts, raw)
+
+    async def async_stitch(self, request: ChapterRequest, parts: List[str]) -> str:
+        """Async version of ``stitch``."""
+        if not self._needs_call(parts):
+            return self._join(parts)
+        try:
+            raw = await async_call_llm(stitch_prompt(request, parts), stage="chapter_stitch")
+        except LLMError:
+            self._count("stitch_failures")
+            return self._join(parts)
+        return self._join(parts, raw)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report fanned-out chapters, their subsections and stitch outcomes."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {"transitions": self.transitions, **metrics}
@@ -4,8 +4,11 @@ Chapter-by-chapter generation service for better performance and cost optimizati
 
 import time
 import asyncio
-from typing import List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+import logging
+from contextlib import contextmanager, nullcontext
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 
 from models.chapter_models import (
     ChapterOutline, 
@@ -16,95 +19,101 @@ from models.chapter_models import (
     BookGenerationResponse
 )
 from models.section_model import Section
-from .ai_client import ask_llm
+from .book_jobs import (
+    DEFAULT_REPAIR_PASSES, JobCheckpoint, UnknownBookJob, async_job_scope, current_checkpoint, get_book_job_store,
+    job_scope
+)
+from .chapter_fanout import SubsectionStitcher, split_subsections, subsection_prompt
+from .chapter_graph import Dependencies, critical_path, lookback_dependencies
+from .chapter_prompts import build_chapter_prompt
+from .ai_client import (
+    call_llm,
+    async_call_llm,
+    stream_llm,
+    async_stream_llm,
+    batch_call_llm,
+    async_batch_call_llm,
+    get_hedger,
+)
+from .llm_batch import BatchResult
+from .llm_cache import regenerate_responses
+from .chapter_scheduler import ChapterScheduler, current_job, get_chapter_scheduler
+from .llm_errors import LLMError, classify_error
+from .model_routing import route_overrides
+from .synopsis_generator import SynopsisGenerator, SynopsisParseError
+from .usage_ledger import UsageTally, current_usage_scope, usage_scope
+
+logger = logging.getLogger(__name__)
 
 
 class ChapterGenerator:
     """Service for generating book chapters individually or orchestrating complete books."""
     
-    def __init__(self, max_workers: int = 5):
+    def __init__(self, max_workers: int = 5, scheduler: Optional[ChapterScheduler] = None,
+                 synopsis_generator: Optional[SynopsisGenerator] = None,
+                 repair_passes: int = DEFAULT_REPAIR_PASSES, stitcher: Optional[SubsectionStitcher] = None):
         """
         Initialize chapter generator.
         
         Args:
             max_workers: Maximum number of concurrent chapter generation threads
+            scheduler: Scheduler granting chapter slots (the process-wide one by default)
+            synopsis_generator: Drafts the chapter synopses used by hybrid generation
+            repair_passes: Extra rounds for failed chapters in parallel generation
+            stitcher: Joins the subsections of chapters generated with fan-out
         """
         self.max_workers = max_workers
+        self._scheduler = scheduler
+        self.synopsis_generator = synopsis_generator or SynopsisGenerator()
+        self.repair_passes = repair_passes
+        self.stitcher = stitcher or SubsectionStitcher()
+        # Book jobs running in the background by job ID (a reference keeps each task alive)
+        self._background: Dict[str, asyncio.Task] = {}
     
-    def _estimate_cost(self, word_count: int, model: str = "gpt-4o") -> float:
-        """
-        Estimate cost based on word count and model.
-        Rough estimates - update with actual pricing.
-        """
-        # Rough estimates for GPT-4o (update with actual pricing)
-        tokens_per_word = 1.3  # Approximate
-        tokens = word_count * tokens_per_word
-        cost_per_1k_tokens = 0.005  # Example rate
-        return (tokens / 1000) * cost_per_1k_tokens
+    @property
+    def scheduler(self) -> ChapterScheduler:
+        """The scheduler every chapter takes a slot from before calling the LLM."""
+        return self._scheduler or get_chapter_scheduler()
     
     def _count_words(self, text: str) -> int:
         """Count words in text."""
         return len(text.split())
     
-    def generate_single_chapter(self, request: ChapterRequest) -> ChapterResponse:
+    def _build_chapter_prompt(self, request: ChapterRequest) -> str:
         """
-        Generate a single chapter based on outline and context.
+        Build the prompt for a single chapter.
+        
+        The book-wide context comes first and is identical for every chapter
+        so the provider can serve it from its prompt cache; see
+        ``services.chapter_prompts``.
         
         Args:
             request: Chapter generation request with outline and context
             
         Returns:
-            Generated chapter response with content and metadata
+            Prompt text sent to the LLM
         """
-        start_time = time.time()
-        
-        # Build context-aware prompt
-        context_parts = [
-            f"You are writing chapter {request.chapter_outline.chapter_number} of the book '{request.book_context.title}' by {request.book_context.author}.",
-            f"Book concept: {request.book_context.book_idea}",
-            f"Chapter title: {request.chapter_outline.section_name}",
-            f"Target length: {request.chapter_outline.target_length}",
-        ]
-        
-        if request.book_context.genre:
-            context_parts.append(f"Genre: {request.book_context.genre}")
-        
-        if request.book_context.writing_style:
-            context_parts.append(f"Writing style: {request.book_context.writing_style}")
-            
-        if request.book_context.target_audience:
-            context_parts.append(f"Target audience: {request.book_context.target_audience}")
-        
-        # Add chapter-specific content requirements
-        ideas_text = "\\n".join(f"- {idea}" for idea in request.chapter_outline.section_ideas)
-        context_parts.append(f"Key topics to cover:\\n{ideas_text}")
-        
-        # Add context from previous chapters if available
-        if request.previous_chapters:
-            prev_summary = "\\n".join(f"Chapter {i+1} summary: {ch[:200]}..." 
-                                    for i, ch in enumerate(request.previous_chapters[-2:]))  # Last 2 chapters
-            context_parts.append(f"Previous chapters context:\\n{prev_summary}")
-        
-        if request.custom_instructions:
-            context_parts.append(f"Special instructions: {request.custom_instructions}")
-        
-        # Final instructions
-        context_parts.extend([
-            "Write engaging, well-structured content that flows naturally.",
-            "Use markdown formatting with appropriate headers (## for main sections, ### for subsections).",
-            "Do not include the chapter number or title in your response - just the content.",
-            "Write in a style consistent with the book's overall tone and the specified genre."
-        ])
-        
-        prompt = "\\n\\n".join(context_parts)
-        
-        # Generate the chapter
-        content = ask_llm(prompt, default=f"*Error generating chapter {request.chapter_outline.chapter_number}*")
-        
-        # Calculate metrics
+        return build_chapter_prompt(request).text
+    
+    @contextmanager
+    def _chapter_scope(self, request: ChapterRequest) -> Iterator[UsageTally]:
+        """Attribute LLM usage to the chapter and apply the request's model routes and cache bypass."""
+        with usage_scope(chapter=request.chapter_outline.chapter_number) as usage, \
+                route_overrides(request.model_routes), regenerate_responses(request.regenerate):
+            yield usage
+    
+    @contextmanager
+    def _book_scope(self, request: BookGenerationRequest) -> Iterator[None]:
+        """Attribute LLM usage to the book, apply its model routes and cache bypass, and cap its hedged requests."""
+        with usage_scope(book=request.book_context.title), route_overrides(request.model_routes), \
+                regenerate_responses(request.regenerate), get_hedger().book_budget(len(request.toc)):
+            yield
+    
+    def _build_chapter_response(self, request: ChapterRequest, content: str, start_time: float,
+                                usage: UsageTally) -> ChapterResponse:
+        """Wrap generated content with timing, word count and the real token usage and cost."""
         generation_time = time.time() - start_time
         word_count = self._count_words(content)
-        cost_estimate = self._estimate_cost(word_count)
         
         return ChapterResponse(
             chapter_number=request.chapter_outline.chapter_number,
@@ -112,51 +121,160 @@ class ChapterGenerator:
             content=content,
             word_count=word_count,
             generation_time=generation_time,
-            cost_estimate=cost_estimate
+            cost_estimate=usage.cost,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=usage.cached_tokens
         )
     
-    def generate_book_sequential(self, request: BookGenerationRequest) -> BookGenerationResponse:
+    def _failed_chapter(self, request: ChapterRequest, error: LLMError, start_time: float) -> ChapterResponse:
+        """Placeholder chapter recording why generation failed and whether a retry may help."""
+        return ChapterResponse(
+            chapter_number=request.chapter_outline.chapter_number,
+            section_name=request.chapter_outline.section_name,
+            content=f"*Error generating chapter {request.chapter_outline.chapter_number}*",
+            word_count=0,
+            generation_time=time.time() - start_time,
+            cost_estimate=0.0,
+            error=str(error),
+            error_type=error.error_type
+        )
+    
+    def _saved_chapter(self, request: ChapterRequest) -> Optional[ChapterResponse]:
+        """The chapter saved by an earlier run of the current book job, if any."""
+        checkpoint = current_checkpoint()
+        return checkpoint.lookup(request.chapter_outline.chapter_number) if checkpoint else None
+    
+    def _checkpoint(self, chapter: ChapterResponse) -> ChapterResponse:
+        """Save a generated chapter to the current book job, if any."""
+        checkpoint = current_checkpoint()
+        if checkpoint is not None:
+            checkpoint.save(chapter)
+        return chapter
+    
+    async def _async_checkpoint(self, chapter: ChapterResponse) -> ChapterResponse:
+        """Async version of ``_checkpoint``."""
+        checkpoint = current_checkpoint()
+        if checkpoint is not None:
+            await checkpoint.async_save(chapter)
+        return chapter
+    
+    def _subsection_prompts(self, request: ChapterRequest) -> List[str]:
+        """One prompt per subsection of a fanned-out chapter, in order."""
+        groups = split_subsections(request.chapter_outline.section_ideas, request.subsection_fanout)
+        return [subsection_prompt(request, ideas, part, len(groups)).text for part, ideas in enumerate(groups, 1)]
+    
+    def _fanout_job(self, request: ChapterRequest, parts: int):
+        """Inside a book the parts share its limit; a chapter on its own may run all its parts at once."""
+        if current_job() is not None:
+            return nullcontext()
+        return self.scheduler.job(parts, request.chapter_outline.section_name, priority="interactive")
+    
+    def _generate_subsection(self, prompt: str) -> str:
+        with self.scheduler.slot():
+            return call_llm(prompt, stage="chapter")
+    
+    def _fanout_chapter(self, request: ChapterRequest, start_time: float) -> ChapterResponse:
+        """Generate a chapter's subsections on a thread pool, then stitch them."""
+        prompts = self._subsection_prompts(request)
+        with self._chapter_scope(request) as usage, self._fanout_job(request, len(prompts)), \
+                ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._generate_subsection, prompt)
+                for prompt in prompts
+            ]
+            try:
+                parts = [future.result() for future in futures]
+            except LLMError as e:
+                return self._failed_chapter(request, e, start_time)
+            content = self.stitcher.stitch(request, parts)
+        return self._build_chapter_response(request, content, start_time, usage)
+    
+    async def _async_fanout_chapter(self, request: ChapterRequest, start_time: float) -> ChapterResponse:
+        """Async version of ``_fanout_chapter``."""
+        prompts = self._subsection_prompts(request)
+        
+        async def generate(prompt: str) -> str:
+            async with self.scheduler.async_slot():
+                return await async_call_llm(prompt, stage="chapter")
+        
+        with self._chapter_scope(request) as usage, self._fanout_job(request, len(prompts)):
+            parts = await asyncio.gather(*(generate(prompt) for prompt in prompts), return_exceptions=True)
+            for part in parts:
+                if isinstance(part, LLMError):
+                    return self._failed_chapter(request, part, start_time)
+                if isinstance(part, BaseException):
+                    raise part
+            content = await self.stitcher.async_stitch(request, list(parts))
+        return self._build_chapter_response(request, content, start_time, usage)
+    
+    def generate_single_chapter(self, request: ChapterRequest) -> ChapterResponse:
         """
-        Generate an entire book chapter by chapter in sequence.
-        Provides context from previous chapters for better coherence.
+        Generate a single chapter based on outline and context.
+        
+        Transient LLM failures are retried by the LLM layer; if the chapter
+        still fails, a placeholder is returned with ``error``/``error_type``
+        set so callers can tell a retryable failure from a permanent one.
+        Inside a book job, a chapter saved by an earlier run is returned
+        as is and a newly generated one is saved. With
+        ``subsection_fanout`` set, the chapter's subsections are generated
+        concurrently and stitched; a failed subsection fails the chapter.
         
         Args:
-            request: Book generation request with TOC and context
+            request: Chapter generation request with outline and context
             
         Returns:
-            Complete book with all chapters and generation metadata
+            Generated chapter response with content and metadata
         """
+        saved = self._saved_chapter(request)
+        if saved is not None:
+            return saved
         start_time = time.time()
-        chapters = []
-        previous_chapters = []
-        total_cost = 0.0
+        if request.subsection_fanout:
+            return self._checkpoint(self._fanout_chapter(request, start_time))
+        prompt = self._build_chapter_prompt(request)
         
-        for i, section in enumerate(request.toc, 1):
-            chapter_outline = ChapterOutline(
-                chapter_number=i,
-                section_name=section.section_name,
-                section_ideas=section.section_ideas
-            )
-            
-            chapter_request = ChapterRequest(
-                chapter_outline=chapter_outline,
-                book_context=request.book_context,
-                previous_chapters=previous_chapters.copy()  # Pass context from previous chapters
-            )
-            
-            chapter_response = self.generate_single_chapter(chapter_request)
-            chapters.append(chapter_response)
-            
-            # Add to context for next chapters (keep last 3 chapters for context)
-            previous_chapters.append(chapter_response.content)
-            if len(previous_chapters) > 3:
-                previous_chapters.pop(0)
+        # Generate the chapter
+        with self._chapter_scope(request) as usage, self.scheduler.slot():
+            try:
+                content = call_llm(prompt, stage="chapter")
+            except LLMError as e:
+                return self._failed_chapter(request, e, start_time)
+        
+        return self._checkpoint(self._build_chapter_response(request, content, start_time, usage))
+    
+    async def async_generate_single_chapter(self, request: ChapterRequest) -> ChapterResponse:
+        """
+        Generate a single chapter without blocking the event loop.
+        
+        Args:
+            request: Chapter generation request with outline and context
             
-            if chapter_response.cost_estimate:
-                total_cost += chapter_response.cost_estimate
+        Returns:
+            Generated chapter response with content and metadata
+        """
+        saved = self._saved_chapter(request)
+        if saved is not None:
+            return saved
+        start_time = time.time()
+        if request.subsection_fanout:
+            return await self._async_checkpoint(await self._async_fanout_chapter(request, start_time))
+        prompt = self._build_chapter_prompt(request)
+        
+        with self._chapter_scope(request) as usage:
+            try:
+                async with self.scheduler.async_slot():
+                    content = await async_call_llm(prompt, stage="chapter")
+            except LLMError as e:
+                return self._failed_chapter(request, e, start_time)
         
+        return await self._async_checkpoint(self._build_chapter_response(request, content, start_time, usage))
+    
+    def _sequential_summary(self, chapters: List[ChapterResponse], start_time: float) -> BookGenerationResponse:
+        """Assemble the response for a sequentially generated book."""
         total_time = time.time() - start_time
         total_words = sum(ch.word_count for ch in chapters)
+        total_cost = sum(ch.cost_estimate for ch in chapters if ch.cost_estimate)
         
         return BookGenerationResponse(
             chapters=chapters,
@@ -168,14 +286,229 @@ class ChapterGenerator:
                 "chapters_generated": len(chapters),
                 "average_words_per_chapter": total_words // len(chapters) if chapters else 0,
                 "average_time_per_chapter": total_time / len(chapters) if chapters else 0,
+                "failed_chapters": [ch.chapter_number for ch in chapters if ch.error],
+                "prompt_cache": self._prompt_cache_summary(chapters),
                 "context_maintained": True
             }
         )
     
-    def generate_book_parallel(self, request: BookGenerationRequest) -> BookGenerationResponse:
+    def _parallel_chapter_requests(self, request: BookGenerationRequest,
+                                   synopses: Optional[List[str]] = None) -> List[ChapterRequest]:
+        """Build independent chapter requests for parallel generation (sharing only the synopses, if any)."""
+        outlines = self.toc_to_chapter_outlines(request.toc)
+        return [
+            ChapterRequest(
+                chapter_outline=outline,
+                book_context=request.book_context,
+                previous_chapters=None,  # No context in parallel mode
+                book_outline=outlines,
+                book_synopses=synopses,
+                subsection_fanout=request.subsection_fanout
+            )
+            for outline in outlines
+        ]
+    
+    def _prompt_cache_summary(self, chapters: List[ChapterResponse]) -> Dict[str, Any]:
+        """Prompt and cached-prompt token totals across a book's chapters."""
+        prompt_tokens = sum(ch.prompt_tokens or 0 for ch in chapters)
+        cached_tokens = sum(ch.cached_tokens or 0 for ch in chapters)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
+    
+    def _error_chapter(self, idx: int, error: Exception) -> ChapterResponse:
+        """Create a placeholder chapter when generation fails."""
+        return ChapterResponse(
+            chapter_number=idx + 1,
+            section_name=f"Chapter {idx + 1}",
+            content=f"*Error generating chapter: {str(error)}*",
+            word_count=0,
+            generation_time=0.0,
+            cost_estimate=0.0,
+            error=str(error),
+            error_type=classify_error(error).error_type
+        )
+    
+    def _parallel_summary(self, chapters: List[ChapterResponse], start_time: float, max_workers: int,
+                          repaired: Optional[List[int]] = None) -> BookGenerationResponse:
+        """Assemble the response for a book generated in parallel."""
+        total_time = time.time() - start_time
+        total_words = sum(ch.word_count for ch in chapters)
+        total_cost = sum(ch.cost_estimate for ch in chapters if ch.cost_estimate)
+        
+        return BookGenerationResponse(
+            chapters=chapters,
+            total_word_count=total_words,
+            total_generation_time=total_time,
+            total_cost_estimate=total_cost,
+            generation_summary={
+                "generation_method": "parallel",
+                "chapters_generated": len(chapters),
+                "max_concurrent_chapters": max_workers,
+                "average_words_per_chapter": total_words // len(chapters) if chapters else 0,
+                "average_time_per_chapter": total_time / len(chapters) if chapters else 0,
+                "failed_chapters": [ch.chapter_number for ch in chapters if ch.error],
+                "repaired_chapters": repaired or [],
+                "prompt_cache": self._prompt_cache_summary(chapters),
+                "context_maintained": False
+            }
+        )
+    
+    def _batch_setup(self, request: BookGenerationRequest) -> Tuple[List[ChapterRequest], List[str],
+                                                                    List[UsageTally], List[Any]]:
+        """Build context-free chapter prompts plus a usage scope per chapter for batch submission."""
+        # Chapters already saved for a resumed job are not submitted again
+        checkpoint = current_checkpoint()
+        chapter_requests = [
+            req for req in self._parallel_chapter_requests(request)
+            if checkpoint is None or checkpoint.lookup(req.chapter_outline.chapter_number) is None
+        ]
+        prompts = [self._build_chapter_prompt(req) for req in chapter_requests]
+        tallies, scopes = [], []
+        for req in chapter_requests:
+            # Captured scopes keep accumulating after the block exits
+            with usage_scope(chapter=req.chapter_outline.chapter_number) as tally:
+                tallies.append(tally)
+                scopes.append(current_usage_scope())
+        return chapter_requests, prompts, tallies, scopes
+    
+    def _batch_tracking(self) -> Dict[str, Any]:
         """
-        Generate an entire book with chapters in parallel for speed.
-        No cross-chapter context, but much faster for large books.
+        Batch arguments that tie the submission to the current book job, if any.
+
+        The job records the batch ID and renews its lease on every poll, and
+        a resumed job waits for the batch an earlier run submitted.
+        """
+        checkpoint = current_checkpoint()
+        if checkpoint is None:
+            return {}
+        return {"batch_id": checkpoint.batch_id, "on_job": checkpoint.track_batch}
+    
+    def _batch_summary(self, chapter_requests: List[ChapterRequest], results: List[BatchResult],
+                       tallies: List[UsageTally], start_time: float) -> BookGenerationResponse:
+        """Map batch results back onto chapters, in TOC order, and assemble the response."""
+        chapters = [
+            self._failed_chapter(req, result.error, start_time) if result.error is not None
+            else self._build_chapter_response(req, result.content, start_time, tally)
+            for req, result, tally in zip(chapter_requests, results, tallies)
+        ]
+        checkpoint = current_checkpoint()
+        if checkpoint is not None:
+            for chapter in chapters:
+                checkpoint.save(chapter)
+            checkpoint.finish_batch()
+            chapters = sorted(chapters + checkpoint.reused_chapters(),
+                              key=lambda ch: ch.chapter_number)
+        total_time = time.time() - start_time
+        total_words = sum(ch.word_count for ch in chapters)
+        
+        return BookGenerationResponse(
+            chapters=chapters,
+            total_word_count=total_words,
+            total_generation_time=total_time,
+            total_cost_estimate=sum(ch.cost_estimate for ch in chapters if ch.cost_estimate),
+            generation_summary={
+                "generation_method": "batch",
+                "chapters_generated": len(chapters),
+                "batch_job_ids": sorted({result.job_id for result in results if result.job_id}),
+                "average_words_per_chapter": total_words // len(chapters) if chapters else 0,
+                "failed_chapters": [ch.chapter_number for ch in chapters if ch.error],
+                "prompt_cache": self._prompt_cache_summary(chapters),
+                "context_maintained": False
+            }
+        )
+    
+    def _stream_complete(self, request: ChapterRequest, parts: List[str], start_time: float,
+                         ttfb: Optional[float], usage: UsageTally) -> Dict[str, Any]:
+        """Build the final event carrying the assembled chapter."""
+        chapter = self._build_chapter_response(request, "".join(parts), start_time, usage)
+        chapter.time_to_first_token = ttfb
+        return {"event": "complete", "chapter": chapter}
+    
+    def _stream_error(self, request: ChapterRequest, error: LLMError, parts: List[str]) -> Dict[str, Any]:
+        """Build the final event of a failed stream; deltas already sent are not a usable chapter."""
+        return {
+            "event": "error",
+            "chapter_number": request.chapter_outline.chapter_number,
+            "error": str(error),
+            "error_type": error.error_type,
+            "partial": bool(parts)
+        }
+    
+    def stream_single_chapter(self, request: ChapterRequest) -> Iterator[Dict[str, Any]]:
+        """
+        Generate a single chapter, yielding content deltas as they arrive.
+        
+        Args:
+            request: Chapter generation request with outline and context
+            
+        Yields:
+            ``{"event": "delta", "content": str}`` per delta, then one
+            ``{"event": "complete", "chapter": ChapterResponse}``, or one
+            ``{"event": "error", ...}`` (see ``_stream_error``) if the stream fails
+        """
+        start_time = time.time()
+        ttfb = None
+        parts: List[str] = []
+        prompt = self._build_chapter_prompt(request)
+        
+        with self._chapter_scope(request) as usage, self.scheduler.slot():
+            try:
+                for delta in stream_llm(prompt, stage="chapter"):
+                    if ttfb is None:
+                        ttfb = time.time() - start_time
+                    parts.append(delta)
+                    yield {"event": "delta", "content": delta}
+            except LLMError as e:
+                yield self._stream_error(request, e, parts)
+                return
+        
+        yield self._stream_complete(request, parts, start_time, ttfb, usage)
+    
+    async def async_stream_single_chapter(self, request: ChapterRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async version of ``stream_single_chapter``.
+        
+        Args:
+            request: Chapter generation request with outline and context
+            
+        Yields:
+            Delta events followed by one completion event with the chapter,
+            or by one error event if the stream fails
+        """
+        start_time = time.time()
+        ttfb = None
+        parts: List[str] = []
+        prompt = self._build_chapter_prompt(request)
+        
+        with self._chapter_scope(request) as usage:
+            async with self.scheduler.async_slot():
+                try:
+                    async for delta in async_stream_llm(prompt, stage="chapter"):
+                        if ttfb is None:
+                            ttfb = time.time() - start_time
+                        parts.append(delta)
+                        yield {"event": "delta", "content": delta}
+                except LLMError as e:
+                    yield self._stream_error(request, e, parts)
+                    return
+        
+        yield self._stream_complete(request, parts, start_time, ttfb, usage)
+    
+    def _sequential_job(self, request: BookGenerationRequest):
+        """A sequential book is bulk work like any other; its limit only lets a fanned-out chapter's parts overlap."""
+        parts = 1
+        if request.subsection_fanout:
+            parts = max(len(split_subsections(section.section_ideas, request.subsection_fanout))
+                        for section in request.toc)
+        return self.scheduler.job(parts, request.book_context.title)
+    
+    def generate_book_sequential(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Generate an entire book chapter by chapter in sequence.
+        Provides context from previous chapters for better coherence.
         
         Args:
             request: Book generation request with TOC and context
@@ -184,75 +517,457 @@ class ChapterGenerator:
             Complete book with all chapters and generation metadata
         """
         start_time = time.time()
-        chapters = [None] * len(request.toc)  # Pre-allocate list to maintain order
-        total_cost = 0.0
+        chapters = []
+        previous_chapters = []
         
-        # Create chapter requests
-        chapter_requests = []
-        for i, section in enumerate(request.toc, 1):
-            chapter_outline = ChapterOutline(
-                chapter_number=i,
-                section_name=section.section_name,
-                section_ideas=section.section_ideas
-            )
+        outlines = self.toc_to_chapter_outlines(request.toc)
+        
+        with self._sequential_job(request):
+            for chapter_outline in outlines:
+                chapter_request = ChapterRequest(
+                    chapter_outline=chapter_outline,
+                    book_context=request.book_context,
+                    previous_chapters=previous_chapters.copy(),  # Pass context from previous chapters
+                    book_outline=outlines,
+                    subsection_fanout=request.subsection_fanout
+                )
+                
+                chapter_response = self.generate_single_chapter(chapter_request)
+                chapters.append(chapter_response)
+                
+                # Add to context for next chapters (keep last 3 chapters for context)
+                if not chapter_response.error:
+                    previous_chapters.append(chapter_response.content)
+                if len(previous_chapters) > 3:
+                    previous_chapters.pop(0)
+        
+        return self._sequential_summary(chapters, start_time)
+    
+    async def async_generate_book_sequential(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Async version of ``generate_book_sequential``.
+        
+        Args:
+            request: Book generation request with TOC and context
             
-            chapter_request = ChapterRequest(
-                chapter_outline=chapter_outline,
-                book_context=request.book_context,
-                previous_chapters=None  # No context in parallel mode
-            )
-            chapter_requests.append((i-1, chapter_request))  # Store index for ordering
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        chapters = []
+        previous_chapters = []
         
-        # Generate chapters in parallel
-        max_workers = min(request.max_concurrent_chapters, self.max_workers, len(request.toc))
+        outlines = self.toc_to_chapter_outlines(request.toc)
+        
+        with self._sequential_job(request):
+            for chapter_outline in outlines:
+                chapter_request = ChapterRequest(
+                    chapter_outline=chapter_outline,
+                    book_context=request.book_context,
+                    previous_chapters=previous_chapters.copy(),
+                    book_outline=outlines,
+                    subsection_fanout=request.subsection_fanout
+                )
+                
+                chapter_response = await self.async_generate_single_chapter(chapter_request)
+                chapters.append(chapter_response)
+                
+                if not chapter_response.error:
+                    previous_chapters.append(chapter_response.content)
+                if len(previous_chapters) > 3:
+                    previous_chapters.pop(0)
+        
+        return self._sequential_summary(chapters, start_time)
+    
+    def _repairable(self, chapters: List[ChapterResponse]) -> List[int]:
+        """Indexes of failed chapters worth another attempt (anything but a permanent error)."""
+        return [idx for idx, ch in enumerate(chapters) if ch.error and ch.error_type != "permanent"]
+    
+    def _parallel_pass(self, chapter_requests: List[ChapterRequest], max_workers: int) -> List[ChapterResponse]:
+        """Generate ``chapter_requests`` on a thread pool, returning the chapters in order."""
+        chapters = [None] * len(chapter_requests)  # Pre-allocate list to maintain order
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all chapter generation tasks
+            # Submit all chapter generation tasks (copying the context keeps usage tags)
             future_to_index = {
-                executor.submit(self.generate_single_chapter, req): idx 
-                for idx, req in chapter_requests
+                executor.submit(contextvars.copy_context().run, self.generate_single_chapter, req): idx 
+                for idx, req in enumerate(chapter_requests)
             }
             
             # Collect results as they complete
             for future in as_completed(future_to_index):
                 idx = future_to_index[future]
                 try:
-                    chapter_response = future.result()
-                    chapters[idx] = chapter_response
-                    if chapter_response.cost_estimate:
-                        total_cost += chapter_response.cost_estimate
+                    chapters[idx] = future.result()
                 except Exception as e:
                     # Create error chapter if generation fails
-                    chapters[idx] = ChapterResponse(
-                        chapter_number=idx + 1,
-                        section_name=f"Chapter {idx + 1}",
-                        content=f"*Error generating chapter: {str(e)}*",
-                        word_count=0,
-                        generation_time=0.0,
-                        cost_estimate=0.0
-                    )
+                    chapters[idx] = self._error_chapter(chapter_requests[idx].chapter_outline.chapter_number - 1, e)
         
-        total_time = time.time() - start_time
-        total_words = sum(ch.word_count for ch in chapters)
+        return chapters
+    
+    def _run_parallel(self, request: BookGenerationRequest,
+                      chapter_requests: List[ChapterRequest]) -> Tuple[List[ChapterResponse], int, List[int]]:
+        """
+        Generate chapters in parallel, then give failed ones up to ``repair_passes`` more rounds.
         
-        return BookGenerationResponse(
-            chapters=chapters,
-            total_word_count=total_words,
-            total_generation_time=total_time,
-            total_cost_estimate=total_cost,
-            generation_summary={
-                "generation_method": "parallel",
-                "chapters_generated": len(chapters),
-                "max_concurrent_chapters": max_workers,
-                "average_words_per_chapter": total_words // len(chapters) if chapters else 0,
-                "average_time_per_chapter": total_time / len(chapters) if chapters else 0,
-                "context_maintained": False
-            }
+        Returns:
+            The chapters in order, the concurrency used and the chapter numbers a repair pass fixed
+        """
+        # Each thread also waits for a global scheduler slot
+        max_workers = min(request.max_concurrent_chapters, self.max_workers, len(request.toc))
+        repaired = []
+        
+        with self.scheduler.job(max_workers, request.book_context.title):
+            chapters = self._parallel_pass(chapter_requests, max_workers)
+            for _ in range(self.repair_passes):
+                failed = self._repairable(chapters)
+                if not failed:
+                    break
+                retried = self._parallel_pass([chapter_requests[idx] for idx in failed], max_workers)
+                for idx, chapter in zip(failed, retried):
+                    chapters[idx] = chapter
+                    if not chapter.error:
+                        repaired.append(chapter.chapter_number)
+        
+        return chapters, max_workers, sorted(repaired)
+    
+    async def _async_parallel_pass(self, chapter_requests: List[ChapterRequest]) -> List[ChapterResponse]:
+        """Async version of ``_parallel_pass``; concurrency comes from the chapter scheduler."""
+        async def generate(chapter_request: ChapterRequest) -> ChapterResponse:
+            try:
+                return await self.async_generate_single_chapter(chapter_request)
+            except Exception as e:
+                return self._error_chapter(chapter_request.chapter_outline.chapter_number - 1, e)
+        
+        return list(await asyncio.gather(*(generate(req) for req in chapter_requests)))
+    
+    async def _async_run_parallel(self, request: BookGenerationRequest, chapter_requests: List[ChapterRequest]
+                                  ) -> Tuple[List[ChapterResponse], int, List[int]]:
+        """Async version of ``_run_parallel``."""
+        max_workers = min(request.max_concurrent_chapters, self.max_workers, len(request.toc))
+        repaired = []
+        
+        # Tasks created inside the job inherit it, so their slots count against this book's limit
+        with self.scheduler.job(max_workers, request.book_context.title):
+            chapters = await self._async_parallel_pass(chapter_requests)
+            for _ in range(self.repair_passes):
+                failed = self._repairable(chapters)
+                if not failed:
+                    break
+                retried = await self._async_parallel_pass([chapter_requests[idx] for idx in failed])
+                for idx, chapter in zip(failed, retried):
+                    chapters[idx] = chapter
+                    if not chapter.error:
+                        repaired.append(chapter.chapter_number)
+        
+        return chapters, max_workers, sorted(repaired)
+    
+    def generate_book_parallel(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Generate an entire book with chapters in parallel for speed.
+        No cross-chapter context, but much faster for large books.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        chapters, max_workers, repaired = self._run_parallel(request, self._parallel_chapter_requests(request))
+        return self._parallel_summary(chapters, start_time, max_workers, repaired)
+    
+    async def async_generate_book_parallel(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Generate chapters concurrently on the event loop.
+        Concurrency is bounded by the chapter scheduler instead of worker
+        threads, so waiting on the LLM does not tie up the server's threadpool.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        chapters, max_workers, repaired = await self._async_run_parallel(
+            request, self._parallel_chapter_requests(request)
+        )
+        return self._parallel_summary(chapters, start_time, max_workers, repaired)
+    
+    def _hybrid_summary(self, chapters: List[ChapterResponse], start_time: float, max_workers: int,
+                        repaired: List[int], synopses: Optional[List[str]], synopsis_usage: UsageTally,
+                        synopsis_time: float, synopsis_error: Optional[Exception]) -> BookGenerationResponse:
+        """Assemble the response for a hybrid book: a parallel summary plus the synopsis step."""
+        response = self._parallel_summary(chapters, start_time, max_workers, repaired)
+        response.total_cost_estimate = (response.total_cost_estimate or 0.0) + synopsis_usage.cost
+        response.generation_summary.update(
+            generation_method="hybrid",
+            context_maintained=synopses is not None,
+            synopses={
+                "generated": synopses is not None,
+                "generation_time": synopsis_time,
+                "cost_estimate": synopsis_usage.cost,
+                "error": str(synopsis_error) if synopsis_error else None,
+            },
+        )
+        return response
+    
+    def generate_book_hybrid(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Generate a book in parallel with per-chapter synopses as shared context.
+        One cheap call drafts a synopsis of every chapter; the chapters then
+        run in parallel with all synopses in their shared prompt prefix. If
+        the synopses cannot be drafted, the book is generated as in parallel
+        mode and the summary records why.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        synopses, synopsis_error = None, None
+        with usage_scope() as synopsis_usage:
+            try:
+                synopses = self.synopsis_generator.generate(
+                    request.book_context, self.toc_to_chapter_outlines(request.toc)
+                )
+            except (LLMError, SynopsisParseError) as e:
+                synopsis_error = e
+        synopsis_time = time.time() - start_time
+        chapters, max_workers, repaired = self._run_parallel(
+            request, self._parallel_chapter_requests(request, synopses)
+        )
+        return self._hybrid_summary(chapters, start_time, max_workers, repaired, synopses, synopsis_usage,
+                                    synopsis_time, synopsis_error)
+    
+    async def async_generate_book_hybrid(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Async version of ``generate_book_hybrid``.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        synopses, synopsis_error = None, None
+        with usage_scope() as synopsis_usage:
+            try:
+                synopses = await self.synopsis_generator.async_generate(
+                    request.book_context, self.toc_to_chapter_outlines(request.toc)
+                )
+            except (LLMError, SynopsisParseError) as e:
+                synopsis_error = e
+        synopsis_time = time.time() - start_time
+        chapters, max_workers, repaired = await self._async_run_parallel(
+            request, self._parallel_chapter_requests(request, synopses)
+        )
+        return self._hybrid_summary(chapters, start_time, max_workers, repaired, synopses, synopsis_usage,
+                                    synopsis_time, synopsis_error)
+    
+    def _graph_setup(self, request: BookGenerationRequest) -> Tuple[List[ChapterOutline], Dependencies, int]:
+        """Outlines, dependencies and wave size (the book's concurrency) for graph generation."""
+        outlines = self.toc_to_chapter_outlines(request.toc)
+        max_workers = min(request.max_concurrent_chapters, self.max_workers, len(request.toc))
+        return outlines, lookback_dependencies(len(outlines), request.context_lookback, max_workers), max_workers
+    
+    def _graph_chapter_request(self, request: BookGenerationRequest, outlines: List[ChapterOutline],
+                               idx: int, dependencies: List[ChapterResponse]) -> ChapterRequest:
+        """Chapter request whose context is its finished dependencies (failed ones are skipped)."""
+        return ChapterRequest(
+            chapter_outline=outlines[idx],
+            book_context=request.book_context,
+            previous_chapters=[dep.content for dep in dependencies if not dep.error],
+            book_outline=outlines,
+            subsection_fanout=request.subsection_fanout
+        )
+    
+    def _graph_summary(self, chapters: List[ChapterResponse], start_time: float, max_workers: int,
+                       dependencies: Dependencies, lookback: int) -> BookGenerationResponse:
+        """Assemble the response for a graph-scheduled book, including its critical path."""
+        response = self._parallel_summary(chapters, start_time, max_workers)
+        slowest, path_time = critical_path(dependencies, [ch.generation_time or 0.0 for ch in chapters])
+        response.generation_summary.update(
+            generation_method="graph",
+            context_maintained=lookback > 0,
+            context_lookback=lookback,
+            critical_path_length=len(critical_path(dependencies)[0]),
+            critical_path=[chapters[idx].chapter_number for idx in slowest],
+            critical_path_time=path_time,
+            # Chapter number -> the chapters it actually received as context (none from its own wave)
+            chapter_dependencies={
+                chapter.chapter_number: [chapters[dep].chapter_number for dep in needs]
+                for chapter, needs in zip(chapters, dependencies)
+            },
         )
+        return response
+    
+    def generate_book_graph(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Generate a book as a dependency graph with bounded context lookback.
+        Each chapter waits only for the ``context_lookback`` chapters before
+        its wave and receives them as context; everything else runs
+        concurrently. Chapters in the same wave of ``max_concurrent_chapters``
+        do not see each other. The summary reports each chapter's effective
+        dependencies (``chapter_dependencies``) and the critical path (the
+        longest dependency chain in chapters, and the slowest chain as generated).
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        outlines, dependencies, max_workers = self._graph_setup(request)
+        chapters: List[Optional[ChapterResponse]] = [None] * len(outlines)
+        pending = set(range(len(outlines)))
+        running: Dict[Future, int] = {}
+        
+        with self.scheduler.job(max_workers, request.book_context.title), \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                # Start every chapter whose dependencies have all finished
+                for idx in sorted(pending):
+                    if all(chapters[dep] is not None for dep in dependencies[idx]):
+                        pending.discard(idx)
+                        chapter_request = self._graph_chapter_request(
+                            request, outlines, idx, [chapters[dep] for dep in dependencies[idx]]
+                        )
+                        future = executor.submit(
+                            contextvars.copy_context().run, self.generate_single_chapter, chapter_request
+                        )
+                        running[future] = idx
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = running.pop(future)
+                    try:
+                        chapters[idx] = future.result()
+                    except Exception as e:
+                        chapters[idx] = self._error_chapter(idx, e)
+        
+        return self._graph_summary(chapters, start_time, max_workers, dependencies, request.context_lookback)
+    
+    async def async_generate_book_graph(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Async version of ``generate_book_graph``.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with all chapters and generation metadata
+        """
+        start_time = time.time()
+        outlines, dependencies, max_workers = self._graph_setup(request)
+        tasks: List[asyncio.Task] = []
+        
+        async def generate(idx: int) -> ChapterResponse:
+            finished = [await tasks[dep] for dep in dependencies[idx]]
+            chapter_request = self._graph_chapter_request(request, outlines, idx, finished)
+            try:
+                return await self.async_generate_single_chapter(chapter_request)
+            except Exception as e:
+                return self._error_chapter(idx, e)
+        
+        with self.scheduler.job(max_workers, request.book_context.title):
+            # Dependencies always precede a chapter, so their tasks exist before it awaits them
+            for idx in range(len(outlines)):
+                tasks.append(asyncio.create_task(generate(idx)))
+            chapters = await asyncio.gather(*tasks)
+        
+        return self._graph_summary(list(chapters), start_time, max_workers, dependencies, request.context_lookback)
+    
+    def generate_book_batch(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Generate every chapter in one Batch API job.
+        Batch jobs are billed at a discount but may take hours, so this suits
+        offline book runs rather than interactive requests. Chapters are
+        context-free, as in parallel mode.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with chapters in TOC order; failed requests become error chapters
+        """
+        start_time = time.time()
+        chapter_requests, prompts, tallies, scopes = self._batch_setup(request)
+        try:
+            results = batch_call_llm(prompts, stage="chapter", scopes=scopes,
+                                     **self._batch_tracking()) if prompts else []
+        except LLMError as e:
+            results = [BatchResult(f"request-{i}", error=e) for i in range(len(prompts))]
+        return self._batch_summary(chapter_requests, results, tallies, start_time)
+    
+    async def async_generate_book_batch(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Async version of ``generate_book_batch``; the job is polled without blocking the event loop.
+        
+        Args:
+            request: Book generation request with TOC and context
+            
+        Returns:
+            Complete book with chapters in TOC order
+        """
+        start_time = time.time()
+        chapter_requests, prompts, tallies, scopes = self._batch_setup(request)
+        try:
+            results = await async_batch_call_llm(prompts, stage="chapter", scopes=scopes,
+                                                 **self._batch_tracking()) if prompts else []
+        except LLMError as e:
+            results = [BatchResult(f"request-{i}", error=e) for i in range(len(prompts))]
+        # The summary saves the chapters to the book job
+        return await asyncio.to_thread(self._batch_summary, chapter_requests, results, tallies, start_time)
+    
+    def _job_summary(self, response: BookGenerationResponse, checkpoint: JobCheckpoint) -> BookGenerationResponse:
+        """Record the book's job ID and the chapters reused from earlier runs of it (not in this run's cost)."""
+        response.generation_summary.update(
+            job_id=checkpoint.job_id,
+            resumed_chapters=sorted(checkpoint.reused),
+            resumed_cost_estimate=checkpoint.reused_cost,
+        )
+        return response
     
     def generate_book(self, request: BookGenerationRequest) -> BookGenerationResponse:
         """
-        Generate a complete book using the specified method (parallel or sequential).
+        Generate a complete book using the specified method (batch, hybrid, graph, parallel or sequential).
+        
+        The book runs as a checkpointed job: every finished chapter is saved
+        under the job ID reported in ``generation_summary``. Passing that ID
+        back as ``job_id`` resumes the job, regenerating only missing or
+        failed chapters.
+        
+        Args:
+            request: Book generation request
+            
+        Returns:
+            Complete book generation response
+            
+        Raises:
+            BookJobConflict: ``job_id`` names a job with a different table of contents
+            BookJobBusy: Another run of the job is in progress
+        """
+        with self._book_scope(request), job_scope(get_book_job_store(), request) as checkpoint:
+            if request.batch_generation:
+                response = self.generate_book_batch(request)
+            elif request.synopsis_generation:
+                response = self.generate_book_hybrid(request)
+            elif request.graph_generation:
+                response = self.generate_book_graph(request)
+            elif request.parallel_generation:
+                response = self.generate_book_parallel(request)
+            else:
+                response = self.generate_book_sequential(request)
+        return self._job_summary(response, checkpoint)
+    
+    async def async_generate_book(self, request: BookGenerationRequest) -> BookGenerationResponse:
+        """
+        Async version of ``generate_book``.
         
         Args:
             request: Book generation request
@@ -260,10 +975,106 @@ class ChapterGenerator:
         Returns:
             Complete book generation response
         """
-        if request.parallel_generation:
-            return self.generate_book_parallel(request)
-        else:
-            return self.generate_book_sequential(request)
+        async with async_job_scope(get_book_job_store(), request) as checkpoint:
+            return await self._async_book_job(request, checkpoint)
+    
+    async def _async_book_job(self, request: BookGenerationRequest, checkpoint: JobCheckpoint) -> BookGenerationResponse:
+        """Generate the book of an opened job with the requested method."""
+        with self._book_scope(request):
+            if request.batch_generation:
+                response = await self.async_generate_book_batch(request)
+            elif request.synopsis_generation:
+                response = await self.async_generate_book_hybrid(request)
+            elif request.graph_generation:
+                response = await self.async_generate_book_graph(request)
+            elif request.parallel_generation:
+                response = await self.async_generate_book_parallel(request)
+            else:
+                response = await self.async_generate_book_sequential(request)
+        return self._job_summary(response, checkpoint)
+    
+    async def async_start_book(self, request: BookGenerationRequest) -> str:
+        """
+        Start a book job in the background and return its ID straight away.
+        
+        Meant for batch generation, which can take hours: chapters are
+        checkpointed as they finish, so progress is read from the job store
+        and a failed or interrupted job can be resumed.
+        
+        Args:
+            request: Book generation request
+            
+        Returns:
+            The job ID
+            
+        Raises:
+            BookJobConflict: ``job_id`` names a job with a different table of contents
+            BookJobBusy: Another run of the job is in progress
+        """
+        async with async_job_scope(get_book_job_store(), request) as checkpoint:
+            # The task copies this context, so it runs inside the job's scope; it holds the lease until done
+            checkpoint.detach()
+            task = asyncio.create_task(self._background_book_job(request, checkpoint))
+        job_id = checkpoint.job_id
+        self._background[job_id] = task
+        
+        def finished(task: asyncio.Task) -> None:
+            self._background.pop(job_id, None)
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning("Background book job %s failed: %s", job_id, task.exception())
+        
+        task.add_done_callback(finished)
+        return job_id
+    
+    async def _background_book_job(self, request: BookGenerationRequest,
+                                   checkpoint: JobCheckpoint) -> BookGenerationResponse:
+        """Run a detached book job, giving up its lease when it ends however it ends."""
+        try:
+            return await self._async_book_job(request, checkpoint)
+        finally:
+            await checkpoint.async_release()
+    
+    async def cancel_background(self) -> None:
+        """
+        Cancel the book jobs running in the background, e.g. on shutdown.
+        
+        Their leases are released, and a batch job keeps its batch ID, so a
+        resume after the restart waits for the same batch.
+        """
+        tasks = list(self._background.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def running_in_background(self, job_id: str) -> bool:
+        """Whether a background task is still generating this job."""
+        return job_id in self._background
+    
+    def _job_request(self, job_id: str) -> BookGenerationRequest:
+        request = get_book_job_store().request(job_id)
+        if request is None:
+            raise UnknownBookJob(job_id)
+        return request
+    
+    def resume_book(self, job_id: str) -> BookGenerationResponse:
+        """
+        Resume a book job with the request it was started with.
+        
+        Args:
+            job_id: Job ID from an earlier ``generate_book``
+            
+        Returns:
+            Complete book; saved chapters are reused and only the rest generated
+            
+        Raises:
+            UnknownBookJob: No job with this ID is stored
+        """
+        return self.generate_book(self._job_request(job_id))
+    
+    async def async_resume_book(self, job_id: str) -> BookGenerationResponse:
+        """Async version of ``resume_book``."""
+        return await self.async_generate_book(await asyncio.to_thread(self._job_request, job_id))
+
     
     def toc_to_chapter_outlines(self, toc: List[Section]) -> List[ChapterOutline]:
         """
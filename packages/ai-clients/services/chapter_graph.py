@@ -0,0 +1,71 @@
+"""
+Chapter dependency graphs for graph-scheduled book generation.
+
+Sequential generation makes every chapter wait for all earlier ones, although
+its prompt only uses the last few. In graph mode each chapter depends only
+on the chapters its context needs, and a chapter starts as soon as those
+have finished. Chapters are written in waves of ``wave`` chapters that run
+concurrently. Every chapter of a wave sees the ``lookback`` chapters just
+before the wave. The longest dependency chain (the critical path) bounds the
+wall-clock time, so reporting it shows the cost of more context.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+# Dependencies as 0-based chapter indexes, one list per chapter
+Dependencies = List[List[int]]
+
+
+def lookback_dependencies(count: int, lookback: int, wave: int = 1) -> Dependencies:
+    """
+    Dependencies where each chapter needs the ``lookback`` chapters before its wave.
+
+    Chapters of the same wave never depend on each other, so with ``wave > 1``
+    chapter k+1 does not see chapter k when both fall in one wave: with
+    ``lookback=2, wave=3`` chapters 4, 5 and 6 (1-based) all see only 2 and 3.
+    ``wave=1`` is sequential generation with bounded context; ``lookback=0``
+    (or ``wave >= count``) makes every chapter independent.
+
+    Args:
+        count: Number of chapters
+        lookback: Earlier chapters each chapter's context needs (K)
+        wave: Consecutive chapters written concurrently without seeing each other
+
+    Returns:
+        Sorted dependency indexes for every chapter
+    """
+    wave = max(1, wave)
+    dependencies = []
+    for index in range(count):
+        start = index - index % wave
+        dependencies.append(list(range(max(0, start - lookback), start)))
+    return dependencies
+
+
+def critical_path(dependencies: Dependencies, durations: Optional[Sequence[float]] = None) -> Tuple[List[int], float]:
+    """
+    Longest chain through the dependency graph.
+
+    Args:
+        dependencies: Dependency indexes per chapter (each lower than the chapter's own)
+        durations: Time per chapter; every chapter counts 1 when omitted
+
+    Returns:
+        The chain as chapter indexes in order, and its total duration
+    """
+    weights = list(durations) if durations is not None else [1.0] * len(dependencies)
+    finish: List[float] = []
+    previous: List[Optional[int]] = []
+    for index, needs in enumerate(dependencies):
+        before = max(needs, key=lambda dep: finish[dep], default=None)
+        finish.append((finish[before] if before is not None else 0.0) + weights[index])
+        previous.append(before)
+    if not finish:
+        return [], 0.0
+    node: Optional[int] = max(range(len(finish)), key=finish.__getitem__)
+    total = finish[node]
+    chain = []
+    while node is not None:
+        chain.append(node)
+        node = previous[node]
+    return chain[::-1], total
@@ -0,0 +1,121 @@
+"""
+Prefix-stable chapter prompt assembly.
+
+Providers cache prompt prefixes (OpenAI from 1024 tokens, in 128-token
+steps), but only when the leading bytes match exactly. Chapter prompts are
+therefore assembled as a shared prefix (book context, the whole outline and
+the standing writing instructions) that is byte-identical for every chapter
+of a book, followed by a per-chapter suffix (which chapter to write, its
+topics, previous-chapter context and custom instructions).
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from models.chapter_models import BookContext, ChapterOutline, ChapterRequest
+
+# Separator used between prompt parts (kept from the original prompt format)
+PART_SEPARATOR = "\\n\\n"
+
+WRITING_INSTRUCTIONS = [
+    "Write engaging, well-structured content that flows naturally.",
+    "Use markdown formatting with appropriate headers (## for main sections, ### for subsections).",
+    "Do not include the chapter number or title in your response - just the content.",
+    "Write in a style consistent with the book's overall tone and the specified genre.",
+]
+
+
+@dataclass(frozen=True)
+class ChapterPrompt:
+    """A chapter prompt split into its book-wide prefix and per-chapter suffix."""
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + PART_SEPARATOR + self.suffix
+
+
+def book_prefix(book_context: BookContext, outline: Optional[List[ChapterOutline]] = None,
+                synopses: Optional[List[str]] = None) -> str:
+    """
+    Shared prompt prefix for every chapter of a book.
+
+    Only book-level fields go here, in a fixed order, so the prefix is
+    byte-identical across chapters.
+
+    Args:
+        book_context: Book-level context
+        outline: Every chapter of the book, in order (optional)
+        synopses: Synopsis of every chapter, in order (optional)
+
+    Returns:
+        Prefix text
+    """
+    parts = [
+        f"You are writing a book titled '{book_context.title}' by {book_context.author}.",
+        f"Book concept: {book_context.book_idea}",
+    ]
+    if book_context.genre:
+        parts.append(f"Genre: {book_context.genre}")
+    if book_context.writing_style:
+        parts.append(f"Writing style: {book_context.writing_style}")
+    if book_context.target_audience:
+        parts.append(f"Target audience: {book_context.target_audience}")
+    if outline:
+        chapters = "\\n".join(
+            f"Chapter {chapter.chapter_number}: {chapter.section_name} ({'; '.join(chapter.section_ideas)})"
+            for chapter in outline
+        )
+        parts.append(f"Book outline:\\n{chapters}")
+    if synopses:
+        summaries = "\\n".join(f"Chapter {number}: {synopsis}" for number, synopsis in enumerate(synopses, 1))
+        parts.append(f"Chapter synopses:\\n{summaries}")
+    parts.extend(WRITING_INSTRUCTIONS)
+    return PART_SEPARATOR.join(parts)
+
+
+def chapter_suffix(request: ChapterRequest) -> str:
+    """
+    Per-chapter part of the prompt.
+
+    Args:
+        request: Chapter generation request
+
+    Returns:
+        Suffix text naming the chapter to write and its specific context
+    """
+    outline = request.chapter_outline
+    ideas_text = "\\n".join(f"- {idea}" for idea in outline.section_ideas)
+    parts = [
+        f"Now write chapter {outline.chapter_number}.",
+        f"Chapter title: {outline.section_name}",
+        f"Target length: {outline.target_length}",
+        f"Key topics to cover:\\n{ideas_text}",
+    ]
+    if request.previous_chapters:
+        prev_summary = "\\n".join(f"Chapter {i+1} summary: {ch[:200]}..."
+                                 for i, ch in enumerate(request.previous_chapters[-2:]))  # Last 2 chapters
+        parts.append(f"Previous chapters context:\\n{prev_summary}")
+    if request.book_synopses:
+        parts.append("Follow this chapter's synopsis, and keep any reference to other chapters "
+                     "consistent with their synopses.")
+    if request.custom_instructions:
+        parts.append(f"Special instructions: {request.custom_instructions}")
+    return PART_SEPARATOR.join(parts)
+
+
+def build_chapter_prompt(request: ChapterRequest) -> ChapterPrompt:
+    """
+    Assemble the prompt for one chapter, shared prefix first.
+
+    Args:
+        request: Chapter generation request
+
+    Returns:
+        The prompt split into prefix and suffix
+    """
+    return ChapterPrompt(
+        book_prefix(request.book_context, request.book_outline, request.book_synopses),
+        chapter_suffix(request),
+    )
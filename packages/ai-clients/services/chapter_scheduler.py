@@ -0,0 +1,363 @@
+"""
+Process-wide scheduling of chapter generation.
+
+Each book request used to bound only its own concurrency, so twenty books
+in flight could mean a hundred simultaneous upstream calls. Every chapter
+job now takes a slot from one ``ChapterScheduler`` before calling the LLM.
+The scheduler enforces a global limit (the provider's sweet spot) and, inside
+it, each book's own limit (``max_concurrent_chapters``). Free slots go to the
+waiting book with the fewest chapters running, so a large book cannot starve
+the others. Waiters may be threads or coroutines on any event loop. Queue
+depth, in-flight counts and slot wait times are reported by ``stats``.
+
+Work is also tagged by tenant (``tenant_scope``, set per HTTP request from
+a header sent by a trusted proxy) and priority. Interactive work (a chapter requested on its own) is
+admitted ahead of bulk work (books), unless a bulk chapter has waited longer
+than ``bulk_max_wait``. Within a priority, tenants share slots by weighted
+fair queuing (start-time fair queuing over admitted chapters). A tenant with
+weight 2 gets twice the slots of a tenant with weight 1 while both are
+waiting, and a tenant that was idle does not get credit for it. Only tenants
+with a configured weight are tracked on their own; any other tenant name is
+scheduled as the default tenant, so made-up names neither grow the tenant
+table nor start afresh at the current virtual time. Per-tenant load,
+admissions and wait times show whether the split is fair.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional, Tuple
+
+from .llm_metrics import LatencyRecorder
+
+# Chapter generations running at once across every request in the process
+DEFAULT_CHAPTER_CONCURRENCY = int(os.getenv("CHAPTER_SCHEDULER_CONCURRENCY", "10"))
+# Relative slot shares as a JSON object, e.g. {"acme": 3}; unlisted tenants share the default tenant's slots
+DEFAULT_TENANT_WEIGHTS: Dict[str, float] = json.loads(os.getenv("SCHEDULER_TENANT_WEIGHTS", "") or "{}")
+# Seconds after which a waiting bulk chapter is admitted as if it were interactive
+DEFAULT_BULK_MAX_WAIT = float(os.getenv("SCHEDULER_BULK_MAX_WAIT", "30"))
+DEFAULT_TENANT = "default"
+
+# Admission order: interactive work first
+PRIORITIES = ("interactive", "bulk")
+
+_job_ids = itertools.count(1)
+
+_current_tenant: ContextVar[str] = ContextVar("chapter_scheduler_tenant", default=DEFAULT_TENANT)
+
+
+@contextmanager
+def tenant_scope(tenant: Optional[str]) -> Iterator[None]:
+    """Attribute scheduler jobs created inside the block to ``tenant`` (the default tenant if empty)."""
+    token = _current_tenant.set(tenant or DEFAULT_TENANT)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def current_tenant() -> str:
+    """The tenant the caller's work is scheduled for."""
+    return _current_tenant.get()
+
+
+class SchedulerJob:
+    """One request's share of the scheduler: its chapters, their limit, tenant and priority."""
+
+    def __init__(self, limit: int, name: Optional[str] = None, priority: str = "bulk",
+                 tenant: Optional[str] = None):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {list(PRIORITIES)}")
+        self.id = next(_job_ids)
+        self.name = name or f"job-{self.id}"
+        self.limit = max(1, limit)
+        self.priority = priority
+        self.tenant = tenant or current_tenant()
+        self.running = 0
+
+
+class _Tenant:
+    """A tenant's weight, fair-queuing tag and load."""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        # Virtual finish time of the tenant's last admitted chapter
+        self.finish = 0.0
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.completed = 0
+
+
+class _Waiter:
+    """A thread (``event``) or coroutine (``loop``/``future``) waiting for a slot."""
+
+    def __init__(self, job: SchedulerJob, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.job = job
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.enqueued = time.monotonic()
+        self.granted = False
+
+
+_current_job: ContextVar[Optional[SchedulerJob]] = ContextVar("chapter_scheduler_job", default=None)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ChapterScheduler:
+    """Shares a global chapter concurrency budget fairly between requests."""
+
+    def __init__(self, limit: int = DEFAULT_CHAPTER_CONCURRENCY, weights: Optional[Dict[str, float]] = None,
+                 bulk_max_wait: float = DEFAULT_BULK_MAX_WAIT):
+        """
+        Initialize the scheduler.
+
+        Args:
+            limit: Chapter generations allowed to run at once across all requests
+            weights: Slot share per tenant (default ``SCHEDULER_TENANT_WEIGHTS``); unlisted tenants are
+                scheduled as the default tenant, which weighs 1 unless listed
+            bulk_max_wait: Seconds after which a waiting bulk chapter is admitted as if it were interactive
+        """
+        self.limit = max(1, limit)
+        self.weights = dict(DEFAULT_TENANT_WEIGHTS if weights is None else weights)
+        self.bulk_max_wait = bulk_max_wait
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._jobs: Dict[int, SchedulerJob] = {}
+        self._tenants: Dict[str, _Tenant] = {}
+        # Virtual time of fair queuing: the start tag of the last admitted chapter
+        self._virtual_time = 0.0
+        self._running = 0
+        self._latency = LatencyRecorder()
+        self._tenant_latency = LatencyRecorder()
+        self._metrics = {"jobs": 0, "admitted": 0, "completed": 0, "abandoned": 0,
+                         "peak_in_flight": 0, "peak_queue_depth": 0}
+
+    @contextmanager
+    def job(self, limit: int, name: Optional[str] = None, priority: str = "bulk") -> Iterator[SchedulerJob]:
+        """
+        Group the chapters started inside the block under one request limit.
+
+        The job belongs to the tenant of the calling context.
+
+        Args:
+            limit: Chapters of this request allowed to run at once
+            name: Label for the job (e.g. the book title)
+            priority: ``"interactive"`` or ``"bulk"``
+        """
+        job = SchedulerJob(min(limit, self.limit), name, priority)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._metrics["jobs"] += 1
+        token = _current_job.set(job)
+        try:
+            yield job
+        finally:
+            _current_job.reset(token)
+            with self._lock:
+                self._jobs.pop(job.id, None)
+
+    def _current(self) -> SchedulerJob:
+        # A chapter outside any job (e.g. /generate-chapter) is an interactive job of one
+        return _current_job.get() or SchedulerJob(1, priority="interactive")
+
+    def _tenant_name(self, name: str) -> str:
+        """The tenant ``name`` is scheduled as: itself if it has a configured weight, else the default tenant."""
+        return name if name in self.weights else DEFAULT_TENANT
+
+    def _tenant(self, name: str) -> _Tenant:
+        # Called with the lock held
+        name = self._tenant_name(name)
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            tenant = self._tenants[name] = _Tenant(float(self.weights.get(name, 1.0)))
+        return tenant
+
+    def _start_tag(self, tenant: _Tenant) -> float:
+        """Virtual start time of the tenant's next chapter; an idle tenant starts at the current virtual time."""
+        return max(tenant.finish, self._virtual_time)
+
+    def _rank(self, waiter: _Waiter, now: float) -> Tuple[int, float, int]:
+        """Admission order: priority (bulk waiting too long counts as interactive), fair share, job load."""
+        priority = PRIORITIES.index(waiter.job.priority)
+        if now - waiter.enqueued >= self.bulk_max_wait:
+            priority = 0
+        return priority, self._start_tag(self._tenant(waiter.job.tenant)), waiter.job.running
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """The eligible waiter ranked first (oldest first on ties)."""
+        now = time.monotonic()
+        best, best_rank = None, None
+        for waiter in self._waiters:
+            if waiter.job.running >= waiter.job.limit:
+                continue
+            rank = self._rank(waiter, now)
+            if best is None or rank < best_rank:
+                best, best_rank = waiter, rank
+        return best
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters; called with the lock held."""
+        while self._running < self.limit:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._waiters.remove(waiter)
+            if waiter.loop is not None:
+                try:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                except RuntimeError:
+                    # The waiter's event loop has closed; nobody is left to run the chapter
+                    self._metrics["abandoned"] += 1
+                    self._tenant(waiter.job.tenant).waiting -= 1
+                    continue
+            else:
+                waiter.event.set()
+            waiter.granted = True
+            waiter.job.running += 1
+            self._running += 1
+            tenant = self._tenant(waiter.job.tenant)
+            tenant.waiting -= 1
+            tenant.running += 1
+            tenant.admitted += 1
+            self._virtual_time = self._start_tag(tenant)
+            tenant.finish = self._virtual_time + 1.0 / tenant.weight
+            self._metrics["admitted"] += 1
+            self._metrics["peak_in_flight"] = max(self._metrics["peak_in_flight"], self._running)
+            wait = time.monotonic() - waiter.enqueued
+            self._latency.record("wait", wait)
+            self._latency.record(waiter.job.priority, wait)
+            self._tenant_latency.record(self._tenant_name(waiter.job.tenant), wait)
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._lock:
+            self._waiters.append(waiter)
+            self._tenant(waiter.job.tenant).waiting += 1
+            self._dispatch()
+            self._metrics["peak_queue_depth"] = max(self._metrics["peak_queue_depth"], len(self._waiters))
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Withdraw a cancelled waiter, giving back its slot if one was already granted."""
+        with self._lock:
+            self._metrics["abandoned"] += 1
+            if waiter.granted:
+                self._release(waiter.job)
+            else:
+                self._waiters.remove(waiter)
+                self._tenant(waiter.job.tenant).waiting -= 1
+
+    def _release(self, job: SchedulerJob) -> None:
+        # Called with the lock held
+        job.running -= 1
+        self._running -= 1
+        self._tenant(job.tenant).running -= 1
+        self._dispatch()
+
+    def release(self, job: SchedulerJob) -> None:
+        """Give back a slot taken by ``acquire`` or ``async_acquire``."""
+        with self._lock:
+            self._metrics["completed"] += 1
+            self._tenant(job.tenant).completed += 1
+            self._release(job)
+
+    def acquire(self, job: SchedulerJob) -> None:
+        """Block the calling thread until ``job`` may start another chapter."""
+        waiter = _Waiter(job)
+        self._enqueue(waiter)
+        waiter.event.wait()
+
+    async def async_acquire(self, job: SchedulerJob) -> None:
+        """Wait, without blocking the event loop, until ``job`` may start another chapter."""
+        waiter = _Waiter(job, asyncio.get_running_loop())
+        self._enqueue(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the current job while the block runs."""
+        job = self._current()
+        self.acquire(job)
+        try:
+            yield
+        finally:
+            self.release(job)
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """Async version of ``slot``."""
+        job = self._current()
+        await self.async_acquire(job)
+        try:
+            yield
+        finally:
+            self.release(job)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the limit, current load, queue depth and slot wait times, overall, per priority and per tenant."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            current = {
+                "in_flight": self._running,
+                "queue_depth": len(self._waiters),
+                "active_jobs": len(self._jobs),
+            }
+            queued = {priority: sum(w.job.priority == priority for w in self._waiters) for priority in PRIORITIES}
+            tenants = {
+                name: {"weight": tenant.weight, "in_flight": tenant.running, "queue_depth": tenant.waiting,
+                       "admitted": tenant.admitted, "completed": tenant.completed}
+                for name, tenant in self._tenants.items()
+            }
+        waits = self._latency.stats()
+        tenant_waits = self._tenant_latency.stats()
+        for name, tenant in tenants.items():
+            tenant["wait"] = tenant_waits.get(name)
+        return {
+            "limit": self.limit,
+            **current,
+            **metrics,
+            "wait": waits.get("wait"),
+            "bulk_max_wait": self.bulk_max_wait,
+            "priorities": {priority: {"queue_depth": queued[priority], "wait": waits.get(priority)}
+                           for priority in PRIORITIES},
+            "tenants": tenants,
+        }
+
+
+def current_job() -> Optional[SchedulerJob]:
+    """The scheduler job the caller's chapters count against, if any."""
+    return _current_job.get()
+
+
+_scheduler = ChapterScheduler()
+
+
+def get_chapter_scheduler() -> ChapterScheduler:
+    """Return the process-wide chapter scheduler."""
+    return _scheduler
+
+
+def set_chapter_scheduler(scheduler: ChapterScheduler) -> ChapterScheduler:
+    """Replace the process-wide chapter scheduler; returns the previous one."""
+    global _scheduler
+    previous, _scheduler = _scheduler, scheduler
+    return previous
+
+
+def get_chapter_scheduler_stats() -> Dict[str, Any]:
+    """Return the chapter scheduler's load and wait-time metrics."""
+    return _scheduler.stats()
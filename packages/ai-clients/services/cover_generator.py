@@ -3,11 +3,10 @@ Cover generation service using AI-generated images and PDF assembly.
 """
 
 import base64
-import requests
 from io import BytesIO
 from PIL import Image, ImageEnhance, ImageFilter
 from weasyprint import HTML
-from .ai_client import get_openai_client, get_replicate_client, ask_llm
+from .ai_client import get_openai_client, get_replicate_client, get_http_client, ask_llm
 
 
 class CoverGenerator:
@@ -105,7 +104,10 @@ class CoverGenerator:
             raise ValueError("Failed to generate front cover image")
 
         # 2) Generate a back illustration prompt via LLM + Replicate
-        back_desc = ask_llm(f"Write a vivid, text‐free illustration description around the idea of '{book_idea}'.")
+        back_desc = ask_llm(
+            f"Write a vivid, text‐free illustration description around the idea of '{book_idea}'.",
+            stage="cover_illustration_prompt"
+        )
         replicate_out = replicate_client.run(
             "black-forest-labs/flux-dev",
             input={"prompt": back_desc, "aspect_ratio": "2:3"}
@@ -113,7 +115,7 @@ class CoverGenerator:
         back_url = list(replicate_out)[0] if replicate_out else None
         if not back_url:
             raise ValueError("Failed to generate back cover image")
-        back_img = requests.get(back_url).content
+        back_img = get_http_client().get(str(back_url)).content
 
         canvas_img, (full_w_in, h_in, back_w_in, spine_w_in, front_w_in) = cls.create_cover_image(
             front_bytes,
@@ -129,7 +131,8 @@ class CoverGenerator:
         # 4) Back‐cover text
         back_blurb = ask_llm(
             f"Write the text for the back cover of the book '{title}' "
-            f"by the author '{author}' that is about '{book_idea}'. REPLY ONLY WITH THE BACK COVER TEXT."
+            f"by the author '{author}' that is about '{book_idea}'. REPLY ONLY WITH THE BACK COVER TEXT.",
+            stage="cover_blurb"
         ) or ""
         back_desc_paragraphs = "".join(f"<p>{line}</p>" for line in back_blurb.split("\n"))
 
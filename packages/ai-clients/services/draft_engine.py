@@ -0,0 +1,166 @@
+"""
+Concurrent section-idea drafting for ``/draft``.
+
+A draft is one LLM call per section idea, and a 10x10 TOC used to make 100
+calls one after another. ``DraftEngine`` sends those calls concurrently, up
+to ``concurrency`` at once per draft, through the process-wide chapter
+scheduler, so several drafts together still respect the global budget. It
+reassembles the markdown in TOC order and reports progress as each idea
+finishes. A draft takes roughly (ideas / concurrency) x per-call latency.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from models.request_models import DraftRequest
+from .ai_client import async_call_llm
+from .chapter_scheduler import ChapterScheduler, get_chapter_scheduler
+from .llm_cache import regenerate_responses
+from .model_routing import route_overrides
+
+# Section ideas drafted at once per /draft request
+DEFAULT_DRAFT_CONCURRENCY = int(os.getenv("DRAFT_CONCURRENCY", "8"))
+
+
+def section_prompt(req: DraftRequest, section_name: str, idea: str) -> str:
+    """The prompt drafting one idea of a section."""
+    return (
+        f"Act as an expert writer of the book '{req.title}' about '{req.book_idea}'. "
+        f"Expand on '{idea}' in chapter '{section_name}'. Write a couple of pages. "
+        "Reply only with the contents of the section. Do not add chapter numbers or chapter titles."
+    )
+
+
+@dataclass
+class DraftProgress:
+    """Progress of one draft."""
+    title: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"title": self.title, "total": self.total, "completed": self.completed, "failed": self.failed,
+                "elapsed": time.time() - self.started_at}
+
+
+class DraftEngine:
+    """Drafts every section idea of a TOC concurrently and reassembles the markdown."""
+
+    def __init__(self, concurrency: int = DEFAULT_DRAFT_CONCURRENCY, scheduler: Optional[ChapterScheduler] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            concurrency: Ideas drafted at once per draft
+            scheduler: Scheduler granting the call slots (the process-wide one by default)
+        """
+        self.concurrency = max(1, concurrency)
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._active: Dict[int, DraftProgress] = {}
+        self._metrics = {"drafts": 0, "ideas": 0, "failed_ideas": 0}
+
+    @property
+    def scheduler(self) -> ChapterScheduler:
+        return self._scheduler or get_chapter_scheduler()
+
+    async def _draft_idea(self, prompt: str, idea: str, position: int, progress: DraftProgress,
+                          finished: asyncio.Queue) -> str:
+        async with self.scheduler.async_slot():
+            try:
+                content = await async_call_llm(prompt, stage="section_draft")
+            except Exception:
+                # As with ask_llm, one failed idea becomes an error line rather than failing the draft
+                content = None
+        with self._lock:
+            progress.completed += 1
+            self._metrics["ideas"] += 1
+            if content is None:
+                progress.failed += 1
+                self._metrics["failed_ideas"] += 1
+            snapshot = progress.as_dict()
+        finished.put_nowait((position, snapshot))
+        return content if content is not None else f"*Error generating {idea}*"
+
+    async def events(self, req: DraftRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Draft ``req`` and report progress.
+
+        Args:
+            req: Draft request (TOC and book metadata)
+
+        Yields:
+            ``{"event": "progress", ...}`` as each idea finishes (with the
+            section and idea), then one ``{"event": "complete", "markdown": str,
+            "_metadata": {...}}``
+        """
+        ideas = [(sec.section_name, idea) for sec in req.toc for idea in sec.section_ideas]
+        progress = DraftProgress(req.title, len(ideas))
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def run() -> List[str]:
+            # Idea tasks inherit the request's routes and count against this draft's scheduler job
+            with route_overrides(req.model_routes), regenerate_responses(req.regenerate), \
+                    self.scheduler.job(self.concurrency, req.title):
+                return await asyncio.gather(*(
+                    self._draft_idea(section_prompt(req, section_name, idea), idea, position, progress, finished)
+                    for position, (section_name, idea) in enumerate(ideas)
+                ))
+
+        with self._lock:
+            self._metrics["drafts"] += 1
+            self._active[id(progress)] = progress
+        runner = asyncio.create_task(run())
+        try:
+            for _ in ideas:
+                position, snapshot = await finished.get()
+                section_name, idea = ideas[position]
+                yield {"event": "progress", "section": section_name, "idea": idea, **snapshot}
+            contents = await runner
+            yield {"event": "complete", "markdown": self._assemble(req, contents),
+                   "_metadata": {"generation_method": "concurrent_ideas", "concurrency": self.concurrency,
+                                 "ideas": progress.total, "failed_ideas": progress.failed,
+                                 "generation_time": time.time() - progress.started_at}}
+        finally:
+            runner.cancel()
+            with self._lock:
+                self._active.pop(id(progress), None)
+
+    @staticmethod
+    def _assemble(req: DraftRequest, contents: List[str]) -> str:
+        """Markdown in TOC order: a heading per section followed by its ideas."""
+        parts = iter(contents)
+        md = []
+        for sec in req.toc:
+            md.append(f"## {sec.section_name}\n")
+            for _ in sec.section_ideas:
+                md.append(next(parts) + "\n\n")
+        return "".join(md)
+
+    async def draft(self, req: DraftRequest) -> Dict[str, Any]:
+        """
+        Draft ``req`` and return ``{"markdown": str, "_metadata": {...}}``.
+
+        Ideas that fail are replaced by an error line, as before.
+        """
+        result = None
+        # Run the generator to its end so the draft leaves the active list before returning
+        async for event in self.events(req):
+            if event["event"] == "complete":
+                result = {"markdown": event["markdown"], "_metadata": event["_metadata"]}
+        if result is None:
+            raise RuntimeError("draft ended without a result")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Report drafts and ideas so far, and the progress of drafts still running."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            active = [progress.as_dict() for progress in self._active.values()]
+        return {"concurrency": self.concurrency, **metrics, "active": active}
@@ -0,0 +1,339 @@
+"""
+Hedged LLM requests to cut tail latency.
+
+When a call has not finished by an adaptive threshold (a high percentile of
+recent latencies for the same stage and model), a duplicate is sent,
+optionally to a different model, and whichever good answer arrives first
+wins. The clock stops while the request waits on the rate limiter
+(``pending_send``), so throttling neither fires hedges nor inflates the
+thresholds. Hedges are capped by a per-book budget (``hedge_budget``) or,
+outside a book, by a global ratio of hedges to calls, and the hedges in
+flight at once by a fraction of the calls in flight, so they cannot double
+load.
+
+Only async calls are hedged. A blocking send cannot be abandoned, so a
+thread waiting on it returns no sooner whatever a hedge does; sync calls
+are sent once and only feed the latency percentiles.
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, ContextManager, Dict, Iterator, Optional
+
+from .llm_metrics import LatencyRecorder
+
+DEFAULT_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0").lower() in ("1", "true", "yes")
+DEFAULT_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Threshold used until enough samples exist for a stage/model
+DEFAULT_HEDGE_INITIAL_DELAY = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "60"))
+DEFAULT_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+DEFAULT_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+DEFAULT_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL", "")
+# Hedges allowed per call outside a book, and per chapter inside one
+DEFAULT_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.05"))
+DEFAULT_HEDGE_BOOK_RATIO = float(os.getenv("LLM_HEDGE_BOOK_RATIO", "0.2"))
+# Hedges in flight at once, as a fraction of hedged calls in flight (at least one)
+DEFAULT_HEDGE_MAX_OUTSTANDING = float(os.getenv("LLM_HEDGE_MAX_OUTSTANDING", "0.1"))
+
+
+class _Attempt:
+    """One upstream send; its clock restarts when the request first clears the rate limiter."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.waiting = False
+        self._sent = False
+
+    def wait(self) -> None:
+        if not self._sent:
+            self.waiting = True
+
+    def start(self) -> None:
+        self.waiting = False
+        if not self._sent:
+            self._sent = True
+            self.started_at = time.monotonic()
+
+
+_current_attempt: contextvars.ContextVar[Optional[_Attempt]] = contextvars.ContextVar(
+    "llm_hedge_attempt", default=None
+)
+
+
+@contextmanager
+def pending_send() -> Iterator[None]:
+    """
+    Hold the current attempt's clock while the block runs (e.g. a rate limiter wait).
+
+    Hedge thresholds and recorded latencies are measured from the end of
+    the first such block, when the request actually goes out.
+    """
+    attempt = _current_attempt.get()
+    if attempt is not None:
+        attempt.wait()
+    try:
+        yield
+    finally:
+        if attempt is not None:
+            attempt.start()
+
+
+class HedgeBudget:
+    """Hedges still allowed for one unit of work (e.g. a book)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+_current_budget: contextvars.ContextVar[Optional[HedgeBudget]] = contextvars.ContextVar(
+    "llm_hedge_budget", default=None
+)
+
+
+@contextmanager
+def hedge_budget(limit: int) -> Iterator[HedgeBudget]:
+    """
+    Cap the hedges fired by LLM calls made inside the block.
+
+    Follows the same context rules as ``usage_scope``.
+
+    Args:
+        limit: Maximum hedges for the block
+
+    Yields:
+        The budget (``used`` reports hedges fired)
+    """
+    previous = _current_budget.get()
+    budget = HedgeBudget(limit)
+    _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.set(previous)
+
+
+class Hedger:
+    """Decides when to hedge a call and races the duplicate against the original."""
+
+    def __init__(self, enabled: bool = DEFAULT_HEDGE_ENABLED, percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 initial_delay: float = DEFAULT_HEDGE_INITIAL_DELAY, min_delay: float = DEFAULT_HEDGE_MIN_DELAY,
+                 min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES, hedge_model: str = DEFAULT_HEDGE_MODEL,
+                 max_ratio: float = DEFAULT_HEDGE_MAX_RATIO, book_ratio: float = DEFAULT_HEDGE_BOOK_RATIO,
+                 max_outstanding: float = DEFAULT_HEDGE_MAX_OUTSTANDING, window: int = 200):
+        """
+        Initialize the hedger.
+
+        Args:
+            enabled: Whether calls are hedged at all
+            percentile: Latency percentile (0-100) after which a hedge fires
+            initial_delay: Threshold until ``min_samples`` latencies are known
+            min_delay: Lower bound on the threshold
+            min_samples: Samples needed before the percentile is trusted
+            hedge_model: Model for the duplicate ("" reuses the call's model)
+            max_ratio: Hedges per call allowed outside a ``hedge_budget``
+            book_ratio: Hedges per chapter granted by ``book_budget``
+            max_outstanding: Hedges in flight at once per hedged call in flight
+            window: Recent latencies kept per stage and model
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.hedge_model = hedge_model
+        self.max_ratio = max_ratio
+        self.book_ratio = book_ratio
+        self.max_outstanding = max_outstanding
+        self._latency = LatencyRecorder(window)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._outstanding = 0
+        self._metrics = {"calls": 0, "hedges": 0, "hedge_wins": 0, "primary_wins": 0, "budget_denied": 0,
+                         "outstanding_denied": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    @staticmethod
+    def _key(stage: Optional[str], params: Dict[str, Any]) -> str:
+        return f"{stage or 'default'}:{params['model']}"
+
+    def _threshold(self, key: str) -> float:
+        if self._latency.count(key) < self.min_samples:
+            return max(self.initial_delay, self.min_delay)
+        return max(self._latency.percentile(key, self.percentile), self.min_delay)
+
+    def threshold(self, stage: Optional[str], params: Dict[str, Any]) -> float:
+        """Seconds to wait before hedging a call for this stage and model."""
+        return self._threshold(self._key(stage, params))
+
+    def book_budget(self, chapters: int) -> ContextManager[HedgeBudget]:
+        """Budget for a book of ``chapters`` chapters (``book_ratio`` per chapter, at least one)."""
+        return hedge_budget(max(1, math.ceil(chapters * self.book_ratio)))
+
+    def _allow(self) -> bool:
+        """Check the cap on hedges in flight, then consume a hedge from the budget or global ratio."""
+        with self._lock:
+            if self._outstanding >= max(1, math.floor(self._in_flight * self.max_outstanding)):
+                self._metrics["outstanding_denied"] += 1
+                return False
+        budget = _current_budget.get()
+        if budget is not None:
+            allowed = budget.take()
+        else:
+            with self._lock:
+                allowed = self._metrics["hedges"] + 1 <= self._metrics["calls"] * self.max_ratio
+        if not allowed:
+            self._count("budget_denied")
+        return allowed
+
+    @contextmanager
+    def _tracked(self) -> Iterator[None]:
+        """Count a hedged call as in flight (the outstanding-hedge cap scales with it)."""
+        with self._lock:
+            self._metrics["calls"] += 1
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _hedge_fired(self) -> None:
+        with self._lock:
+            self._metrics["hedges"] += 1
+            self._outstanding += 1
+
+    def _hedge_done(self, _: Any) -> None:
+        with self._lock:
+            self._outstanding -= 1
+
+    def _hedge_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {**params, "model": self.hedge_model} if self.hedge_model else params
+
+    def _timed(self, key: str, send: Callable[[Dict[str, Any], Optional[float]], Any],
+               params: Dict[str, Any], timeout: Optional[float], attempt: _Attempt) -> Any:
+        token = _current_attempt.set(attempt)
+        try:
+            result = send(params, timeout)
+        finally:
+            _current_attempt.reset(token)
+        self._latency.record(key, time.monotonic() - attempt.started_at)
+        return result
+
+    async def _async_timed(self, key: str, send: Callable[[Dict[str, Any], Optional[float]], Awaitable[Any]],
+                           params: Dict[str, Any], timeout: Optional[float], attempt: _Attempt) -> Any:
+        # Runs as its own task, so the attempt is only visible to this send
+        _current_attempt.set(attempt)
+        result = await send(params, timeout)
+        self._latency.record(key, time.monotonic() - attempt.started_at)
+        return result
+
+    @staticmethod
+    def _remaining(timeout: Optional[float], started: float) -> Optional[float]:
+        return None if timeout is None else max(timeout - (time.monotonic() - started), 0.0)
+
+    def call(self, params: Dict[str, Any], timeout: Optional[float],
+             send: Callable[[Dict[str, Any], Optional[float]], Any], stage: Optional[str] = None) -> Any:
+        """
+        Send ``params`` with ``send`` on the calling thread, without hedging.
+
+        The caller would wait for its own blocking send whatever a hedge did,
+        so a hedge could only add a second paid call. The latency still
+        counts towards the thresholds ``async_call`` hedges by.
+
+        Args:
+            params: Chat parameters
+            timeout: Time budget for the call (None for unbounded)
+            send: Performs one upstream call
+            stage: Call site, used to keep latency percentiles per stage
+
+        Returns:
+            The result of ``send``
+        """
+        return self._timed(self._key(stage, params), send, params, timeout, _Attempt())
+
+    async def async_call(self, params: Dict[str, Any], timeout: Optional[float],
+                         send: Callable[[Dict[str, Any], Optional[float]], Awaitable[Any]],
+                         stage: Optional[str] = None) -> Any:
+        """
+        Send ``params`` with ``send``, hedging once if it is slow.
+
+        Both attempts race: the first good answer wins and the other is
+        cancelled. Both are recorded in the usage ledger by ``send``.
+
+        Args:
+            params: Chat parameters
+            timeout: Time budget for the call (None for unbounded)
+            send: Performs one upstream call
+            stage: Call site, used to keep latency percentiles per stage
+
+        Returns:
+            The first successful result
+
+        Raises:
+            Exception: The last failure if both calls fail
+        """
+        key = self._key(stage, params)
+        if not self.enabled:
+            return await self._async_timed(key, send, params, timeout, _Attempt())
+        attempt = _Attempt()
+        threshold = self.threshold(stage, params)
+        with self._tracked():
+            primary = asyncio.ensure_future(self._async_timed(key, send, params, timeout, attempt))
+            pending = {primary: "primary_wins"}
+            try:
+                # The deadline moves while the send waits on the rate limiter
+                while not primary.done() and (attempt.waiting or attempt.started_at + threshold > time.monotonic()):
+                    due = threshold if attempt.waiting else attempt.started_at + threshold - time.monotonic()
+                    await asyncio.wait([primary], timeout=due)
+                if primary.done() or not self._allow():
+                    return await primary
+                self._hedge_fired()
+                hedge_params = self._hedge_params(params)
+                hedge = asyncio.ensure_future(self._async_timed(
+                    self._key(stage, hedge_params), send, hedge_params,
+                    self._remaining(timeout, attempt.started_at), _Attempt()
+                ))
+                hedge.add_done_callback(self._hedge_done)
+                pending[hedge] = "hedge_wins"
+                error: Optional[BaseException] = None
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        outcome = pending.pop(task)
+                        if task.exception() is not None:
+                            error = task.exception()
+                            continue
+                        self._count(outcome)
+                        return task.result()
+                raise error
+            finally:
+                for loser in pending:
+                    loser.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hedges fired, how often the hedge won, budget and outstanding-cap denials and current thresholds."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            "enabled": self.enabled,
+            **metrics,
+            "hedge_win_rate": metrics["hedge_wins"] / metrics["hedges"] if metrics["hedges"] else 0.0,
+            "thresholds": {key: self._threshold(key) for key in self._latency.stats()},
+        }
@@ -0,0 +1,352 @@
+"""
+Record/replay HTTP transport for deterministic, offline pipeline runs.
+
+``ReplayTransport`` sits under the pooled OpenAI client, the Replicate
+client and image downloads. In ``record`` mode it forwards every request
+upstream and appends the request fingerprint, the response and the arrival
+time of each body chunk to a JSONL cassette. In ``replay`` mode it answers
+from the cassette without touching the network, re-emitting chunks with
+their recorded timing (scaled by ``speed``). This lets the real
+``ChapterGenerator``/``CoverGenerator`` pipeline be benchmarked
+reproducibly with no token spend.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+REPLAY_MODES = ("off", "record", "replay")
+DEFAULT_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off")
+DEFAULT_CASSETTE_PATH = os.getenv("LLM_REPLAY_PATH", ".cache/llm_cassette.jsonl")
+# 1.0 replays recorded latencies as-is, 0 replays instantly
+DEFAULT_REPLAY_SPEED = float(os.getenv("LLM_REPLAY_SPEED", "1.0"))
+# Hop-by-hop or length headers that no longer match a re-served body
+_DROPPED_HEADERS = frozenset({"content-length", "transfer-encoding", "connection", "keep-alive"})
+
+
+def request_fingerprint(request: httpx.Request) -> str:
+    """
+    Stable identity of a request: method, URL and body.
+
+    Credentials are not part of it, JSON bodies are compared with sorted keys
+    and multipart boundaries (random per upload) are blanked out.
+
+    Args:
+        request: The outgoing request (its body must be readable)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    body = request.read()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json") and body:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+        except ValueError:
+            pass
+    elif "boundary=" in content_type:
+        body = body.replace(content_type.split("boundary=", 1)[1].encode(), b"")
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class Cassette:
+    """Recorded exchanges keyed by request fingerprint, stored as JSONL."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the cassette, loading any exchanges already on disk.
+
+        Args:
+            path: JSONL file holding one exchange per line
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Store one exchange in memory and on disk."""
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Next recorded exchange for ``key``.
+
+        Repeated identical requests (e.g. batch status polls) are served in
+        recorded order; once exhausted, the last one is repeated.
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[min(served, len(entries) - 1)]
+
+
+def _response_headers(headers: httpx.Headers) -> List[List[str]]:
+    return [[name, value] for name, value in headers.multi_items() if name.lower() not in _DROPPED_HEADERS]
+
+
+def _entry(key: str, request: httpx.Request, response: httpx.Response, started: float,
+           headers_at: float, chunks: List[List[Any]]) -> Dict[str, Any]:
+    return {
+        "key": key,
+        "method": request.method,
+        "url": str(request.url),
+        "status": response.status_code,
+        "headers": _response_headers(response.headers),
+        # Seconds after the request was sent until the response headers arrived
+        "headers_at": headers_at,
+        # (seconds after the request was sent, base64 bytes)
+        "chunks": chunks,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Passes upstream chunks through while noting their arrival times."""
+
+    def __init__(self, transport: "ReplayTransport", key: str, request: httpx.Request,
+                 response: httpx.Response, started: float):
+        self._transport = transport
+        self._key = key
+        self._request = request
+        self._response = response
+        self._started = started
+        self._headers_at = time.perf_counter() - started
+        self._chunks: List[List[Any]] = []
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._response.stream:
+            self._chunks.append([time.perf_counter() - self._started, base64.b64encode(chunk).decode()])
+            yield chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._response.close()
+        self._transport.record(_entry(
+            self._key, self._request, self._response, self._started, self._headers_at, self._chunks
+        ))
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    """Async counterpart of ``_RecordingStream``."""
+
+    def __init__(self, transport: "ReplayTransport", key: str, request: httpx.Request,
+                 response: httpx.Response, started: float):
+        self._transport = transport
+        self._key = key
+        self._request = request
+        self._response = response
+        self._started = started
+        self._headers_at = time.perf_counter() - started
+        self._chunks: List[List[Any]] = []
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._response.stream:
+            self._chunks.append([time.perf_counter() - self._started, base64.b64encode(chunk).decode()])
+            yield chunk
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        await self._response.aclose()
+        self._transport.record(_entry(
+            self._key, self._request, self._response, self._started, self._headers_at, self._chunks
+        ))
+
+
+class _ReplayStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Re-emits recorded chunks at their recorded offsets (scaled by ``speed``)."""
+
+    def __init__(self, chunks: List[List[Any]], speed: float, started: float):
+        self._chunks = chunks
+        self._speed = speed
+        self._started = started
+
+    def _delay(self, offset: float) -> float:
+        return max(offset * self._speed - (time.perf_counter() - self._started), 0.0)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for offset, data in self._chunks:
+            delay = self._delay(offset)
+            if delay > 0:
+                time.sleep(delay)
+            yield base64.b64decode(data)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for offset, data in self._chunks:
+            delay = self._delay(offset)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield base64.b64decode(data)
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Transport that records upstream exchanges to, or replays them from, a cassette."""
+
+    def __init__(self, cassette: Cassette, mode: str = "replay", speed: float = DEFAULT_REPLAY_SPEED,
+                 inner: Optional[httpx.BaseTransport] = None,
+                 async_inner: Optional[httpx.AsyncBaseTransport] = None,
+                 limits: Optional[httpx.Limits] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            cassette: Where exchanges are stored
+            mode: ``record`` (forward and store) or ``replay`` (serve from the cassette)
+            speed: Multiplier on recorded latencies when replaying (0 for none)
+            inner: Upstream transport for sync clients in record mode
+            async_inner: Upstream transport for async clients in record mode
+            limits: Connection limits for the default upstream transports
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode {mode!r}; expected 'record' or 'replay'")
+        self.cassette = cassette
+        self.mode = mode
+        self.speed = speed
+        self._limits = limits or httpx.Limits()
+        self._inner = inner
+        self._async_inner = async_inner
+        self._lock = threading.Lock()
+        self._metrics = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Store a completed exchange (called when its body stream closes)."""
+        self.cassette.append(entry)
+        self._count("recorded")
+
+    def _lookup(self, request: httpx.Request) -> Optional[Dict[str, Any]]:
+        entry = self.cassette.next(request_fingerprint(request))
+        self._count("replayed" if entry is not None else "misses")
+        return entry
+
+    def _replayed(self, request: httpx.Request, entry: Optional[Dict[str, Any]], started: float) -> httpx.Response:
+        if entry is None:
+            # 404 is classified as permanent, so the miss is not retried
+            return httpx.Response(404, json={"error": {
+                "message": f"No recorded response for {request.method} {request.url} in {self.cassette.path}",
+                "type": "replay_miss",
+            }})
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            stream=_ReplayStream(entry["chunks"], self.speed, started),
+        )
+
+    def _header_delay(self, entry: Optional[Dict[str, Any]], started: float) -> float:
+        if entry is None:
+            return 0.0
+        return max(entry.get("headers_at", 0.0) * self.speed - (time.perf_counter() - started), 0.0)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "replay":
+            started = time.perf_counter()
+            entry = self._lookup(request)
+            delay = self._header_delay(entry, started)
+            if delay > 0:
+                time.sleep(delay)
+            return self._replayed(request, entry, started)
+        if self._inner is None:
+            self._inner = httpx.HTTPTransport(limits=self._limits)
+        key = request_fingerprint(request)
+        started = time.perf_counter()
+        response = self._inner.handle_request(request)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(self, key, request, response, started),
+            extensions=response.extensions,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "replay":
+            started = time.perf_counter()
+            entry = self._lookup(request)
+            delay = self._header_delay(entry, started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return self._replayed(request, entry, started)
+        if self._async_inner is None:
+            self._async_inner = httpx.AsyncHTTPTransport(limits=self._limits)
+        key = request_fingerprint(request)
+        started = time.perf_counter()
+        response = await self._async_inner.handle_async_request(request)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_AsyncRecordingStream(self, key, request, response, started),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        if self._inner is not None:
+            self._inner.close()
+
+    async def aclose(self) -> None:
+        if self._async_inner is not None:
+            await self._async_inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the mode, cassette size and recorded/replayed/missed exchanges."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {"mode": self.mode, "cassette": self.cassette.path, "entries": len(self.cassette), **metrics}
+
+
+def make_replay_transport(mode: str = DEFAULT_REPLAY_MODE, path: str = DEFAULT_CASSETTE_PATH,
+                          speed: float = DEFAULT_REPLAY_SPEED,
+                          limits: Optional[httpx.Limits] = None) -> Optional[ReplayTransport]:
+    """
+    Build the transport selected by ``LLM_REPLAY_MODE`` (None when ``off``).
+
+    Args:
+        mode: ``off``, ``record`` or ``replay``
+        path: Cassette file
+        speed: Replay latency multiplier
+        limits: Connection limits for recording upstream
+
+    Returns:
+        The transport, or None to use the network directly
+    """
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"Unknown LLM_REPLAY_MODE {mode!r}; expected one of {list(REPLAY_MODES)}")
+    if mode == "off":
+        return None
+    return ReplayTransport(Cassette(path), mode=mode, speed=speed, limits=limits)
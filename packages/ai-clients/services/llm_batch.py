@@ -0,0 +1,294 @@
+"""
+Batch-API submission for bulk LLM work.
+
+Whole-book generation is a set of independent chapter calls that nobody
+watches live. ``BatchRunner`` packs them into one OpenAI Batch-style JSONL
+job, polls it until it finishes and maps the output lines back to the
+requests in order. Jobs go through a ``BatchProvider`` so a local stand-in
+server can exercise the whole flow in tests.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .llm_errors import (
+    LLMDeadlineExceededError,
+    LLMError,
+    LLMPermanentError,
+    LLMRateLimitError,
+    LLMTransientError,
+)
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+DEFAULT_POLL_INTERVAL = float(os.getenv("LLM_BATCH_POLL_SECONDS", "30"))
+DEFAULT_BATCH_TIMEOUT = float(os.getenv("LLM_BATCH_TIMEOUT_SECONDS", str(25 * 3600)))
+# Batch jobs are billed at a discount to synchronous calls
+BATCH_PRICE_FACTOR = float(os.getenv("LLM_BATCH_PRICE_FACTOR", "0.5"))
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# (custom_id, chat.completions params)
+BatchRequest = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class BatchJob:
+    """Provider-neutral view of a batch job."""
+    id: str
+    status: str
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    request_counts: Dict[str, int] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one request in a batch: content and usage, or a typed error."""
+    custom_id: str
+    content: Optional[str] = None
+    model: Optional[str] = None
+    usage: Any = None
+    error: Optional[LLMError] = None
+    job_id: Optional[str] = None
+
+
+def encode_jsonl(requests: List[BatchRequest]) -> bytes:
+    """Encode requests as Batch API input lines."""
+    lines = (
+        json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": params})
+        for custom_id, params in requests
+    )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _status_error(status_code: int, message: str) -> LLMError:
+    if status_code == 429:
+        return LLMRateLimitError(message, status_code=status_code)
+    if status_code >= 500 or status_code in (408, 409):
+        return LLMTransientError(message, status_code=status_code)
+    return LLMPermanentError(message, status_code=status_code)
+
+
+def parse_result_line(line: Dict[str, Any]) -> BatchResult:
+    """
+    Map one Batch API output (or error) line onto a ``BatchResult``.
+
+    Args:
+        line: Decoded JSONL line with ``custom_id``, ``response`` and ``error``
+
+    Returns:
+        The result, with ``error`` set for failed requests
+    """
+    custom_id = line["custom_id"]
+    if line.get("error"):
+        error = line["error"]
+        return BatchResult(custom_id, error=LLMPermanentError(f"{error.get('code')}: {error.get('message')}"))
+    response = line.get("response") or {}
+    status_code = response.get("status_code", 0)
+    body = response.get("body") or {}
+    if status_code != 200:
+        message = (body.get("error") or {}).get("message") or f"HTTP {status_code}"
+        return BatchResult(custom_id, error=_status_error(status_code, message))
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return BatchResult(custom_id, error=LLMPermanentError("Batch response has no message content"))
+    return BatchResult(custom_id, content=content, model=body.get("model"), usage=body.get("usage"))
+
+
+class BatchProvider:
+    """Interface for submitting and collecting batch jobs."""
+
+    name = "batch"
+
+    def submit(self, requests: List[BatchRequest]) -> BatchJob:
+        raise NotImplementedError
+
+    def retrieve(self, job_id: str) -> BatchJob:
+        raise NotImplementedError
+
+    def results(self, job: BatchJob) -> Dict[str, BatchResult]:
+        raise NotImplementedError
+
+    def cancel(self, job_id: str) -> None:
+        raise NotImplementedError
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """OpenAI Files + Batches API (through the shared pooled client)."""
+
+    name = "openai"
+
+    def __init__(self, client: Callable[[], "OpenAI"], completion_window: str = "24h"):
+        """
+        Initialize the provider.
+
+        Args:
+            client: Returns the shared OpenAI client (looked up per call)
+            completion_window: Batch completion window requested from the API
+        """
+        self._client = client
+        self.completion_window = completion_window
+
+    @staticmethod
+    def _job(batch: Any) -> BatchJob:
+        counts = batch.request_counts
+        errors = getattr(batch.errors, "data", None) or []
+        return BatchJob(
+            id=batch.id,
+            status=batch.status,
+            output_file_id=batch.output_file_id,
+            error_file_id=batch.error_file_id,
+            request_counts=(
+                {"total": counts.total, "completed": counts.completed, "failed": counts.failed} if counts else {}
+            ),
+            errors=[error.message or error.code or "" for error in errors],
+        )
+
+    def submit(self, requests: List[BatchRequest]) -> BatchJob:
+        client = self._client()
+        upload = client.files.create(file=("batch.jsonl", encode_jsonl(requests)), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=upload.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return self._job(batch)
+
+    def retrieve(self, job_id: str) -> BatchJob:
+        return self._job(self._client().batches.retrieve(job_id))
+
+    def results(self, job: BatchJob) -> Dict[str, BatchResult]:
+        results = {}
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            for raw in self._client().files.content(file_id).text.splitlines():
+                if raw.strip():
+                    result = parse_result_line(json.loads(raw))
+                    results[result.custom_id] = result
+        return results
+
+    def cancel(self, job_id: str) -> None:
+        self._client().batches.cancel(job_id)
+
+
+class BatchRunner:
+    """Submits a batch, polls it to completion and returns results in request order."""
+
+    def __init__(self, provider: BatchProvider, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 timeout: float = DEFAULT_BATCH_TIMEOUT,
+                 retry: Optional[Callable[[Callable[[Optional[float]], Any]], Any]] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            provider: Batch backend
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait for a job before cancelling it
+            retry: Runs one provider operation with retries (e.g.
+                ``LLMResilience.call``); defaults to a single attempt
+        """
+        self.provider = provider
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._retry = retry or (lambda fn: fn(None))
+        self._lock = threading.Lock()
+        self._metrics = {"jobs_submitted": 0, "jobs_reattached": 0, "jobs_completed": 0, "jobs_failed": 0,
+                         "requests": 0, "request_errors": 0, "polls": 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _submit(self, requests: List[BatchRequest], batch_id: Optional[str] = None) -> Tuple[BatchJob, float]:
+        """Submit ``requests``, or re-attach to ``batch_id`` if they were already submitted."""
+        if batch_id is not None:
+            job = self._retry(lambda timeout: self.provider.retrieve(batch_id))
+            self._count("jobs_reattached")
+        else:
+            job = self._retry(lambda timeout: self.provider.submit(requests))
+            self._count("jobs_submitted")
+            self._count("requests", len(requests))
+        return job, time.monotonic() + self.timeout
+
+    def _poll(self, job: BatchJob, expires_at: float) -> Optional[BatchJob]:
+        """Return the finished job, or None to keep waiting; cancels on timeout."""
+        if job.status in TERMINAL_STATUSES:
+            return job
+        if time.monotonic() >= expires_at:
+            self._retry(lambda timeout: self.provider.cancel(job.id))
+            self._count("jobs_failed")
+            raise LLMDeadlineExceededError(f"Batch {job.id} did not finish within {self.timeout:.0f}s")
+        return None
+
+    def _collect(self, job: BatchJob, requests: List[BatchRequest]) -> List[BatchResult]:
+        if job.status == "failed":
+            self._count("jobs_failed")
+            raise LLMPermanentError(f"Batch {job.id} failed: {'; '.join(job.errors) or 'no details'}")
+        results = self._retry(lambda timeout: self.provider.results(job))
+        self._count("jobs_completed")
+        ordered = []
+        for custom_id, _ in requests:
+            result = results.get(custom_id) or BatchResult(
+                custom_id, error=LLMTransientError(f"Batch {job.id} ended '{job.status}' before this request ran")
+            )
+            result.job_id = job.id
+            if result.error is not None:
+                self._count("request_errors")
+            ordered.append(result)
+        return ordered
+
+    def run(self, requests: List[BatchRequest], batch_id: Optional[str] = None,
+            on_job: Optional[Callable[[BatchJob], None]] = None) -> List[BatchResult]:
+        """
+        Run ``requests`` as one batch job and wait for it.
+
+        Args:
+            requests: ``(custom_id, params)`` pairs with unique ids
+            batch_id: A batch these requests were already submitted as (e.g.
+                before a restart); it is waited for instead of submitting again
+            on_job: Called with the job once submitted and after every poll
+
+        Returns:
+            One result per request, in the same order
+
+        Raises:
+            LLMError: The job could not be submitted, failed as a whole or timed out
+        """
+        on_job = on_job or (lambda job: None)
+        job, expires_at = self._submit(requests, batch_id)
+        on_job(job)
+        while self._poll(job, expires_at) is None:
+            time.sleep(self.poll_interval)
+            job = self._retry(lambda timeout: self.provider.retrieve(job.id))
+            self._count("polls")
+            on_job(job)
+        return self._collect(job, requests)
+
+    async def async_run(self, requests: List[BatchRequest], batch_id: Optional[str] = None,
+                        on_job: Optional[Callable[[BatchJob], None]] = None) -> List[BatchResult]:
+        """Async version of ``run``; provider calls and ``on_job`` run in worker threads between polls."""
+        on_job = on_job or (lambda job: None)
+        job, expires_at = await asyncio.to_thread(self._submit, requests, batch_id)
+        await asyncio.to_thread(on_job, job)
+        # _poll cancels the job through the provider on timeout, so it runs off the loop too
+        while await asyncio.to_thread(self._poll, job, expires_at) is None:
+            await asyncio.sleep(self.poll_interval)
+            job = await asyncio.to_thread(self._retry, lambda timeout: self.provider.retrieve(job.id))
+            self._count("polls")
+            await asyncio.to_thread(on_job, job)
+        return await asyncio.to_thread(self._collect, job, requests)
+
+    def stats(self) -> Dict[str, int]:
+        """Report jobs submitted/completed/failed, requests and polls."""
+        with self._lock:
+            return dict(self._metrics)
@@ -0,0 +1,265 @@
+"""
+Content-addressed cache for LLM responses.
+
+Responses are keyed on a hash of the exact request (model, messages and
+parameters). Lookups hit a bounded in-memory LRU first and a persistent
+SQLite tier second, so demo presets, repeated TOC prompts and retried
+chapters come back without another upstream call. Calls made inside
+``regenerate_responses`` skip cached answers, and their fresh responses
+replace the cached ones.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+DEFAULT_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+DEFAULT_DB_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+DEFAULT_MAX_DISK_MB = float(os.getenv("LLM_CACHE_MAX_DISK_MB", "200"))
+
+
+_regenerate: ContextVar[bool] = ContextVar("llm_cache_regenerate", default=False)
+
+
+@contextmanager
+def regenerate_responses(enabled: bool = True) -> Iterator[None]:
+    """
+    Ignore cached responses for LLM calls made inside the block.
+
+    Fresh responses are still stored, so they replace the cached copies.
+    ``enabled=False`` leaves an enclosing block in effect.
+    """
+    if not enabled:
+        yield
+        return
+    token = _regenerate.set(True)
+    try:
+        yield
+    finally:
+        _regenerate.reset(token)
+
+
+def regenerating() -> bool:
+    """Whether the caller asked for fresh responses instead of cached ones."""
+    return _regenerate.get()
+
+
+def make_cache_key(params: Dict[str, Any]) -> str:
+    """
+    Hash request parameters into a stable cache key.
+
+    Args:
+        params: Keyword arguments sent to ``chat.completions.create``
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding
+    """
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (memory LRU + SQLite) response cache with TTL and size limits."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        db_path: Optional[str] = DEFAULT_DB_PATH,
+        max_disk_bytes: int = int(DEFAULT_MAX_DISK_MB * 1024 * 1024),
+        enabled: bool = DEFAULT_CACHE_ENABLED,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum responses kept in the memory tier
+            ttl_seconds: Lifetime of an entry in either tier (0 disables expiry)
+            db_path: SQLite file for the persistent tier (None/"" disables it)
+            max_disk_bytes: Total response bytes kept in the SQLite tier
+            enabled: Master switch; a disabled cache always misses
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path or None
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._metrics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "expired": 0,
+        }
+
+    def _expiry(self, now: float) -> float:
+        return now + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier on first use (caller holds the lock)."""
+        if self.db_path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        """Insert into the memory LRU (caller holds the lock)."""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._metrics["memory_evictions"] += 1
+
+    def record_bypass(self) -> None:
+        """Count a call that deliberately skipped the cache."""
+        with self._lock:
+            self._metrics["bypassed"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from ``make_cache_key``
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._metrics["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._metrics["expired"] += 1
+
+            db = self._connect()
+            if db is not None:
+                row = db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                        db.commit()
+                        self._remember(key, value, expires_at)
+                        self._metrics["disk_hits"] += 1
+                        return value
+                    db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    db.commit()
+                    self._metrics["expired"] += 1
+
+            self._metrics["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both tiers.
+
+        Args:
+            key: Key from ``make_cache_key``
+            value: Response text to cache
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = self._expiry(now)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._metrics["stores"] += 1
+            db = self._connect()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, size, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), expires_at, now),
+                )
+                self._evict_disk(db, now)
+                db.commit()
+
+    async def async_get(self, key: str) -> Optional[str]:
+        """``get`` for coroutines: the SQLite tier is read on a worker thread, off the event loop."""
+        if self.db_path is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def async_set(self, key: str, value: str) -> None:
+        """``set`` for coroutines: the SQLite write and commit run on a worker thread."""
+        if self.db_path is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def _evict_disk(self, db: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows, then least-recently-used rows over the byte budget."""
+        expired = db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        self._metrics["expired"] += max(expired, 0)
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+            self._metrics["disk_evictions"] += 1
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM llm_cache")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hit/miss counters and tier sizes."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            disk_entries = 0
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            memory_entries = len(self._memory)
+        hits = metrics["memory_hits"] + metrics["disk_hits"]
+        lookups = hits + metrics["misses"]
+        return {
+            "enabled": self.enabled,
+            "memory_entries": memory_entries,
+            "disk_entries": disk_entries,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            **metrics,
+        }
@@ -0,0 +1,127 @@
+"""
+Typed errors for the LLM layer.
+
+Provider SDK exceptions are mapped onto a small hierarchy so callers such as
+``ChapterGenerator`` can tell a transient failure (rate limit, timeout,
+5xx, open circuit) that is worth retrying later from a permanent one
+(bad request, auth, unparsable response) that is not.
+"""
+
+import sys
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional, Tuple
+
+# SDKs whose exceptions are classified; the Anthropic SDK mirrors OpenAI's hierarchy
+_SDKS = ("openai", "anthropic")
+
+
+def _sdk_errors(name: str) -> Tuple[type, ...]:
+    """
+    ``<sdk>.<name>`` for every SDK that is already imported.
+
+    An SDK can only have raised an exception once it is loaded, so this
+    never imports one (the SDKs are loaded on first client use).
+    """
+    return tuple(getattr(sys.modules[sdk], name) for sdk in _SDKS if sdk in sys.modules)
+
+
+class LLMError(Exception):
+    """Base class for LLM call failures."""
+    transient = False
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+    @property
+    def error_type(self) -> str:
+        """'transient' or 'permanent', as reported in API responses."""
+        return "transient" if self.transient else "permanent"
+
+
+class LLMTransientError(LLMError):
+    """Failure that may succeed if retried (5xx, connection reset, ...)."""
+    transient = True
+
+
+class LLMRateLimitError(LLMTransientError):
+    """Provider returned 429; ``retry_after`` holds its hint in seconds."""
+
+
+class LLMTimeoutError(LLMTransientError):
+    """The request timed out."""
+
+
+class LLMDeadlineExceededError(LLMTimeoutError):
+    """The per-call deadline expired before a successful attempt."""
+
+
+class LLMCircuitOpenError(LLMTransientError):
+    """The circuit breaker is open; the call was rejected without being sent."""
+
+
+class LLMPermanentError(LLMError):
+    """Failure that will not succeed on retry (4xx, malformed response, ...)."""
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """
+    Read a Retry-After hint (seconds) from response headers.
+
+    Args:
+        headers: Mapping of response headers (case-insensitive httpx headers)
+
+    Returns:
+        Seconds to wait, or None if no usable hint is present
+    """
+    if headers is None:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc: BaseException) -> LLMError:
+    """
+    Map an exception raised during an LLM call onto the typed hierarchy.
+
+    Args:
+        exc: Exception raised by the SDK or while reading the response
+
+    Returns:
+        The matching ``LLMError`` (``exc`` itself if it already is one)
+    """
+    if isinstance(exc, LLMError):
+        return exc
+    if isinstance(exc, _sdk_errors("APITimeoutError")):
+        return LLMTimeoutError(str(exc))
+    if isinstance(exc, _sdk_errors("APIConnectionError")):
+        return LLMTransientError(str(exc))
+    if isinstance(exc, _sdk_errors("APIStatusError")):
+        status = exc.status_code
+        retry_after = parse_retry_after(getattr(exc.response, "headers", None))
+        if status == 429:
+            return LLMRateLimitError(str(exc), retry_after=retry_after, status_code=status)
+        # 529 is Anthropic's "overloaded"; it is covered by the 5xx rule
+        if status >= 500 or status in (408, 409):
+            return LLMTransientError(str(exc), retry_after=retry_after, status_code=status)
+        return LLMPermanentError(str(exc), status_code=status)
+    if isinstance(exc, TimeoutError):
+        return LLMTimeoutError(str(exc) or "LLM call timed out")
+    return LLMPermanentError(f"{type(exc).__name__}: {exc}")
@@ -0,0 +1,81 @@
+"""
+Rolling latency metrics for LLM calls.
+
+Keeps a bounded window of recent samples per metric (e.g. total call time,
+streaming time-to-first-token) and reports percentiles from it.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+DEFAULT_WINDOW = 1000
+
+
+def _nearest_rank(ordered, q: float) -> float:
+    """Pick the ``q``-th percentile (0-100) from an already sorted list."""
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class LatencyRecorder:
+    """Thread-safe rolling window of latency samples per metric name."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        """
+        Initialize the recorder.
+
+        Args:
+            window: Number of most recent samples kept per metric
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, metric: str, seconds: float) -> None:
+        """Add one sample (in seconds) to ``metric``."""
+        with self._lock:
+            samples = self._samples.get(metric)
+            if samples is None:
+                samples = self._samples[metric] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[metric] = self._counts.get(metric, 0) + 1
+
+    def percentile(self, metric: str, q: float) -> Optional[float]:
+        """
+        Return the ``q``-th percentile (0-100) of recent samples.
+
+        Args:
+            metric: Metric name
+            q: Percentile between 0 and 100
+
+        Returns:
+            Percentile value in seconds, or None if there are no samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(metric, ()))
+        if not samples:
+            return None
+        return _nearest_rank(samples, q)
+
+    def count(self, metric: str) -> int:
+        """Total samples ever recorded for ``metric``."""
+        with self._lock:
+            return self._counts.get(metric, 0)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Report count, mean and p50/p95/p99 for every metric."""
+        with self._lock:
+            metrics = {name: list(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+        report = {}
+        for name, samples in metrics.items():
+            ordered = sorted(samples)
+            report[name] = {
+                "count": counts[name],
+                "mean": sum(ordered) / len(ordered),
+                "p50": _nearest_rank(ordered, 50),
+                "p95": _nearest_rank(ordered, 95),
+                "p99": _nearest_rank(ordered, 99),
+            }
+        return report
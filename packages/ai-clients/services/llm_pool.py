@@ -0,0 +1,367 @@
+"""
+Process-wide pooled HTTP clients for the LLM proxy.
+
+Building a fresh ``OpenAI`` instance per prompt forces a new TCP/TLS handshake
+against the HAL9 proxy on every call. ``LLMClientManager`` owns a single
+keep-alive connection pool that every caller (including the ``ChapterGenerator``
+thread pool) shares, and counts how often connections are actually reused.
+The asyncio path gets an ``AsyncOpenAI`` client per event loop, since async
+connections cannot be shared across loops.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# Pool sizing and timeouts (seconds), overridable via environment
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+DEFAULT_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+
+# httpcore trace event emitted only when a brand new connection is opened
+_NEW_CONNECTION_EVENT = "connection.connect_tcp.complete"
+
+
+class _PoolCounters:
+    """Thread-safe request/connection counters shared by the pooled transports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.new_connections = 0
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.requests_total += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            reused = max(self.requests_total - self.new_connections, 0)
+            return {
+                "requests_total": self.requests_total,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+            }
+
+
+def _chain_trace(existing: Optional[Callable], counters: _PoolCounters) -> Callable:
+    """Wrap an httpcore trace callback so new connections are counted."""
+    def trace(event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == _NEW_CONNECTION_EVENT:
+            counters.connection_opened()
+        if existing is not None:
+            existing(event_name, info)
+    return trace
+
+
+def _chain_async_trace(existing: Optional[Callable], counters: _PoolCounters) -> Callable:
+    """Async counterpart of ``_chain_trace`` for the asyncio transport."""
+    async def trace(event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == _NEW_CONNECTION_EVENT:
+            counters.connection_opened()
+        if existing is not None:
+            await existing(event_name, info)
+    return trace
+
+
+class _FinishOnce:
+    """Marks a request finished exactly once, whichever of error or body close comes first."""
+
+    def __init__(self, counters: _PoolCounters):
+        self._counters = counters
+        self._lock = threading.Lock()
+        self._done = False
+
+    def __call__(self) -> None:
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+        self._counters.request_finished()
+
+
+class _CountingStream(httpx.SyncByteStream):
+    """Response body that keeps its request in flight until the body is closed."""
+
+    def __init__(self, inner: httpx.SyncByteStream, finish: _FinishOnce):
+        self._inner = inner
+        self._finish = finish
+
+    def __iter__(self):
+        return iter(self._inner)
+
+    def close(self) -> None:
+        try:
+            self._inner.close()
+        finally:
+            self._finish()
+
+
+class _AsyncCountingStream(httpx.AsyncByteStream):
+    """Async version of ``_CountingStream``."""
+
+    def __init__(self, inner: httpx.AsyncByteStream, finish: _FinishOnce):
+        self._inner = inner
+        self._finish = finish
+
+    def __aiter__(self):
+        return self._inner.__aiter__()
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            self._finish()
+
+
+class _CountingTransport(httpx.BaseTransport):
+    """Transport wrapper that records pool usage from each request until its body is closed."""
+
+    def __init__(self, inner: httpx.BaseTransport, counters: _PoolCounters):
+        self._inner = inner
+        self._counters = counters
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _chain_trace(request.extensions.get("trace"), self._counters)
+        self._counters.request_started()
+        finish = _FinishOnce(self._counters)
+        try:
+            response = self._inner.handle_request(request)
+        except BaseException:
+            finish()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            # The body is already in memory, so nothing is left on the connection
+            finish()
+        else:
+            # Streamed chapters stay in flight while their body is read
+            response.stream = _CountingStream(response.stream, finish)
+        return response
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class _AsyncCountingTransport(httpx.AsyncBaseTransport):
+    """Async transport wrapper that records pool usage from each request until its body is closed."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, counters: _PoolCounters):
+        self._inner = inner
+        self._counters = counters
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _chain_async_trace(request.extensions.get("trace"), self._counters)
+        self._counters.request_started()
+        finish = _FinishOnce(self._counters)
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            finish()
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            finish()
+        else:
+            response.stream = _AsyncCountingStream(response.stream, finish)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class LLMClientManager:
+    """Lazily builds and shares pooled OpenAI clients (one sync, one async per loop)."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        """
+        Initialize the client manager.
+
+        Args:
+            base_url: OpenAI-compatible base URL (HAL9 proxy by default)
+            api_key: API key sent with every request
+            max_connections: Maximum simultaneous connections in the pool
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection stays in the pool
+            timeout: Overall read/write timeout per request in seconds
+            connect_timeout: Timeout for establishing a new connection
+            transport: Optional transport override (used by tests); an
+                ``httpx.MockTransport`` serves both the sync and async paths
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._transport_override = transport
+        self._counters = _PoolCounters()
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._openai_client: Optional["OpenAI"] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.clients_created = 0
+
+    def _build_http_client(self) -> httpx.Client:
+        inner = self._transport_override or httpx.HTTPTransport(limits=self.limits)
+        return httpx.Client(
+            transport=_CountingTransport(inner, self._counters),
+            timeout=self.timeout,
+        )
+
+    def _build_async_http_client(self) -> httpx.AsyncClient:
+        inner = self._transport_override
+        if not isinstance(inner, httpx.AsyncBaseTransport):
+            inner = httpx.AsyncHTTPTransport(limits=self.limits)
+        return httpx.AsyncClient(
+            transport=_AsyncCountingTransport(inner, self._counters),
+            timeout=self.timeout,
+        )
+
+    def get_openai_client(self) -> "OpenAI":
+        """Return the shared OpenAI client, creating it on first use."""
+        client = self._openai_client
+        if client is not None:
+            return client
+        # Imported here: the SDK is slow to import and not needed to start the app
+        from openai import OpenAI
+
+        with self._lock:
+            if self._openai_client is None:
+                self._http_client = self._build_http_client()
+                self._openai_client = OpenAI(
+                    base_url=self.base_url,
+                    api_key=self.api_key,
+                    http_client=self._http_client,
+                    timeout=self.timeout,
+                    max_retries=0,  # retries are owned by services.resilience
+                )
+                self.clients_created += 1
+            return self._openai_client
+
+    def get_async_openai_client(self) -> "AsyncOpenAI":
+        """Return the AsyncOpenAI client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                from openai import AsyncOpenAI
+
+                client = AsyncOpenAI(
+                    base_url=self.base_url,
+                    api_key=self.api_key,
+                    http_client=self._build_async_http_client(),
+                    timeout=self.timeout,
+                    max_retries=0,  # retries are owned by services.resilience
+                )
+                self._async_clients[loop] = client
+                self.clients_created += 1
+            return client
+
+    def warm(self, connections: int = 1) -> int:
+        """
+        Build the OpenAI client and open pooled connections ahead of traffic.
+
+        Sends ``connections`` concurrent ``GET models`` requests (no tokens are
+        spent). Any HTTP answer counts, since the connection is kept alive
+        either way; connection failures propagate.
+
+        Args:
+            connections: Connections to open (capped by the pool size)
+
+        Returns:
+            Requests answered
+        """
+        from openai import APIStatusError
+
+        client = self.get_openai_client()
+
+        def probe(_) -> None:
+            try:
+                client.get("models", cast_to=httpx.Response)
+            except APIStatusError:
+                pass
+
+        count = max(1, min(connections, self.limits.max_connections or connections))
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            list(executor.map(probe, range(count)))
+        return count
+
+    async def async_warm(self, connections: int = 1) -> int:
+        """Async counterpart of ``warm`` for the running event loop's client."""
+        from openai import APIStatusError
+
+        client = self.get_async_openai_client()
+
+        async def probe() -> None:
+            try:
+                await client.get("models", cast_to=httpx.Response)
+            except APIStatusError:
+                pass
+
+        count = max(1, min(connections, self.limits.max_connections or connections))
+        await asyncio.gather(*(probe() for _ in range(count)))
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Report pool configuration, utilisation and connection reuse."""
+        counters = self._counters.snapshot()
+        max_connections = self.limits.max_connections
+        requests_total = counters["requests_total"]
+        return {
+            "max_connections": max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "clients_created": self.clients_created,
+            "async_clients": len(self._async_clients),
+            "pool_utilization": counters["in_flight"] / max_connections if max_connections else 0.0,
+            "connection_reuse_ratio": (
+                counters["reused_connections"] / requests_total if requests_total else 0.0
+            ),
+            **counters,
+        }
+
+    def close(self) -> None:
+        """Close pooled connections; the next call rebuilds the client."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._openai_client = None
+            # Async clients are closed with their event loop; just forget them
+            self._async_clients.clear()
@@ -0,0 +1,597 @@
+"""
+LLM provider abstraction with weighted load spreading and failover.
+
+``call_llm`` talks to a ``ProviderPool`` rather than to one SDK. The pool
+spreads calls across providers by weight and, within a single attempt,
+fails over to the next provider when the chosen one is saturated (too many
+calls in flight), erroring (its own circuit breaker is open or it returned
+a transient error) or slow (no answer within its failover threshold). The
+attempt's time budget is shared by every provider tried, so failover
+stays inside the caller's deadline.
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .llm_errors import LLMDeadlineExceededError, LLMError, classify_error
+from .llm_metrics import LatencyRecorder
+from .resilience import CircuitBreaker
+from .usage_ledger import Usage
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# The SDK itself is imported when the first Anthropic client is built
+ANTHROPIC_AVAILABLE = importlib.util.find_spec("anthropic") is not None
+
+DEFAULT_PROVIDERS = os.getenv("LLM_PROVIDERS", "openai")
+DEFAULT_FAILOVER_AFTER = float(os.getenv("LLM_FAILOVER_AFTER_SECONDS", "0")) or None
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("LLM_PROVIDER_MAX_IN_FLIGHT", "0"))
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-5")
+ANTHROPIC_MAX_TOKENS = int(os.getenv("ANTHROPIC_MAX_TOKENS", "8192"))
+CLAUDE_PREFIX = "claude-"
+
+# A stream yields (text delta, usage) pairs; usage is set on the final item only
+StreamItem = Tuple[str, Optional[Any]]
+
+
+@dataclass
+class Completion:
+    """Provider-neutral result of one chat completion."""
+    content: str
+    model: str
+    usage: Any = None
+
+
+class LLMProvider:
+    """Interface every provider implements; ``params`` are OpenAI chat parameters."""
+
+    name = "provider"
+
+    def model_for(self, params: Dict[str, Any]) -> str:
+        """Model this provider will actually use for ``params``."""
+        return params["model"]
+
+    def serves(self, model: str) -> bool:
+        """Whether the provider sends ``model`` as asked (rather than failing or substituting another)."""
+        return True
+
+    def complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        raise NotImplementedError
+
+    async def async_complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        raise NotImplementedError
+
+    def open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> Iterator[StreamItem]:
+        raise NotImplementedError
+
+    async def async_open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> AsyncIterator[StreamItem]:
+        raise NotImplementedError
+
+
+def _timeout_kwargs(timeout: Optional[float]) -> Dict[str, Any]:
+    """Per-attempt request timeout derived from the call deadline."""
+    return {"timeout": timeout} if timeout is not None else {}
+
+
+# Ask for a final chunk carrying token usage
+_OPENAI_STREAM_KWARGS = {"stream": True, "stream_options": {"include_usage": True}}
+
+
+def _openai_chunk(chunk: Any) -> StreamItem:
+    text = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+    return text, chunk.usage
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI-compatible provider (the HAL9 proxy) using the pooled clients."""
+
+    name = "openai"
+
+    def __init__(self, client: Callable[[], "OpenAI"], async_client: Callable[[], "AsyncOpenAI"]):
+        """
+        Initialize the provider.
+
+        Args:
+            client: Returns the shared sync client (looked up per call)
+            async_client: Returns the AsyncOpenAI client for the running loop
+        """
+        self._client = client
+        self._async_client = async_client
+
+    def serves(self, model: str) -> bool:
+        # The OpenAI-compatible proxy rejects Claude models
+        return not model.startswith(CLAUDE_PREFIX)
+
+    def complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        resp = self._client().chat.completions.create(stream=False, **params, **_timeout_kwargs(timeout))
+        return Completion(resp.choices[0].message.content, params["model"], resp.usage)
+
+    async def async_complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        resp = await self._async_client().chat.completions.create(
+            stream=False, **params, **_timeout_kwargs(timeout)
+        )
+        return Completion(resp.choices[0].message.content, params["model"], resp.usage)
+
+    def open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> Iterator[StreamItem]:
+        stream = self._client().chat.completions.create(
+            **_OPENAI_STREAM_KWARGS, **params, **_timeout_kwargs(timeout)
+        )
+        return (_openai_chunk(chunk) for chunk in stream)
+
+    async def async_open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> AsyncIterator[StreamItem]:
+        stream = await self._async_client().chat.completions.create(
+            **_OPENAI_STREAM_KWARGS, **params, **_timeout_kwargs(timeout)
+        )
+
+        async def items() -> AsyncIterator[StreamItem]:
+            async for chunk in stream:
+                yield _openai_chunk(chunk)
+
+        return items()
+
+
+def parse_model_map(spec: str) -> Dict[str, str]:
+    """Parse ``ANTHROPIC_MODEL_MAP`` (e.g. ``"gpt-4o=claude-sonnet-4-5,gpt-4o-mini=claude-haiku-4-5"``)."""
+    pairs = (entry.split("=", 1) for entry in spec.split(",") if "=" in entry)
+    return {source.strip(): target.strip() for source, target in pairs}
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic Messages API provider; OpenAI model names are mapped to Claude models."""
+
+    name = "anthropic"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 model_map: Optional[Dict[str, str]] = None, default_model: str = ANTHROPIC_MODEL,
+                 max_tokens: int = ANTHROPIC_MAX_TOKENS):
+        """
+        Initialize the provider.
+
+        Args:
+            api_key: Anthropic API key (defaults to ``ANTHROPIC_API_KEY``)
+            base_url: Optional API base URL (defaults to ``ANTHROPIC_BASE_URL``)
+            model_map: OpenAI model name → Claude model (defaults to ``ANTHROPIC_MODEL_MAP``)
+            default_model: Claude model for unmapped OpenAI models
+            max_tokens: Completion limit when the request does not set one
+        """
+        if not ANTHROPIC_AVAILABLE:
+            raise ImportError("Anthropic package not installed. Run: pip install anthropic")
+        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        if not self.api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+        self.base_url = base_url or os.getenv("ANTHROPIC_BASE_URL") or None
+        self.model_map = model_map if model_map is not None else parse_model_map(os.getenv("ANTHROPIC_MODEL_MAP", ""))
+        self.default_model = default_model
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def model_for(self, params: Dict[str, Any]) -> str:
+        model = params["model"]
+        if model in self.model_map:
+            return self.model_map[model]
+        # Claude models are sent as named; unmapped OpenAI models fall back to the default
+        return model if model.startswith(CLAUDE_PREFIX) else self.default_model
+
+    def serves(self, model: str) -> bool:
+        return model in self.model_map or model.startswith(CLAUDE_PREFIX)
+
+    def _get_client(self):
+        import anthropic
+
+        with self._lock:
+            if self._client is None:
+                self._client = anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            return self._client
+
+    def _get_async_client(self):
+        import anthropic
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = anthropic.AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+                self._async_clients[loop] = client
+            return client
+
+    def _request(self, params: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        """Translate OpenAI chat parameters into a Messages API request."""
+        system = [m["content"] for m in params["messages"] if m["role"] == "system"]
+        request = {
+            "model": self.model_for(params),
+            "messages": [m for m in params["messages"] if m["role"] != "system"],
+            "max_tokens": params.get("max_tokens") or params.get("max_completion_tokens") or self.max_tokens,
+            **{key: params[key] for key in ("temperature", "top_p") if key in params},
+            **_timeout_kwargs(timeout),
+        }
+        if system:
+            request["system"] = "\n\n".join(system)
+        if params.get("stop"):
+            stop = params["stop"]
+            request["stop_sequences"] = [stop] if isinstance(stop, str) else list(stop)
+        return request
+
+    @staticmethod
+    def _usage(usage: Any, completion_tokens: Optional[int] = None) -> Usage:
+        # Anthropic reports cached reads separately from input_tokens
+        cached = getattr(usage, "cache_read_input_tokens", None) or 0
+        return Usage(
+            model="",
+            prompt_tokens=(usage.input_tokens or 0) + cached,
+            completion_tokens=completion_tokens if completion_tokens is not None else usage.output_tokens or 0,
+            cached_tokens=cached,
+        )
+
+    def _completion(self, resp: Any) -> Completion:
+        text = "".join(block.text for block in resp.content if block.type == "text")
+        return Completion(text, resp.model, self._usage(resp.usage))
+
+    def complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        return self._completion(self._get_client().messages.create(**self._request(params, timeout)))
+
+    async def async_complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        return self._completion(await self._get_async_client().messages.create(**self._request(params, timeout)))
+
+    def _stream_item(self, event: Any, state: Dict[str, Any]) -> Optional[StreamItem]:
+        if event.type == "message_start":
+            state["usage"] = event.message.usage
+        elif event.type == "content_block_delta" and getattr(event.delta, "type", "") == "text_delta":
+            return event.delta.text, None
+        elif event.type == "message_delta" and state.get("usage") is not None:
+            return "", self._usage(state["usage"], event.usage.output_tokens)
+        return None
+
+    def open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> Iterator[StreamItem]:
+        stream = self._get_client().messages.create(stream=True, **self._request(params, timeout))
+
+        def items() -> Iterator[StreamItem]:
+            state: Dict[str, Any] = {}
+            for event in stream:
+                item = self._stream_item(event, state)
+                if item is not None:
+                    yield item
+
+        return items()
+
+    async def async_open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> AsyncIterator[StreamItem]:
+        stream = await self._get_async_client().messages.create(stream=True, **self._request(params, timeout))
+
+        async def items() -> AsyncIterator[StreamItem]:
+            state: Dict[str, Any] = {}
+            async for event in stream:
+                item = self._stream_item(event, state)
+                if item is not None:
+                    yield item
+
+        return items()
+
+
+class _Member:
+    """A provider in the pool with its weight, breaker and counters."""
+
+    def __init__(self, provider: LLMProvider, weight: float, failover_after: Optional[float],
+                 max_in_flight: int, breaker: CircuitBreaker):
+        self.provider = provider
+        self.weight = weight
+        self.failover_after = failover_after
+        self.max_in_flight = max_in_flight
+        self.breaker = breaker
+        self.in_flight = 0
+        self.metrics = {"calls": 0, "successes": 0, "failures": 0, "failovers_from": 0, "saturated_skips": 0}
+
+    @property
+    def saturated(self) -> bool:
+        return 0 < self.max_in_flight <= self.in_flight
+
+
+class ProviderPool:
+    """Spreads calls across providers by weight and fails over within the attempt budget."""
+
+    def __init__(self, providers: List[Tuple[LLMProvider, float]],
+                 failover_after: Optional[float] = DEFAULT_FAILOVER_AFTER,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 breaker: Callable[[], CircuitBreaker] = CircuitBreaker,
+                 before_send: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 async_before_send: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            providers: ``(provider, weight)`` pairs; weight 0 makes a provider
+                failover-only
+            failover_after: Seconds to wait on a provider before moving on
+                when another provider is left to try (None waits the full budget)
+            max_in_flight: Calls in flight at which a provider counts as
+                saturated and is tried last (0 for no cap)
+            breaker: Factory for each provider's own circuit breaker
+            before_send: Called with the provider's model and the params
+                before every send (rate limiting)
+            async_before_send: Async counterpart of ``before_send``
+        """
+        if not providers:
+            raise ValueError("ProviderPool needs at least one provider")
+        self._members = [
+            _Member(provider, weight, failover_after, max_in_flight, breaker())
+            for provider, weight in providers
+        ]
+        self._before_send = before_send
+        self._async_before_send = async_before_send
+        self._lock = threading.Lock()
+        self._latency = LatencyRecorder()
+        self.failovers = 0
+
+    @property
+    def providers(self) -> List[LLMProvider]:
+        return [member.provider for member in self._members]
+
+    def serves(self, model: str) -> bool:
+        """Whether some provider in the pool sends ``model`` as asked."""
+        return any(member.provider.serves(model) for member in self._members)
+
+    def _order(self) -> List[_Member]:
+        """Weighted pick for the first provider; healthy, unsaturated providers before the rest."""
+        with self._lock:
+            members = list(self._members)
+            healthy = [m for m in members if m.breaker.state != CircuitBreaker.OPEN and not m.saturated]
+            for member in members:
+                if member.saturated:
+                    member.metrics["saturated_skips"] += 1
+        weighted = [m for m in healthy if m.weight > 0]
+        first = random.choices(weighted, weights=[m.weight for m in weighted])[0] if weighted else None
+        rest = sorted((m for m in members if m is not first), key=lambda m: (m not in healthy, -m.weight))
+        return ([first] if first else []) + rest
+
+    def _budget(self, member: _Member, expires_at: Optional[float], last: bool) -> Optional[float]:
+        """Time this provider may use: the remaining budget, capped by its failover threshold."""
+        remaining = None if expires_at is None else expires_at - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise LLMDeadlineExceededError("LLM attempt budget exhausted during provider failover")
+        if last or member.failover_after is None:
+            return remaining
+        return member.failover_after if remaining is None else min(remaining, member.failover_after)
+
+    def _succeed(self, member: _Member, started: float) -> None:
+        member.breaker.record_success()
+        self._latency.record(member.provider.name, time.monotonic() - started)
+        with self._lock:
+            member.in_flight -= 1
+            member.metrics["successes"] += 1
+
+    def _fail(self, member: _Member, exc: Exception, last: bool) -> LLMError:
+        """Record a failed send; raise permanent errors, return transient ones to fail over."""
+        error = classify_error(exc)
+        with self._lock:
+            member.in_flight -= 1
+            member.metrics["failures"] += 1
+            if error.transient and not last:
+                member.metrics["failovers_from"] += 1
+                self.failovers += 1
+        if not error.transient:
+            # The provider answered, so this says nothing about its health
+            member.breaker.record_success()
+            raise error from exc
+        member.breaker.record_failure()
+        return error
+
+    def _abandon(self, member: _Member) -> None:
+        """The caller stopped reading a stream early; it neither succeeded nor failed."""
+        with self._lock:
+            member.in_flight -= 1
+
+    def _watch(self, member: _Member, started: float, items: Iterator[StreamItem]) -> Iterator[StreamItem]:
+        """Keep a stream in flight until it is fully read, then record its outcome and latency."""
+        try:
+            for item in items:
+                yield item
+        except GeneratorExit:
+            self._abandon(member)
+            getattr(items, "close", lambda: None)()
+            raise
+        except Exception as exc:
+            raise self._fail(member, exc, last=True) from exc
+        self._succeed(member, started)
+
+    async def _async_watch(self, member: _Member, started: float,
+                           items: AsyncIterator[StreamItem]) -> AsyncIterator[StreamItem]:
+        """Async version of ``_watch``."""
+        try:
+            async for item in items:
+                yield item
+        except GeneratorExit:
+            self._abandon(member)
+            aclose = getattr(items, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            raise
+        except Exception as exc:
+            raise self._fail(member, exc, last=True) from exc
+        self._succeed(member, started)
+
+    def _run(self, params: Dict[str, Any], timeout: Optional[float],
+             send: Callable[[_Member, Optional[float]], Any], stream: bool = False) -> Any:
+        """
+        Try providers in order until one succeeds.
+
+        Rate limiting (``before_send``) happens before a provider's clock
+        starts, so a limiter wait neither counts as provider latency nor
+        trips the failover threshold. A stream stays in flight until its
+        items have been read.
+        """
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        order = self._order()
+        last_error: Optional[LLMError] = None
+        for index, member in enumerate(order):
+            last = index == len(order) - 1
+            self._budget(member, expires_at, last)  # fail fast rather than wait on the limiter
+            model = self._prepare(member, params)
+            budget = self._budget(member, expires_at, last)
+            try:
+                member.breaker.before_call()
+            except LLMError as e:
+                last_error = e
+                continue
+            with self._lock:
+                member.in_flight += 1
+                member.metrics["calls"] += 1
+            started = time.monotonic()
+            try:
+                result = send(member, budget)
+            except Exception as exc:
+                last_error = self._fail(member, exc, last)
+                continue
+            if stream:
+                return model, self._watch(member, started, result)
+            self._succeed(member, started)
+            return result
+        raise last_error
+
+    async def _async_run(self, params: Dict[str, Any], timeout: Optional[float],
+                         send: Callable[[_Member, Optional[float]], Awaitable[Any]], stream: bool = False) -> Any:
+        """Async version of ``_run``."""
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        order = self._order()
+        last_error: Optional[LLMError] = None
+        for index, member in enumerate(order):
+            last = index == len(order) - 1
+            self._budget(member, expires_at, last)
+            model = await self._async_prepare(member, params)
+            budget = self._budget(member, expires_at, last)
+            try:
+                member.breaker.before_call()
+            except LLMError as e:
+                last_error = e
+                continue
+            with self._lock:
+                member.in_flight += 1
+                member.metrics["calls"] += 1
+            started = time.monotonic()
+            try:
+                if budget is not None and not last:
+                    # Enforce the failover threshold even if the SDK ignores its timeout
+                    result = await asyncio.wait_for(send(member, budget), budget)
+                else:
+                    result = await send(member, budget)
+            except Exception as exc:
+                last_error = self._fail(member, exc, last)
+                continue
+            if stream:
+                return model, self._async_watch(member, started, result)
+            self._succeed(member, started)
+            return result
+        raise last_error
+
+    def _prepare(self, member: _Member, params: Dict[str, Any]) -> str:
+        model = member.provider.model_for(params)
+        if self._before_send is not None:
+            self._before_send(model, params)
+        return model
+
+    async def _async_prepare(self, member: _Member, params: Dict[str, Any]) -> str:
+        model = member.provider.model_for(params)
+        if self._async_before_send is not None:
+            await self._async_before_send(model, params)
+        return model
+
+    def complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        """
+        Send one chat completion, failing over between providers.
+
+        Args:
+            params: OpenAI-style chat parameters
+            timeout: Time budget shared by every provider tried (None for unbounded)
+
+        Returns:
+            The first successful provider's completion
+
+        Raises:
+            LLMError: Permanent error from a provider, or the last transient one
+        """
+        return self._run(params, timeout, lambda member, budget: member.provider.complete(params, budget))
+
+    async def async_complete(self, params: Dict[str, Any], timeout: Optional[float]) -> Completion:
+        """Async version of ``complete``."""
+        return await self._async_run(
+            params, timeout, lambda member, budget: member.provider.async_complete(params, budget)
+        )
+
+    def open_stream(self, params: Dict[str, Any], timeout: Optional[float]) -> Tuple[str, Iterator[StreamItem]]:
+        """
+        Open a stream, failing over between providers until one accepts it.
+
+        Returns:
+            The serving provider's model and its ``(text, usage)`` items
+        """
+        return self._run(params, timeout, lambda member, budget: member.provider.open_stream(params, budget),
+                         stream=True)
+
+    async def async_open_stream(self, params: Dict[str, Any],
+                                timeout: Optional[float]) -> Tuple[str, AsyncIterator[StreamItem]]:
+        """Async version of ``open_stream``."""
+        return await self._async_run(
+            params, timeout, lambda member, budget: member.provider.async_open_stream(params, budget), stream=True
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Report per-provider weights, health, load and latency plus total failovers."""
+        latency = self._latency.stats()
+        with self._lock:
+            providers = {
+                member.provider.name: {
+                    "weight": member.weight,
+                    "in_flight": member.in_flight,
+                    **member.metrics,
+                    "circuit": member.breaker.stats()["state"],
+                    "latency_p50": latency.get(member.provider.name, {}).get("p50"),
+                    "latency_p95": latency.get(member.provider.name, {}).get("p95"),
+                }
+                for member in self._members
+            }
+            return {"failovers": self.failovers, "providers": providers}
+
+
+def parse_providers(spec: str) -> List[Tuple[str, float]]:
+    """
+    Parse ``LLM_PROVIDERS`` (e.g. ``"openai:3,anthropic:1"``; weight defaults to 1).
+
+    Args:
+        spec: Comma-separated ``name[:weight]`` entries, primary first
+
+    Returns:
+        ``(name, weight)`` pairs
+    """
+    providers = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = entry.partition(":")
+        providers.append((name.strip(), float(weight) if weight else 1.0))
+    return providers
+
+
+def build_provider_pool(openai_provider: LLMProvider, spec: str = DEFAULT_PROVIDERS, **kwargs: Any) -> ProviderPool:
+    """
+    Build the pool described by ``LLM_PROVIDERS``.
+
+    Args:
+        openai_provider: Provider used for the ``openai`` entry
+        spec: Provider list (see ``parse_providers``)
+        **kwargs: Passed to ``ProviderPool``
+
+    Returns:
+        The configured pool
+    """
+    factories = {"openai": lambda: openai_provider, "anthropic": AnthropicProvider}
+    providers = []
+    for name, weight in parse_providers(spec):
+        if name not in factories:
+            raise ValueError(f"Unknown LLM provider {name!r}; expected one of {sorted(factories)}")
+        providers.append((factories[name](), weight))
+    return ProviderPool(providers, **kwargs)
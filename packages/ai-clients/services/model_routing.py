@@ -0,0 +1,176 @@
+"""
+Per-stage model routing for LLM calls.
+
+Each call site names its stage (``toc``, ``chapter``, ``cover_blurb``,
+``cover_illustration_prompt``, ``section_draft``) and the router maps it to
+a model and extra sampling parameters. Routes come from ``LLM_ROUTES`` and
+can be overridden per request with ``route_overrides``, so latency-
+insensitive stages can run on cheaper, faster models than chapters.
+"""
+
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Mapping, Optional, get_args
+
+from models.request_models import OVERRIDABLE_PARAMS, ModelStage, check_override_model
+
+STAGES = get_args(ModelStage)
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+# Set by the LLM layer itself; a route may not change them
+RESERVED_PARAMS = frozenset({"model", "messages", "stream", "stream_options"})
+
+
+@dataclass
+class StageRoute:
+    """Model and extra ``chat.completions`` parameters for one stage."""
+    model: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def _check_params(params: Mapping[str, Any]) -> Dict[str, Any]:
+    reserved = RESERVED_PARAMS.intersection(params)
+    if reserved:
+        raise ValueError(f"Route parameters may not set {sorted(reserved)}")
+    return dict(params)
+
+
+def _check_stage(stage: str) -> str:
+    if stage not in STAGES:
+        raise ValueError(f"Unknown LLM stage {stage!r}; expected one of {list(STAGES)}")
+    return stage
+
+
+def parse_routes(spec: str, default_model: str = DEFAULT_MODEL) -> Dict[str, StageRoute]:
+    """
+    Parse ``LLM_ROUTES``.
+
+    Accepts a JSON object mapping stage to either a model name or
+    ``{"model": ..., "params": {...}}``, e.g.
+    ``{"toc": "gpt-4o-mini", "chapter": {"model": "gpt-4o", "params": {"temperature": 0.8}}}``.
+
+    Args:
+        spec: JSON text (empty for no routes)
+        default_model: Model used when an entry only sets params
+
+    Returns:
+        Mapping of stage to its route
+    """
+    if not spec.strip():
+        return {}
+    routes = {}
+    for stage, entry in json.loads(spec).items():
+        if isinstance(entry, str):
+            entry = {"model": entry}
+        routes[_check_stage(stage)] = StageRoute(
+            model=entry.get("model") or default_model,
+            params=_check_params(entry.get("params", {})),
+        )
+    return routes
+
+
+_overrides: contextvars.ContextVar[Dict[str, Dict[str, Any]]] = contextvars.ContextVar(
+    "llm_route_overrides", default={}
+)
+
+
+def _check_override(model: Optional[str], params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Requests may only pick allowlisted models the providers serve, and sampling parameters."""
+    if model is not None:
+        check_override_model(model)
+    unknown = set(params) - OVERRIDABLE_PARAMS
+    if unknown:
+        raise ValueError(f"Route overrides may not set {sorted(unknown)}")
+    return {"model": model, "params": dict(params)}
+
+
+def _as_dict(route: Any) -> Dict[str, Any]:
+    """Accept a ``ModelRoute`` model, a dict or a bare model name."""
+    if isinstance(route, str):
+        return _check_override(route, {})
+    if hasattr(route, "model_dump"):
+        route = route.model_dump()
+    return _check_override(route.get("model"), route.get("params") or {})
+
+
+@contextmanager
+def route_overrides(routes: Optional[Mapping[str, Any]]) -> Iterator[None]:
+    """
+    Override stage routes for LLM calls made inside the block.
+
+    Overrides nest (inner stages win) and follow the same context rules as
+    ``usage_scope``. ``None`` leaves the current routes untouched.
+
+    Args:
+        routes: Mapping of stage to ``ModelRoute``, dict or model name
+
+    Raises:
+        ValueError: For a model outside ``LLM_ALLOWED_MODELS`` or not served by
+            the provider pool, or a parameter outside ``OVERRIDABLE_PARAMS``
+    """
+    if not routes:
+        yield
+        return
+    previous = _overrides.get()
+    merged = dict(previous)
+    for stage, route in routes.items():
+        merged[_check_stage(stage)] = _as_dict(route)
+    _overrides.set(merged)
+    try:
+        yield
+    finally:
+        _overrides.set(previous)
+
+
+class ModelRouter:
+    """Resolves a stage to the model and parameters its calls should use."""
+
+    def __init__(self, routes: Optional[Dict[str, StageRoute]] = None, default_model: str = DEFAULT_MODEL):
+        """
+        Initialize the router.
+
+        Args:
+            routes: Per-stage routes (defaults to ``LLM_ROUTES``)
+            default_model: Model for stages without a route (defaults to ``LLM_MODEL``)
+        """
+        self.default_model = default_model
+        self.routes = routes if routes is not None else parse_routes(os.getenv("LLM_ROUTES", ""), default_model)
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, int]] = {}
+
+    def resolve(self, stage: Optional[str] = None) -> StageRoute:
+        """
+        Route for ``stage`` after applying any request overrides.
+
+        Args:
+            stage: Call site name, or None for the default model
+
+        Returns:
+            The model and parameters to send
+        """
+        if stage is None:
+            route = StageRoute(self.default_model)
+        else:
+            base = self.routes.get(_check_stage(stage)) or StageRoute(self.default_model)
+            override = _overrides.get().get(stage)
+            route = StageRoute(
+                model=(override and override["model"]) or base.model,
+                params={**base.params, **(override["params"] if override else {})},
+            )
+        with self._lock:
+            by_model = self._calls.setdefault(stage or "default", {})
+            by_model[route.model] = by_model.get(route.model, 0) + 1
+        return route
+
+    def stats(self) -> Dict[str, Any]:
+        """Report the configured routes and how many calls each stage sent to each model."""
+        with self._lock:
+            calls = {stage: dict(models) for stage, models in self._calls.items()}
+        return {
+            "default_model": self.default_model,
+            "routes": {stage: {"model": route.model, "params": route.params} for stage, route in self.routes.items()},
+            "calls": calls,
+        }
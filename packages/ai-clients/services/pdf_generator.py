@@ -2,6 +2,7 @@
 PDF generation service using WeasyPrint.
 """
 
+import threading
 from io import BytesIO
 from typing import List
 import pypandoc
@@ -9,11 +10,21 @@ from weasyprint import HTML
 from bs4 import BeautifulSoup
 from models.section_model import Section
 
-# Ensure Pandoc is installed for markdown → HTML conversion
-try:
-    pypandoc.get_pandoc_version()
-except OSError:
-    pypandoc.download_pandoc()
+_pandoc_checked = False
+_pandoc_lock = threading.Lock()
+
+
+def ensure_pandoc() -> None:
+    """Ensure Pandoc is installed for markdown → HTML conversion (downloaded on first use if missing)."""
+    global _pandoc_checked
+    with _pandoc_lock:
+        if _pandoc_checked:
+            return
+        try:
+            pypandoc.get_pandoc_version()
+        except OSError:
+            pypandoc.download_pandoc()
+        _pandoc_checked = True
 
 
 class PDFGenerator:
@@ -22,6 +33,7 @@ class PDFGenerator:
     @staticmethod
     def markdown_to_html(md: str) -> str:
         """Convert markdown to HTML."""
+        ensure_pandoc()
         return pypandoc.convert_text(md, 'html', format='md')
     
     @staticmethod
@@ -0,0 +1,185 @@
+"""
+Process-wide client-side rate limiting for LLM calls.
+
+Every upstream request first reserves capacity from two token buckets for
+its model: one for requests per minute and one for estimated tokens per
+minute. Because the buckets are shared by every thread, event loop and
+concurrent book request, the service stays under the provider's RPM/TPM
+limits instead of discovering them through waves of 429s. Unless
+``LLM_RATE_LIMITS`` or ``LLM_DEFAULT_RPM/TPM`` configure a limit, the
+buckets are pass-through: the provider's limits depend on the account.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .llm_metrics import LatencyRecorder
+
+DEFAULT_RPM = float(os.getenv("LLM_DEFAULT_RPM", "0"))
+DEFAULT_TPM = float(os.getenv("LLM_DEFAULT_TPM", "0"))
+# Completion tokens assumed per call without max_tokens when reserving TPM (chapters are long)
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "1500"))
+
+
+def estimate_tokens(prompt: str, completion_tokens: int = EXPECTED_COMPLETION_TOKENS) -> int:
+    """
+    Rough token estimate for a call: ~4 characters per prompt token plus
+    the expected completion size.
+
+    Args:
+        prompt: Prompt text
+        completion_tokens: Expected completion tokens
+
+    Returns:
+        Estimated total tokens
+    """
+    return len(prompt) // 4 + completion_tokens
+
+
+@dataclass
+class ModelLimits:
+    """Per-minute limits for one model; 0 disables that limit."""
+    rpm: float = DEFAULT_RPM
+    tpm: float = DEFAULT_TPM
+
+
+def parse_limits(spec: str) -> Dict[str, ModelLimits]:
+    """
+    Parse ``LLM_RATE_LIMITS`` (e.g. ``"gpt-4o=500:30000,gpt-4o-mini=500:200000"``).
+
+    Args:
+        spec: Comma-separated ``model=rpm:tpm`` entries
+
+    Returns:
+        Mapping of model name to its limits
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = entry.partition("=")
+        rpm, _, tpm = values.partition(":")
+        limits[model.strip()] = ModelLimits(
+            rpm=float(rpm) if rpm else DEFAULT_RPM,
+            tpm=float(tpm) if tpm else DEFAULT_TPM,
+        )
+    return limits
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take ``amount`` tokens (possibly going into debt) and return the wait.
+
+        Reservations queue fairly: a caller that goes into debt makes later
+        callers wait until the debt has been refilled.
+        """
+        amount = min(amount, self.capacity)
+        elapsed = max(now - self.updated, 0.0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = max(now, self.updated)
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Shared RPM/TPM limiter keyed by model."""
+
+    def __init__(self, limits: Optional[Dict[str, ModelLimits]] = None,
+                 default: Optional[ModelLimits] = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            limits: Per-model limits (defaults to ``LLM_RATE_LIMITS``)
+            default: Limits for models not listed (defaults to ``LLM_DEFAULT_RPM/TPM``)
+        """
+        self.limits = limits if limits is not None else parse_limits(os.getenv("LLM_RATE_LIMITS", ""))
+        self.default = default or ModelLimits()
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._waits = LatencyRecorder()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def _model_buckets(self, model: str) -> Dict[str, TokenBucket]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            limits = self.limits.get(model, self.default)
+            buckets = {}
+            if limits.rpm > 0:
+                buckets["requests"] = TokenBucket(limits.rpm)
+            if limits.tpm > 0:
+                buckets["tokens"] = TokenBucket(limits.tpm)
+            self._buckets[model] = buckets
+        return buckets
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """
+        Reserve one request and ``tokens`` tokens for ``model``.
+
+        Args:
+            model: Model the request is sent to
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Seconds the caller must wait before sending
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._model_buckets(model)
+            wait = 0.0
+            if "requests" in buckets:
+                wait = max(wait, buckets["requests"].reserve(1, now))
+            if "tokens" in buckets:
+                wait = max(wait, buckets["tokens"].reserve(tokens, now))
+            metrics = self._metrics.setdefault(
+                model, {"acquired": 0, "throttled": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            )
+            metrics["acquired"] += 1
+            if wait > 0:
+                metrics["throttled"] += 1
+                metrics["total_wait_seconds"] += wait
+                metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], wait)
+        self._waits.record(model, wait)
+        return wait
+
+    def acquire(self, model: str, tokens: int) -> float:
+        """Block until the request may be sent; returns the time waited."""
+        wait = self.reserve(model, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def async_acquire(self, model: str, tokens: int) -> float:
+        """Async version of ``acquire``."""
+        wait = self.reserve(model, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Report per-model limits, throttling counts and wait-time percentiles."""
+        with self._lock:
+            metrics = {model: dict(values) for model, values in self._metrics.items()}
+        waits = self._waits.stats()
+        report = {}
+        for model, values in metrics.items():
+            limits = self.limits.get(model, self.default)
+            report[model] = {
+                "rpm_limit": limits.rpm,
+                "tpm_limit": limits.tpm,
+                **values,
+                "wait_p50_seconds": waits[model]["p50"],
+                "wait_p95_seconds": waits[model]["p95"],
+            }
+        return report
@@ -0,0 +1,258 @@
+"""
+Retry, deadline and circuit-breaker policy for LLM calls.
+
+Transient failures are retried with exponential backoff and full jitter,
+honouring the provider's Retry-After hint. Every call can carry a deadline
+that bounds the total time spent across attempts, and a circuit breaker
+rejects calls immediately while the proxy is failing.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from .llm_errors import (
+    LLMCircuitOpenError,
+    LLMDeadlineExceededError,
+    classify_error,
+)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+DEFAULT_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+DEFAULT_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+DEFAULT_DEADLINE = float(os.getenv("LLM_DEADLINE_SECONDS", "0")) or None
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+DEFAULT_RESET_TIMEOUT = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before the next attempt.
+
+        Args:
+            attempt: Number of attempts already made (1-based)
+            retry_after: Provider hint in seconds, if any
+
+        Returns:
+            Seconds to sleep; never shorter than ``retry_after``
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive transient failures → half-open probe."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive transient failures that open the circuit
+            reset_timeout: Seconds to stay open before allowing a probe call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise ``LLMCircuitOpenError`` unless the call may proceed."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            retry_after = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+        raise LLMCircuitOpenError("LLM circuit breaker is open", retry_after=retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class LLMResilience:
+    """Runs LLM attempts under a retry policy, deadline and circuit breaker."""
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 default_deadline: Optional[float] = DEFAULT_DEADLINE):
+        """
+        Initialize the resilience layer.
+
+        Args:
+            policy: Backoff policy (defaults from environment)
+            breaker: Circuit breaker shared by all calls (defaults from environment)
+            default_deadline: Deadline in seconds applied when a call gives none
+        """
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.default_deadline = default_deadline
+        self._lock = threading.Lock()
+        self._metrics = {"calls": 0, "retries": 0, "transient_failures": 0, "permanent_failures": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def _start(self, deadline: Optional[float]) -> Optional[float]:
+        """Return the absolute monotonic deadline for a new call."""
+        self._count("calls")
+        deadline = deadline if deadline is not None else self.default_deadline
+        return time.monotonic() + deadline if deadline else None
+
+    def _attempt_timeout(self, expires_at: Optional[float]) -> Optional[float]:
+        """Check the deadline and circuit; return the time budget for the next attempt."""
+        remaining = None
+        if expires_at is not None:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise LLMDeadlineExceededError("LLM call deadline exceeded")
+        self.breaker.before_call()
+        return remaining
+
+    def _on_failure(self, exc: Exception, attempt: int, expires_at: Optional[float]) -> float:
+        """Classify a failed attempt; return the backoff delay or raise the typed error."""
+        error = classify_error(exc)
+        if not error.transient:
+            # The provider answered, so this says nothing about its health
+            self.breaker.record_success()
+            self._count("permanent_failures")
+            raise error from exc
+        if not isinstance(error, LLMCircuitOpenError):
+            self.breaker.record_failure()
+        if attempt >= self.policy.max_attempts or isinstance(error, LLMCircuitOpenError):
+            self._count("transient_failures")
+            raise error from exc
+        delay = self.policy.backoff(attempt, error.retry_after)
+        if expires_at is not None and time.monotonic() + delay >= expires_at:
+            self._count("transient_failures")
+            raise LLMDeadlineExceededError(
+                f"LLM call deadline exceeded after {attempt} attempt(s): {error}",
+                retry_after=error.retry_after,
+            ) from exc
+        self._count("retries")
+        return delay
+
+    def call(self, attempt_fn: Callable[[Optional[float]], T], deadline: Optional[float] = None) -> T:
+        """
+        Run ``attempt_fn`` until it succeeds, fails permanently or runs out of budget.
+
+        Args:
+            attempt_fn: Performs one attempt; receives the remaining time budget
+                in seconds (None when unbounded) to use as its request timeout
+            deadline: Total seconds allowed across all attempts
+
+        Returns:
+            The first successful result
+
+        Raises:
+            LLMError: Typed error describing the final failure
+        """
+        expires_at = self._start(deadline)
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(expires_at)
+            attempt += 1
+            try:
+                result = attempt_fn(timeout)
+            except Exception as exc:
+                time.sleep(self._on_failure(exc, attempt, expires_at))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def async_call(self, attempt_fn: Callable[[Optional[float]], Awaitable[T]],
+                         deadline: Optional[float] = None) -> T:
+        """
+        Async version of ``call``.
+
+        Args:
+            attempt_fn: Coroutine function performing one attempt
+            deadline: Total seconds allowed across all attempts
+
+        Returns:
+            The first successful result
+
+        Raises:
+            LLMError: Typed error describing the final failure
+        """
+        expires_at = self._start(deadline)
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(expires_at)
+            attempt += 1
+            try:
+                result = await attempt_fn(timeout)
+            except Exception as exc:
+                await asyncio.sleep(self._on_failure(exc, attempt, expires_at))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Report retry counters and circuit breaker state."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {**metrics, "circuit": self.breaker.stats()}
+
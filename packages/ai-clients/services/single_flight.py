@@ -0,0 +1,102 @@
+"""
+Single-flight deduplication of identical in-flight LLM calls.
+
+When the same prompt is requested again while the first call is still
+running (two users on the same demo preset, a frontend retry of ``/toc``),
+the later callers wait for the first call's result instead of paying for a
+second upstream request. Waiters can be worker threads or asyncio tasks;
+both wait on the same ``concurrent.futures.Future``.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._metrics = {"leaders": 0, "coalesced": 0}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for ``key`` and whether we lead it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._metrics["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._metrics["leaders"] += 1
+            return future, True
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    @staticmethod
+    def _fail(future: Future, error: BaseException) -> None:
+        # Waiters should see an ordinary error, not the leader's cancellation
+        if not isinstance(error, Exception):
+            error = RuntimeError("single-flight leader was cancelled")
+        future.set_exception(error)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` unless an identical call is already in flight.
+
+        Args:
+            key: Identity of the call (e.g. the LLM cache key)
+            fn: Zero-argument callable performing the real work
+
+        Returns:
+            The leader's result, shared by every concurrent caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._fail(future, e)
+            self._finish(key)
+            raise
+        # Publish before unregistering so late joiners never start a duplicate
+        future.set_result(result)
+        self._finish(key)
+        return result
+
+    async def async_do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async version of ``do``; coalesces with both async and threaded callers.
+
+        Args:
+            key: Identity of the call (e.g. the LLM cache key)
+            fn: Zero-argument coroutine function performing the real work
+
+        Returns:
+            The leader's result, shared by every concurrent caller
+        """
+        future, leader = self._join(key)
+        if not leader:
+            # Shield so a cancelled waiter does not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._fail(future, e)
+            self._finish(key)
+            raise
+        # Publish before unregistering so late joiners never start a duplicate
+        future.set_result(result)
+        self._finish(key)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Report upstream (leader) calls, coalesced waiters and keys in flight."""
+        with self._lock:
+            return {**self._metrics, "in_flight": len(self._calls)}
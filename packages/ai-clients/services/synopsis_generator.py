@@ -0,0 +1,167 @@
+"""
+Per-chapter synopses for hybrid book generation.
+
+Sequential generation keeps chapters coherent by feeding each one the
+chapters before it, at the cost of N chapter latencies; parallel generation
+is fast but every chapter is written blind. Hybrid mode makes one cheap call
+(stage ``synopsis``, routable to a small model) that drafts a short synopsis
+of every chapter from the TOC. The synopses go into the prompt prefix that
+all chapters share, so the chapters can run in parallel and still refer to
+each other consistently. Replies are parsed as tolerantly as TOCs.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from models.chapter_models import BookContext, ChapterOutline
+from .ai_client import async_call_llm, call_llm
+from .llm_errors import LLMPermanentError
+from .toc_generator import DEFAULT_TOC_STRUCTURED, parse_json_reply
+
+# Upper bound on each synopsis, in words
+DEFAULT_SYNOPSIS_WORDS = int(os.getenv("LLM_SYNOPSIS_WORDS", "80"))
+
+SYNOPSIS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {"synopses": {"type": "array", "items": {"type": "string"}}},
+    "required": ["synopses"],
+    "additionalProperties": False,
+}
+SYNOPSIS_RESPONSE_FORMAT: Dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {"name": "chapter_synopses", "strict": True, "schema": SYNOPSIS_SCHEMA},
+}
+
+
+class SynopsisParseError(ValueError):
+    """The reply does not contain one synopsis per chapter."""
+
+    def __init__(self, message: str, raw: str):
+        super().__init__(message)
+        self.raw = raw
+
+
+def synopsis_prompt(book_context: BookContext, outline: List[ChapterOutline], words: int = DEFAULT_SYNOPSIS_WORDS) -> str:
+    """The prompt asking for one synopsis per chapter of ``outline``."""
+    chapters = "\n".join(
+        f"Chapter {chapter.chapter_number}: {chapter.section_name} ({'; '.join(chapter.section_ideas)})"
+        for chapter in outline
+    )
+    return (
+        f"Act as an expert editor planning the book '{book_context.title}' by {book_context.author}. "
+        f"Book concept: {book_context.book_idea}\n\n"
+        f"Outline:\n{chapters}\n\n"
+        f"Write a synopsis of at most {words} words for each chapter: what it covers, which earlier "
+        "chapters it builds on and what it sets up for later ones. Keep names, terms and recurring "
+        "examples consistent across chapters. "
+        f"Return only JSON of the form {{\"synopses\": [string, ...]}} with exactly {len(outline)} "
+        "entries, in chapter order."
+    )
+
+
+def _synopses(value: Any, count: int) -> List[str]:
+    """Validate a decoded reply: ``count`` non-empty strings (or ``{"synopsis": ...}`` objects)."""
+    if isinstance(value, dict):
+        value = value.get("synopses")
+    if not isinstance(value, list) or len(value) != count:
+        raise ValueError(f"expected {count} synopses")
+    synopses = [item.get("synopsis") if isinstance(item, dict) else item for item in value]
+    if not all(isinstance(text, str) and text.strip() for text in synopses):
+        raise ValueError("empty or non-text synopsis")
+    return [text.strip() for text in synopses]
+
+
+def parse_synopses(raw: str, count: int) -> List[str]:
+    """
+    Extract ``count`` chapter synopses from a model reply.
+
+    Raises:
+        SynopsisParseError: The reply does not hold exactly one synopsis per chapter
+    """
+    try:
+        return parse_json_reply(raw, lambda value: _synopses(value, count))[0]
+    except ValueError as e:
+        raise SynopsisParseError(f"Synopsis reply is not usable: {e}", raw) from e
+
+
+class SynopsisGenerator:
+    """Drafts the per-chapter synopses that hybrid generation shares between chapters."""
+
+    def __init__(self, words: int = DEFAULT_SYNOPSIS_WORDS, structured: bool = DEFAULT_TOC_STRUCTURED):
+        """
+        Initialize the generator.
+
+        Args:
+            words: Upper bound on each synopsis, in words
+            structured: Request the provider's JSON schema mode
+        """
+        self.words = words
+        self.structured = structured
+        self._lock = threading.Lock()
+        self._metrics = {"calls": 0, "generated": 0, "parse_failures": 0, "structured_rejected": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def _response_format(self) -> Optional[Dict[str, Any]]:
+        return SYNOPSIS_RESPONSE_FORMAT if self.structured else None
+
+    def _structured_rejected(self, error: LLMPermanentError) -> bool:
+        if self.structured and error.status_code == 400:
+            self._count("structured_rejected")
+            return True
+        return False
+
+    def _parse(self, raw: str, count: int) -> List[str]:
+        try:
+            synopses = parse_synopses(raw, count)
+        except SynopsisParseError:
+            self._count("parse_failures")
+            raise
+        self._count("generated")
+        return synopses
+
+    def generate(self, book_context: BookContext, outline: List[ChapterOutline]) -> List[str]:
+        """
+        Draft a synopsis for every chapter in one call.
+
+        Args:
+            book_context: Book-level context
+            outline: Every chapter of the book, in order
+
+        Returns:
+            One synopsis per chapter, in outline order
+
+        Raises:
+            LLMError: The LLM call failed
+            SynopsisParseError: The reply did not hold one synopsis per chapter
+        """
+        self._count("calls")
+        prompt = synopsis_prompt(book_context, outline, self.words)
+        try:
+            raw = call_llm(prompt, stage="synopsis", response_format=self._response_format())
+        except LLMPermanentError as e:
+            if not self._structured_rejected(e):
+                raise
+            raw = call_llm(prompt, stage="synopsis")
+        return self._parse(raw, len(outline))
+
+    async def async_generate(self, book_context: BookContext, outline: List[ChapterOutline]) -> List[str]:
+        """Async version of ``generate``."""
+        self._count("calls")
+        prompt = synopsis_prompt(book_context, outline, self.words)
+        try:
+            raw = await async_call_llm(prompt, stage="synopsis", response_format=self._response_format())
+        except LLMPermanentError as e:
+            if not self._structured_rejected(e):
+                raise
+            raw = await async_call_llm(prompt, stage="synopsis")
+        return self._parse(raw, len(outline))
+
+    def stats(self) -> Dict[str, Any]:
+        """Report synopsis calls, successes and replies that could not be parsed."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {"words": self.words, "structured": self.structured, **metrics}
@@ -0,0 +1,291 @@
+"""
+Table-of-contents generation with structured output and tolerant parsing.
+
+A TOC (ten or more sections of ten or more ideas each) is one of the most
+expensive responses, so it should never be thrown away over formatting.
+The call asks the provider for JSON matching the ``Section`` schema
+(OpenAI structured outputs); providers without that mode answer in text.
+Replies are parsed tolerantly: code fences and surrounding prose are
+skipped, the outermost JSON value is extracted, and trailing commas or a
+reply cut off mid-array are repaired locally. Only when that fails is the
+raw reply sent back once for a JSON-only rewrite (stage ``toc_repair``).
+Outcome counts are reported by ``TOCGenerator.stats``.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from models.section_model import Section
+from .ai_client import async_call_llm, call_llm
+from .llm_errors import LLMPermanentError
+
+DEFAULT_TOC_STRUCTURED = os.getenv("LLM_TOC_STRUCTURED", "1").lower() in ("1", "true", "yes")
+DEFAULT_TOC_REPAIR = os.getenv("LLM_TOC_REPAIR", "1").lower() in ("1", "true", "yes")
+
+# Strict structured outputs need an object at the root, so the sections are wrapped
+TOC_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "section_name": {"type": "string"},
+                    "section_ideas": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["section_name", "section_ideas"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["sections"],
+    "additionalProperties": False,
+}
+TOC_RESPONSE_FORMAT: Dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {"name": "table_of_contents", "strict": True, "schema": TOC_SCHEMA},
+}
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_JSON_START = re.compile(r"[\[{]")
+_TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+_CLOSERS = {"[": "]", "{": "}"}
+
+T = TypeVar("T")
+
+
+class TOCParseError(ValueError):
+    """The reply does not contain a usable table of contents."""
+
+    def __init__(self, message: str, raw: str):
+        super().__init__(message)
+        self.raw = raw
+
+
+def toc_prompt(book_idea: str) -> str:
+    """The TOC generation prompt for a book idea."""
+    return (
+        f"Act as an expert editor with the book idea: '{book_idea}'. "
+        "Generate a detailed table of contents using the following JSON schema: "
+        "[{\"section_name\": string, \"section_ideas\": [string, ...]}]. "
+        "Create at least 10 sections, and include at least 10 section ideas per section. "
+        "ONLY RETURN RAW JSON — do NOT include any Markdown formatting (no ``` or ```json), explanations, or extra text. "
+        "The response must be directly parsable as JSON."
+    )
+
+
+def repair_prompt(raw: str) -> str:
+    """Prompt asking for ``raw`` rewritten as valid TOC JSON, without changing its content."""
+    return (
+        "The following table of contents is not valid JSON. Rewrite it as JSON of the form "
+        "{\"sections\": [{\"section_name\": string, \"section_ideas\": [string, ...]}]}, keeping every "
+        "section and idea unchanged. Return only the JSON.\n\n" + raw
+    )
+
+
+def _sections(value: Any) -> List[Dict[str, Any]]:
+    """Validate a decoded reply (a list of sections, or an object wrapping one) against ``Section``."""
+    if isinstance(value, dict):
+        lists = [item for item in value.values() if isinstance(item, list)]
+        value = value.get("sections", lists[0] if len(lists) == 1 else None)
+    if not isinstance(value, list) or not value:
+        raise ValueError("no list of sections")
+    return [Section.model_validate(section).model_dump() for section in value]
+
+
+def close_truncated(text: str) -> str:
+    """
+    Make JSON that was cut off parseable.
+
+    Everything after the last closed array or object is dropped and the
+    brackets still open are closed, so a reply that ran out of tokens loses
+    only its unfinished last section.
+    """
+    stack: List[str] = []
+    in_string = escaped = False
+    safe, safe_stack = 0, []
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "]}" and stack:
+            stack.pop()
+            safe, safe_stack = index + 1, list(stack)
+            if not stack:
+                return text[:safe]
+    return text[:safe] + "".join(_CLOSERS[char] for char in reversed(safe_stack))
+
+
+def parse_json_reply(raw: str, validate: Callable[[Any], T]) -> Tuple[T, str]:
+    """
+    Extract a JSON value that ``validate`` accepts from a model reply.
+
+    Args:
+        raw: Reply text
+        validate: Converts a decoded value, raising ``ValueError`` if it is unusable
+
+    Returns:
+        The validated value and how it was recovered: ``json`` (valid as
+        sent), ``extracted`` (found inside fences or prose) or ``repaired``
+        (trailing commas or truncation fixed)
+
+    Raises:
+        ValueError: No acceptable JSON value could be recovered
+    """
+    try:
+        return validate(json.loads(raw)), "json"
+    except ValueError:
+        pass
+    text = _FENCE.sub("", raw)
+    starts = [match.start() for match in _JSON_START.finditer(text)]
+    if not starts:
+        raise ValueError("reply contains no JSON")
+    decoder = json.JSONDecoder()
+    for start in starts:
+        try:
+            return validate(decoder.raw_decode(text, start)[0]), "extracted"
+        except ValueError:
+            continue
+    text = text[starts[0]:]
+    return validate(json.loads(close_truncated(_TRAILING_COMMA.sub(r"\1", text)))), "repaired"
+
+
+def parse_toc(raw: str) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Extract a table of contents from a model reply.
+
+    Args:
+        raw: Reply text
+
+    Returns:
+        The sections and how they were recovered (see ``parse_json_reply``)
+
+    Raises:
+        TOCParseError: No valid table of contents could be recovered
+    """
+    try:
+        return parse_json_reply(raw, _sections)
+    except ValueError as e:
+        raise TOCParseError(f"TOC reply is not a valid table of contents: {e}", raw) from e
+
+
+class TOCGenerator:
+    """Generates tables of contents without discarding replies over formatting."""
+
+    def __init__(self, structured: bool = DEFAULT_TOC_STRUCTURED, repair: bool = DEFAULT_TOC_REPAIR):
+        """
+        Initialize the generator.
+
+        Args:
+            structured: Request the provider's JSON schema mode
+            repair: Ask the model to rewrite a reply that cannot be parsed locally
+        """
+        self.structured = structured
+        self.repair = repair
+        self._lock = threading.Lock()
+        self._metrics = {"calls": 0, "json": 0, "extracted": 0, "repaired": 0, "llm_repaired": 0,
+                         "parse_failures": 0, "structured_rejected": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def _response_format(self) -> Optional[Dict[str, Any]]:
+        return TOC_RESPONSE_FORMAT if self.structured else None
+
+    def _parse(self, raw: str) -> List[Dict[str, Any]]:
+        sections, method = parse_toc(raw)
+        self._count(method)
+        return sections
+
+    def _fail(self, error: TOCParseError) -> TOCParseError:
+        self._count("parse_failures")
+        return error
+
+    def _structured_rejected(self, error: LLMPermanentError) -> bool:
+        """Whether the provider refused the schema mode itself (HTTP 400), so plain text is worth a try."""
+        if self.structured and error.status_code == 400:
+            self._count("structured_rejected")
+            return True
+        return False
+
+    def _call(self, prompt: str, stage: str) -> str:
+        try:
+            return call_llm(prompt, stage=stage, response_format=self._response_format())
+        except LLMPermanentError as e:
+            if not self._structured_rejected(e):
+                raise
+            return call_llm(prompt, stage=stage)
+
+    async def _async_call(self, prompt: str, stage: str) -> str:
+        try:
+            return await async_call_llm(prompt, stage=stage, response_format=self._response_format())
+        except LLMPermanentError as e:
+            if not self._structured_rejected(e):
+                raise
+            return await async_call_llm(prompt, stage=stage)
+
+    def generate(self, book_idea: str) -> List[Dict[str, Any]]:
+        """
+        Generate the table of contents for a book idea.
+
+        Args:
+            book_idea: The book idea
+
+        Returns:
+            Sections as ``{"section_name": ..., "section_ideas": [...]}`` dicts
+
+        Raises:
+            LLMError: The LLM call failed
+            TOCParseError: Not even the repair pass produced a valid TOC
+        """
+        self._count("calls")
+        raw = self._call(toc_prompt(book_idea), "toc")
+        try:
+            return self._parse(raw)
+        except TOCParseError as e:
+            if not self.repair:
+                raise self._fail(e)
+        repaired = self._call(repair_prompt(raw), "toc_repair")
+        try:
+            sections = parse_toc(repaired)[0]
+        except TOCParseError as e:
+            raise self._fail(e)
+        self._count("llm_repaired")
+        return sections
+
+    async def async_generate(self, book_idea: str) -> List[Dict[str, Any]]:
+        """Async version of ``generate``."""
+        self._count("calls")
+        raw = await self._async_call(toc_prompt(book_idea), "toc")
+        try:
+            return self._parse(raw)
+        except TOCParseError as e:
+            if not self.repair:
+                raise self._fail(e)
+        repaired = await self._async_call(repair_prompt(raw), "toc_repair")
+        try:
+            sections = parse_toc(repaired)[0]
+        except TOCParseError as e:
+            raise self._fail(e)
+        self._count("llm_repaired")
+        return sections
+
+    def stats(self) -> Dict[str, Any]:
+        """Report how replies were recovered and how many could not be parsed."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {"structured": self.structured, "repair": self.repair, **metrics}
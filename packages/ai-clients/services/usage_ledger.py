@@ -0,0 +1,339 @@
+"""
+Token usage and cost accounting for LLM calls.
+
+Every upstream response's ``usage`` block (prompt, completion and cached
+prompt tokens) is priced from a per-model table and appended to a local
+SQLite ledger tagged with the endpoint, book and chapter that caused it.
+Callers open a ``usage_scope`` around work they want to attribute and read
+the real token counts and cost back from it, replacing word-count guesses.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+DEFAULT_LEDGER_PATH = os.getenv("LLM_USAGE_LEDGER_PATH", ".cache/llm_usage.sqlite3")
+LEDGER_TAGS = ("endpoint", "book", "chapter")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """USD per million tokens."""
+    prompt: float
+    cached_prompt: float
+    completion: float
+
+
+# Published list prices; override or extend with LLM_PRICES
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    "gpt-4o": ModelPrice(prompt=2.50, cached_prompt=1.25, completion=10.00),
+    "gpt-4o-mini": ModelPrice(prompt=0.15, cached_prompt=0.075, completion=0.60),
+    "gpt-4.1": ModelPrice(prompt=2.00, cached_prompt=0.50, completion=8.00),
+    "gpt-4.1-mini": ModelPrice(prompt=0.40, cached_prompt=0.10, completion=1.60),
+    "claude-sonnet-4-5": ModelPrice(prompt=3.00, cached_prompt=0.30, completion=15.00),
+    "claude-haiku-4-5": ModelPrice(prompt=1.00, cached_prompt=0.10, completion=5.00),
+}
+
+
+def parse_prices(spec: str) -> Dict[str, ModelPrice]:
+    """
+    Parse ``LLM_PRICES`` (e.g. ``"my-model=1.0:0.5:4.0"``, USD per 1M tokens).
+
+    Args:
+        spec: Comma-separated ``model=prompt:cached_prompt:completion`` entries
+
+    Returns:
+        Mapping of model name to its price
+    """
+    prices = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = entry.partition("=")
+        prompt, cached, completion = (float(v) for v in values.split(":"))
+        prices[model.strip()] = ModelPrice(prompt, cached, completion)
+    return prices
+
+
+@dataclass
+class Usage:
+    """Token counts and cost of one LLM response."""
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost: float = 0.0
+
+    @classmethod
+    def from_response(cls, model: str, usage: Any) -> "Usage":
+        """Read an OpenAI ``CompletionUsage`` (object or JSON dict), a provider's ``Usage`` or None."""
+        if usage is None:
+            return cls(model)
+        if isinstance(usage, Usage):
+            return cls(model, usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens)
+        if isinstance(usage, dict):
+            details = usage.get("prompt_tokens_details") or {}
+            return cls(
+                model=model,
+                prompt_tokens=usage.get("prompt_tokens") or 0,
+                completion_tokens=usage.get("completion_tokens") or 0,
+                cached_tokens=details.get("cached_tokens") or 0,
+            )
+        details = getattr(usage, "prompt_tokens_details", None)
+        return cls(
+            model=model,
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+            cached_tokens=(getattr(details, "cached_tokens", None) or 0) if details else 0,
+        )
+
+
+class UsageTally:
+    """Running totals for the calls made inside one ``usage_scope``."""
+
+    def __init__(self, tags: Dict[str, Any]):
+        self.tags = tags
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost = 0.0
+
+    def add(self, usage: Usage) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+            self.cached_tokens += usage.cached_tokens
+            self.cost += usage.cost
+
+
+class _Scope:
+    def __init__(self, tally: UsageTally, parent: Optional["_Scope"]):
+        self.tally = tally
+        self.parent = parent
+
+    def chain(self) -> Iterator[UsageTally]:
+        scope = self
+        while scope is not None:
+            yield scope.tally
+            scope = scope.parent
+
+
+_current_scope: contextvars.ContextVar[Optional[_Scope]] = contextvars.ContextVar("llm_usage_scope", default=None)
+
+
+def current_usage_scope() -> Optional[_Scope]:
+    """The innermost active scope (capture it to attribute work done later)."""
+    return _current_scope.get()
+
+
+@contextmanager
+def usage_scope(**tags: Any) -> Iterator[UsageTally]:
+    """
+    Attribute LLM calls made inside the block.
+
+    Scopes nest: a call is added to every enclosing tally and tagged with
+    the merged tags (inner values win). Context propagates into asyncio
+    tasks; thread pools must submit through ``contextvars.copy_context``.
+
+    Args:
+        **tags: Ledger tags such as ``endpoint``, ``book`` or ``chapter``
+
+    Yields:
+        Tally of the calls made inside the block
+    """
+    parent = _current_scope.get()
+    merged = {**(parent.tally.tags if parent else {}), **tags}
+    scope = _Scope(UsageTally(merged), parent)
+    _current_scope.set(scope)
+    try:
+        yield scope.tally
+    finally:
+        # set() rather than reset(): generators may finish in another context
+        _current_scope.set(parent)
+
+
+class UsageLedger:
+    """Prices LLM usage and appends it to a SQLite ledger."""
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_LEDGER_PATH,
+                 prices: Optional[Dict[str, ModelPrice]] = None):
+        """
+        Initialize the ledger.
+
+        Args:
+            db_path: SQLite file for the ledger (None/"" keeps totals in memory only)
+            prices: Per-model prices (defaults to ``DEFAULT_PRICES`` plus ``LLM_PRICES``)
+        """
+        self.db_path = db_path or None
+        self.prices = prices if prices is not None else {
+            **DEFAULT_PRICES, **parse_prices(os.getenv("LLM_PRICES", ""))
+        }
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._by_model: Dict[str, Dict[str, float]] = {}
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the ledger on first use (caller holds the lock)."""
+        if self.db_path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_usage ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL,"
+                " model TEXT NOT NULL, endpoint TEXT, book TEXT, chapter INTEGER,"
+                " prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL,"
+                " cached_tokens INTEGER NOT NULL, cost REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def price_for(self, model: str) -> Optional[ModelPrice]:
+        """
+        Price of ``model``, or None if it has none.
+
+        Dated snapshots (``gpt-4o-2024-08-06``) use the price of the longest
+        listed model they extend.
+        """
+        price = self.prices.get(model)
+        if price is None:
+            bases = [name for name in self.prices if model.startswith(name + "-")]
+            price = self.prices[max(bases, key=len)] if bases else None
+        return price
+
+    def price(self, usage: Usage) -> float:
+        """
+        Cost of ``usage`` in USD; models without a price cost 0 and are
+        reported under ``unpriced_models`` in ``stats``.
+
+        Cached prompt tokens are a subset of prompt tokens billed at the
+        cached rate.
+        """
+        price = self.price_for(usage.model)
+        if price is None:
+            return 0.0
+        uncached = max(usage.prompt_tokens - usage.cached_tokens, 0)
+        return (
+            uncached * price.prompt
+            + usage.cached_tokens * price.cached_prompt
+            + usage.completion_tokens * price.completion
+        ) / 1_000_000
+
+    def record(self, model: str, usage: Any, scope: Optional[_Scope] = None,
+               price_factor: float = 1.0) -> Usage:
+        """
+        Price one response's usage, add it to the active scopes and the ledger.
+
+        Args:
+            model: Model the request was sent to
+            usage: The response's ``usage`` block (may be None)
+            scope: Scope to attribute to (defaults to the current one)
+            price_factor: Multiplier on list price (e.g. batch discount)
+
+        Returns:
+            The priced usage
+        """
+        entry, row = self._tally(model, usage, scope, price_factor)
+        self._write(row)
+        return entry
+
+    async def async_record(self, model: str, usage: Any, scope: Optional[_Scope] = None,
+                           price_factor: float = 1.0) -> Usage:
+        """``record`` for coroutines: scopes are updated at once, the SQLite insert runs on a worker thread."""
+        entry, row = self._tally(model, usage, scope, price_factor)
+        if self.db_path is not None:
+            await asyncio.to_thread(self._write, row)
+        return entry
+
+    def _tally(self, model: str, usage: Any, scope: Optional[_Scope],
+               price_factor: float) -> Tuple[Usage, Tuple[Any, ...]]:
+        """Price the usage and add it to the scopes and per-model totals; returns it and its ledger row."""
+        entry = Usage.from_response(model, usage)
+        entry.cost = self.price(entry) * price_factor
+        scope = scope if scope is not None else _current_scope.get()
+        tags = scope.tally.tags if scope else {}
+        if scope is not None:
+            for tally in scope.chain():
+                tally.add(entry)
+        with self._lock:
+            totals = self._by_model.get(model)
+            if totals is None:
+                priced = self.price_for(model) is not None
+                if not priced:
+                    logger.warning("No price for LLM model %s; its usage is recorded at zero cost", model)
+                totals = self._by_model[model] = {
+                    "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cost": 0.0,
+                    "priced": priced,
+                }
+            totals["calls"] += 1
+            totals["prompt_tokens"] += entry.prompt_tokens
+            totals["completion_tokens"] += entry.completion_tokens
+            totals["cached_tokens"] += entry.cached_tokens
+            totals["cost"] += entry.cost
+        row = (time.time(), model, *(tags.get(tag) for tag in LEDGER_TAGS),
+               entry.prompt_tokens, entry.completion_tokens, entry.cached_tokens, entry.cost)
+        return entry, row
+
+    def _write(self, row: Tuple[Any, ...]) -> None:
+        """Append one row to the SQLite ledger, if there is one."""
+        with self._lock:
+            db = self._connect()
+            if db is not None:
+                db.execute(
+                    "INSERT INTO llm_usage (created_at, model, endpoint, book, chapter, prompt_tokens,"
+                    " completion_tokens, cached_tokens, cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+                db.commit()
+
+    def summary(self, **filters: Any) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregate the ledger by model, optionally filtered by tag.
+
+        Args:
+            **filters: Tag values to match, e.g. ``book="My Book"``
+
+        Returns:
+            Per-model calls, token counts and cost
+        """
+        unknown = set(filters) - set(LEDGER_TAGS)
+        if unknown:
+            raise ValueError(f"Unknown ledger tags: {sorted(unknown)}")
+        where = " AND ".join(f"{tag} = ?" for tag in filters) or "1 = 1"
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return {}
+            rows = db.execute(
+                "SELECT model, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(cached_tokens), SUM(cost)"
+                f" FROM llm_usage WHERE {where} GROUP BY model",
+                tuple(filters.values()),
+            ).fetchall()
+        return {
+            model: {"calls": calls, "prompt_tokens": prompt, "completion_tokens": completion,
+                    "cached_tokens": cached, "cost": cost}
+            for model, calls, prompt, completion, cached, cost in rows
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Report per-model totals recorded by this process."""
+        with self._lock:
+            by_model = {model: dict(totals) for model, totals in self._by_model.items()}
+        return {
+            "total_cost": sum(totals["cost"] for totals in by_model.values()),
+            "unpriced_models": sorted(model for model, totals in by_model.items() if not totals["priced"]),
+            "by_model": by_model,
+        }
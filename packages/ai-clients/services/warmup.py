@@ -0,0 +1,175 @@
+"""
+Background warm-up at worker startup, and the readiness it reports.
+
+A cold worker pays for one-time setup on its first requests: the pandoc
+check, WeasyPrint and fontconfig initialisation on the first ``/pdf``, and
+client construction plus TCP/TLS handshakes on the first LLM call.
+``Warmup`` runs these steps in the background when the app starts, and
+``GET /ready`` answers 503 until they have finished, so a load balancer
+only routes traffic to warmed workers. ``GET /test`` stays a liveness check.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional
+
+from models.section_model import Section
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").lower() in ("1", "true", "yes")
+# Pooled LLM connections opened per client (sync and async) before traffic arrives
+DEFAULT_WARMUP_CONNECTIONS = int(os.getenv("WARMUP_LLM_CONNECTIONS", "2"))
+# A step still running after this long is reported as failed
+DEFAULT_WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "60"))
+
+# A step is a plain function (run in a worker thread) or a coroutine function
+Step = Callable[[], Any]
+
+
+class WarmupSkipped(Exception):
+    """Raised by a step that does not apply to this deployment (e.g. WeasyPrint is not installed)."""
+
+
+@dataclass
+class StepResult:
+    """Outcome of one warm-up step."""
+    # pending, running, done, skipped or failed
+    status: str = "pending"
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Runs warm-up steps concurrently in the background and tracks readiness."""
+
+    def __init__(self, steps: Dict[str, Step], timeout: float = DEFAULT_WARMUP_TIMEOUT,
+                 enabled: bool = DEFAULT_WARMUP_ENABLED):
+        """
+        Initialize the warm-up.
+
+        Args:
+            steps: Step name → step
+            timeout: Seconds before a running step is reported as failed
+            enabled: When False, nothing runs and the worker is ready at once
+        """
+        self.steps = dict(steps)
+        self.timeout = timeout
+        self.enabled = enabled
+        self.results = {name: StepResult() for name in self.steps}
+        self.seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the worker should receive traffic.
+
+        True once every step has ended, whatever its outcome: a failed step
+        only means its first real request pays the setup cost, so it does
+        not keep the worker out of rotation.
+        """
+        return not self.enabled or self.seconds is not None
+
+    async def _run_step(self, name: str, step: Step) -> None:
+        result = self.results[name]
+        result.status = "running"
+        start = time.perf_counter()
+        try:
+            work = step() if asyncio.iscoroutinefunction(step) else asyncio.to_thread(step)
+            await asyncio.wait_for(work, self.timeout)
+            result.status = "done"
+        except WarmupSkipped as e:
+            result.status = "skipped"
+            result.error = str(e) or None
+        except asyncio.TimeoutError:
+            result.status = "failed"
+            result.error = f"timed out after {self.timeout:g}s"
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}"
+        result.seconds = time.perf_counter() - start
+        if result.status == "failed":
+            logger.warning("Warm-up step %s failed: %s", name, result.error)
+
+    async def run(self) -> None:
+        """Run every step concurrently and wait for all of them."""
+        start = time.perf_counter()
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self.steps.items()))
+        self.seconds = time.perf_counter() - start
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Start ``run`` in the background on the running loop (once; None when disabled)."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancel a warm-up that is still running (e.g. on shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        """Report readiness, total warm-up time and each step's outcome."""
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "seconds": self.seconds,
+            "steps": {name: asdict(result) for name, result in self.results.items()},
+        }
+
+
+def warm_pandoc() -> None:
+    """Resolve pandoc (downloading it if missing) before the first markdown conversion."""
+    from . import _PDF_AVAILABLE
+    if not _PDF_AVAILABLE:
+        raise WarmupSkipped("WeasyPrint not installed")
+    from .pdf_generator import ensure_pandoc
+    ensure_pandoc()
+
+
+def warm_pdf() -> None:
+    """Render a one-page book so WeasyPrint, fontconfig and the book fonts are initialised."""
+    from . import PDFGenerator
+    if PDFGenerator is None:
+        raise WarmupSkipped("WeasyPrint not installed")
+    PDFGenerator.generate_book_pdf(
+        title="Warm-up",
+        author="",
+        toc=[Section(section_name="Warm-up", section_ideas=[])],
+        markdown="## Warm-up\n\nWarm-up.",
+    )
+
+
+def warm_llm_connections(connections: int = DEFAULT_WARMUP_CONNECTIONS) -> Step:
+    """
+    Step that builds the pooled LLM clients and opens ``connections`` connections each.
+
+    The async client is warmed on the app's event loop (async clients are
+    per loop) and the sync client, used by the thread-pool paths, in a thread.
+    """
+    async def step() -> None:
+        from .ai_client import get_client_manager, get_replay_stats
+        if get_replay_stats()["mode"] != "off":
+            raise WarmupSkipped("record/replay transport in use")
+        manager = get_client_manager()
+        await manager.async_warm(connections)
+        await asyncio.to_thread(manager.warm, connections)
+
+    return step
+
+
+def default_warmup_steps(connections: int = DEFAULT_WARMUP_CONNECTIONS) -> Dict[str, Step]:
+    """The service's warm-up steps: pandoc, a tiny PDF render and pooled LLM connections."""
+    return {
+        "pandoc": warm_pandoc,
+        "pdf": warm_pdf,
+        "llm_connections": warm_llm_connections(connections),
+    }
@@ -0,0 +1,112 @@
+"""
+Cold-start import report for the ai-clients service.
+
+Imports a module (``app`` by default) in a fresh interpreter with
+``python -X importtime`` and lists the import cost per top-level package,
+slowest first. Use it to check that a change has not pulled a heavy
+dependency (openai, replicate, weasyprint, ...) back into startup:
+
+    python startup_report.py
+    python startup_report.py fake_llm_server --top 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Dependencies that should only be imported on first use, not at startup
+LAZY_DEPENDENCIES = ("openai", "replicate", "anthropic", "weasyprint", "pypandoc", "bs4", "PIL")
+
+
+@dataclass
+class ImportCost:
+    """One ``-X importtime`` entry (times in microseconds)."""
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> List[ImportCost]:
+    """
+    Parse the ``import time:`` lines written to stderr by ``-X importtime``.
+
+    Args:
+        output: Captured stderr (other lines are ignored)
+
+    Returns:
+        One entry per imported module, in import order
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        entries.append(ImportCost(fields[2].strip(), int(fields[0]), int(fields[1])))
+    return entries
+
+
+def package_costs(entries: List[ImportCost]) -> Dict[str, int]:
+    """
+    Import time per top-level package, slowest first.
+
+    Each module's own (self) time is attributed to its top-level package,
+    so the values add up to the total import time.
+    """
+    totals: Dict[str, int] = {}
+    for entry in entries:
+        package = entry.module.split(".")[0]
+        totals[package] = totals.get(package, 0) + entry.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure(module: str = "app", cwd: Optional[str] = None) -> List[ImportCost]:
+    """
+    Import ``module`` in a fresh interpreter and return its import costs.
+
+    Args:
+        module: Module to import
+        cwd: Directory to run in (defaults to this file's directory)
+
+    Returns:
+        Parsed ``-X importtime`` entries
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def report(entries: List[ImportCost], top: int = 20) -> str:
+    """Format the per-package table, the total and any lazy dependency imported at startup."""
+    costs = package_costs(entries)
+    total = sum(costs.values())
+    lines = [f"{'package':<32}{'ms':>10}{'share':>8}"]
+    for package, us in list(costs.items())[:top]:
+        lines.append(f"{package:<32}{us / 1000:>10.1f}{us / total:>8.1%}")
+    lines.append(f"{'total':<32}{total / 1000:>10.1f}")
+    eager = [name for name in LAZY_DEPENDENCIES if name in costs]
+    if eager:
+        lines.append(f"imported at startup but expected on first use: {', '.join(eager)}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("module", nargs="?", default="app", help="Module to import (default: app)")
+    parser.add_argument("--top", type=int, default=20, help="Packages to list (default: 20)")
+    args = parser.parse_args()
+    print(report(measure(args.module), args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -126,4 +126,210 @@ def mock_pypandoc() -> Generator[Mock, None, None]:
     """Mock pypandoc for markdown conversion testing."""
     with patch('pypandoc.convert_text') as mock_convert:
         mock_convert.return_value = "<h1>Test HTML</h1><p>Test content</p>"
-        yield mock_convert
\ No newline at end of file
+        yield mock_convert
+
+def chat_completion_payload(content: str, model: str = "gpt-4o", usage: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Build an OpenAI chat.completion response body."""
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [
+            {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+        ],
+        "usage": usage or {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+    }
+
+
+class FakeLLMBackend:
+    """In-process stand-in for the LLM proxy, served through httpx.MockTransport."""
+
+    def __init__(self):
+        self.requests = []
+        self.reply = lambda body: "pooled response"
+        # Usage block for non-streamed responses (None for the default)
+        self.usage = lambda body: None
+        self.failures = []
+        # Batch API state: uploaded files, jobs, and how many polls a job stays in progress
+        self.files = {}
+        self.batches = {}
+        self.batch_polls = 1
+        self.batch_line_errors = {}
+        # Connection warm-up probes (GET /models)
+        self.warm_requests = 0
+
+    def fail_next(self, status: int, times: int = 1, headers: Dict[str, str] = None) -> None:
+        """Answer the next ``times`` requests with an error status."""
+        self.failures.extend([(status, headers or {})] * times)
+
+    def handler(self, request):
+        import httpx
+        if request.url.path.endswith("/models"):
+            self.warm_requests += 1
+            return httpx.Response(200, json={"object": "list", "data": []})
+        if not request.url.path.endswith("/chat/completions"):
+            return self._batch_handler(request)
+        body = json.loads(request.content)
+        self.requests.append(body)
+        if self.failures:
+            status, headers = self.failures.pop(0)
+            return httpx.Response(status, headers=headers, json={"error": {"message": f"HTTP {status}"}})
+        content = self.reply(body)
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=self._sse_body(content, body.get("model", "gpt-4o"), include_usage),
+            )
+        return httpx.Response(200, json=chat_completion_payload(content, body.get("model", "gpt-4o"), self.usage(body)))
+
+    def _batch_object(self, batch_id: str) -> Dict[str, Any]:
+        job = self.batches[batch_id]
+        done = job["status"] == "completed"
+        return {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": job["input_file_id"],
+            "completion_window": "24h",
+            "created_at": 0,
+            "status": job["status"],
+            "output_file_id": job.get("output_file_id"),
+            "error_file_id": None,
+            "request_counts": {"total": len(job["lines"]), "completed": len(job["lines"]) if done else 0, "failed": 0},
+        }
+
+    def _run_batch(self, batch_id: str) -> None:
+        """Answer every line of a job through ``reply`` and write the output file."""
+        job = self.batches[batch_id]
+        output = []
+        for line in job["lines"]:
+            self.requests.append(line["body"])
+            status = self.batch_line_errors.get(line["custom_id"], 200)
+            if status == 200:
+                body = chat_completion_payload(
+                    self.reply(line["body"]), line["body"].get("model", "gpt-4o"), self.usage(line["body"])
+                )
+            else:
+                body = {"error": {"message": f"HTTP {status}"}}
+            output.append({"id": f"resp-{line['custom_id']}", "custom_id": line["custom_id"],
+                           "response": {"status_code": status, "body": body}, "error": None})
+        file_id = f"file-out-{batch_id}"
+        self.files[file_id] = "".join(json.dumps(entry) + "\n" for entry in output)
+        job.update(status="completed", output_file_id=file_id)
+
+    def _batch_handler(self, request):
+        """Serve the Files and Batches endpoints used by batch mode."""
+        import httpx
+        path = request.url.path.split("/v1", 1)[1]
+        if path == "/files" and request.method == "POST":
+            text = request.content.decode()
+            lines = [line for line in text.splitlines() if line.startswith('{"custom_id"')]
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = "\n".join(lines) + "\n"
+            return httpx.Response(200, json={
+                "id": file_id, "object": "file", "bytes": len(text), "created_at": 0,
+                "filename": "batch.jsonl", "purpose": "batch", "status": "processed",
+            })
+        if path.startswith("/files/") and path.endswith("/content"):
+            return httpx.Response(200, content=self.files[path.split("/")[2]].encode())
+        if path == "/batches" and request.method == "POST":
+            body = json.loads(request.content)
+            batch_id = f"batch-{len(self.batches) + 1}"
+            lines = [json.loads(line) for line in self.files[body["input_file_id"]].splitlines() if line]
+            self.batches[batch_id] = {"input_file_id": body["input_file_id"], "lines": lines,
+                                      "status": "validating", "polls": 0}
+            return httpx.Response(200, json=self._batch_object(batch_id))
+        batch_id = path.split("/")[2]
+        job = self.batches[batch_id]
+        if path.endswith("/cancel"):
+            job["status"] = "cancelled"
+        elif job["status"] not in ("completed", "cancelled"):
+            job["polls"] += 1
+            job["status"] = "in_progress"
+            if job["polls"] >= self.batch_polls:
+                self._run_batch(batch_id)
+        return httpx.Response(200, json=self._batch_object(batch_id))
+
+    @staticmethod
+    def _sse_body(content: str, model: str, include_usage: bool = False) -> bytes:
+        """Encode content as one chat.completion.chunk event per word (plus a usage chunk)."""
+        events = []
+        for word in content.split(" "):
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        if include_usage:
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+            }
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        events.append("data: [DONE]\n\n")
+        return "".join(events).encode()
+
+
+@pytest.fixture
+def fake_llm(mock_env_vars) -> Generator[tuple, None, None]:
+    """Install a pooled LLM client manager backed by FakeLLMBackend."""
+    import httpx
+    from services import ai_client
+    from services.llm_cache import LLMCache
+    from services.llm_pool import LLMClientManager
+    from services.hedging import Hedger
+    from services.chapter_scheduler import ChapterScheduler, set_chapter_scheduler
+    from services.book_jobs import BookJobStore, set_book_job_store
+    from services.llm_batch import BatchRunner, OpenAIBatchProvider
+    from services.rate_limiter import ModelLimits, RateLimiter
+    from services.resilience import CircuitBreaker, LLMResilience, RetryPolicy
+    from services.model_routing import ModelRouter
+    from services.usage_ledger import UsageLedger
+
+    backend = FakeLLMBackend()
+    manager = LLMClientManager(
+        base_url="http://llm.test/v1/",
+        api_key="test-key",
+        max_connections=4,
+        transport=httpx.MockTransport(backend.handler),
+    )
+    previous = ai_client.set_client_manager(manager)
+    previous_cache = ai_client.set_llm_cache(LLMCache(db_path=None))
+    previous_resilience = ai_client.set_resilience(
+        LLMResilience(RetryPolicy(max_attempts=3, base_delay=0.0), CircuitBreaker(failure_threshold=100))
+    )
+    previous_limiter = ai_client.set_rate_limiter(RateLimiter(limits={}, default=ModelLimits(rpm=0, tpm=0)))
+    previous_ledger = ai_client.set_usage_ledger(UsageLedger(db_path=None))
+    previous_router = ai_client.set_model_router(ModelRouter(routes={}, default_model="gpt-4o"))
+    previous_pool = ai_client.set_provider_pool(
+        ai_client.make_provider_pool(breaker=lambda: CircuitBreaker(failure_threshold=100))
+    )
+    previous_batch = ai_client.set_batch_runner(
+        BatchRunner(OpenAIBatchProvider(ai_client.get_openai_client), poll_interval=0.0)
+    )
+    previous_hedger = ai_client.set_hedger(Hedger(enabled=False))
+    previous_scheduler = set_chapter_scheduler(ChapterScheduler())
+    previous_jobs = set_book_job_store(BookJobStore(db_path=None))
+    yield manager, backend
+    set_book_job_store(previous_jobs)
+    set_chapter_scheduler(previous_scheduler)
+    ai_client.set_hedger(previous_hedger)
+    ai_client.set_batch_runner(previous_batch)
+    ai_client.set_provider_pool(previous_pool)
+    ai_client.set_model_router(previous_router)
+    ai_client.set_usage_ledger(previous_ledger)
+    ai_client.set_rate_limiter(previous_limiter)
+    ai_client.set_client_manager(previous)
+    ai_client.set_llm_cache(previous_cache)
+    ai_client.set_resilience(previous_resilience)
+    manager.close()
@@ -0,0 +1,268 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from models import BookContext, BookGenerationRequest, ChapterResponse, Section
+from services.book_jobs import (
+    BookJobBusy, BookJobConflict, BookJobStore, UnknownBookJob, get_book_job_store, job_scope
+)
+from services import ai_client
+from services.chapter_generator import ChapterGenerator
+
+
+def job_book(chapters: int = 3, **overrides) -> BookGenerationRequest:
+    fields = dict(
+        book_context=BookContext(title="Jobs", author="A", book_idea="Idea"),
+        toc=[Section(section_name=f"Part {i}", section_ideas=["x"]) for i in range(1, chapters + 1)],
+        parallel_generation=True,
+        max_concurrent_chapters=1,
+    )
+    fields.update(overrides)
+    return BookGenerationRequest(**fields)
+
+
+class TestBookJobStore:
+    """Test the checkpoint store on its own."""
+
+    def test_chapters_survive_a_restart(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        request = job_book(job_id="book-1")
+        store = BookJobStore(db_path=path)
+        assert store.open(request) == "book-1"
+        store.save_chapter("book-1", ChapterResponse(chapter_number=2, section_name="Part 2",
+                                                    content="saved", word_count=1))
+        restarted = BookJobStore(db_path=path)
+        assert restarted.request("book-1").toc == request.toc
+        assert restarted.chapters("book-1")[2].content == "saved"
+        status = restarted.status("book-1")
+        assert (status["completed_chapters"], status["missing_chapters"]) == ([2], [1, 3])
+        assert restarted.status("other") is None
+
+    def test_job_id_cannot_be_reused_for_another_book(self):
+        store = BookJobStore(db_path=None)
+        store.open(job_book(job_id="book-1"))
+        with pytest.raises(BookJobConflict):
+            store.open(job_book(chapters=4, job_id="book-1"))
+
+    def test_running_job_cannot_be_claimed_twice(self):
+        store = BookJobStore(db_path=None, lease_seconds=60)
+        request = job_book(job_id="busy")
+        with job_scope(store, request):
+            assert store.status("busy")["leased"] is True
+            with pytest.raises(BookJobBusy):
+                with job_scope(store, request):
+                    pass
+        assert store.status("busy")["leased"] is False
+        with job_scope(store, request):
+            pass
+        assert store.stats()["jobs_busy"] == 1
+
+    def test_expired_lease_can_be_taken_over(self):
+        store = BookJobStore(db_path=None, lease_seconds=60)
+        store.open(job_book(job_id="stale"))
+        store.claim("stale", lease_seconds=-1)  # a run that died without releasing
+        store.release("stale", store.claim("stale"))
+
+    def test_old_jobs_are_purged(self, tmp_path):
+        path = str(tmp_path / "jobs.sqlite3")
+        store = BookJobStore(db_path=path, retention_seconds=60)
+        store.open(job_book(job_id="old"))
+        store.save_chapter("old", ChapterResponse(chapter_number=1, section_name="Part 1", content="x",
+                                                  word_count=1))
+        store.open(job_book(job_id="new"))
+        with store._lock:
+            store._connect().execute("UPDATE book_jobs SET updated_at = updated_at - 120 WHERE job_id = 'old'")
+        assert store.purge() == 1
+        assert store.status("old") is None and store.chapters("old") == {}
+        assert store.status("new") is not None
+        assert BookJobStore(db_path=path, retention_seconds=0).purge() == 0
+
+    def test_batch_polls_record_the_batch_and_renew_the_lease(self):
+        from services.llm_batch import BatchJob
+        store = BookJobStore(db_path=None, lease_seconds=60)
+        with job_scope(store, job_book(job_id="polled", batch_generation=True)) as checkpoint:
+            checkpoint.track_batch(BatchJob(id="batch-9", status="in_progress"))
+            assert store.status("polled")["batch_id"] == "batch-9"
+            checkpoint.finish_batch()  # still running, so it is kept for a resume
+            assert store.batch("polled") == "batch-9"
+            # The lease lapsed and another run took the job over
+            store.release("polled", checkpoint.lease)
+            store.claim("polled")
+            with pytest.raises(BookJobBusy):
+                checkpoint.track_batch(BatchJob(id="batch-9", status="in_progress"))
+
+    def test_store_without_lease_columns_is_migrated(self, tmp_path):
+        import sqlite3
+        path = str(tmp_path / "jobs.sqlite3")
+        db = sqlite3.connect(path)
+        db.execute("CREATE TABLE book_jobs (job_id TEXT PRIMARY KEY, request TEXT NOT NULL,"
+                   " chapter_count INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+        db.commit()
+        db.close()
+        store = BookJobStore(db_path=path)
+        store.claim(store.open(job_book(job_id="old-schema")))
+        assert store.status("old-schema")["leased"] is True
+        assert store.status("old-schema")["batch_id"] is None
+
+
+class TestCheckpointedGeneration:
+    """Test repair passes and resuming books against the fake LLM backend."""
+
+    def test_failed_chapter_is_repaired(self, fake_llm):
+        _, backend = fake_llm
+        backend.fail_next(503, times=3)  # every retry of the first chapter
+        response = ChapterGenerator().generate_book(job_book())
+        assert not response.generation_summary["failed_chapters"]
+        assert response.generation_summary["repaired_chapters"] == [1]
+        assert get_book_job_store().status(response.generation_summary["job_id"])["complete"]
+
+    def test_permanent_failures_are_not_repaired(self, fake_llm):
+        _, backend = fake_llm
+        backend.fail_next(400)
+        response = ChapterGenerator().generate_book(job_book())
+        assert response.generation_summary["failed_chapters"] == [1]
+        assert len(backend.requests) == 3
+
+    def test_resume_regenerates_only_missing_chapters(self, fake_llm):
+        _, backend = fake_llm
+        backend.fail_next(503, times=3)
+        generator = ChapterGenerator(repair_passes=0)
+        first = generator.generate_book(job_book())
+        job_id = first.generation_summary["job_id"]
+        assert first.chapters[0].error
+        calls = len(backend.requests)
+        resumed = generator.resume_book(job_id)
+        assert len(backend.requests) == calls + 1
+        assert not resumed.chapters[0].error
+        assert [ch.chapter_number for ch in resumed.chapters] == [1, 2, 3]
+        summary = resumed.generation_summary
+        assert (summary["job_id"], summary["resumed_chapters"]) == (job_id, [2, 3])
+
+    def test_reused_chapters_are_not_charged_again(self, fake_llm):
+        store = get_book_job_store()
+        request = job_book(job_id="paid")
+        store.open(request)
+        for number in (1, 2):
+            store.save_chapter("paid", ChapterResponse(chapter_number=number, section_name=f"Part {number}",
+                                                       content="saved", word_count=1, cost_estimate=0.5))
+        response = ChapterGenerator().generate_book(request)
+        assert [ch.cost_estimate for ch in response.chapters[:2]] == [0.0, 0.0]
+        assert response.total_cost_estimate == response.chapters[2].cost_estimate
+        assert response.generation_summary["resumed_cost_estimate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_sequential_resume_uses_saved_chapters_as_context(self, fake_llm):
+        _, backend = fake_llm
+        generator = ChapterGenerator()
+        store = get_book_job_store()
+        request = job_book(parallel_generation=False, job_id="seq")
+        store.open(request)
+        store.save_chapter("seq", ChapterResponse(chapter_number=1, section_name="Part 1",
+                                                  content="Saved opening", word_count=2))
+        response = await generator.async_generate_book(request)
+        assert response.chapters[0].content == "Saved opening"
+        assert len(backend.requests) == 2
+        assert "Saved opening" in backend.requests[0]["messages"][0]["content"]
+
+    @pytest.mark.asyncio
+    async def test_async_book_touches_store_off_event_loop(self, fake_llm, monkeypatch):
+        import threading
+        loop_thread = threading.get_ident()
+        threads = []
+        store = get_book_job_store()
+        real_connect = store._connect
+        monkeypatch.setattr(store, "_connect", lambda: threads.append(threading.get_ident()) or real_connect())
+        generator = ChapterGenerator()
+        response = await generator.async_generate_book(job_book(parallel_generation=False))
+        await generator.async_resume_book(response.generation_summary["job_id"])
+        assert threads and loop_thread not in threads
+
+    def test_batch_resume_submits_only_missing_chapters(self, fake_llm):
+        _, backend = fake_llm
+        store = get_book_job_store()
+        request = job_book(batch_generation=True, job_id="batch")
+        store.open(request)
+        store.save_chapter("batch", ChapterResponse(chapter_number=2, section_name="Part 2",
+                                                    content="Saved middle", word_count=2))
+        response = ChapterGenerator().generate_book(request)
+        assert [ch.chapter_number for ch in response.chapters] == [1, 2, 3]
+        assert response.chapters[1].content == "Saved middle"
+        assert len(backend.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_resume_after_shutdown_reattaches_to_the_batch(self, fake_llm):
+        import asyncio
+        _, backend = fake_llm
+        backend.batch_polls = 10 ** 9  # still running when the worker shuts down
+        store = get_book_job_store()
+        generator = ChapterGenerator()
+        job_id = await generator.async_start_book(job_book(batch_generation=True, job_id="restart"))
+        while store.batch(job_id) is None:
+            await asyncio.sleep(0.01)
+        await generator.cancel_background()
+        status = store.status(job_id)
+        assert (status["batch_id"], status["leased"], status["complete"]) == ("batch-1", False, False)
+
+        backend.batch_polls = 0
+        response = await ChapterGenerator().async_resume_book(job_id)
+        assert [ch.error for ch in response.chapters] == [None, None, None]
+        assert list(backend.batches) == ["batch-1"]  # not paid for twice
+        assert ai_client.get_batch_stats()["jobs_reattached"] == 1
+        assert store.status(job_id)["batch_id"] is None
+
+    def test_unknown_job(self, fake_llm):
+        with pytest.raises(UnknownBookJob):
+            ChapterGenerator().resume_book("missing")
+
+
+class TestBookJobEndpoints:
+    """Test the job status and resume endpoints."""
+
+    def test_status_and_resume(self, fake_llm):
+        from app import app
+        _, backend = fake_llm
+        client = TestClient(app)
+        store = get_book_job_store()
+        store.open(job_book(job_id="api"))
+        assert client.get("/book-jobs/api").json()["missing_chapters"] == [1, 2, 3]
+        response = client.post("/book-jobs/api/resume")
+        assert response.status_code == 200
+        assert len(response.json()["chapters"]) == 3
+        assert client.get("/book-jobs/api").json()["complete"] is True
+        assert client.get("/book-jobs/nope").status_code == 404
+        assert client.post("/book-jobs/nope/resume").status_code == 404
+
+    def test_conflicting_job_id_is_409(self, fake_llm):
+        from app import app
+        get_book_job_store().open(job_book(job_id="taken"))
+        body = job_book(chapters=2, job_id="taken").model_dump()
+        assert TestClient(app).post("/generate-book", json=body).status_code == 409
+
+    def test_concurrent_resume_is_409(self, fake_llm):
+        from app import app
+        store = get_book_job_store()
+        store.open(job_book(job_id="running"))
+        store.claim("running")
+        client = TestClient(app)
+        assert client.post("/book-jobs/running/resume").status_code == 409
+        assert client.post("/generate-book", json=job_book(job_id="running").model_dump()).status_code == 409
+        assert client.get("/book-jobs/running").json()["leased"] is True
+
+    @pytest.mark.asyncio
+    async def test_batch_book_runs_in_background(self, fake_llm):
+        import asyncio
+        import httpx
+        from app import app, chapter_generator
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = job_book(batch_generation=True, job_id="bg").model_dump()
+            response = await client.post("/generate-book", json=body)
+            assert response.status_code == 202
+            assert response.json() == {"job_id": "bg", "status": "running", "status_url": "/book-jobs/bg"}
+            while chapter_generator.running_in_background("bg"):
+                await asyncio.sleep(0.01)
+            status = (await client.get("/book-jobs/bg")).json()
+            assert status["complete"] is True and status["running"] is False
+            book = await client.post("/book-jobs/bg/resume")
+            assert book.status_code == 200
+            assert [ch["chapter_number"] for ch in book.json()["chapters"]] == [1, 2, 3]
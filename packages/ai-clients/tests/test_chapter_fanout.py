@@ -0,0 +1,100 @@
+import re
+import time
+
+import pytest
+
+from models import BookContext, BookGenerationRequest, ChapterOutline, ChapterRequest, Section
+from services.chapter_fanout import split_subsections
+from services.chapter_generator import ChapterGenerator
+from services.chapter_scheduler import get_chapter_scheduler
+
+
+def fanout_request(ideas: int = 4, per_part: int = 2) -> ChapterRequest:
+    return ChapterRequest(
+        chapter_outline=ChapterOutline(chapter_number=1, section_name="Long",
+                                       section_ideas=[f"idea {i}" for i in range(1, ideas + 1)]),
+        book_context=BookContext(title="Fan", author="A", book_idea="Idea"),
+        subsection_fanout=per_part,
+    )
+
+
+def part_reply(body):
+    """Write part N as 'Text of part N', and answer stitch calls with one transition per boundary."""
+    prompt = body["messages"][0]["content"]
+    if "were written separately" in prompt:
+        count = int(re.search(r"exactly (\d+) entries", prompt).group(1))
+        return '{"transitions": [' + ", ".join(f'"Bridge {n}."' for n in range(1, count + 1)) + "]}"
+    return "Text of part " + re.search(r"Write only part (\d+) of", prompt).group(1)
+
+
+class TestSubsections:
+    """Test splitting a chapter's ideas into subsections."""
+
+    def test_split(self):
+        assert split_subsections(["a", "b", "c", "d", "e"], 2) == [["a", "b"], ["c", "d"], ["e"]]
+        assert split_subsections(["a", "b"], 5) == [["a", "b"]]
+        assert split_subsections([], 2) == [[]]
+
+
+class TestFanoutGeneration:
+    """Test fanned-out chapters against the fake LLM backend."""
+
+    @pytest.mark.asyncio
+    async def test_parts_are_stitched_in_order(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = part_reply
+        generator = ChapterGenerator()
+        chapter = await generator.async_generate_single_chapter(fanout_request(ideas=5, per_part=2))
+        assert chapter.content == "Text of part 1\n\nBridge 1.\n\nText of part 2\n\nBridge 2.\n\nText of part 3"
+        assert not chapter.error
+        prompts = [call["messages"][0]["content"] for call in backend.requests]
+        assert len(prompts) == 4  # three parts and one stitch call
+        # Every part sees the whole chapter's topics, and only the last one concludes it
+        part_prompts = [p for p in prompts if "Write only part" in p]
+        assert all("- idea 5" in p for p in part_prompts)
+        assert sum("End the chapter with a short conclusion" in p for p in part_prompts) == 1
+        stats = generator.stitcher.stats()
+        assert (stats["chapters"], stats["subsections"], stats["stitched"]) == (1, 3, 1)
+
+    def test_parts_run_concurrently(self, fake_llm):
+        _, backend = fake_llm
+
+        def slow_reply(body):
+            time.sleep(0.05)
+            return part_reply(body)
+
+        backend.reply = slow_reply
+        chapter = ChapterGenerator().generate_single_chapter(fanout_request(ideas=3, per_part=1))
+        assert chapter.content.startswith("Text of part 1\n\nBridge 1.")
+        assert get_chapter_scheduler().stats()["peak_in_flight"] == 3
+
+    def test_failed_part_fails_the_chapter(self, fake_llm):
+        _, backend = fake_llm
+        backend.fail_next(400)
+        generator = ChapterGenerator()
+        chapter = generator.generate_single_chapter(fanout_request())
+        assert chapter.error_type == "permanent"
+        assert len(backend.requests) == 2  # both parts, no stitch call
+        assert generator.stitcher.stats()["chapters"] == 0
+
+    def test_unusable_stitch_joins_parts(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: ("no json here" if "were written separately" in body["messages"][0]["content"]
+                                      else part_reply(body))
+        generator = ChapterGenerator()
+        chapter = generator.generate_single_chapter(fanout_request())
+        assert chapter.content == "Text of part 1\n\nText of part 2"
+        assert generator.stitcher.stats()["stitch_failures"] == 1
+
+    def test_book_chapters_fan_out(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = part_reply
+        request = BookGenerationRequest(
+            book_context=BookContext(title="Fan", author="A", book_idea="Idea"),
+            toc=[Section(section_name=f"Part {i}", section_ideas=["x", "y"]) for i in (1, 2)],
+            parallel_generation=True,
+            subsection_fanout=1,
+        )
+        response = ChapterGenerator().generate_book(request)
+        assert [ch.content for ch in response.chapters] == ["Text of part 1\n\nBridge 1.\n\nText of part 2"] * 2
+        assert len(backend.requests) == 6
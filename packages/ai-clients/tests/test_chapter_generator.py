@@ -0,0 +1,74 @@
+import pytest
+
+from models import BookContext, BookGenerationRequest, ChapterOutline, ChapterRequest, Section
+from services.chapter_generator import ChapterGenerator
+
+
+@pytest.fixture
+def book_context() -> BookContext:
+    return BookContext(title="Test Book", author="Test Author", book_idea="Testing generators")
+
+
+@pytest.fixture
+def book_request(book_context) -> BookGenerationRequest:
+    return BookGenerationRequest(
+        book_context=book_context,
+        toc=[Section(section_name=f"Chapter {i}", section_ideas=[f"Idea {i}"]) for i in range(1, 5)],
+        parallel_generation=True,
+        max_concurrent_chapters=2,
+    )
+
+
+def _echo_chapter_title(body: dict) -> str:
+    prompt = body["messages"][0]["content"]
+    title = prompt.split("Chapter title: ")[1].split("\\n")[0]
+    return f"Content for {title}"
+
+
+class TestChapterGenerator:
+    """Test sync and async chapter generation against a fake LLM."""
+
+    def test_generate_single_chapter(self, fake_llm, book_context):
+        _, backend = fake_llm
+        backend.reply = _echo_chapter_title
+        request = ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=1, section_name="Intro", section_ideas=["a"]),
+            book_context=book_context,
+        )
+        response = ChapterGenerator().generate_single_chapter(request)
+        assert response.content == "Content for Intro"
+        assert response.word_count == 3
+
+    @pytest.mark.asyncio
+    async def test_async_generate_single_chapter(self, fake_llm, book_context):
+        _, backend = fake_llm
+        backend.reply = _echo_chapter_title
+        request = ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=2, section_name="Body", section_ideas=["b"]),
+            book_context=book_context,
+        )
+        response = await ChapterGenerator().async_generate_single_chapter(request)
+        assert response.chapter_number == 2
+        assert response.content == "Content for Body"
+
+    @pytest.mark.asyncio
+    async def test_async_parallel_preserves_order(self, fake_llm, book_request):
+        _, backend = fake_llm
+        backend.reply = _echo_chapter_title
+        response = await ChapterGenerator().async_generate_book(book_request)
+        assert [ch.content for ch in response.chapters] == [
+            f"Content for Chapter {i}" for i in range(1, 5)
+        ]
+        assert response.generation_summary["generation_method"] == "parallel"
+        assert response.generation_summary["max_concurrent_chapters"] == 2
+
+    def test_sync_and_async_sequential_match(self, fake_llm, book_request):
+        import asyncio
+        _, backend = fake_llm
+        backend.reply = _echo_chapter_title
+        book_request.parallel_generation = False
+        generator = ChapterGenerator()
+        sync_response = generator.generate_book(book_request)
+        async_response = asyncio.run(generator.async_generate_book(book_request))
+        assert [ch.content for ch in sync_response.chapters] == [ch.content for ch in async_response.chapters]
+        assert async_response.generation_summary["context_maintained"] is True
@@ -0,0 +1,82 @@
+import re
+
+import pytest
+
+from models import BookContext, BookGenerationRequest, Section
+from services.chapter_generator import ChapterGenerator
+from services.chapter_graph import critical_path, lookback_dependencies
+
+
+def graph_book(chapters: int, lookback: int, concurrency: int) -> BookGenerationRequest:
+    return BookGenerationRequest(
+        book_context=BookContext(title="Graph", author="A", book_idea="Idea"),
+        toc=[Section(section_name=f"Part {i}", section_ideas=["x"]) for i in range(1, chapters + 1)],
+        graph_generation=True,
+        context_lookback=lookback,
+        max_concurrent_chapters=concurrency,
+    )
+
+
+def chapter_reply(body):
+    """Write chapter N as 'Text of part N' so its context can be traced in later prompts."""
+    part = re.search(r"Chapter title: Part (\d+)", body["messages"][0]["content"]).group(1)
+    return f"Text of part {part}"
+
+
+def context_parts(prompts, part: int):
+    """Parts whose text appears as context in the prompt for ``part``."""
+    prompt = next(p for p in prompts if f"Chapter title: Part {part}" in p)
+    return sorted(int(n) for n in re.findall(r"Text of part (\d+)", prompt))
+
+
+class TestDependencies:
+    """Test dependency graphs and their critical path."""
+
+    def test_lookback_within_waves(self):
+        assert lookback_dependencies(5, 2, 1) == [[], [0], [0, 1], [1, 2], [2, 3]]
+        assert lookback_dependencies(5, 1, 2) == [[], [], [1], [1], [3]]
+        assert lookback_dependencies(4, 0, 1) == [[], [], [], []]
+
+    def test_critical_path(self):
+        assert critical_path(lookback_dependencies(6, 2, 1)) == ([0, 1, 2, 3, 4, 5], 6.0)
+        assert critical_path(lookback_dependencies(6, 1, 3))[1] == 2.0
+        chain, seconds = critical_path([[], [], [0, 1]], durations=[1.0, 5.0, 2.0])
+        assert (chain, seconds) == ([1, 2], 7.0)
+        assert critical_path([]) == ([], 0.0)
+
+
+class TestGraphGeneration:
+    """Test graph-scheduled books against the fake LLM backend."""
+
+    def test_chapters_see_only_their_dependencies(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = chapter_reply
+        response = ChapterGenerator().generate_book(graph_book(chapters=5, lookback=1, concurrency=2))
+        prompts = [call["messages"][0]["content"] for call in backend.requests]
+        assert [context_parts(prompts, part) for part in range(1, 6)] == [[], [], [2], [2], [4]]
+        assert [ch.content for ch in response.chapters] == [f"Text of part {i}" for i in range(1, 6)]
+        summary = response.generation_summary
+        assert summary["generation_method"] == "graph"
+        assert (summary["context_lookback"], summary["critical_path_length"]) == (1, 3)
+        # Chapter 4 shares a wave with chapter 3, so it sees only chapter 2
+        assert summary["chapter_dependencies"] == {1: [], 2: [], 3: [2], 4: [2], 5: [4]}
+        # Chapters on a chain run one after another, so the chain fits in the book's wall-clock time
+        assert 0 < summary["critical_path_time"] <= response.total_generation_time
+
+    @pytest.mark.asyncio
+    async def test_async_sequential_with_bounded_lookback(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = chapter_reply
+        response = await ChapterGenerator().async_generate_book(graph_book(chapters=4, lookback=2, concurrency=1))
+        prompts = [call["messages"][0]["content"] for call in backend.requests]
+        assert [context_parts(prompts, part) for part in range(1, 5)] == [[], [1], [1, 2], [2, 3]]
+        assert response.generation_summary["critical_path"] == [1, 2, 3, 4]
+
+    def test_failed_dependency_is_left_out_of_context(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = chapter_reply
+        backend.fail_next(400)
+        response = ChapterGenerator().generate_book(graph_book(chapters=2, lookback=1, concurrency=1))
+        assert response.chapters[0].error
+        assert response.chapters[1].content == "Text of part 2"
+        assert "Previous chapters context" not in backend.requests[-1]["messages"][0]["content"]
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from models import BookContext, BookGenerationRequest, ChapterOutline, ChapterRequest, Section
+from services.chapter_generator import ChapterGenerator
+from services.chapter_prompts import PART_SEPARATOR, build_chapter_prompt
+
+
+@pytest.fixture
+def book_request() -> BookGenerationRequest:
+    return BookGenerationRequest(
+        book_context=BookContext(title="Cache Book", author="A", book_idea="Idea", genre="Essay"),
+        toc=[Section(section_name=f"Part {i}", section_ideas=[f"Idea {i}"]) for i in range(1, 4)],
+    )
+
+
+def simulated_prefix_cache():
+    """Usage hook that reports the prompt prefix already seen as cached (~4 chars per token)."""
+    seen = []
+
+    def usage(body):
+        prompt = body["messages"][0]["content"]
+        shared = max((len(os.path.commonprefix([prompt, earlier])) for earlier in seen), default=0)
+        seen.append(prompt)
+        return {"prompt_tokens": len(prompt) // 4, "completion_tokens": 10,
+                "prompt_tokens_details": {"cached_tokens": shared // 4}}
+    return usage
+
+
+class TestChapterPrompts:
+    """Test that chapter prompts share a byte-identical book prefix."""
+
+    def test_prefix_identical_across_chapters(self, book_request):
+        generator = ChapterGenerator()
+        prompts = [build_chapter_prompt(req) for req in generator._parallel_chapter_requests(book_request)]
+        assert len({prompt.prefix for prompt in prompts}) == 1
+        assert "Part 2" in prompts[0].prefix  # the whole outline is shared
+        assert [prompt.suffix.split(PART_SEPARATOR)[0] for prompt in prompts] == [
+            "Now write chapter 1.", "Now write chapter 2.", "Now write chapter 3."
+        ]
+
+    def test_per_chapter_context_stays_in_suffix(self, book_request):
+        outline = ChapterOutline(chapter_number=2, section_name="Part 2", section_ideas=["x"])
+        plain = build_chapter_prompt(ChapterRequest(chapter_outline=outline, book_context=book_request.book_context))
+        with_context = build_chapter_prompt(ChapterRequest(
+            chapter_outline=outline,
+            book_context=book_request.book_context,
+            previous_chapters=["Earlier chapter text"],
+            custom_instructions="Be brief",
+        ))
+        assert plain.prefix == with_context.prefix
+        assert "Earlier chapter text" in with_context.suffix
+        assert with_context.text.startswith(with_context.prefix)
+
+    def test_sequential_book_reports_cached_tokens(self, fake_llm, book_request):
+        _, backend = fake_llm
+        backend.usage = simulated_prefix_cache()
+        response = ChapterGenerator().generate_book(book_request)
+        prefix = build_chapter_prompt(ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=1, section_name="Part 1", section_ideas=["Idea 1"]),
+            book_context=book_request.book_context,
+        )).prefix
+        assert response.chapters[0].cached_tokens == 0
+        assert all(ch.cached_tokens >= len(prefix) // 4 for ch in response.chapters[1:])
+        summary = response.generation_summary["prompt_cache"]
+        assert summary["cached_tokens"] == sum(ch.cached_tokens for ch in response.chapters)
+        assert 0 < summary["cached_ratio"] < 1
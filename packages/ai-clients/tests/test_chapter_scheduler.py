@@ -0,0 +1,261 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models import BookContext, BookGenerationRequest, ChapterOutline, ChapterRequest, Section
+from services.chapter_generator import ChapterGenerator
+from services.chapter_scheduler import (
+    ChapterScheduler, SchedulerJob, get_chapter_scheduler, set_chapter_scheduler, tenant_scope
+)
+
+
+def book(title: str, chapters: int, concurrency: int) -> BookGenerationRequest:
+    return BookGenerationRequest(
+        book_context=BookContext(title=title, author="A", book_idea="Idea"),
+        toc=[Section(section_name=f"Part {i}", section_ideas=["x"]) for i in range(chapters)],
+        parallel_generation=True,
+        max_concurrent_chapters=concurrency,
+    )
+
+
+class ConcurrencyProbe:
+    """Backend reply that tracks how many chapter calls run at once."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, body):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return "chapter text"
+
+
+class TestChapterScheduler:
+    """Test the shared chapter concurrency budget."""
+
+    def test_global_limit_holds_across_books(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = probe = ConcurrencyProbe()
+        scheduler = ChapterScheduler(limit=2)
+        set_chapter_scheduler(scheduler)
+        generator = ChapterGenerator(max_workers=5)
+        threads = [threading.Thread(target=generator.generate_book, args=(book(f"Book {i}", 4, 3),))
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert probe.peak == 2
+        stats = scheduler.stats()
+        assert (stats["jobs"], stats["admitted"], stats["completed"]) == (3, 12, 12)
+        assert (stats["in_flight"], stats["queue_depth"], stats["active_jobs"]) == (0, 0, 0)
+        assert stats["peak_in_flight"] == 2
+        assert stats["peak_queue_depth"] > 0
+        assert stats["wait"]["count"] == 12
+
+    @pytest.mark.asyncio
+    async def test_job_limit_applies_inside_global_limit(self):
+        scheduler = ChapterScheduler(limit=10)
+        running = peak = 0
+
+        async def chapter():
+            nonlocal running, peak
+            async with scheduler.async_slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        with scheduler.job(2):
+            await asyncio.gather(*(chapter() for _ in range(6)))
+        assert peak == 2
+
+    def test_free_slot_goes_to_least_served_job(self):
+        scheduler = ChapterScheduler(limit=2)
+        order = []
+
+        def wait(job, label):
+            scheduler.acquire(job)
+            order.append(label)
+
+        def queue(job, label, depth):
+            thread = threading.Thread(target=wait, args=(job, label))
+            thread.start()
+            while scheduler.stats()["queue_depth"] < depth:
+                time.sleep(0.001)
+            return thread
+
+        with scheduler.job(3, "big") as big, scheduler.job(1, "small") as small:
+            scheduler.acquire(big)
+            scheduler.acquire(big)
+            big_waiter = queue(big, "big", 1)
+            small_waiter = queue(small, "small", 2)
+            scheduler.release(big)
+            small_waiter.join(1)
+            assert order == ["small"]
+            scheduler.release(small)
+            big_waiter.join(1)
+        assert order == ["small", "big"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = ChapterScheduler(limit=1)
+        with scheduler.job(1) as job:
+            await scheduler.async_acquire(job)
+            waiter = asyncio.create_task(scheduler.async_acquire(job))
+            await asyncio.sleep(0)
+            assert scheduler.stats()["queue_depth"] == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            scheduler.release(job)
+        stats = scheduler.stats()
+        assert (stats["queue_depth"], stats["in_flight"], stats["abandoned"]) == (0, 0, 1)
+
+    @pytest.mark.asyncio
+    async def test_async_book_chapters_take_slots(self, fake_llm):
+        generator = ChapterGenerator()
+        response = await generator.async_generate_book(book("Async", 3, 2))
+        assert len(response.chapters) == 3
+        stats = get_chapter_scheduler().stats()
+        assert (stats["jobs"], stats["admitted"], stats["in_flight"]) == (1, 3, 0)
+
+    @pytest.mark.parametrize("fanout, slots", [(None, 3), (2, 6)])
+    def test_sequential_book_chapters_are_bulk(self, fake_llm, fanout, slots):
+        request = BookGenerationRequest(
+            book_context=BookContext(title="Sequential", author="A", book_idea="Idea"),
+            toc=[Section(section_name=f"Part {i}", section_ideas=["a", "b", "c"]) for i in range(3)],
+            subsection_fanout=fanout,
+        )
+        ChapterGenerator().generate_book(request)
+        stats = get_chapter_scheduler().stats()
+        # One bulk job for the book; fanned-out parts share it rather than opening interactive jobs
+        assert (stats["jobs"], stats["admitted"]) == (1, slots)
+        assert stats["priorities"]["interactive"]["wait"] is None
+        assert stats["priorities"]["bulk"]["wait"]["count"] == slots
+
+
+async def admission_order(scheduler: ChapterScheduler, chapters) -> list:
+    """
+    Queue ``chapters`` (label, tenant, priority) behind a held slot, then
+    release it and return the labels in the order they were admitted.
+    """
+    order = []
+
+    async def chapter(label, tenant, priority):
+        with tenant_scope(tenant):
+            if priority is None:
+                # Outside any job: an interactive chapter of its own
+                async with scheduler.async_slot():
+                    order.append(label)
+                    await asyncio.sleep(0)
+                return
+            with scheduler.job(10, label, priority) as job:
+                await scheduler.async_acquire(job)
+                order.append(label)
+                await asyncio.sleep(0)
+                scheduler.release(job)
+
+    # Not entered as a job, so the chapters' tasks do not inherit it
+    holder = SchedulerJob(1, "holder")
+    await scheduler.async_acquire(holder)
+    tasks = [asyncio.create_task(chapter(*spec)) for spec in chapters]
+    while scheduler.stats()["queue_depth"] < len(chapters):
+        await asyncio.sleep(0)
+    scheduler.release(holder)
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestFairShare:
+    """Test priorities and weighted fair queuing between tenants."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_chapters_go_before_books(self):
+        order = await admission_order(ChapterScheduler(limit=1, weights={"a": 1, "b": 1}), [
+            ("book", "a", "bulk"), ("chapter", "b", None),
+        ])
+        assert order == ["chapter", "book"]
+
+    @pytest.mark.asyncio
+    async def test_bulk_work_waiting_too_long_is_not_starved(self):
+        order = await admission_order(ChapterScheduler(limit=1, weights={"a": 1, "b": 1}, bulk_max_wait=0.0), [
+            ("book", "a", "bulk"), ("chapter", "b", None),
+        ])
+        assert order == ["book", "chapter"]
+
+    @pytest.mark.asyncio
+    async def test_tenants_share_slots_by_weight(self):
+        scheduler = ChapterScheduler(limit=1, weights={"heavy": 2, "light": 1})
+        chapters = [(f"heavy {i}", "heavy", "bulk") for i in range(4)] + \
+                   [(f"light {i}", "light", "bulk") for i in range(4)]
+        order = [label.split()[0] for label in await admission_order(scheduler, chapters)]
+        # While both tenants wait, the heavier one gets two slots for every one of the other's
+        assert order[:6].count("heavy") == 4
+        stats = scheduler.stats()
+        assert stats["tenants"]["heavy"]["weight"] == 2.0
+        assert (stats["tenants"]["light"]["admitted"], stats["tenants"]["light"]["completed"]) == (4, 4)
+        assert stats["tenants"]["light"]["wait"]["count"] == 4
+        assert stats["priorities"]["bulk"]["wait"]["count"] == 9  # and the holder
+
+    @pytest.mark.asyncio
+    async def test_one_tenants_book_does_not_block_another(self):
+        order = await admission_order(ChapterScheduler(limit=1, weights={"a": 1, "b": 1}), [
+            ("big 1", "a", "bulk"), ("big 2", "a", "bulk"), ("big 3", "a", "bulk"), ("other", "b", "bulk"),
+        ])
+        assert order.index("other") <= 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_tenants_are_scheduled_as_default(self):
+        scheduler = ChapterScheduler(limit=1, weights={"acme": 2})
+        await admission_order(scheduler, [(f"made-up {i}", f"tenant-{i}", "bulk") for i in range(3)])
+        tenants = scheduler.stats()["tenants"]
+        assert set(tenants) == {"default"}
+        assert (tenants["default"]["weight"], tenants["default"]["admitted"]) == (1.0, 4)  # and the holder
+
+
+class TestSchedulerStatsEndpoint:
+    """Test that the scheduler is reported by /llm-stats."""
+
+    def test_llm_stats_reports_scheduler(self, fake_llm):
+        from app import app
+        set_chapter_scheduler(ChapterScheduler(limit=7))
+        body = TestClient(app).get("/llm-stats").json()
+        assert body["chapter_scheduler"]["limit"] == 7
+        assert body["chapter_scheduler"]["wait"] is None
+
+    def test_tenant_header_tags_work(self, fake_llm, monkeypatch):
+        import app as app_module
+        monkeypatch.setattr(app_module, "TRUSTED_PROXIES", frozenset({"testclient"}))
+        set_chapter_scheduler(ChapterScheduler(weights={"acme": 2}))
+        request = ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=1, section_name="One", section_ideas=["x"]),
+            book_context=BookContext(title="Tenant", author="A", book_idea="Idea"),
+        )
+        client = TestClient(app_module.app)
+        response = client.post("/generate-chapter", json=request.model_dump(), headers={"X-Tenant-ID": "acme"})
+        assert response.status_code == 200
+        tenants = client.get("/llm-stats").json()["chapter_scheduler"]["tenants"]
+        assert tenants["acme"]["admitted"] == 1
+        assert tenants["acme"]["in_flight"] == 0
+
+    def test_tenant_header_from_untrusted_client_is_ignored(self, fake_llm):
+        from app import app
+        set_chapter_scheduler(ChapterScheduler(weights={"acme": 2}))
+        request = ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=1, section_name="One", section_ideas=["x"]),
+            book_context=BookContext(title="Tenant", author="A", book_idea="Idea"),
+        )
+        client = TestClient(app)
+        client.post("/generate-chapter", json=request.model_dump(), headers={"X-Tenant-ID": "acme"})
+        assert set(client.get("/llm-stats").json()["chapter_scheduler"]["tenants"]) == {"default"}
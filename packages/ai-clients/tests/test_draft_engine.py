@@ -0,0 +1,84 @@
+import json
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models import DraftRequest, Section
+from services.chapter_scheduler import get_chapter_scheduler
+from services.draft_engine import DraftEngine
+
+
+def draft_request(sections: int = 3, ideas: int = 4) -> DraftRequest:
+    return DraftRequest(
+        title="Drafts",
+        author="A",
+        book_idea="Idea",
+        toc=[Section(section_name=f"Part {s}", section_ideas=[f"idea {s}.{i}" for i in range(1, ideas + 1)])
+             for s in range(1, sections + 1)],
+    )
+
+
+def idea_reply(body):
+    """Answer each prompt with the idea it asks for, so the assembled order can be checked."""
+    return "Text of " + re.search(r"Expand on '([^']+)'", body["messages"][0]["content"]).group(1)
+
+
+class TestDraftEngine:
+    """Test concurrent drafting against the fake LLM backend."""
+
+    @pytest.mark.asyncio
+    async def test_markdown_keeps_toc_order(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = idea_reply
+        result = await DraftEngine(concurrency=4).draft(draft_request())
+        expected = "".join(
+            f"## Part {s}\n" + "".join(f"Text of idea {s}.{i}\n\n" for i in range(1, 5)) for s in range(1, 4)
+        )
+        assert result["markdown"] == expected
+        assert result["_metadata"]["ideas"] == 12
+        assert result["_metadata"]["failed_ideas"] == 0
+
+    @pytest.mark.asyncio
+    async def test_calls_stay_within_concurrency(self, fake_llm):
+        engine = DraftEngine(concurrency=3)
+        await engine.draft(draft_request())
+        stats = get_chapter_scheduler().stats()
+        assert stats["admitted"] == 12
+        assert 1 < stats["peak_in_flight"] <= 3
+        assert engine.stats()["active"] == []
+
+    @pytest.mark.asyncio
+    async def test_failed_idea_becomes_error_line(self, fake_llm):
+        _, backend = fake_llm
+        backend.fail_next(400)
+        engine = DraftEngine(concurrency=2)
+        result = await engine.draft(draft_request(sections=1, ideas=3))
+        assert result["markdown"].count("*Error generating idea 1.") == 1
+        assert result["_metadata"]["failed_ideas"] == 1
+        assert (engine.stats()["ideas"], engine.stats()["failed_ideas"]) == (3, 1)
+
+    @pytest.mark.asyncio
+    async def test_progress_events(self, fake_llm):
+        events = [event async for event in DraftEngine(concurrency=2).events(draft_request(sections=2, ideas=2))]
+        assert [event["completed"] for event in events[:-1]] == [1, 2, 3, 4]
+        assert {event["idea"] for event in events[:-1]} == {"idea 1.1", "idea 1.2", "idea 2.1", "idea 2.2"}
+        assert events[-1]["event"] == "complete"
+
+
+class TestDraftEndpoints:
+    """Test /draft and /draft-stream."""
+
+    def test_draft_and_stream(self, fake_llm):
+        from app import app
+        _, backend = fake_llm
+        backend.reply = idea_reply
+        client = TestClient(app)
+        body = draft_request(sections=2, ideas=2).model_dump()
+        markdown = client.post("/draft", json=body).json()["markdown"]
+        assert markdown.index("idea 1.2") < markdown.index("## Part 2") < markdown.index("idea 2.1")
+        response = client.post("/draft-stream", json=body)
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line]
+        assert [event["event"] for event in events] == ["progress"] * 4 + ["complete"]
+        assert events[-1]["markdown"] == markdown
@@ -0,0 +1,91 @@
+import base64
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+import uvicorn
+
+from fake_llm_server import FakeLLMConfig, create_app, synthetic_text
+from services import ai_client
+from services.llm_errors import LLMRateLimitError
+from services.llm_pool import LLMClientManager
+
+
+def start_server(config: FakeLLMConfig):
+    """Run the fake provider on a free local port; returns (server, base_url, thread)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    fake = create_app(config)
+    server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return server, fake, f"http://127.0.0.1:{port}/v1/", thread
+
+
+@pytest.fixture
+def fake_server(fake_llm):
+    """Point ai_client at a live fake provider built from a config."""
+    previous, _ = fake_llm
+    running = []
+
+    def run(**settings):
+        server, fake, base_url, thread = start_server(FakeLLMConfig(**{"ttfb_median": 0.0, **settings}))
+        running.append((server, thread))
+        ai_client.set_client_manager(LLMClientManager(base_url=base_url, api_key="test-key"))
+        return fake.state.provider, base_url
+
+    yield run
+    ai_client.set_client_manager(previous)
+    for server, thread in running:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+class TestFakeLLMServer:
+    """Test the bundled OpenAI-compatible fake provider."""
+
+    def test_chat_completion_length_and_usage(self, fake_server):
+        provider, _ = fake_server(output_tokens=25, tokens_per_second=0)
+        content = ai_client.call_llm("hello", use_cache=False)
+        assert content == "".join(synthetic_text("hello", 25)).strip()
+        assert ai_client.get_usage_ledger().stats()["by_model"]["gpt-4o"]["completion_tokens"] == 25
+        assert provider.stats()["completed"] == 1
+
+    def test_streaming_paces_tokens(self, fake_server):
+        provider, _ = fake_server(output_tokens=10, ttfb_median=0.05, ttfb_sigma=0.01, tokens_per_second=100)
+        start = time.perf_counter()
+        deltas = list(ai_client.stream_llm("stream me", use_cache=False))
+        elapsed = time.perf_counter() - start
+        assert len(deltas) == 10
+        assert elapsed >= 0.04 + 9 * 0.01 * 0.8
+        assert provider.stats()["streamed"] == 1
+
+    def test_injected_rate_limits_surface_after_retries(self, fake_server):
+        provider, _ = fake_server(rate_limit_rate=1.0, retry_after=0.0)
+        with pytest.raises(LLMRateLimitError):
+            ai_client.call_llm("limited", use_cache=False)
+        assert provider.stats()["rate_limited"] == 3  # one per attempt
+
+    def test_concurrency_cap_rejects_extra_requests(self, fake_server):
+        provider, base_url = fake_server(max_concurrency=2, output_tokens=5, ttfb_median=0.3, ttfb_sigma=0.01)
+
+        def post(_):
+            return httpx.post(base_url + "chat/completions", timeout=5,
+                              json={"model": "gpt-4o", "messages": [{"role": "user", "content": "x"}]}).status_code
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            statuses = list(executor.map(post, range(4)))
+        assert sorted(statuses) == [200, 200, 429, 429]
+        assert provider.stats()["peak_in_flight"] == 2
+
+    def test_images_generate(self, fake_server):
+        fake_server(image_latency=0.0, image_size=8)
+        response = ai_client.get_openai_client().images.generate(model="gpt-image-1", prompt="a cover")
+        assert base64.b64decode(response.data[0].b64_json).startswith(b"\x89PNG")
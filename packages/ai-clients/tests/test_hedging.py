@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from models import BookContext, BookGenerationRequest, Section
+from services import ai_client
+from services.chapter_generator import ChapterGenerator
+from services.hedging import Hedger, hedge_budget
+from services.llm_providers import Completion
+
+
+@pytest.fixture
+def hedger(fake_llm) -> Hedger:
+    hedger = Hedger(enabled=True, initial_delay=0.05, min_delay=0.0, min_samples=100, max_ratio=1.0,
+                    max_outstanding=10.0)
+    ai_client.set_hedger(hedger)
+    return hedger
+
+
+def slow_first(backend, delay: float = 0.5):
+    """Make the first upstream request slow and every later one fast."""
+    lock = threading.Lock()
+    seen = []
+
+    def reply(body):
+        with lock:
+            seen.append(body)
+            first = len(seen) == 1
+        if first:
+            time.sleep(delay)
+            return "slow"
+        return "fast"
+
+    backend.reply = reply
+
+
+def slow_sends(monkeypatch, delays):
+    """Replace the async upstream send: call ``i`` takes ``delays[i]`` seconds (0 once they run out)."""
+    models = []
+
+    async def send(params, timeout):
+        models.append(params["model"])
+        delay = delays[len(models) - 1] if len(models) <= len(delays) else 0.0
+        await asyncio.sleep(delay)
+        return Completion(content="slow" if delay else "fast", model=params["model"])
+
+    monkeypatch.setattr(ai_client, "_async_send", send)
+    return models
+
+
+class TestHedging:
+    """Test hedged LLM requests."""
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_hedge_wins(self, hedger, monkeypatch):
+        slow_sends(monkeypatch, [0.5])
+        assert await ai_client.async_call_llm("tail", use_cache=False, stage="chapter") == "fast"
+        stats = hedger.stats()
+        assert (stats["hedges"], stats["hedge_wins"], stats["hedge_win_rate"]) == (1, 1, 1.0)
+
+    def test_sync_calls_are_not_hedged(self, hedger, fake_llm):
+        _, backend = fake_llm
+        slow_first(backend, delay=0.2)
+        assert ai_client.call_llm("tail", use_cache=False, stage="chapter") == "slow"
+        assert len(backend.requests) == 1
+        stats = hedger.stats()
+        assert stats["hedges"] == 0
+        # Sync latencies still inform the async thresholds
+        assert hedger._latency.count("chapter:gpt-4o") == 1
+
+    def test_threshold_starts_when_send_starts(self):
+        from services.hedging import pending_send
+        hedger = Hedger(enabled=True, initial_delay=0.05, min_delay=0.0, min_samples=100, max_ratio=1.0)
+
+        def send(params, timeout):
+            with pending_send():
+                time.sleep(0.1)  # rate limiter wait
+            time.sleep(0.02)
+            return "sent"
+
+        assert hedger.call({"model": "gpt-4o"}, None, send, stage="toc") == "sent"
+        assert hedger.stats()["hedges"] == 0
+        assert hedger._latency.percentile("toc:gpt-4o", 50) < 0.05
+
+    @pytest.mark.asyncio
+    async def test_outstanding_hedges_are_capped(self):
+        hedger = Hedger(enabled=True, initial_delay=0.02, min_delay=0.0, min_samples=100, max_ratio=1.0,
+                        max_outstanding=0.25)
+
+        async def send(params, timeout):
+            await asyncio.sleep(0.2)
+            return "slow"
+
+        await asyncio.gather(*(hedger.async_call({"model": "gpt-4o"}, None, send) for _ in range(4)))
+        stats = hedger.stats()
+        assert stats["hedges"] == 1
+        assert stats["outstanding_denied"] == 3
+
+    def test_fast_call_is_not_hedged(self, hedger, fake_llm):
+        _, backend = fake_llm
+        assert ai_client.call_llm("quick", use_cache=False) == "pooled response"
+        assert len(backend.requests) == 1
+        assert hedger.stats()["hedges"] == 0
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_hedges(self, hedger, monkeypatch):
+        models = slow_sends(monkeypatch, [0.1] * 10)
+        with hedge_budget(1) as budget:
+            await ai_client.async_call_llm("one", use_cache=False)
+            await ai_client.async_call_llm("two", use_cache=False)
+        assert budget.used == 1
+        assert hedger.stats()["budget_denied"] == 1
+        assert len(models) == 3
+
+    @pytest.mark.asyncio
+    async def test_hedge_uses_configured_model(self, hedger, monkeypatch):
+        hedger.hedge_model = "gpt-4o-mini"
+        models = slow_sends(monkeypatch, [0.5])
+        await ai_client.async_call_llm("other model", use_cache=False)
+        assert models == ["gpt-4o", "gpt-4o-mini"]
+
+    def test_threshold_follows_recent_latencies(self):
+        hedger = Hedger(enabled=True, percentile=50, initial_delay=9.0, min_delay=0.0, min_samples=3)
+        params = {"model": "gpt-4o"}
+        assert hedger.threshold("toc", params) == 9.0
+        for seconds in (0.01, 0.02, 0.03):
+            hedger.call(params, None, lambda p, t, s=seconds: time.sleep(s), stage="toc")
+        assert 0.01 < hedger.threshold("toc", params) < 0.05
+        assert hedger.threshold("chapter", params) == 9.0
+
+    @pytest.mark.asyncio
+    async def test_book_budget_scales_with_chapters(self, hedger, monkeypatch):
+        slow_sends(monkeypatch, [0.1] * 10)
+        hedger.book_ratio = 0.5
+        request = BookGenerationRequest(
+            book_context=BookContext(title="Hedged", author="A", book_idea="Idea"),
+            toc=[Section(section_name=f"Part {i}", section_ideas=["x"]) for i in range(4)],
+            parallel_generation=False,
+        )
+        await ChapterGenerator().async_generate_book(request)
+        assert hedger.stats()["hedges"] == 2
+        assert hedger.stats()["budget_denied"] == 2
+
+    @pytest.mark.asyncio
+    async def test_async_loser_is_cancelled(self):
+        hedger = Hedger(enabled=True, initial_delay=0.05, min_delay=0.0, min_samples=100, max_ratio=1.0)
+        delays = iter([1.0, 0.0])
+        cancelled = []
+
+        async def send(params, timeout):
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        start = time.perf_counter()
+        assert await hedger.async_call({"model": "gpt-4o"}, None, send) == 0.0
+        await asyncio.sleep(0)
+        assert time.perf_counter() - start < 0.5
+        assert cancelled == [1.0]
+        assert hedger.stats()["hedge_wins"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_both_failures_raise(self):
+        hedger = Hedger(enabled=True, initial_delay=0.01, min_delay=0.0, min_samples=100, max_ratio=1.0)
+
+        async def send(params, timeout):
+            await asyncio.sleep(0.02)
+            raise ValueError("upstream down")
+
+        with pytest.raises(ValueError):
+            await hedger.async_call({"model": "gpt-4o"}, None, send)
+        assert hedger.stats()["hedges"] == 1
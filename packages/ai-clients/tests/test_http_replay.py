@@ -0,0 +1,109 @@
+import time
+
+import httpx
+import pytest
+
+from services import ai_client
+from services.http_replay import Cassette, ReplayTransport, make_replay_transport, request_fingerprint
+from services.llm_errors import LLMPermanentError
+from services.llm_pool import LLMClientManager
+
+
+@pytest.fixture
+def cassette_path(tmp_path) -> str:
+    return str(tmp_path / "cassette.jsonl")
+
+
+def install(transport: ReplayTransport) -> LLMClientManager:
+    manager = LLMClientManager(base_url="http://llm.test/v1/", api_key="test-key", transport=transport)
+    ai_client.set_client_manager(manager)
+    return manager
+
+
+@pytest.fixture
+def recorder(fake_llm, cassette_path):
+    """Install a recording transport in front of the fake backend."""
+    previous_manager, backend = fake_llm
+    mock = httpx.MockTransport(backend.handler)
+    transport = ReplayTransport(Cassette(cassette_path), mode="record", inner=mock, async_inner=mock)
+    install(transport)
+    yield transport, backend
+    ai_client.set_client_manager(previous_manager)
+
+
+def replayer(cassette_path: str, speed: float = 0.0) -> ReplayTransport:
+    transport = ReplayTransport(Cassette(cassette_path), mode="replay", speed=speed)
+    install(transport)
+    return transport
+
+
+class TestRecordReplay:
+    """Test recording upstream exchanges and replaying them offline."""
+
+    def test_replay_returns_recorded_responses_without_upstream(self, recorder, cassette_path):
+        transport, backend = recorder
+        backend.reply = lambda body: f"answer to {body['messages'][0]['content']}"
+        recorded = [ai_client.call_llm(p, use_cache=False) for p in ("a", "b")]
+        streamed = "".join(ai_client.stream_llm("c", use_cache=False))
+        assert transport.stats()["recorded"] == 3
+
+        replay = replayer(cassette_path)
+        assert [ai_client.call_llm(p, use_cache=False) for p in ("a", "b")] == recorded
+        assert "".join(ai_client.stream_llm("c", use_cache=False)) == streamed
+        assert len(backend.requests) == 3
+        assert replay.stats()["replayed"] == 3
+
+    def test_unrecorded_request_is_a_permanent_miss(self, recorder, cassette_path):
+        replay = replayer(cassette_path)
+        with pytest.raises(LLMPermanentError):
+            ai_client.call_llm("never recorded", use_cache=False)
+        assert replay.stats()["misses"] == 1
+
+    def test_replay_reproduces_recorded_latency(self, recorder, cassette_path):
+        _, backend = recorder
+        backend.reply = lambda body: time.sleep(0.05) or "slow"
+        ai_client.call_llm("slow", use_cache=False)
+
+        replayer(cassette_path, speed=1.0)
+        start = time.perf_counter()
+        assert ai_client.call_llm("slow", use_cache=False) == "slow"
+        assert time.perf_counter() - start >= 0.04
+
+        replayer(cassette_path, speed=0.0)
+        start = time.perf_counter()
+        ai_client.call_llm("slow", use_cache=False)
+        assert time.perf_counter() - start < 0.04
+
+    @pytest.mark.asyncio
+    async def test_async_record_and_replay(self, recorder, cassette_path):
+        _, backend = recorder
+        recorded = await ai_client.async_call_llm("async", use_cache=False)
+        replayer(cassette_path)
+        assert await ai_client.async_call_llm("async", use_cache=False) == recorded
+        assert len(backend.requests) == 1
+
+    def test_repeated_requests_replay_in_order(self, recorder, cassette_path):
+        _, backend = recorder
+        replies = iter(["first", "second"])
+        backend.reply = lambda body: next(replies)
+        ai_client.call_llm("same", use_cache=False)
+        ai_client.call_llm("same", use_cache=False)
+        replayer(cassette_path)
+        assert [ai_client.call_llm("same", use_cache=False) for _ in range(3)] == ["first", "second", "second"]
+
+
+class TestFingerprint:
+    """Test request matching."""
+
+    def test_ignores_credentials_and_json_key_order(self):
+        a = httpx.Request("POST", "http://x/v1/chat", json={"a": 1, "b": 2}, headers={"authorization": "one"})
+        b = httpx.Request("POST", "http://x/v1/chat", content=b'{"b": 2, "a": 1}',
+                          headers={"authorization": "two", "content-type": "application/json"})
+        assert request_fingerprint(a) == request_fingerprint(b)
+        c = httpx.Request("POST", "http://x/v1/chat", json={"a": 2})
+        assert request_fingerprint(a) != request_fingerprint(c)
+
+    def test_mode_off_builds_nothing(self, cassette_path):
+        assert make_replay_transport("off", cassette_path) is None
+        with pytest.raises(ValueError):
+            make_replay_transport("rewind", cassette_path)
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from models import BookContext, BookGenerationRequest, Section
+from services import ai_client
+from services.chapter_generator import ChapterGenerator
+from services.llm_batch import (
+    BatchJob,
+    BatchProvider,
+    BatchRunner,
+    encode_jsonl,
+    parse_result_line,
+)
+from services.llm_errors import LLMDeadlineExceededError, LLMPermanentError, LLMRateLimitError
+from services.usage_ledger import usage_scope
+
+
+def book_request(chapters: int = 3) -> BookGenerationRequest:
+    return BookGenerationRequest(
+        book_context=BookContext(title="Batch Book", author="A", book_idea="Idea"),
+        toc=[Section(section_name=f"Chapter {i}", section_ideas=["x"]) for i in range(1, chapters + 1)],
+        batch_generation=True,
+    )
+
+
+class StuckBatchProvider(BatchProvider):
+    """Batch provider whose jobs never finish."""
+
+    def __init__(self):
+        self.cancelled = []
+
+    def submit(self, requests):
+        return BatchJob(id="batch-stuck", status="in_progress")
+
+    def retrieve(self, job_id):
+        return BatchJob(id=job_id, status="in_progress")
+
+    def cancel(self, job_id):
+        self.cancelled.append(job_id)
+
+
+class TestBatchFormat:
+    """Test the JSONL encoding and output-line parsing."""
+
+    def test_encode_jsonl_one_line_per_request(self):
+        lines = encode_jsonl([("a", {"model": "m"}), ("b", {"model": "m"})]).decode().splitlines()
+        assert len(lines) == 2
+        assert '"custom_id": "a"' in lines[0]
+        assert '"url": "/v1/chat/completions"' in lines[1]
+
+    def test_parse_success_and_errors(self):
+        ok = parse_result_line({"custom_id": "a", "response": {"status_code": 200, "body": {
+            "model": "gpt-4o", "choices": [{"message": {"content": "hi"}}], "usage": {"prompt_tokens": 3},
+        }}})
+        assert (ok.content, ok.model, ok.error) == ("hi", "gpt-4o", None)
+        limited = parse_result_line({"custom_id": "b", "response": {"status_code": 429, "body": {}}})
+        assert isinstance(limited.error, LLMRateLimitError)
+        failed = parse_result_line({"custom_id": "c", "error": {"code": "bad", "message": "nope"}})
+        assert isinstance(failed.error, LLMPermanentError)
+
+
+class TestBatchCalls:
+    """Test batch submission through the stand-in Files/Batches API."""
+
+    def test_results_come_back_in_order(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: body["messages"][0]["content"].upper()
+        backend.batch_polls = 3
+        results = ai_client.batch_call_llm(["one", "two", "three"], stage="chapter")
+        assert [r.content for r in results] == ["ONE", "TWO", "THREE"]
+        assert len(backend.batches) == 1
+        assert ai_client.get_batch_stats()["polls"] == 3
+
+    def test_cached_prompts_are_not_resubmitted(self, fake_llm):
+        _, backend = fake_llm
+        ai_client.call_llm("cached", stage="chapter")
+        results = ai_client.batch_call_llm(["cached", "fresh"], stage="chapter")
+        assert [r.content for r in results] == ["pooled response", "pooled response"]
+        assert len(backend.batches["batch-1"]["lines"]) == 1
+        # Batch results feed the cache too
+        ai_client.call_llm("fresh", stage="chapter")
+        assert len(backend.requests) == 2
+
+    def test_usage_recorded_at_batch_price(self, fake_llm):
+        with usage_scope(book="b") as tally:
+            ai_client.batch_call_llm(["x"], stage="chapter")
+        ledger = ai_client.get_usage_ledger()
+        full_price = ledger.price(ledger.record("gpt-4o", {"prompt_tokens": 5, "completion_tokens": 2}))
+        assert tally.calls == 1
+        assert tally.cost == pytest.approx(full_price * 0.5)
+
+    def test_line_errors_are_typed(self, fake_llm):
+        _, backend = fake_llm
+        backend.batch_line_errors = {"request-1": 400}
+        results = ai_client.batch_call_llm(["a", "b"], use_cache=False)
+        assert results[0].error is None
+        assert isinstance(results[1].error, LLMPermanentError)
+
+    def test_timeout_cancels_job(self):
+        provider = StuckBatchProvider()
+        runner = BatchRunner(provider, poll_interval=0.0, timeout=0.0)
+        with pytest.raises(LLMDeadlineExceededError):
+            runner.run([("request-0", {"model": "m"})])
+        assert provider.cancelled == ["batch-stuck"]
+        assert runner.stats()["jobs_failed"] == 1
+
+    def test_async_timeout_cancels_job(self):
+        provider = StuckBatchProvider()
+        runner = BatchRunner(provider, poll_interval=0.0, timeout=0.0)
+        with pytest.raises(LLMDeadlineExceededError):
+            asyncio.run(runner.async_run([("request-0", {"model": "m"})]))
+        assert provider.cancelled == ["batch-stuck"]
+
+    def test_async_batch(self, fake_llm):
+        results = asyncio.run(ai_client.async_batch_call_llm(["a", "b"]))
+        assert [r.custom_id for r in results] == ["request-0", "request-1"]
+
+
+class TestBatchBookGeneration:
+    """Test generate_book in batch mode."""
+
+    def test_chapters_mapped_back_in_order(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: "Words for " + body["messages"][0]["content"].split("Chapter ")[1][:1]
+        response = ChapterGenerator().generate_book(book_request())
+        assert [ch.chapter_number for ch in response.chapters] == [1, 2, 3]
+        assert response.generation_summary["generation_method"] == "batch"
+        assert response.generation_summary["batch_job_ids"] == ["batch-1"]
+        assert all(ch.prompt_tokens == 5 and ch.cost_estimate > 0 for ch in response.chapters)
+        assert ai_client.get_usage_ledger().stats()["by_model"]["gpt-4o"]["calls"] == 3
+
+    def test_failed_request_becomes_error_chapter(self, fake_llm):
+        _, backend = fake_llm
+        backend.batch_line_errors = {"request-1": 500}
+        response = ChapterGenerator().generate_book(book_request())
+        assert response.chapters[1].error_type == "transient"
+        assert response.generation_summary["failed_chapters"] == [2]
+
+    def test_job_failure_fails_every_chapter(self, fake_llm):
+        previous = ai_client.set_batch_runner(BatchRunner(StuckBatchProvider(), poll_interval=0.0, timeout=0.0))
+        try:
+            response = asyncio.run(ChapterGenerator().async_generate_book(book_request(2)))
+        finally:
+            ai_client.set_batch_runner(previous)
+        assert response.generation_summary["failed_chapters"] == [1, 2]
+        assert all(ch.error_type == "transient" for ch in response.chapters)
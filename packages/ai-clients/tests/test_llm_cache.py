@@ -0,0 +1,121 @@
+import pytest
+
+from services import ai_client
+from services.llm_cache import LLMCache, make_cache_key, regenerate_responses
+
+
+class TestLLMCache:
+    """Test the two-tier LLM response cache."""
+
+    def test_key_is_order_independent(self):
+        assert make_cache_key({"model": "a", "x": 1}) == make_cache_key({"x": 1, "model": "a"})
+        assert make_cache_key({"model": "a"}) != make_cache_key({"model": "b"})
+
+    def test_memory_lru_eviction(self):
+        cache = LLMCache(max_entries=2, db_path=None)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        assert cache.get("a") == "1"  # refresh "a"
+        cache.set("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.stats()["memory_evictions"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        db_path = str(tmp_path / "cache.sqlite3")
+        LLMCache(db_path=db_path).set("key", "persisted")
+        fresh = LLMCache(db_path=db_path)
+        assert fresh.get("key") == "persisted"
+        assert fresh.stats()["disk_hits"] == 1
+        assert fresh.get("key") == "persisted"
+        assert fresh.stats()["memory_hits"] == 1
+
+    def test_ttl_expiry(self, tmp_path, monkeypatch):
+        cache = LLMCache(ttl_seconds=10, db_path=str(tmp_path / "cache.sqlite3"))
+        cache.set("key", "value")
+        import services.llm_cache as llm_cache
+        real_time = llm_cache.time.time
+        monkeypatch.setattr(llm_cache.time, "time", lambda: real_time() + 60)
+        assert cache.get("key") is None
+        assert cache.stats()["expired"] == 2
+
+    def test_disk_size_eviction(self, tmp_path):
+        cache = LLMCache(max_entries=1, db_path=str(tmp_path / "cache.sqlite3"), max_disk_bytes=10)
+        cache.set("old", "x" * 6)
+        cache.set("new", "y" * 6)
+        assert cache.stats()["disk_entries"] == 1
+        assert cache.get("new") == "y" * 6
+
+    def test_ask_llm_serves_repeats_from_cache(self, fake_llm):
+        _, backend = fake_llm
+        assert ai_client.ask_llm("same prompt") == "pooled response"
+        assert ai_client.ask_llm("same prompt") == "pooled response"
+        assert len(backend.requests) == 1
+        stats = ai_client.get_llm_cache_stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_bypass_skips_cache(self, fake_llm):
+        _, backend = fake_llm
+        ai_client.ask_llm("same prompt")
+        ai_client.ask_llm("same prompt", use_cache=False)
+        assert len(backend.requests) == 2
+        assert ai_client.get_llm_cache_stats()["bypassed"] == 1
+
+    def test_regenerate_replaces_cached_response(self, fake_llm):
+        _, backend = fake_llm
+        ai_client.ask_llm("same prompt")
+        backend.reply = lambda body: "fresh text"
+        with regenerate_responses():
+            assert ai_client.ask_llm("same prompt") == "fresh text"
+            # A nested scope that does not ask for regeneration keeps the outer one
+            with regenerate_responses(False):
+                assert ai_client.ask_llm("same prompt") == "fresh text"
+        assert len(backend.requests) == 3
+        assert ai_client.ask_llm("same prompt") == "fresh text"
+        assert len(backend.requests) == 3
+
+    def test_regenerate_request_field(self, fake_llm):
+        from fastapi.testclient import TestClient
+        from app import app
+        _, backend = fake_llm
+        client = TestClient(app)
+        body = {"title": "T", "author": "A", "book_idea": "I",
+                "toc": [{"section_name": "S", "section_ideas": ["one"]}]}
+        first = client.post("/draft", json=body).json()["markdown"]
+        backend.reply = lambda body: "rewritten"
+        assert client.post("/draft", json=body).json()["markdown"] == first
+        assert "rewritten" in client.post("/draft", json={**body, "regenerate": True}).json()["markdown"]
+
+    def test_failures_are_not_cached(self, fake_llm):
+        manager, backend = fake_llm
+
+        def boom(body):
+            raise RuntimeError("upstream down")
+
+        backend.reply = boom
+        assert ai_client.ask_llm("flaky", default="fallback") == "fallback"
+        backend.reply = lambda body: "recovered"
+        assert ai_client.ask_llm("flaky", default="fallback") == "recovered"
+
+    @pytest.mark.asyncio
+    async def test_async_path_shares_cache(self, fake_llm):
+        _, backend = fake_llm
+        ai_client.ask_llm("shared")
+        assert await ai_client.async_ask_llm("shared") == "pooled response"
+        assert len(backend.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_async_disk_cache_runs_off_event_loop(self, fake_llm, tmp_path, monkeypatch):
+        import threading
+        _, backend = fake_llm
+        cache = LLMCache(db_path=str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setattr(ai_client, "_llm_cache", cache)
+        loop_thread = threading.get_ident()
+        threads = []
+        real_get = cache.get
+        monkeypatch.setattr(cache, "get", lambda key: threads.append(threading.get_ident()) or real_get(key))
+        assert await ai_client.async_ask_llm("disk") == "pooled response"
+        assert await ai_client.async_ask_llm("disk") == "pooled response"
+        assert len(backend.requests) == 1
+        assert threads and loop_thread not in threads
@@ -0,0 +1,71 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from services import ai_client
+
+
+class TestLLMClientManager:
+    """Test the shared, pooled LLM client."""
+
+    def test_client_is_shared(self, fake_llm):
+        """The same OpenAI instance is returned on every call."""
+        manager, _ = fake_llm
+        assert ai_client.get_openai_client() is ai_client.get_openai_client()
+        assert manager.clients_created == 1
+
+    def test_ask_llm_uses_pool(self, fake_llm):
+        """ask_llm goes through the pooled transport and is counted."""
+        manager, backend = fake_llm
+        assert ai_client.ask_llm("hello") == "pooled response"
+        assert backend.requests[0]["messages"][0]["content"] == "hello"
+        stats = manager.stats()
+        assert stats["requests_total"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["max_connections"] == 4
+
+    def test_thread_pool_shares_single_client(self, fake_llm):
+        """Concurrent worker threads build exactly one client."""
+        manager, _ = fake_llm
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(ai_client.ask_llm, [f"p{i}" for i in range(16)]))
+        assert results == ["pooled response"] * 16
+        stats = manager.stats()
+        assert manager.clients_created == 1
+        assert stats["requests_total"] == 16
+        assert stats["peak_in_flight"] >= 1
+
+    def test_close_rebuilds_client(self, fake_llm):
+        """Closing the manager drops the client; next use rebuilds it."""
+        manager, _ = fake_llm
+        first = manager.get_openai_client()
+        manager.close()
+        assert manager.get_openai_client() is not first
+        assert manager.clients_created == 2
+
+    @pytest.mark.asyncio
+    async def test_async_client_per_loop(self, fake_llm):
+        """The async path reuses one AsyncOpenAI client within a loop."""
+        manager, _ = fake_llm
+        assert ai_client.get_async_openai_client() is ai_client.get_async_openai_client()
+        assert await ai_client.async_ask_llm("hello") == "pooled response"
+        assert manager.stats()["async_clients"] == 1
+
+    def test_streamed_response_stays_in_flight_until_read(self):
+        """A streamed body keeps its request in flight until the stream closes."""
+        import httpx
+        from services.llm_pool import LLMClientManager
+        from tests.conftest import FakeLLMBackend
+
+        def handler(request):
+            body = FakeLLMBackend._sse_body("one two three", "gpt-4o")
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=iter([body]))
+
+        manager = LLMClientManager(base_url="http://llm.test/v1/", api_key="k",
+                                   transport=httpx.MockTransport(handler))
+        stream = manager.get_openai_client().chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": "hi"}], stream=True
+        )
+        assert manager.stats()["in_flight"] == 1
+        assert "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+        assert manager.stats()["in_flight"] == 0
+        manager.close()
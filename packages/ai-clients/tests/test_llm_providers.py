@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from services import ai_client
+from services.llm_errors import LLMPermanentError, LLMTransientError
+from services.llm_providers import (
+    ANTHROPIC_AVAILABLE,
+    AnthropicProvider,
+    Completion,
+    LLMProvider,
+    OpenAIProvider,
+    ProviderPool,
+    build_provider_pool,
+    parse_providers,
+)
+from services.resilience import CircuitBreaker
+
+PARAMS = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+
+
+class ScriptedProvider(LLMProvider):
+    """Provider that answers after ``delay`` seconds or raises queued errors."""
+
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.errors = []
+        self.calls = 0
+
+    def _answer(self, timeout):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        if timeout is not None and self.delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"{self.name} timed out")
+        time.sleep(self.delay)
+        return Completion(f"from {self.name}", f"{self.name}-model")
+
+    def complete(self, params, timeout):
+        return self._answer(timeout)
+
+    async def async_complete(self, params, timeout):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        await asyncio.sleep(self.delay)
+        return Completion(f"from {self.name}", f"{self.name}-model")
+
+    def open_stream(self, params, timeout):
+        completion = self._answer(timeout)
+        return iter([(completion.content, None)])
+
+
+def _pool(*members, **kwargs) -> ProviderPool:
+    return ProviderPool(list(members), breaker=lambda: CircuitBreaker(failure_threshold=2), **kwargs)
+
+
+class TestProviderPool:
+    """Test weighted spreading and failover between LLM providers."""
+
+    def test_transient_error_fails_over(self):
+        primary, secondary = ScriptedProvider("primary"), ScriptedProvider("secondary")
+        primary.errors.append(LLMTransientError("503"))
+        pool = _pool((primary, 1), (secondary, 0))
+        assert pool.complete(PARAMS, None).content == "from secondary"
+        stats = pool.stats()
+        assert stats["failovers"] == 1
+        assert stats["providers"]["primary"]["failovers_from"] == 1
+
+    def test_permanent_error_does_not_fail_over(self):
+        primary, secondary = ScriptedProvider("primary"), ScriptedProvider("secondary")
+        primary.errors.append(LLMPermanentError("400"))
+        pool = _pool((primary, 1), (secondary, 0))
+        with pytest.raises(LLMPermanentError):
+            pool.complete(PARAMS, None)
+        assert secondary.calls == 0
+
+    def test_last_transient_error_is_raised(self):
+        primary, secondary = ScriptedProvider("primary"), ScriptedProvider("secondary")
+        primary.errors.append(LLMTransientError("503"))
+        secondary.errors.append(LLMTransientError("529"))
+        with pytest.raises(LLMTransientError, match="529"):
+            _pool((primary, 1), (secondary, 0)).complete(PARAMS, None)
+
+    def test_slow_provider_fails_over_within_budget(self):
+        primary, secondary = ScriptedProvider("primary", delay=1.0), ScriptedProvider("secondary")
+        pool = _pool((primary, 1), (secondary, 0), failover_after=0.05)
+        start = time.monotonic()
+        assert pool.complete(PARAMS, timeout=2.0).content == "from secondary"
+        assert time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_async_slow_provider_fails_over(self):
+        primary, secondary = ScriptedProvider("primary", delay=1.0), ScriptedProvider("secondary")
+        pool = _pool((primary, 1), (secondary, 0), failover_after=0.05)
+        completion = await asyncio.wait_for(pool.async_complete(PARAMS, timeout=2.0), 0.5)
+        assert completion.content == "from secondary"
+
+    @pytest.mark.asyncio
+    async def test_saturated_provider_is_tried_last(self):
+        primary, secondary = ScriptedProvider("primary", delay=0.2), ScriptedProvider("secondary")
+        pool = _pool((primary, 1), (secondary, 0), max_in_flight=1)
+        first = asyncio.create_task(pool.async_complete(PARAMS, None))
+        await asyncio.sleep(0.05)
+        second = await pool.async_complete(PARAMS, None)
+        assert second.content == "from secondary"
+        assert (await first).content == "from primary"
+        assert pool.stats()["providers"]["primary"]["saturated_skips"] == 1
+
+    def test_open_breaker_skips_provider(self):
+        primary, secondary = ScriptedProvider("primary"), ScriptedProvider("secondary")
+        primary.errors.extend([LLMTransientError("503")] * 2)
+        pool = _pool((primary, 1), (secondary, 0))
+        pool.complete(PARAMS, None)
+        pool.complete(PARAMS, None)
+        assert pool.stats()["providers"]["primary"]["circuit"] == CircuitBreaker.OPEN
+        pool.complete(PARAMS, None)
+        assert primary.calls == 2
+        assert secondary.calls == 3
+
+    def test_weights_spread_load(self):
+        random.seed(7)
+        heavy, light, standby = ScriptedProvider("heavy"), ScriptedProvider("light"), ScriptedProvider("standby")
+        pool = _pool((heavy, 3), (light, 1), (standby, 0))
+        for _ in range(400):
+            pool.complete(PARAMS, None)
+        assert standby.calls == 0
+        assert 0.65 < heavy.calls / 400 < 0.85
+
+    def test_stream_fails_over_on_open(self):
+        primary, secondary = ScriptedProvider("primary"), ScriptedProvider("secondary")
+        primary.errors.append(LLMTransientError("503"))
+        model, items = _pool((primary, 1), (secondary, 0)).open_stream(PARAMS, None)
+        assert list(items) == [("from secondary", None)]
+
+    @pytest.mark.asyncio
+    async def test_limiter_wait_does_not_trigger_failover(self):
+        primary, secondary = ScriptedProvider("primary"), ScriptedProvider("secondary")
+
+        async def throttle(model, params):
+            await asyncio.sleep(0.1)
+
+        pool = _pool((primary, 1), (secondary, 0), failover_after=0.05, async_before_send=throttle)
+        assert (await pool.async_complete(PARAMS, timeout=2.0)).content == "from primary"
+        assert pool.stats()["failovers"] == 0
+        assert pool.stats()["providers"]["primary"]["latency_p50"] < 0.05
+
+    def test_stream_stays_in_flight_until_read(self):
+        primary = ScriptedProvider("primary")
+        pool = _pool((primary, 1))
+        _, items = pool.open_stream(PARAMS, None)
+        assert pool.stats()["providers"]["primary"]["in_flight"] == 1
+        assert pool.stats()["providers"]["primary"]["successes"] == 0
+        list(items)
+        assert pool.stats()["providers"]["primary"]["in_flight"] == 0
+        assert pool.stats()["providers"]["primary"]["successes"] == 1
+
+    def test_stream_failure_and_abandon_release_in_flight(self):
+        class BrokenStream(ScriptedProvider):
+            def open_stream(self, params, timeout):
+                def items():
+                    yield "partial", None
+                    raise LLMTransientError("reset")
+                return items()
+
+        pool = _pool((BrokenStream("primary"), 1))
+        _, items = pool.open_stream(PARAMS, None)
+        with pytest.raises(LLMTransientError):
+            list(items)
+        _, items = pool.open_stream(PARAMS, None)
+        next(items)
+        items.close()
+        stats = pool.stats()["providers"]["primary"]
+        assert stats["in_flight"] == 0
+        assert stats["failures"] == 1
+        assert stats["successes"] == 0
+
+    def test_parse_and_build(self):
+        assert parse_providers("openai:3, anthropic") == [("openai", 3.0), ("anthropic", 1.0)]
+        openai_provider = OpenAIProvider(ai_client.get_openai_client, ai_client.get_async_openai_client)
+        assert build_provider_pool(openai_provider, "openai").providers == [openai_provider]
+        assert build_provider_pool(openai_provider, "openai").serves("gpt-4o-mini")
+        assert not build_provider_pool(openai_provider, "openai").serves("claude-sonnet-4-5")
+        with pytest.raises(ValueError):
+            build_provider_pool(openai_provider, "openai,bard")
+
+    @pytest.mark.skipif(ANTHROPIC_AVAILABLE, reason="anthropic is installed")
+    def test_anthropic_requires_package(self):
+        with pytest.raises(ImportError):
+            AnthropicProvider(api_key="key")
+
+
+class TestProviderFailoverIntegration:
+    """Test failover through call_llm with the fake OpenAI backend as primary."""
+
+    def test_call_llm_fails_over_and_records_usage(self, fake_llm):
+        _, backend = fake_llm
+        secondary = ScriptedProvider("secondary")
+        openai_provider = OpenAIProvider(ai_client.get_openai_client, ai_client.get_async_openai_client)
+        ai_client.set_provider_pool(ai_client.make_provider_pool([(openai_provider, 1), (secondary, 0)]))
+        backend.fail_next(503)
+        assert ai_client.call_llm("prompt") == "from secondary"
+        assert ai_client.get_provider_stats()["failovers"] == 1
+        assert "secondary-model" in ai_client.get_llm_usage_stats()["by_model"]
+        # The next call goes back to the healthy primary
+        assert ai_client.call_llm("another prompt") == "pooled response"
@@ -0,0 +1,125 @@
+import pytest
+
+from models import request_models
+from models import BookContext, BookGenerationRequest, ChapterOutline, ChapterRequest, ModelRoute, Section
+from services import ai_client
+from services.chapter_generator import ChapterGenerator
+from services.llm_providers import LLMProvider
+from services.model_routing import ModelRouter, StageRoute, parse_routes, route_overrides
+
+
+@pytest.fixture
+def router(fake_llm) -> ModelRouter:
+    router = ModelRouter(
+        routes={"toc": StageRoute("gpt-4o-mini", {"temperature": 0.2})},
+        default_model="gpt-4o",
+    )
+    ai_client.set_model_router(router)
+    return router
+
+
+@pytest.fixture
+def backend(fake_llm, router):
+    return fake_llm[1]
+
+
+class TestModelRouting:
+    """Test per-stage model routing and per-request overrides."""
+
+    def test_parse_routes(self):
+        routes = parse_routes('{"toc": "gpt-4o-mini", "chapter": {"params": {"temperature": 0.8}}}', "gpt-4o")
+        assert routes["toc"] == StageRoute("gpt-4o-mini")
+        assert routes["chapter"] == StageRoute("gpt-4o", {"temperature": 0.8})
+
+    def test_parse_routes_rejects_unknown_stage_and_reserved_params(self):
+        with pytest.raises(ValueError):
+            parse_routes('{"summary": "gpt-4o-mini"}')
+        with pytest.raises(ValueError):
+            parse_routes('{"toc": {"params": {"stream": true}}}')
+
+    def test_stage_selects_model_and_params(self, backend):
+        ai_client.call_llm("toc prompt", stage="toc")
+        ai_client.call_llm("chapter prompt", stage="chapter")
+        assert backend.requests[0]["model"] == "gpt-4o-mini"
+        assert backend.requests[0]["temperature"] == 0.2
+        assert backend.requests[1]["model"] == "gpt-4o"
+        assert "temperature" not in backend.requests[1]
+
+    def test_routes_are_part_of_the_cache_key(self, backend):
+        ai_client.call_llm("same prompt", stage="toc")
+        ai_client.call_llm("same prompt", stage="chapter")
+        assert len(backend.requests) == 2
+
+    def test_overrides_nest_and_merge_params(self, backend):
+        with route_overrides({"toc": ModelRoute(params={"max_tokens": 100})}):
+            with route_overrides({"chapter": "gpt-4.1"}):
+                ai_client.call_llm("a", stage="toc")
+                ai_client.call_llm("b", stage="chapter")
+        ai_client.call_llm("c", stage="chapter")
+        assert backend.requests[0]["model"] == "gpt-4o-mini"
+        assert backend.requests[0]["temperature"] == 0.2
+        assert backend.requests[0]["max_tokens"] == 100
+        assert backend.requests[1]["model"] == "gpt-4.1"
+        assert backend.requests[2]["model"] == "gpt-4o"
+
+    def test_unknown_stage_is_rejected(self, router):
+        with pytest.raises(ValueError):
+            router.resolve("summary")
+
+    def test_request_model_rejects_reserved_params(self):
+        with pytest.raises(ValueError):
+            ModelRoute(params={"messages": []})
+
+    def test_request_model_allowlists_models_and_params(self):
+        with pytest.raises(ValueError):
+            ModelRoute(model="o1-pro")
+        with pytest.raises(ValueError):
+            ModelRoute(params={"n": 8})
+        with pytest.raises(ValueError):
+            ModelRoute(params={"logit_bias": {"50256": 100}})
+        assert ModelRoute(model="gpt-4o-mini", params={"temperature": 0.3}).model == "gpt-4o-mini"
+
+    def test_overrides_reject_models_outside_allowlist(self, router):
+        with pytest.raises(ValueError):
+            with route_overrides({"chapter": "o1-pro"}):
+                pass
+        with pytest.raises(ValueError):
+            with route_overrides({"chapter": {"params": {"n": 8}}}):
+                pass
+
+    def test_overrides_reject_models_the_providers_cannot_serve(self, router, monkeypatch):
+        monkeypatch.setattr(request_models, "ALLOWED_MODELS", request_models.ALLOWED_MODELS | {"claude-sonnet-4-5"})
+        # The default pool is the OpenAI proxy only
+        with pytest.raises(ValueError, match="cannot be served"):
+            ModelRoute(model="claude-sonnet-4-5")
+        with pytest.raises(ValueError, match="cannot be served"):
+            with route_overrides({"chapter": "claude-sonnet-4-5"}):
+                pass
+
+        class ClaudeProvider(LLMProvider):
+            name = "claude"
+
+        ai_client.set_provider_pool(ai_client.make_provider_pool([(ClaudeProvider(), 1)]))
+        assert ModelRoute(model="claude-sonnet-4-5").model == "claude-sonnet-4-5"
+
+    def test_parallel_book_applies_request_routes(self, backend, router):
+        request = BookGenerationRequest(
+            book_context=BookContext(title="T", author="A", book_idea="I"),
+            toc=[Section(section_name=f"Chapter {i}", section_ideas=["x"]) for i in range(1, 4)],
+            parallel_generation=True,
+            model_routes={"chapter": {"model": "gpt-4o-mini"}},
+        )
+        ChapterGenerator().generate_book(request)
+        assert {body["model"] for body in backend.requests} == {"gpt-4o-mini"}
+        assert router.stats()["calls"]["chapter"] == {"gpt-4o-mini": 3}
+
+    @pytest.mark.asyncio
+    async def test_async_chapter_applies_request_routes(self, backend):
+        request = ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=1, section_name="Intro", section_ideas=["a"]),
+            book_context=BookContext(title="T", author="A", book_idea="I"),
+            model_routes={"chapter": {"model": "gpt-4.1", "params": {"temperature": 0.9}}},
+        )
+        await ChapterGenerator().async_generate_single_chapter(request)
+        assert backend.requests[0]["model"] == "gpt-4.1"
+        assert backend.requests[0]["temperature"] == 0.9
@@ -0,0 +1,66 @@
+import pytest
+
+from services import ai_client
+from services.rate_limiter import ModelLimits, RateLimiter, TokenBucket, estimate_tokens, parse_limits
+
+
+class TestRateLimiter:
+    """Test the shared RPM/TPM token-bucket limiter."""
+
+    def test_parse_limits(self):
+        limits = parse_limits("gpt-4o=60:1000, gpt-4o-mini=120:")
+        assert limits["gpt-4o"].rpm == 60
+        assert limits["gpt-4o"].tpm == 1000
+        assert limits["gpt-4o-mini"].rpm == 120
+
+    def test_bucket_debt_makes_callers_wait(self):
+        bucket = TokenBucket(per_minute=60)  # one per second
+        assert bucket.reserve(60, now=bucket.updated) == 0.0
+        assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1.0)
+        assert bucket.reserve(1, now=bucket.updated) == pytest.approx(2.0)
+
+    def test_requests_per_minute(self):
+        limiter = RateLimiter(limits={"m": ModelLimits(rpm=2, tpm=0)})
+        assert limiter.reserve("m", 10) == 0.0
+        assert limiter.reserve("m", 10) == 0.0
+        assert limiter.reserve("m", 10) > 0
+        stats = limiter.stats()["m"]
+        assert stats["acquired"] == 3
+        assert stats["throttled"] == 1
+        assert stats["max_wait_seconds"] > 0
+
+    def test_tokens_per_minute_is_per_model(self):
+        limiter = RateLimiter(limits={"small": ModelLimits(rpm=0, tpm=100)}, default=ModelLimits(rpm=0, tpm=0))
+        assert limiter.reserve("small", 100) == 0.0
+        assert limiter.reserve("small", 50) == pytest.approx(30.0, rel=0.01)
+        assert limiter.reserve("unlimited", 10_000) == 0.0
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("x" * 400, completion_tokens=100) == 200
+
+    def test_unconfigured_limits_pass_through(self, monkeypatch):
+        monkeypatch.delenv("LLM_RATE_LIMITS", raising=False)
+        limiter = RateLimiter()
+        assert all(limiter.reserve("gpt-4o", 1_000_000) == 0.0 for _ in range(1000))
+        assert limiter.stats()["gpt-4o"]["throttled"] == 0
+
+    def test_reservation_uses_max_tokens(self):
+        messages = [{"role": "user", "content": "x" * 400}]
+        assert ai_client._estimated_tokens({"messages": messages, "max_tokens": 50}) == 150
+        assert ai_client._estimated_tokens({"messages": messages, "max_completion_tokens": 20}) == 120
+        assert ai_client._estimated_tokens({"messages": messages}) == estimate_tokens("x" * 400)
+
+    def test_llm_calls_acquire_limiter(self, fake_llm):
+        limiter = RateLimiter(limits={}, default=ModelLimits(rpm=1000, tpm=0))
+        ai_client.set_rate_limiter(limiter)
+        ai_client.ask_llm("one")
+        ai_client.ask_llm("two")
+        assert ai_client.get_rate_limit_stats()["gpt-4o"]["acquired"] == 2
+
+    @pytest.mark.asyncio
+    async def test_async_acquire_waits(self):
+        limiter = RateLimiter(limits={"m": ModelLimits(rpm=600, tpm=0)})  # 10 per second
+        for _ in range(600):
+            limiter.reserve("m", 0)
+        waited = await limiter.async_acquire("m", 0)
+        assert 0 < waited <= 0.1
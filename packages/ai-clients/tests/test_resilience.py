@@ -0,0 +1,123 @@
+import pytest
+
+from models import BookContext, ChapterOutline, ChapterRequest
+from services import ai_client
+from services import resilience as resilience_module
+from services.chapter_generator import ChapterGenerator
+from services.llm_errors import (
+    LLMCircuitOpenError,
+    LLMDeadlineExceededError,
+    LLMPermanentError,
+    LLMRateLimitError,
+    LLMTransientError,
+    parse_retry_after,
+)
+from services.resilience import CircuitBreaker, LLMResilience, RetryPolicy
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting."""
+    recorded = []
+    monkeypatch.setattr(resilience_module.time, "sleep", recorded.append)
+    return recorded
+
+
+class TestRetryPolicy:
+    """Test backoff computation and Retry-After parsing."""
+
+    def test_backoff_is_bounded(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        for attempt in range(1, 8):
+            assert 0 <= policy.backoff(attempt) <= 4.0
+
+    def test_backoff_honours_retry_after(self):
+        assert RetryPolicy(base_delay=0.0).backoff(1, retry_after=7.5) == 7.5
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after({"retry-after": "3"}) == 3.0
+        assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+        assert parse_retry_after({}) is None
+
+
+class TestLLMResilience:
+    """Test retries, typed errors and the circuit breaker through call_llm."""
+
+    def test_rate_limit_is_retried_with_retry_after(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(429, headers={"retry-after": "2"})
+        assert ai_client.call_llm("prompt") == "pooled response"
+        assert len(backend.requests) == 2
+        assert sleeps == [2.0]
+        assert ai_client.get_resilience_stats()["retries"] == 1
+
+    def test_permanent_error_is_not_retried(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(400)
+        with pytest.raises(LLMPermanentError):
+            ai_client.call_llm("prompt")
+        assert len(backend.requests) == 1
+        assert sleeps == []
+
+    def test_transient_error_after_max_attempts(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(503, times=3)
+        with pytest.raises(LLMTransientError):
+            ai_client.call_llm("prompt")
+        assert len(backend.requests) == 3
+
+    def test_ask_llm_still_returns_default(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(429, times=3)
+        assert ai_client.ask_llm("prompt", default="fallback") == "fallback"
+
+    def test_deadline_stops_retries(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(429, headers={"retry-after": "30"})
+        with pytest.raises(LLMDeadlineExceededError):
+            ai_client.call_llm("prompt", deadline=1.0)
+        assert sleeps == []
+
+    def test_circuit_breaker_fails_fast(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        ai_client.set_resilience(LLMResilience(
+            RetryPolicy(max_attempts=1, base_delay=0.0),
+            CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        ))
+        backend.fail_next(500, times=2)
+        for _ in range(2):
+            with pytest.raises(LLMTransientError):
+                ai_client.call_llm("prompt", use_cache=False)
+        with pytest.raises(LLMCircuitOpenError):
+            ai_client.call_llm("prompt", use_cache=False)
+        assert len(backend.requests) == 2
+        assert ai_client.get_resilience_stats()["circuit"]["state"] == "open"
+
+    def test_half_open_probe_closes_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        with pytest.raises(LLMCircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_chapter_reports_transient_failure(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(429, times=3)
+        request = ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=3, section_name="Three", section_ideas=["x"]),
+            book_context=BookContext(title="T", author="A", book_idea="I"),
+        )
+        chapter = ChapterGenerator().generate_single_chapter(request)
+        assert chapter.error_type == "transient"
+        assert chapter.content == "*Error generating chapter 3*"
+        assert chapter.word_count == 0
+
+    def test_rate_limit_error_type(self, fake_llm, sleeps):
+        _, backend = fake_llm
+        backend.fail_next(429, times=3)
+        with pytest.raises(LLMRateLimitError) as exc_info:
+            ai_client.call_llm("prompt")
+        assert exc_info.value.error_type == "transient"
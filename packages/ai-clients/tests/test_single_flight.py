@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from services import ai_client
+from services.single_flight import SingleFlight
+
+
+def _slow_reply(delay: float = 0.2):
+    def reply(body):
+        time.sleep(delay)
+        return f"answer to {body['messages'][0]['content']}"
+    return reply
+
+
+class TestSingleFlight:
+    """Test coalescing of identical in-flight calls."""
+
+    def test_threads_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def work():
+            calls.append(1)
+            release.wait(2)
+            return "done"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(flight.do, "k", work) for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert results == ["done"] * 4
+        assert len(calls) == 1
+        assert flight.stats() == {"leaders": 1, "coalesced": 3, "in_flight": 0}
+
+    def test_errors_propagate_to_waiters(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def work():
+            release.wait(2)
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(flight.do, "k", work) for _ in range(2)]
+            time.sleep(0.1)
+            release.set()
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+        assert flight.stats()["in_flight"] == 0
+
+    def test_ask_llm_coalesces_thread_pool(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = _slow_reply()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: ai_client.ask_llm("toc prompt"), range(5)))
+        assert results == ["answer to toc prompt"] * 5
+        assert len(backend.requests) == 1
+        assert ai_client.get_single_flight_stats()["coalesced"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_async_and_thread_callers_coalesce(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = _slow_reply()
+        thread_call = asyncio.to_thread(ai_client.ask_llm, "demo preset")
+        results = await asyncio.gather(
+            ai_client.async_ask_llm("demo preset"),
+            ai_client.async_ask_llm("demo preset"),
+            thread_call,
+        )
+        assert results == ["answer to demo preset"] * 3
+        assert len(backend.requests) == 1
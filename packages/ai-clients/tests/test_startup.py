@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+
+from startup_report import LAZY_DEPENDENCIES, measure, package_costs, parse_importtime, report
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str, **env) -> subprocess.CompletedProcess:
+    """Run ``code`` in a fresh interpreter from the package root without HAL9_TOKEN."""
+    environ = {key: value for key, value in os.environ.items() if key != "HAL9_TOKEN"}
+    return subprocess.run([sys.executable, "-c", code], cwd=PACKAGE_DIR, capture_output=True, text=True,
+                          env={**environ, **env})
+
+
+class TestColdStart:
+    """Test that importing the app stays cheap."""
+
+    def test_app_import_defers_heavy_dependencies(self):
+        result = run_python(
+            "import json, sys, app\n"
+            f"print(json.dumps([m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules]))"
+        )
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout) == []
+
+    def test_missing_token_fails_on_first_client_use(self):
+        result = run_python(
+            "from services import ai_client\n"
+            "try:\n"
+            "    ai_client.get_openai_client()\n"
+            "except RuntimeError as e:\n"
+            "    print(e)\n"
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "HAL9_TOKEN must be set"
+
+    def test_pdf_services_load_on_first_access(self):
+        result = run_python(
+            "import sys, services\n"
+            "before = 'services.pdf_generator' in sys.modules\n"
+            "available = services._PDF_AVAILABLE\n"
+            "print(before, available, (services.PDFGenerator is not None) == available)\n"
+        )
+        assert result.returncode == 0, result.stderr
+        before, _, consistent = result.stdout.splitlines()[-1].split()
+        assert (before, consistent) == ("False", "True")
+
+
+class TestStartupReport:
+    """Test the import cost report."""
+
+    def test_parse_and_aggregate(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |     fastapi.params\n"
+            "import time:        50 |        150 |   fastapi\n"
+            "import time:        30 |        30 |   services.ai_client\n"
+            "some other stderr line\n"
+        )
+        entries = parse_importtime(output)
+        assert [entry.module for entry in entries] == ["fastapi.params", "fastapi", "services.ai_client"]
+        assert package_costs(entries) == {"fastapi": 150, "services": 30}
+        assert "total" in report(entries)
+
+    def test_measure_real_import(self):
+        entries = measure("services.llm_errors", cwd=PACKAGE_DIR)
+        assert "services.llm_errors" in [entry.module for entry in entries]
+        assert "openai" not in package_costs(entries)
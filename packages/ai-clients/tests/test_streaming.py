@@ -0,0 +1,107 @@
+import json
+import pytest
+
+from models import BookContext, ChapterOutline, ChapterRequest
+from services import ai_client
+from services.llm_errors import LLMError
+from services.chapter_generator import ChapterGenerator
+
+
+@pytest.fixture
+def chapter_request() -> ChapterRequest:
+    return ChapterRequest(
+        chapter_outline=ChapterOutline(chapter_number=1, section_name="Intro", section_ideas=["a"]),
+        book_context=BookContext(title="Test Book", author="Test Author", book_idea="Streaming"),
+    )
+
+
+class TestStreaming:
+    """Test token streaming through ask_llm and ChapterGenerator."""
+
+    def test_stream_llm_yields_deltas(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: "one two three"
+        deltas = list(ai_client.stream_llm("prompt"))
+        assert deltas == ["one ", "two ", "three "]
+        assert backend.requests[0]["stream"] is True
+        latency = ai_client.get_llm_latency_stats()
+        assert latency["stream_ttfb"]["count"] >= 1
+        assert latency["stream_total"]["count"] >= 1
+
+    def test_streamed_response_is_cached(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: "one two"
+        list(ai_client.stream_llm("prompt"))
+        assert list(ai_client.stream_llm("prompt")) == ["one two "]
+        assert ai_client.ask_llm("prompt") == "one two "
+        assert len(backend.requests) == 1
+
+    def test_stream_failure_yields_default(self, fake_llm):
+        _, backend = fake_llm
+
+        def boom(body):
+            raise RuntimeError("down")
+
+        backend.reply = boom
+        assert list(ai_client.stream_llm("prompt", default="fallback")) == ["fallback"]
+
+    def test_stream_single_chapter(self, fake_llm, chapter_request):
+        _, backend = fake_llm
+        backend.reply = lambda body: "chapter body text"
+        events = list(ChapterGenerator().stream_single_chapter(chapter_request))
+        assert [e["content"] for e in events[:-1]] == ["chapter ", "body ", "text "]
+        chapter = events[-1]["chapter"]
+        assert events[-1]["event"] == "complete"
+        assert chapter.content == "chapter body text "
+        assert chapter.word_count == 3
+        assert chapter.time_to_first_token is not None
+        assert chapter.time_to_first_token <= chapter.generation_time
+
+    @pytest.mark.asyncio
+    async def test_async_stream_single_chapter(self, fake_llm, chapter_request):
+        _, backend = fake_llm
+        backend.reply = lambda body: "async body"
+        events = [e async for e in ChapterGenerator().async_stream_single_chapter(chapter_request)]
+        assert [e["event"] for e in events] == ["delta", "delta", "complete"]
+        assert events[-1]["chapter"].content == "async body "
+
+    def test_stream_failure_raises_without_default(self, fake_llm):
+        _, backend = fake_llm
+        backend.fail_next(400)
+        with pytest.raises(LLMError):
+            list(ai_client.stream_llm("prompt"))
+
+    def test_mid_stream_failure_raises(self, fake_llm, monkeypatch):
+        def broken_stream():
+            yield "partial ", None
+            raise RuntimeError("connection reset")
+
+        pool = ai_client.get_provider_pool()
+        monkeypatch.setattr(pool, "open_stream", lambda params, timeout: ("gpt-4o", broken_stream()))
+        deltas = []
+        with pytest.raises(LLMError):
+            for delta in ai_client.stream_llm("prompt", default="fallback"):
+                deltas.append(delta)
+        assert deltas == ["partial "]
+        assert ai_client.get_llm_cache_stats()["memory_entries"] == 0
+
+    def test_stream_single_chapter_reports_error_event(self, fake_llm, chapter_request):
+        _, backend = fake_llm
+        backend.fail_next(400)
+        events = list(ChapterGenerator().stream_single_chapter(chapter_request))
+        assert [e["event"] for e in events] == ["error"]
+        assert events[0]["error_type"] == "permanent"
+        assert events[0]["chapter_number"] == 1
+
+    def test_sse_route_sends_error_frame(self, fake_llm):
+        from fastapi.testclient import TestClient
+        from app import app
+
+        _, backend = fake_llm
+        backend.fail_next(400)
+        response = TestClient(app).post("/generate-chapter-stream", json={
+            "chapter_outline": {"chapter_number": 1, "section_name": "Intro", "section_ideas": ["a"]},
+            "book_context": {"title": "T", "author": "A", "book_idea": "I"},
+        })
+        frames = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert [f["event"] for f in frames] == ["error"]
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from models import BookContext, BookGenerationRequest, Section
+from services.chapter_generator import ChapterGenerator
+from services.chapter_prompts import build_chapter_prompt
+from services.synopsis_generator import (
+    SYNOPSIS_RESPONSE_FORMAT, SynopsisGenerator, SynopsisParseError, parse_synopses
+)
+
+SYNOPSES = ["Sets up the hero.", "The hero travels.", "The hero returns."]
+
+
+def hybrid_book(**overrides) -> BookGenerationRequest:
+    fields = dict(
+        book_context=BookContext(title="Hybrid", author="A", book_idea="A journey"),
+        toc=[Section(section_name=f"Part {i}", section_ideas=["x"]) for i in range(1, 4)],
+        synopsis_generation=True,
+    )
+    fields.update(overrides)
+    return BookGenerationRequest(**fields)
+
+
+def synopsis_reply(body):
+    """Answer the synopsis call with JSON and chapter calls with text."""
+    if body.get("response_format") == SYNOPSIS_RESPONSE_FORMAT:
+        return json.dumps({"synopses": SYNOPSES})
+    return "chapter text"
+
+
+class TestParseSynopses:
+    """Test extraction of per-chapter synopses."""
+
+    def test_wrapped_plain_and_fenced(self):
+        assert parse_synopses(json.dumps({"synopses": SYNOPSES}), 3) == SYNOPSES
+        assert parse_synopses(f"```json\n{json.dumps(SYNOPSES)}\n```", 3) == SYNOPSES
+        objects = [{"chapter": i, "synopsis": text} for i, text in enumerate(SYNOPSES, 1)]
+        assert parse_synopses(json.dumps(objects), 3) == SYNOPSES
+
+    def test_wrong_count_is_rejected(self):
+        with pytest.raises(SynopsisParseError):
+            parse_synopses(json.dumps(SYNOPSES[:2]), 3)
+        with pytest.raises(SynopsisParseError):
+            parse_synopses(json.dumps(["", "b", "c"]), 3)
+
+
+class TestHybridGeneration:
+    """Test hybrid book generation against the fake LLM backend."""
+
+    def test_synopses_are_shared_by_every_chapter(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = synopsis_reply
+        response = ChapterGenerator().generate_book(hybrid_book())
+        synopsis_call, *chapter_calls = backend.requests
+        assert "exactly 3 entries" in synopsis_call["messages"][0]["content"]
+        assert len(chapter_calls) == 3
+        for call in chapter_calls:
+            prompt = call["messages"][0]["content"]
+            assert all(f"Chapter {i}: {text}" in prompt for i, text in enumerate(SYNOPSES, 1))
+        summary = response.generation_summary
+        assert (summary["generation_method"], summary["context_maintained"]) == ("hybrid", True)
+        assert summary["synopses"]["generated"] is True
+        assert [ch.content for ch in response.chapters] == ["chapter text"] * 3
+
+    def test_synopses_keep_the_prompt_prefix_shared(self, fake_llm):
+        generator = ChapterGenerator()
+        requests = generator._parallel_chapter_requests(hybrid_book(), SYNOPSES)
+        prefixes = {build_chapter_prompt(request).prefix for request in requests}
+        assert len(prefixes) == 1
+        assert "Chapter synopses" in prefixes.pop()
+
+    def test_unusable_synopses_fall_back_to_parallel(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: "no json" if body.get("response_format") else "chapter text"
+        generator = ChapterGenerator()
+        response = generator.generate_book(hybrid_book())
+        summary = response.generation_summary
+        assert summary["context_maintained"] is False
+        assert "not usable" in summary["synopses"]["error"]
+        assert "Chapter synopses" not in backend.requests[-1]["messages"][0]["content"]
+        assert len(response.chapters) == 3 and not summary["failed_chapters"]
+        assert generator.synopsis_generator.stats()["parse_failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_hybrid_routes_synopsis_stage(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = synopsis_reply
+        request = hybrid_book(model_routes={"synopsis": {"model": "gpt-4o-mini"}})
+        response = await ChapterGenerator().async_generate_book(request)
+        assert backend.requests[0]["model"] == "gpt-4o-mini"
+        assert {call["model"] for call in backend.requests[1:]} == {"gpt-4o"}
+        assert response.generation_summary["generation_method"] == "hybrid"
+
+    def test_schema_rejection_falls_back_to_text(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: json.dumps(SYNOPSES)
+        backend.fail_next(400)
+        generator = SynopsisGenerator(structured=True)
+        outline = ChapterGenerator().toc_to_chapter_outlines(hybrid_book().toc)
+        assert generator.generate(hybrid_book().book_context, outline) == SYNOPSES
+        assert generator.stats()["structured_rejected"] == 1
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.toc_generator import TOC_RESPONSE_FORMAT, TOCGenerator, TOCParseError, close_truncated, parse_toc
+
+SECTIONS = [
+    {"section_name": "Origins", "section_ideas": ["Early days", "First steps"]},
+    {"section_name": "Growth", "section_ideas": ["Scaling", "Lessons"]},
+]
+TOC_JSON = json.dumps(SECTIONS)
+
+
+class TestParseToc:
+    """Test tolerant extraction of a TOC from model replies."""
+
+    def test_plain_and_wrapped_json(self):
+        assert parse_toc(TOC_JSON) == (SECTIONS, "json")
+        assert parse_toc(json.dumps({"sections": SECTIONS})) == (SECTIONS, "json")
+
+    def test_fences_and_prose(self):
+        raw = f"Here is the table [draft] of contents:\n```json\n{TOC_JSON}\n```\nLet me know!"
+        assert parse_toc(raw) == (SECTIONS, "extracted")
+
+    def test_trailing_commas(self):
+        raw = '[{"section_name": "Origins", "section_ideas": ["Early days", "First steps",],}, ' \
+              '{"section_name": "Growth", "section_ideas": ["Scaling", "Lessons"]},]'
+        assert parse_toc(raw) == (SECTIONS, "repaired")
+
+    def test_truncated_reply_keeps_complete_sections(self):
+        raw = TOC_JSON[:-1] + ', {"section_name": "Unfinish'
+        assert parse_toc(raw) == (SECTIONS, "repaired")
+        assert close_truncated('{"a": [[1], [2, {"b": "x]') == '{"a": [[1]]}'
+
+    def test_unusable_reply(self):
+        with pytest.raises(TOCParseError):
+            parse_toc("I cannot help with that.")
+        with pytest.raises(TOCParseError):
+            parse_toc('[{"title": "No ideas"}]')
+
+
+class TestTOCGenerator:
+    """Test TOC generation against the fake LLM backend."""
+
+    def test_requests_structured_output(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: json.dumps({"sections": SECTIONS})
+        generator = TOCGenerator(structured=True)
+        assert generator.generate("A book") == SECTIONS
+        assert backend.requests[0]["response_format"] == TOC_RESPONSE_FORMAT
+        assert generator.stats()["json"] == 1
+
+    def test_repair_pass_rescues_unparsable_reply(self, fake_llm):
+        _, backend = fake_llm
+        replies = iter(["Sections: Origins (Early days, First steps); Growth (Scaling, Lessons)", TOC_JSON])
+        backend.reply = lambda body: next(replies)
+        generator = TOCGenerator(structured=False)
+        assert generator.generate("A book") == SECTIONS
+        assert "Origins (Early days" in backend.requests[1]["messages"][0]["content"]
+        assert "response_format" not in backend.requests[0]
+        stats = generator.stats()
+        assert (stats["llm_repaired"], stats["parse_failures"]) == (1, 0)
+
+    def test_unrepairable_reply_counts_a_failure(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: "no json here"
+        generator = TOCGenerator()
+        with pytest.raises(TOCParseError):
+            generator.generate("A book")
+        assert generator.stats()["parse_failures"] == 1
+        assert len(backend.requests) == 2
+
+    def test_schema_rejection_falls_back_to_text(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: f"```json\n{TOC_JSON}\n```"
+        backend.fail_next(400)
+        generator = TOCGenerator(structured=True)
+        assert generator.generate("A book") == SECTIONS
+        assert "response_format" not in backend.requests[1]
+        assert generator.stats()["structured_rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_generate(self, fake_llm):
+        _, backend = fake_llm
+        backend.reply = lambda body: "Sure! " + TOC_JSON
+        generator = TOCGenerator()
+        assert await generator.async_generate("A book") == SECTIONS
+        assert generator.stats()["extracted"] == 1
+
+
+class TestTocEndpoint:
+    """Test /toc with a reply the old strict parser rejected."""
+
+    def test_fenced_reply_is_accepted(self, fake_llm):
+        from app import app
+        _, backend = fake_llm
+        backend.reply = lambda body: f"```json\n{TOC_JSON}\n```"
+        response = TestClient(app).post("/toc", json={"title": "T", "author": "A", "book_idea": "Fenced"})
+        assert response.status_code == 200
+        assert response.json() == SECTIONS
+        assert len(backend.requests) == 1
@@ -0,0 +1,123 @@
+import pytest
+
+from models import BookContext, BookGenerationRequest, ChapterOutline, ChapterRequest, Section
+from services import ai_client
+from services.chapter_generator import ChapterGenerator
+from services.usage_ledger import ModelPrice, Usage, UsageLedger, parse_prices, usage_scope
+
+
+@pytest.fixture
+def ledger(fake_llm, tmp_path) -> UsageLedger:
+    ledger = UsageLedger(db_path=str(tmp_path / "usage.sqlite3"),
+                         prices={"gpt-4o": ModelPrice(prompt=2.0, cached_prompt=1.0, completion=10.0)})
+    ai_client.set_usage_ledger(ledger)
+    return ledger
+
+
+def _book_request(parallel: bool) -> BookGenerationRequest:
+    return BookGenerationRequest(
+        book_context=BookContext(title="Ledger Book", author="Test Author", book_idea="Costs"),
+        toc=[Section(section_name=f"Chapter {i}", section_ideas=[f"Idea {i}"]) for i in range(1, 4)],
+        parallel_generation=parallel,
+    )
+
+
+class TestUsageLedger:
+    """Test token usage capture, pricing and the SQLite ledger."""
+
+    def test_price_bills_cached_tokens_at_cached_rate(self):
+        ledger = UsageLedger(db_path=None, prices={"m": ModelPrice(prompt=2.0, cached_prompt=1.0, completion=10.0)})
+        usage = Usage("m", prompt_tokens=1_000_000, completion_tokens=100_000, cached_tokens=400_000)
+        assert ledger.price(usage) == pytest.approx(0.6 * 2.0 + 0.4 * 1.0 + 0.1 * 10.0)
+
+    def test_unknown_model_is_flagged_not_priced(self):
+        ledger = UsageLedger(db_path=None, prices={"gpt-4o": ModelPrice(1.0, 1.0, 1.0)})
+        assert ledger.price(Usage("custom", prompt_tokens=1_000_000)) == 0.0
+        ledger.record("custom", {"prompt_tokens": 10})
+        ledger.record("gpt-4o", {"prompt_tokens": 10})
+        stats = ledger.stats()
+        assert stats["unpriced_models"] == ["custom"]
+        assert stats["by_model"]["gpt-4o"]["priced"] is True
+
+    def test_snapshot_uses_base_model_price(self):
+        ledger = UsageLedger(db_path=None, prices={"gpt-4o": ModelPrice(1.0, 1.0, 1.0),
+                                                   "gpt-4o-mini": ModelPrice(0.5, 0.5, 0.5)})
+        assert ledger.price(Usage("gpt-4o-2024-08-06", prompt_tokens=1_000_000)) == pytest.approx(1.0)
+        assert ledger.price(Usage("gpt-4o-mini-2024-07-18", prompt_tokens=1_000_000)) == pytest.approx(0.5)
+
+    def test_parse_prices(self):
+        assert parse_prices("m=1:0.5:4") == {"m": ModelPrice(1.0, 0.5, 4.0)}
+
+    def test_nested_scopes_merge_tags_and_totals(self, ledger):
+        with usage_scope(endpoint="/toc") as outer:
+            with usage_scope(book="B", chapter=2) as inner:
+                ai_client.ask_llm("prompt")
+            assert inner.tags == {"endpoint": "/toc", "book": "B", "chapter": 2}
+        assert inner.prompt_tokens == outer.prompt_tokens == 5
+        assert inner.completion_tokens == 2
+        assert outer.cost == pytest.approx((5 * 2.0 + 2 * 10.0) / 1_000_000)
+        assert ledger.summary(endpoint="/toc", book="B", chapter=2)["gpt-4o"]["calls"] == 1
+
+    def test_cache_hits_cost_nothing(self, ledger):
+        ai_client.ask_llm("prompt")
+        with usage_scope() as usage:
+            ai_client.ask_llm("prompt")
+        assert usage.calls == 0
+        assert ai_client.get_llm_usage_stats()["by_model"]["gpt-4o"]["calls"] == 1
+
+    def test_chapter_cost_comes_from_usage(self, ledger):
+        chapter = ChapterGenerator().generate_single_chapter(ChapterRequest(
+            chapter_outline=ChapterOutline(chapter_number=1, section_name="Intro", section_ideas=["a"]),
+            book_context=BookContext(title="T", author="A", book_idea="I"),
+        ))
+        assert chapter.prompt_tokens == 5
+        assert chapter.completion_tokens == 2
+        assert chapter.cost_estimate == pytest.approx(30 / 1_000_000)
+
+    def test_parallel_book_is_tagged_and_totalled(self, ledger):
+        book = ChapterGenerator().generate_book(_book_request(parallel=True))
+        assert book.total_cost_estimate == pytest.approx(3 * 30 / 1_000_000)
+        summary = ledger.summary(book="Ledger Book")
+        assert summary["gpt-4o"]["calls"] == 3
+        assert ledger.summary(book="Ledger Book", chapter=2)["gpt-4o"]["calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_book_is_tagged(self, ledger):
+        book = await ChapterGenerator().async_generate_book(_book_request(parallel=True))
+        assert all(ch.cost_estimate > 0 for ch in book.chapters)
+        assert ledger.summary(book="Ledger Book")["gpt-4o"]["calls"] == 3
+
+    def test_streamed_usage_is_recorded(self, ledger):
+        with usage_scope(chapter=7) as usage:
+            list(ai_client.stream_llm("prompt"))
+        assert usage.completion_tokens == 2
+        assert ledger.summary(chapter=7)["gpt-4o"]["calls"] == 1
+
+    def test_summary_rejects_unknown_tags(self, ledger):
+        with pytest.raises(ValueError):
+            ledger.summary(tenant="x")
+
+    def test_requests_are_tagged_with_endpoint(self, ledger):
+        from fastapi.testclient import TestClient
+        from app import app
+
+        response = TestClient(app).post("/generate-chapter", json={
+            "chapter_outline": {"chapter_number": 1, "section_name": "Intro", "section_ideas": ["a"]},
+            "book_context": {"title": "T", "author": "A", "book_idea": "I"},
+        })
+        assert response.status_code == 200
+        assert response.json()["cost_estimate"] > 0
+        assert ledger.summary(endpoint="/generate-chapter")["gpt-4o"]["calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_record_writes_off_event_loop(self, ledger, monkeypatch):
+        import threading
+        loop_thread = threading.get_ident()
+        threads = []
+        real_write = ledger._write
+        monkeypatch.setattr(ledger, "_write", lambda row: threads.append(threading.get_ident()) or real_write(row))
+        with usage_scope(chapter=9) as usage:
+            await ai_client.async_ask_llm("async ledger", use_cache=False)
+        assert usage.completion_tokens > 0
+        assert ledger.summary(chapter=9)["gpt-4o"]["calls"] == 1
+        assert threads and loop_thread not in threads
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services.warmup import Warmup, WarmupSkipped, warm_llm_connections
+
+
+class TestWarmup:
+    """Test the background warm-up and readiness."""
+
+    @pytest.mark.asyncio
+    async def test_ready_once_every_step_ended(self):
+        calls = []
+
+        async def async_step():
+            calls.append("async")
+
+        def skipped():
+            raise WarmupSkipped("not installed")
+
+        def broken():
+            raise OSError("no fonts")
+
+        warmup = Warmup({"sync": lambda: calls.append("sync"), "async": async_step,
+                         "skipped": skipped, "broken": broken}, enabled=True)
+        assert not warmup.ready
+        await warmup.start()
+        assert warmup.ready
+        assert sorted(calls) == ["async", "sync"]
+        steps = warmup.status()["steps"]
+        assert {name: step["status"] for name, step in steps.items()} == {
+            "sync": "done", "async": "done", "skipped": "skipped", "broken": "failed",
+        }
+        assert steps["broken"]["error"] == "OSError: no fonts"
+
+    @pytest.mark.asyncio
+    async def test_slow_step_times_out(self):
+        warmup = Warmup({"slow": lambda: time.sleep(0.2)}, timeout=0.01, enabled=True)
+        await warmup.run()
+        assert warmup.results["slow"].status == "failed"
+        assert "timed out" in warmup.results["slow"].error
+
+    def test_disabled_is_ready_without_running(self):
+        warmup = Warmup({"never": lambda: pytest.fail("ran")}, enabled=False)
+        assert warmup.ready
+        assert warmup.status()["steps"]["never"]["status"] == "pending"
+
+    @pytest.mark.asyncio
+    async def test_llm_connections_warm_both_clients(self, fake_llm):
+        _, backend = fake_llm
+        await warm_llm_connections(3)()
+        assert backend.warm_requests == 6
+        assert backend.requests == []  # no completions, so no tokens spent
+
+
+class TestReadyEndpoint:
+    """Test GET /ready against the app's lifespan."""
+
+    def test_ready_turns_200_after_warmup(self, monkeypatch):
+        release = threading.Event()
+        monkeypatch.setattr(app_module, "warmup", Warmup({"gate": lambda: release.wait(5)}, enabled=True))
+        with TestClient(app_module.app) as client:
+            assert client.get("/ready").status_code == 503
+            assert client.get("/test").status_code == 200
+            release.set()
+            deadline = time.monotonic() + 5
+            while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            body = client.get("/ready").json()
+        assert body["ready"] is True
+        assert body["steps"]["gate"]["status"] == "done"